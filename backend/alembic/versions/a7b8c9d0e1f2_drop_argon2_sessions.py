@@ -0,0 +1,30 @@
+"""drop sessions stored with argon2 token hashes
+
+Sessions are looked up by their keyed token digest (c3d4e5f6a7b8). Rows
+still holding an argon2 hash can't be converted to a digest, and matching
+them meant argon2-verifying every one of a user's legacy rows on each
+lookup miss. They are deleted; their users log in again.
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-18
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DELETE FROM sessions WHERE token LIKE '$argon2%'")
+
+
+def downgrade() -> None:
+    # The deleted sessions can't be restored
+    pass
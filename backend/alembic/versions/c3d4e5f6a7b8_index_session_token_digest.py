@@ -0,0 +1,30 @@
+"""index sessions token digest
+
+Session tokens are now stored as a keyed SHA-256 digest instead of an argon2
+hash so they can be looked up by index. Rows still holding an argon2 hash are
+rewritten to the digest form the first time the owning token is presented.
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-18
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+revision: str = 'c3d4e5f6a7b8'
+down_revision: Union[str, None] = 'b2c3d4e5f6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sessions_token'), ['token'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sessions_token'))
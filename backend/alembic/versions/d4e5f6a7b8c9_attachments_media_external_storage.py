@@ -0,0 +1,28 @@
+"""store attachments media uncompressed out of line
+
+Media payloads are now streamed with substring() slices. With EXTERNAL
+storage Postgres can fetch just the TOAST chunks covering a slice instead of
+decompressing the whole value. Only newly written values are affected.
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-18
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+revision: str = 'd4e5f6a7b8c9'
+down_revision: Union[str, None] = 'c3d4e5f6a7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE attachments ALTER COLUMN media SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE attachments ALTER COLUMN media SET STORAGE EXTENDED")
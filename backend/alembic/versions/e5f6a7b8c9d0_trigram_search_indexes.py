@@ -0,0 +1,46 @@
+"""trigram indexes for free-text search
+
+Free-text `search` matches ILIKE '%term%' against a curated per-table text
+document (data_adapters.sql.create_tables.SEARCH_DOCUMENTS). These GIN
+trigram indexes are built on the same expressions so the match no longer
+needs a sequential scan. The expressions are copied here so the migration
+stays stable if the documents change later.
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-18
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+revision: str = 'e5f6a7b8c9d0'
+down_revision: Union[str, None] = 'd4e5f6a7b8c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+META_COLUMNS = ("uuid", "shortname", "slug", "displayname", "description", "tags", "payload", "owner_shortname")
+
+TABLE_COLUMNS = {
+    "entries": (*META_COLUMNS, "state", "workflow_shortname"),
+    "attachments": (*META_COLUMNS, "body", "state"),
+    "users": (*META_COLUMNS, "email", "msisdn", "roles", "groups"),
+    "roles": (*META_COLUMNS, "permissions"),
+    "permissions": META_COLUMNS,
+    "spaces": META_COLUMNS,
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table_name, columns in TABLE_COLUMNS.items():
+        document = " || ' ' || ".join(f"COALESCE({column}::text, '')" for column in columns)
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_search_trgm ON {table_name} USING GIN (({document}) gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    for table_name in TABLE_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS idx_{table_name}_search_trgm")
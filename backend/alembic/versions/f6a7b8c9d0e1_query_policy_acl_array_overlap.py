@@ -0,0 +1,67 @@
+"""index-friendly query policy and ACL filtering
+
+Query-policy access used to be checked with LIKE over unnest(query_policies)
+and a jsonb_array_elements scan of `acl`, neither of which can use an index.
+Rows now also carry their `<space>:<subpath>:<type>` and
+`<space>:<subpath>:<type>:<active>` prefixes as tokens, so wildcard policies
+compile to `query_policies && ARRAY[...]`, and the users granted `query` by
+the ACL are kept in a new `acl_principals` column. Both are GIN indexed.
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-18
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ("entries", "users", "roles", "permissions", "spaces")
+
+PREFIX_PATTERN = "^([^:]*:[^:]*:[^:]*):(true|false)"
+
+
+def upgrade() -> None:
+    for table_name in TABLES:
+        op.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS acl_principals TEXT[] NOT NULL DEFAULT '{{}}'")
+        op.execute(
+            f"""
+            UPDATE {table_name} SET acl_principals = ARRAY(
+                SELECT DISTINCT elem->>'user_shortname'
+                FROM jsonb_array_elements(CASE WHEN jsonb_typeof(acl::jsonb) = 'array' THEN acl::jsonb ELSE '[]'::jsonb END) AS elem
+                WHERE jsonb_typeof(elem->'allowed_actions') = 'array'
+                  AND (elem->'allowed_actions') ? 'query'
+                  AND elem->>'user_shortname' IS NOT NULL
+            )
+            WHERE acl IS NOT NULL
+            """
+        )
+        op.execute(
+            f"""
+            UPDATE {table_name} SET query_policies = ARRAY(
+                SELECT qp FROM unnest(query_policies) AS qp
+                UNION
+                SELECT m[1] FROM unnest(query_policies) AS qp CROSS JOIN LATERAL regexp_match(qp, '{PREFIX_PATTERN}') AS m
+                WHERE m IS NOT NULL
+                UNION
+                SELECT m[1] || ':' || m[2] FROM unnest(query_policies) AS qp CROSS JOIN LATERAL regexp_match(qp, '{PREFIX_PATTERN}') AS m
+                WHERE m IS NOT NULL
+            )
+            WHERE query_policies IS NOT NULL
+            """
+        )
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_acl_principals_gin ON {table_name} USING GIN (acl_principals)")
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_query_policies_gin ON {table_name} USING GIN (query_policies)")
+
+
+def downgrade() -> None:
+    for table_name in TABLES:
+        op.execute(f"DROP INDEX IF EXISTS idx_{table_name}_acl_principals_gin")
+        op.execute(f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS acl_principals")
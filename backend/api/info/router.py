@@ -10,10 +10,14 @@ from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
 
 import models.api as api
+from data_adapters.sql.metadata_cache import metadata_cache
+from data_adapters.sql.search_plans import search_plans
 from utils.internal_error_code import InternalErrorCode
 from utils.jwt import JWTBearer
 from utils.plugin_manager import plugin_manager
+from utils.schema_validators import schema_validators
 from utils.settings import settings
+from utils.token_cache import token_cache
 
 router = APIRouter(default_response_class=JSONResponse)
 
@@ -96,6 +100,12 @@ async def get_manifest(_=Depends(JWTBearer())) -> api.Response:
         },
         "git": git_info,
         "plugins": plugin_manager.active_plugins,
+        "caches": {
+            "token": token_cache.stats(),
+            "search_plans": search_plans.stats(),
+            "metadata": metadata_cache.stats(),
+            "schema_validators": schema_validators.stats(),
+        },
     }
     return api.Response(status=api.Status.success, attributes=manifest)
 
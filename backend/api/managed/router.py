@@ -11,17 +11,17 @@ import traceback
 import zipfile
 from collections.abc import Callable
 from datetime import datetime
-from io import BytesIO, StringIO
+from io import StringIO
 from pathlib import Path as FilePath
 from re import sub as res_sub
 
 # from time import time
 from typing import Any
 
-from fastapi import APIRouter, Body, Depends, Form, Path, Query, UploadFile, status
+from fastapi import APIRouter, Body, Depends, Form, Path, Query, Request, UploadFile, status
+from fastapi.logger import logger
 from fastapi.responses import JSONResponse, RedirectResponse
-from starlette.background import BackgroundTask
-from starlette.responses import FileResponse, StreamingResponse
+from starlette.responses import StreamingResponse
 
 import models.api as api
 import models.core as core
@@ -29,14 +29,15 @@ import utils.regex as regex
 import utils.repository as repository
 from api.managed.utils import (
     create_or_update_resource_with_payload_handler,
-    csv_entries_prepare_docs,
+    csv_entry_row,
     # data_asset_attachments_handler,
     # data_asset_handler,
-    get_mime_type,
     get_resource_content_type_from_payload_content_type,
     handle_update_state,
     import_resources_from_csv_handler,
-    iter_bytesio,
+    media_payload_response,
+    query_response_attributes,
+    schema_columns,
     serve_request_assign,
     serve_request_create,
     serve_request_delete,
@@ -49,6 +50,7 @@ from api.managed.utils import (
 from data_adapters.adapter import data_adapter as db
 from data_adapters.sql.json_to_db_migration import main as json_to_db_main
 from models.enums import (
+    ArchiveFormat,
     ContentType,
     # DataAssetType,
     LockAction,
@@ -58,6 +60,7 @@ from models.enums import (
     TaskType,
 )
 from utils.access_control import access_control
+from utils.archive_stream import MEDIA_TYPES, stream_archive
 from utils.helpers import (
     camel_case,
     # csv_file_to_json,
@@ -108,55 +111,19 @@ async def import_data(
             return api.Response(status=api.Status.failed, attributes={"message": f"Failed to import data: {e!s}"})
 
 
-@router.post("/export", response_class=FileResponse)
-async def export_data(query: api.Query, user_shortname=Depends(JWTBearer())):
-    zip_temp_dir_obj = None
-    temp_dir_obj = tempfile.TemporaryDirectory()
-    temp_dir = temp_dir_obj.name
+@router.post("/export", response_class=StreamingResponse)
+async def export_data(
+    query: api.Query,
+    archive_format: ArchiveFormat = ArchiveFormat.zip,
+    user_shortname=Depends(JWTBearer()),
+):
+    from data_adapters.sql.db_to_json_migration import export_query_members
 
+    chunks = stream_archive(export_query_members(query, user_shortname), archive_format)
     try:
-        original_spaces_folder = settings.spaces_folder
-        temp_spaces_folder = FilePath(temp_dir)
-
-        zip_temp_dir_obj = tempfile.TemporaryDirectory()
-        zip_temp_dir = zip_temp_dir_obj.name
-        zip_path = os.path.join(zip_temp_dir, "export.zip")
-
-        try:
-            settings.spaces_folder = temp_spaces_folder
-
-            from data_adapters.sql.db_to_json_migration import export_data_with_query
-
-            await export_data_with_query(query, user_shortname)
-
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                for root, _, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_dir)  # noqa: ASYNC240
-                        zip_file.write(file_path, arcname)
-
-            def cleanup():
-                temp_dir_obj.cleanup()
-                zip_temp_dir_obj.cleanup()
-
-            response = FileResponse(
-                path=zip_path, media_type="application/zip", filename="export.zip", background=BackgroundTask(cleanup)
-            )
-            return response
-
-        finally:
-            settings.spaces_folder = original_spaces_folder
-
+        # Errors before the first byte (permissions, a bad query) still get a proper response
+        first_chunk = await anext(chunks, b"")
     except Exception as e:
-        temp_dir_obj.cleanup()
-        try:
-            if zip_temp_dir_obj:
-                zip_temp_dir_obj.cleanup()
-        except Exception as ee:
-            print(f"Export error: {ee}")
-            pass
-
         traceback.print_exc()
         print(f"Export error: {e}")
         return JSONResponse(
@@ -166,6 +133,24 @@ async def export_data(query: api.Query, user_shortname=Depends(JWTBearer())):
             ).model_dump(),
         )
 
+    async def archive_chunks():
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(
+        archive_chunks(),
+        media_type=MEDIA_TYPES[archive_format],
+        headers={"Content-Disposition": f'attachment; filename="export.{archive_format}"'},
+    )
+
+
+def csv_chunk(writer: csv.DictWriter, buffer: StringIO, rows: list[dict]) -> str:
+    buffer.seek(0)
+    buffer.truncate(0)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
 
 @router.post(
     "/csv/{space_name}",
@@ -173,53 +158,84 @@ async def export_data(query: api.Query, user_shortname=Depends(JWTBearer())):
     response_model_exclude_none=True,
 )
 async def generate_csv_from_report_saved_query(space_name: str, record: core.Record, user_shortname=Depends(JWTBearer())):
-    records = (
-        await execute(
-            space_name=space_name,
-            record=record,
-            task_type=TaskType.query,
-            logged_in_user=user_shortname,
-        )
-    ).records
-    if not records:
+    query = await saved_query(space_name, record, user_shortname)
+    await is_space_exist(query.space_name)
+    query_event = core.Event(
+        space_name=query.space_name,
+        subpath=query.subpath,
+        action_type=core.ActionType.query,
+        user_shortname=user_shortname,
+        attributes={"filter_shortnames": query.filter_shortnames},
+    )
+    await plugin_manager.before_action(query_event)
+
+    batches = repository.serve_query_batches(query, user_shortname)
+    first_rows = [flatten_dict(r.attributes) for r in await anext(batches, []) if r.attributes is not None]
+    if not first_rows:
+        await batches.aclose()
         raise api.Exception(
             status.HTTP_400_BAD_REQUEST,
             error=api.Error(type="media", code=InternalErrorCode.OBJECT_NOT_FOUND, message="Request object is not available"),
         )
 
-    json_data = []
-    for r in records:
-        if r.attributes is None:
+    # The header goes out with the first byte: the attributes of the first batch plus the payload
+    # properties the queried schemas declare, so records that leave them out early still get a column
+    columns = [key for row in first_rows for key in row]
+    for schema_shortname in query.filter_schema_names:
+        if schema_shortname == "meta":
             continue
-        json_data.append(flatten_dict(r.attributes))
-
-    v_path = StringIO()
+        try:
+            columns.extend(schema_columns(await db.get_schema(query.space_name, schema_shortname, user_shortname)))
+        except api.Exception:
+            continue
+    fieldnames = list(dict.fromkeys(columns))
 
-    keys: set = set({})
-    for row in json_data:
-        keys.update(set(row.keys()))
+    async def csv_chunks():
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        yield buffer.getvalue()
+        yield csv_chunk(writer, buffer, first_rows)
+        number_of_records = len(first_rows)
+        known_columns = set(fieldnames)
+        dropped_columns: set[str] = set()
+        async for batch in batches:
+            rows = [flatten_dict(r.attributes) for r in batch if r.attributes is not None]
+            number_of_records += len(rows)
+            unknown_columns = {key for row in rows for key in row} - known_columns - dropped_columns
+            if unknown_columns:
+                dropped_columns |= unknown_columns
+                logger.warning(
+                    f"CSV export of {space_name}/{record.subpath}/{record.shortname} left out attributes missing"
+                    f" from its header: {sorted(unknown_columns)}"
+                )
+            yield csv_chunk(writer, buffer, rows)
 
-    writer = csv.DictWriter(v_path, fieldnames=list(keys))
-    writer.writeheader()
-    writer.writerows(json_data)
+        await plugin_manager.after_action(
+            core.Event(
+                space_name=query.space_name,
+                subpath=query.subpath,
+                action_type=core.ActionType.query,
+                user_shortname=user_shortname,
+            )
+        )
+        await plugin_manager.after_action(
+            core.Event(
+                space_name=space_name,
+                subpath=record.subpath,
+                action_type=core.ActionType.query,
+                user_shortname=user_shortname,
+                attributes={
+                    "shortname": record.shortname,
+                    "number_of_records": number_of_records,
+                    "dropped_columns": sorted(dropped_columns),
+                },
+            )
+        )
 
-    response = StreamingResponse(iter([v_path.getvalue()]), media_type="text/csv")
+    response = StreamingResponse(csv_chunks(), media_type="text/csv")
     safe_filename = f"{space_name}_{record.subpath}".replace("/", "_").replace("\\", "_").replace('"', "")
     response.headers["Content-Disposition"] = f'attachment; filename="{safe_filename}.csv"'
-
-    await plugin_manager.after_action(
-        core.Event(
-            space_name=space_name,
-            subpath=record.subpath,
-            action_type=core.ActionType.query,
-            user_shortname=user_shortname,
-            attributes={
-                "shortname": record.shortname,
-                "number_of_records": len(json_data),
-            },
-        )
-    )
-
     return response
 
 
@@ -252,112 +268,51 @@ async def csv_entries(query: api.Query, user_shortname=Depends(JWTBearer())):
         user_shortname,
     )
 
-    folder_payload = await db.load_resource_payload(
-        query.space_name,
-        parent_subpath,
-        f"{folder.shortname}.json",
-        core.Folder,
-    )
+    # The folder comes from the metadata cache, no need for a second trip for its payload
+    if folder.payload and isinstance(folder.payload.body, dict):
+        folder_payload: dict | None = folder.payload.body
+    else:
+        folder_payload = await db.load_resource_payload(
+            query.space_name,
+            parent_subpath,
+            f"{folder.shortname}.json",
+            core.Folder,
+        )
     folder_views: list = []
     if folder_payload:
         folder_views = folder_payload.get("csv_columns", [])
         if not folder_views:
             folder_views = folder_payload.get("index_attributes", [])
 
-    keys: list = [i["name"] for i in folder_views]
-    keys_existence = dict(zip(keys, [False for _ in range(len(keys))], strict=False))
-
-    #  _, search_res = await db.query(query, user_shortname)
-    # docs_dicts = [search_re.model_dump() for search_re in search_res]
-
-    _, search_res = await repository.serve_query(
-        query,
-        user_shortname,
-    )
+    # Every configured column is written up front so the first byte leaves before the query is done
+    fieldnames: list = list(dict.fromkeys(i["name"] for i in folder_views))
 
-    docs_dicts = [search_re.model_dump() for search_re in search_res]
-
-    json_data, deprecated_keys, new_keys = csv_entries_prepare_docs(query, docs_dicts, folder_views, keys_existence)
+    async def csv_chunks():
+        """Flatten and write each batch as it comes off the cursor"""
+        buffer = StringIO()
+        buffer.write(codecs.BOM_UTF8.decode("utf-8"))
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        yield buffer.getvalue()
+        async for batch in repository.serve_query_batches(query, user_shortname):
+            yield csv_chunk(writer, buffer, [csv_entry_row(r.model_dump(), folder_views) for r in batch])
 
-    await plugin_manager.after_action(
-        core.Event(
-            space_name=query.space_name,
-            subpath=query.subpath,
-            action_type=core.ActionType.query,
-            user_shortname=user_shortname,
+        await plugin_manager.after_action(
+            core.Event(
+                space_name=query.space_name,
+                subpath=query.subpath,
+                action_type=core.ActionType.query,
+                user_shortname=user_shortname,
+            )
         )
-    )
-
-    keys = [key for key in keys if keys_existence[key]]
 
-    list_deprecated_keys = list(deprecated_keys)
-    keys = list(filter(lambda item: item not in list_deprecated_keys, keys))
-    fieldnames = keys + list(new_keys)
-
-    def csv_row_generator():
-        """Stream CSV rows one at a time to avoid building the full CSV in memory."""
-        buf = StringIO()
-        buf.write(codecs.BOM_UTF8.decode("utf-8"))
-        writer = csv.DictWriter(buf, fieldnames=fieldnames)
-        writer.writeheader()
-        yield buf.getvalue()
-        for row in json_data:
-            buf = StringIO()
-            writer = csv.DictWriter(buf, fieldnames=fieldnames)
-            writer.writerow(row)
-            yield buf.getvalue()
-
-    response = StreamingResponse(csv_row_generator(), media_type="text/csv")
+    response = StreamingResponse(csv_chunks(), media_type="text/csv")
     safe_filename = f"{query.space_name}_{query.subpath}".replace("/", "_").replace("\\", "_").replace('"', "")
     response.headers["Content-Disposition"] = f'attachment; filename="{safe_filename}.csv"'
 
     return response
 
 
-# @router.post("/space", response_model=api.Response, response_model_exclude_none=True)
-# async def serve_space(
-#         request: api.Request, owner_shortname=Depends(JWTBearer())
-# ) -> api.Response:
-#     record = request.records[0]
-#     history_diff = {}
-#     _record = None
-#     match request.request_type:
-#         case api.RequestType.create:
-#             _record = await serve_space_create(request, record, owner_shortname)
-#
-#         case api.RequestType.update:
-#             history_diff = await serve_space_update(request, record, owner_shortname)
-#
-#         case api.RequestType.delete:
-#             await serve_space_delete(request, record, owner_shortname)
-#
-#         case _:
-#             raise api.Exception(
-#                 status.HTTP_400_BAD_REQUEST,
-#                 api.Error(
-#                     type="request",
-#                     code=InternalErrorCode.UNMATCHED_DATA,
-#                     message="mismatch with the information provided",
-#                 ),
-#             )
-#
-#     await db.initialize_spaces()
-#
-#     await plugin_manager.after_action(
-#         core.Event(
-#             space_name=record.shortname,
-#             subpath=record.subpath,
-#             shortname=record.shortname,
-#             action_type=core.ActionType(request.request_type),
-#             resource_type=ResourceType.space,
-#             user_shortname=owner_shortname,
-#             attributes={"history_diff": history_diff},
-#         )
-#     )
-#
-#     return api.Response(status=api.Status.success, records=[_record if _record else record])
-
-
 @router.post("/query", response_model=api.Response, response_model_exclude_none=True)
 async def query_entries(query: api.Query, user_shortname=Depends(JWTBearer())) -> api.Response:
     await is_space_exist(query.space_name)
@@ -388,7 +343,7 @@ async def query_entries(query: api.Query, user_shortname=Depends(JWTBearer())) -
     return api.Response(
         status=api.Status.success,
         records=[] if query.type == QueryType.counters else records,
-        attributes={"total": total, "returned": len(records)},
+        attributes=query_response_attributes(query, total, records),
     )
 
 
@@ -599,6 +554,7 @@ async def update_state(
     response_model_exclude_none=True,
 )
 async def retrieve_entry_or_attachment_payload(
+    request: Request,
     resource_type: ResourceType,
     space_name: str = Path(..., pattern=regex.SPACENAME, examples=["data"]),
     subpath: str = Path(..., pattern=regex.SUBPATH, examples=["/content"]),
@@ -671,10 +627,7 @@ async def retrieve_entry_or_attachment_payload(
             attributes=meta.payload.body,
         )
 
-    data: BytesIO | None = await db.get_media_attachment(space_name, subpath, shortname)
-    if data:
-        return StreamingResponse(iter_bytesio(data), media_type=get_mime_type(meta.payload.content_type, meta.payload.body))
-    return api.Response(status=api.Status.failed)
+    return await media_payload_response(request, space_name, subpath, shortname, meta)
 
 
 @router.post(
@@ -860,13 +813,31 @@ async def import_resources_from_csv(
         meta_class_attributes.update(user_cls.model_fields)
     failed_shortnames: list = []
     success_count = 0
-    for row in csv_reader:
-        payload_object, meta_object, shortname = await import_resources_from_csv_handler(
+    parsed_rows = [
+        await import_resources_from_csv_handler(
             row,
             meta_class_attributes,
             schema_content,
             data_types_mapper,
         )
+        for row in csv_reader
+    ]
+
+    # Validate every new payload against the compiled schema in one go, the
+    # per-record validation of serve_request then only sees the valid rows.
+    # Updates are merged into the stored payload first so they are left to it.
+    invalid_rows: dict[int, Exception] = {}
+    if schema_shortname and not is_update:
+        invalid_rows = dict(
+            await db.validate_payloads_with_schema(
+                [payload_object for payload_object, _, _ in parsed_rows], space_name, schema_shortname
+            )
+        )
+
+    for index, (payload_object, meta_object, shortname) in enumerate(parsed_rows):
+        if index in invalid_rows:
+            failed_shortnames.append({shortname: invalid_rows[index].__str__()})
+            continue
 
         if "is_active" not in meta_object:
             meta_object["is_active"] = True
@@ -1103,6 +1074,7 @@ async def get_space_report(
     )
     return api.Response(
         status=api.Status.success,
+        attributes={"payload_indexes": await db.payload_index_status(space_name)},
     )
 
 
@@ -1273,6 +1245,11 @@ async def execute(
     record: core.Record,
     logged_in_user=Depends(JWTBearer()),
 ):
+    return await query_entries(query=await saved_query(space_name, record, logged_in_user), user_shortname=logged_in_user)
+
+
+async def saved_query(space_name: str, record: core.Record, logged_in_user: str) -> api.Query:
+    """The query a saved report or query entry describes, with `record.attributes` filled in"""
     meta = await db.load(
         space_name=space_name,
         subpath=record.subpath,
@@ -1319,7 +1296,7 @@ async def execute(
     if "to_date" in record.attributes:
         query_dict["to_date"] = record.attributes["to_date"]
 
-    return await query_entries(query=api.Query(**query_dict), user_shortname=logged_in_user)
+    return api.Query(**query_dict)
 
 
 @router.get(
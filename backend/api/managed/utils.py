@@ -2,12 +2,14 @@ import asyncio
 import contextlib
 import json
 import sys
-from datetime import datetime
+from datetime import UTC, datetime
+from email.utils import format_datetime
 from io import BytesIO
 from pathlib import Path as FilePath
 from typing import Any
 
-from fastapi import status
+from fastapi import Request, status
+from starlette.responses import Response, StreamingResponse
 
 import models.api as api
 import models.core as core
@@ -57,78 +59,151 @@ async def iter_bytesio(data: BytesIO, chunk_size: int = 8192):
             return
 
 
-def csv_entries_prepare_docs(query, docs_dicts, folder_views, keys_existence):
-    json_data = []
-    timestamp_fields = ["created_at", "updated_at"]
-    new_keys: set[str] = set()
-    deprecated_keys: set[str] = set()
-
-    for redis_document in docs_dicts:
-        rows: list[dict] = [{}]
-        flattened_doc = flatten_dict(redis_document)
-        for folder_view in folder_views:
-            column_key = folder_view.get("key")
-            column_title = folder_view.get("name")
-            attribute_val = flattened_doc.get(column_key)
-
-            if attribute_val is None and not column_key.startswith("attachments."):
-                parts = column_key.split(".")
-                current = redis_document
-                for part in parts:
-                    if isinstance(current, dict):
-                        current = current.get(part)
-                    else:
-                        current = None
-                        break
-                if isinstance(current, (dict, list)):
-                    attribute_val = current
-
-            if column_key.startswith("attachments.") and attribute_val is None:
-                parts = column_key.split(".")
-                if len(parts) >= 3:
-                    attachment_type = parts[1]
-                    property_name = ".".join(parts[2:])
-
-                    attachment_key = f"attachments.{attachment_type}"
-                    attachments_array = flattened_doc.get(attachment_key)
-
-                    if isinstance(attachments_array, list):
-                        flattened_attachments = [
-                            flatten_dict(attachment) if isinstance(attachment, dict) else attachment
-                            for attachment in attachments_array
-                        ]
-                        attribute_val = [
-                            flattened_attachment.get(property_name)
-                            for flattened_attachment in flattened_attachments
-                            if isinstance(flattened_attachment, dict) and flattened_attachment.get(property_name) is not None
-                        ]
-                        attribute_val = [val for val in attribute_val if val is not None]
-
-            if attribute_val is not None:
-                keys_existence[column_title] = True
-            if isinstance(attribute_val, (dict, list)):
-                new_col = json.dumps(attribute_val, ensure_ascii=False)
-                for row in rows:
-                    row[column_title] = new_col
-            elif attribute_val is not None:
-                new_col = (
-                    attribute_val
-                    if column_key not in timestamp_fields
-                    else datetime.fromtimestamp(attribute_val).strftime("%Y-%m-%d %H:%M:%S")
-                )
-                for row in rows:
-                    row[column_title] = new_col
-        json_data += rows
-
-    # Sort all entries from all schemas
-    if query.sort_by in core.Meta.model_fields and len(query.filter_schema_names) > 1:
-        json_data = sorted(
-            json_data,
-            key=lambda d: d.get(query.sort_by, ""),
-            reverse=(query.sort_type == api.SortType.descending),
+def parse_range_header(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """Return the inclusive (start, end) of a single `bytes=` range, or None to serve the whole body.
+
+    Malformed and multi-range headers are ignored as allowed by RFC 9110,
+    a range starting past the end raises ValueError (416).
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    first, sep, last = range_header[6:].strip().partition("-")
+    if not sep or not (first.isdigit() or last.isdigit()) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range, the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    if end < start:
+        return None
+    return start, end
+
+
+async def media_payload_response(
+    request: Request, space_name: str, subpath: str, shortname: str, meta: core.Meta
+) -> Response | api.Response:
+    size = await db.get_media_attachment_size(space_name, subpath, shortname)
+    if not size or not meta.payload:
+        return api.Response(status=api.Status.failed)
+
+    updated_at = meta.updated_at.astimezone(UTC)
+    etag = f'"{meta.payload.checksum}"' if meta.payload.checksum else f'W/"{size}-{int(updated_at.timestamp())}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": format_datetime(updated_at, usegmt=True),
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() not in (etag, headers["Last-Modified"]):
+        range_header = None
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{size}"},
+        )
+
+    media_type = get_mime_type(meta.payload.content_type, meta.payload.body if isinstance(meta.payload.body, str) else None)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            db.stream_media_attachment(space_name, subpath, shortname, 0, size), media_type=media_type, headers=headers
         )
 
-    return json_data, deprecated_keys, new_keys
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        db.stream_media_attachment(space_name, subpath, shortname, start, end - start + 1),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def query_response_attributes(query: api.Query, total: int, records: list) -> dict[str, Any]:
+    attributes: dict[str, Any] = {"total": total, "returned": len(records)}
+    if query.next_cursor:
+        attributes["next_cursor"] = query.next_cursor
+    return attributes
+
+
+def schema_columns(schema: dict, prefix: str = "payload.body") -> list[str]:
+    """The flattened keys (as `flatten_dict` names them) of the properties a payload schema declares"""
+    columns: list[str] = []
+    for name, definition in (schema.get("properties") or {}).items():
+        key = f"{prefix}.{name}"
+        if isinstance(definition, dict) and definition.get("properties"):
+            columns.extend(schema_columns(definition, key))
+        else:
+            columns.append(key)
+    return columns
+
+
+def csv_entry_row(document: dict, folder_views: list) -> dict:
+    """One CSV row of a dumped record, keyed on the folder's column titles"""
+    timestamp_fields = ["created_at", "updated_at"]
+    row: dict = {}
+    flattened_doc = flatten_dict(document)
+    for folder_view in folder_views:
+        column_key = folder_view.get("key")
+        column_title = folder_view.get("name")
+        attribute_val = flattened_doc.get(column_key)
+
+        if attribute_val is None and not column_key.startswith("attachments."):
+            parts = column_key.split(".")
+            current: Any = document
+            for part in parts:
+                if isinstance(current, dict):
+                    current = current.get(part)
+                else:
+                    current = None
+                    break
+            if isinstance(current, (dict, list)):
+                attribute_val = current
+
+        if column_key.startswith("attachments.") and attribute_val is None:
+            parts = column_key.split(".")
+            if len(parts) >= 3:
+                attachment_type = parts[1]
+                property_name = ".".join(parts[2:])
+
+                attachment_key = f"attachments.{attachment_type}"
+                attachments_array = flattened_doc.get(attachment_key)
+
+                if isinstance(attachments_array, list):
+                    flattened_attachments = [
+                        flatten_dict(attachment) if isinstance(attachment, dict) else attachment
+                        for attachment in attachments_array
+                    ]
+                    attribute_val = [
+                        flattened_attachment.get(property_name)
+                        for flattened_attachment in flattened_attachments
+                        if isinstance(flattened_attachment, dict) and flattened_attachment.get(property_name) is not None
+                    ]
+                    attribute_val = [val for val in attribute_val if val is not None]
+
+        if isinstance(attribute_val, (dict, list)):
+            row[column_title] = json.dumps(attribute_val, ensure_ascii=False)
+        elif attribute_val is not None:
+            row[column_title] = (
+                attribute_val
+                if column_key not in timestamp_fields
+                else datetime.fromtimestamp(attribute_val).strftime("%Y-%m-%d %H:%M:%S")
+            )
+    return row
 
 
 async def serve_request_create_check_access(request, record, owner_shortname):
@@ -322,7 +397,14 @@ async def serve_request_create(request: api.Request, owner_shortname: str, token
                 "error_code": e.error.code,
             }
 
-    results = await asyncio.gather(*(process_record(r) for r in request.records))
+    bulk_records: list[core.Record] = []
+    if is_bulk_request(request):
+        bulk_records = [r for r in request.records if r.resource_type != ResourceType.space]
+    single_records = [r for r in request.records if r.resource_type == ResourceType.space] if bulk_records else request.records
+
+    results = list(await asyncio.gather(*(process_record(r) for r in single_records)))
+    if bulk_records:
+        results.extend(await serve_request_create_bulk(request, bulk_records, owner_shortname, token, is_internal))
     for rec, failed in results:
         if rec is not None:
             records.append(rec)
@@ -332,6 +414,173 @@ async def serve_request_create(request: api.Request, owner_shortname: str, token
     return records, failed_records
 
 
+def is_bulk_request(request: api.Request) -> bool:
+    return 0 < settings.bulk_write_min_records <= len(request.records)
+
+
+def schema_shortname_of(record: core.Record) -> str | None:
+    payload = record.attributes.get("payload")
+    return payload.get("schema_shortname", None) if isinstance(payload, dict) else None
+
+
+def failed_record(record, e: api.Exception) -> dict:
+    return {"record": record, "error": e.error.message, "error_code": e.error.code}
+
+
+async def serve_request_create_bulk(
+    request: api.Request, bulk_records: list[core.Record], owner_shortname: str, token: str, is_internal: bool = False
+) -> list[tuple[core.Record | None, dict | None]]:
+    """The create path for large requests, same checks and outcome per record as `serve_request_create`.
+
+    Plugin events are dispatched per batch, existence, uniqueness and schema
+    checks run as a handful of batched queries and the new entries are inserted
+    in a single transaction.
+    """
+    batch = list(bulk_records)
+    results: list[tuple[core.Record | None, dict | None]] = [(None, None)] * len(batch)
+
+    def reject(failures: dict[int, api.Exception], pending: list[int]) -> list[int]:
+        """Record the failures (keyed on their position in `pending`), returns what is left"""
+        for position, e in failures.items():
+            results[pending[position]] = (None, failed_record(batch[pending[position]], e))
+        return [index for position, index in enumerate(pending) if position not in failures]
+
+    for record in batch:
+        if record.subpath[0] != "/":
+            record.subpath = f"/{record.subpath}"
+    pending = list(range(len(batch)))
+
+    pending = reject(
+        await plugin_manager.before_action_many(
+            [
+                core.Event(
+                    space_name=request.space_name,
+                    subpath=batch[index].subpath,
+                    shortname=batch[index].shortname,
+                    action_type=core.ActionType.create,
+                    schema_shortname=schema_shortname_of(batch[index]),
+                    resource_type=batch[index].resource_type,
+                    user_shortname=owner_shortname,
+                )
+                for index in pending
+            ]
+        ),
+        pending,
+    )
+
+    access_failures: dict[int, api.Exception] = {}
+    for position, index in enumerate(pending):
+        try:
+            await serve_request_create_check_access(request, batch[index], owner_shortname)
+            if batch[index].resource_type == ResourceType.ticket:
+                batch[index] = await set_init_state_for_record(batch[index], request.space_name, owner_shortname)
+        except api.Exception as e:
+            access_failures[position] = e
+    pending = reject(access_failures, pending)
+
+    # One IN probe per resource type, and no two records of the batch at the same place
+    locators: dict[ResourceType, list[tuple[str, str]]] = {}
+    for index in pending:
+        if batch[index].shortname != settings.auto_uuid_rule:
+            locators.setdefault(batch[index].resource_type, []).append((batch[index].subpath, batch[index].shortname))
+    existing: set[tuple[ResourceType, str, str]] = set()
+    for resource_type, resource_locators in locators.items():
+        existing.update(
+            (resource_type, subpath, shortname)
+            for subpath, shortname in await db.existing_locators(request.space_name, resource_type, resource_locators)
+        )
+    existence_failures: dict[int, api.Exception] = {}
+    for position, index in enumerate(pending):
+        record = batch[index]
+        if record.shortname == settings.auto_uuid_rule:
+            continue
+        locator = (record.resource_type, record.subpath, record.shortname)
+        if locator in existing:
+            existence_failures[position] = api.Exception(
+                status.HTTP_400_BAD_REQUEST,
+                api.Error(
+                    type="request",
+                    code=InternalErrorCode.SHORTNAME_ALREADY_EXIST,
+                    message=f"This shortname {record.shortname} already exists",
+                ),
+            )
+        existing.add(locator)
+    pending = reject(existence_failures, pending)
+
+    pending = reject(
+        await db.validate_uniqueness_many(request.space_name, [batch[index] for index in pending], owner_shortname),
+        pending,
+    )
+
+    resource_objs: dict[int, core.Meta] = {}
+    payloads: dict[int, Any] = {}
+    for index in pending:
+        resource_obj = core.Meta.from_record(record=batch[index], owner_shortname=owner_shortname)
+        payloads[index], resource_objs[index] = set_resource_object(batch[index], resource_obj, is_internal)
+
+    # Same outcome as the per-record path: the first invalid payload fails the request
+    by_schema: dict[str, list[int]] = {}
+    for index in pending:
+        payload = resource_objs[index].payload
+        if payload and payload.content_type == ContentType.json and payload.schema_shortname and isinstance(payloads[index], dict):
+            by_schema.setdefault(payload.schema_shortname, []).append(index)
+    schema_failures: dict[int, api.Exception] = {}
+    for schema_shortname, indexes in by_schema.items():
+        try:
+            invalid = await db.validate_payloads_with_schema(
+                [payloads[index] for index in indexes], request.space_name, schema_shortname
+            )
+        except api.Exception as e:
+            # e.g. a missing schema, fails its records only
+            schema_failures.update((pending.index(index), e) for index in indexes)
+            continue
+        if invalid:
+            raise invalid[0][1]
+    pending = reject(schema_failures, pending)
+
+    # The INSERT already carries the payload body, no separate payload update is needed
+    try:
+        save_failures = await db.save_many(
+            request.space_name, [(batch[index].subpath, resource_objs[index]) for index in pending]
+        )
+    except api.Exception:
+        # Something in the batch broke the transaction (e.g. a concurrent insert), find out what record by record
+        save_failures = {}
+        for position, index in enumerate(pending):
+            try:
+                await db.save(request.space_name, batch[index].subpath, resource_objs[index])
+            except api.Exception as e:
+                save_failures[position] = e
+    pending = reject(save_failures, pending)
+
+    for index in pending:
+        resource_obj = resource_objs[index]
+        if isinstance(resource_obj, core.User):
+            await send_sms_email_invitation(resource_obj, batch[index])
+        batch[index].attributes["logged_in_user_token"] = token
+
+    after_failures = await plugin_manager.after_action_many(
+        [
+            core.Event(
+                space_name=request.space_name,
+                subpath=batch[index].subpath,
+                shortname=resource_objs[index].shortname,
+                action_type=core.ActionType.create,
+                schema_shortname=schema_shortname_of(batch[index]),
+                resource_type=batch[index].resource_type,
+                user_shortname=owner_shortname,
+                attributes=batch[index].attributes,
+            )
+            for index in pending
+        ]
+    )
+    for position, index in enumerate(pending):
+        if position not in after_failures:
+            results[index] = (resource_objs[index].to_record(batch[index].subpath, resource_objs[index].shortname, []), None)
+    reject(after_failures, pending)
+    return results
+
+
 async def serve_request_update_fetch_payload(old_resource_obj, record, request, resource_cls, schema_shortname):
     old_resource_payload_body: dict[str, Any] = {}
     old_version_flattend = flatten_dict(old_resource_obj.model_dump())
@@ -365,7 +614,8 @@ async def serve_request_update_fetch_payload(old_resource_obj, record, request,
 async def serve_request_update(request, owner_shortname: str):
     failed_records: list[dict] = []
 
-    async def process_record(record):
+    async def process_record(record, batched: bool = False):
+        """With `batched`, plugin events are left to the caller and the after event is returned"""
         try:
             if record.subpath[0] != "/":
                 record.subpath = f"/{record.subpath}"
@@ -396,17 +646,18 @@ async def serve_request_update(request, owner_shortname: str):
                 if record.attributes.get("payload", {}) is not None
                 else None
             )
-            await plugin_manager.before_action(
-                core.Event(
-                    space_name=request.space_name,
-                    subpath=record.subpath,
-                    shortname=record.shortname,
-                    schema_shortname=record_schema_shortname,
-                    action_type=core.ActionType.update,
-                    resource_type=record.resource_type,
-                    user_shortname=owner_shortname,
+            if not batched:
+                await plugin_manager.before_action(
+                    core.Event(
+                        space_name=request.space_name,
+                        subpath=record.subpath,
+                        shortname=record.shortname,
+                        schema_shortname=record_schema_shortname,
+                        action_type=core.ActionType.update,
+                        resource_type=record.resource_type,
+                        user_shortname=owner_shortname,
+                    )
                 )
-            )
 
             resource_cls = getattr(sys.modules["models.core"], camel_case(record.resource_type))
             old_resource_obj = await db.load(
@@ -551,18 +802,19 @@ async def serve_request_update(request, owner_shortname: str):
             ):
                 await db.remove_user_session(record.shortname)
 
-            await plugin_manager.after_action(
-                core.Event(
-                    space_name=request.space_name,
-                    subpath=record.subpath,
-                    shortname=record.shortname,
-                    schema_shortname=record_schema_shortname,
-                    action_type=core.ActionType.update,
-                    resource_type=record.resource_type,
-                    user_shortname=owner_shortname,
-                    attributes={"history_diff": history_diff},
-                )
+            after_event = core.Event(
+                space_name=request.space_name,
+                subpath=record.subpath,
+                shortname=record.shortname,
+                schema_shortname=record_schema_shortname,
+                action_type=core.ActionType.update,
+                resource_type=record.resource_type,
+                user_shortname=owner_shortname,
+                attributes={"history_diff": history_diff},
             )
+            if batched:
+                return after_event, None
+            await plugin_manager.after_action(after_event)
             return {}, None
         except api.Exception as e:
             return None, {
@@ -571,10 +823,42 @@ async def serve_request_update(request, owner_shortname: str):
                 "error_code": e.error.code,
             }
 
-    results = await asyncio.gather(*(process_record(r) for r in request.records))
-    for _, failed in results:
-        if failed is not None:
-            failed_records.append(failed)
+    if not is_bulk_request(request):
+        results = await asyncio.gather(*(process_record(r) for r in request.records))
+        for _, failed in results:
+            if failed is not None:
+                failed_records.append(failed)
+        return [], failed_records
+
+    # Large requests dispatch their plugin events per batch
+    spaces = [r for r in request.records if r.resource_type == ResourceType.space]
+    entries = [r for r in request.records if r.resource_type != ResourceType.space]
+    for record in entries:
+        if record.subpath[0] != "/":
+            record.subpath = f"/{record.subpath}"
+    rejected = await plugin_manager.before_action_many(
+        [
+            core.Event(
+                space_name=request.space_name,
+                subpath=record.subpath,
+                shortname=record.shortname,
+                schema_shortname=schema_shortname_of(record),
+                action_type=core.ActionType.update,
+                resource_type=record.resource_type,
+                user_shortname=owner_shortname,
+            )
+            for record in entries
+        ]
+    )
+    failed_records.extend(failed_record(entries[position].shortname, e) for position, e in rejected.items())
+    results = await asyncio.gather(
+        *(process_record(r) for r in spaces),
+        *(process_record(r, batched=True) for position, r in enumerate(entries) if position not in rejected),
+    )
+    after_events = [result for result, _ in results if isinstance(result, core.Event)]
+    failed_records.extend(failed for _, failed in results if failed is not None)
+    after_failures = await plugin_manager.after_action_many(after_events)
+    failed_records.extend(failed_record(after_events[position].shortname, e) for position, e in after_failures.items())
     return [], failed_records
 
 
@@ -1054,14 +1338,138 @@ async def serve_request_delete(request, owner_shortname: str):
                 "error_code": e.error.code,
             }
 
-    results = await asyncio.gather(*(process_record(r) for r in request.records))
+    bulk_records: list[core.Record] = []
+    if is_bulk_request(request):
+        bulk_records = [
+            r
+            for r in request.records
+            if r.resource_type != ResourceType.space
+            and db.is_bulk_deletable(getattr(sys.modules["models.core"], camel_case(r.resource_type)))
+        ]
+    single_records = [r for r in request.records if all(r is not b for b in bulk_records)]
+
+    results = await asyncio.gather(*(process_record(r) for r in single_records))
     for _, failed in results:
         if failed is not None:
             failed_records.append(failed)
+    if bulk_records:
+        failed_records.extend(await serve_request_delete_bulk(request, bulk_records, owner_shortname))
 
     return [], failed_records
 
 
+async def serve_request_delete_bulk(request: api.Request, bulk_records: list[core.Record], owner_shortname: str) -> list[dict]:
+    """The delete path for large requests of plain entries and attachments, see `SQLAdapter.delete_many`.
+
+    The entries are loaded with one query per resource type and deleted in a
+    single transaction, plugin events are dispatched per batch.
+    """
+    failed_records: list[dict] = []
+    for record in bulk_records:
+        if record.subpath[0] != "/":
+            record.subpath = f"/{record.subpath}"
+
+    rejected = await plugin_manager.before_action_many(
+        [
+            core.Event(
+                space_name=request.space_name,
+                subpath=record.subpath,
+                shortname=record.shortname,
+                action_type=core.ActionType.delete,
+                resource_type=record.resource_type,
+                user_shortname=owner_shortname,
+            )
+            for record in bulk_records
+        ]
+    )
+    failed_records.extend(failed_record(bulk_records[position].shortname, e) for position, e in rejected.items())
+    records = [record for position, record in enumerate(bulk_records) if position not in rejected]
+
+    loaded: dict[tuple[ResourceType, str, str], core.Meta] = {}
+    by_type: dict[ResourceType, list[tuple[str, str]]] = {}
+    for record in records:
+        by_type.setdefault(record.resource_type, []).append((record.subpath, record.shortname))
+    for resource_type, locators in by_type.items():
+        resource_cls = getattr(sys.modules["models.core"], camel_case(resource_type))
+        for (subpath, shortname), meta in (await db.load_many(request.space_name, resource_cls, locators)).items():
+            loaded[(resource_type, subpath, shortname)] = meta
+
+    to_delete: list[tuple[core.Record, core.Meta]] = []
+    for record in records:
+        resource_obj = loaded.get((record.resource_type, record.subpath, record.shortname))
+        if resource_obj is None:
+            failed_records.append(
+                failed_record(
+                    record.shortname,
+                    api.Exception(
+                        status.HTTP_404_NOT_FOUND,
+                        api.Error(
+                            type="db",
+                            code=InternalErrorCode.OBJECT_NOT_FOUND,
+                            message=f"Request object is not available @{request.space_name}/{record.subpath}/{record.shortname}",
+                        ),
+                    ),
+                )
+            )
+            continue
+        if not await access_control.check_access(
+            user_shortname=owner_shortname,
+            space_name=request.space_name,
+            subpath=record.subpath,
+            resource_type=record.resource_type,
+            action_type=core.ActionType.delete,
+            resource_is_active=resource_obj.is_active,
+            resource_owner_shortname=resource_obj.owner_shortname,
+            resource_owner_group=resource_obj.owner_group_shortname,
+            entry_shortname=record.shortname,
+        ):
+            failed_records.append(
+                failed_record(
+                    record.shortname,
+                    api.Exception(
+                        status.HTTP_401_UNAUTHORIZED,
+                        api.Error(
+                            type="request",
+                            code=InternalErrorCode.NOT_ALLOWED,
+                            message="You don't have permission to this action [6]",
+                        ),
+                    ),
+                )
+            )
+            continue
+        to_delete.append((record, resource_obj))
+
+    try:
+        await db.delete_many(request.space_name, [(record.subpath, resource_obj) for record, resource_obj in to_delete])
+    except api.Exception:
+        # Find out which record broke the transaction, record by record
+        deleted: list[tuple[core.Record, core.Meta]] = []
+        for record, resource_obj in to_delete:
+            try:
+                await db.delete(request.space_name, record.subpath, resource_obj, owner_shortname)
+                deleted.append((record, resource_obj))
+            except api.Exception as e:
+                failed_records.append(failed_record(record.shortname, e))
+        to_delete = deleted
+
+    after_failures = await plugin_manager.after_action_many(
+        [
+            core.Event(
+                space_name=request.space_name,
+                subpath=record.subpath,
+                shortname=record.shortname,
+                action_type=core.ActionType.delete,
+                resource_type=record.resource_type,
+                user_shortname=owner_shortname,
+                attributes={"entry": resource_obj},
+            )
+            for record, resource_obj in to_delete
+        ]
+    )
+    failed_records.extend(failed_record(to_delete[position][0].shortname, e) for position, e in after_failures.items())
+    return failed_records
+
+
 async def serve_request_move(request, owner_shortname: str):
     failed_records: list[dict] = []
 
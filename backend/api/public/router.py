@@ -6,9 +6,9 @@ from re import sub as res_sub
 from typing import Any, Union
 from uuid import uuid4
 
-from fastapi import APIRouter, Body, Depends, Form, Path, Query, UploadFile, status
+from fastapi import APIRouter, Body, Depends, Form, Path, Query, Request, UploadFile, status
 from fastapi.responses import JSONResponse
-from starlette.responses import FileResponse, StreamingResponse
+from starlette.responses import Response
 
 import models.api as api
 import models.core as core
@@ -16,9 +16,9 @@ import utils.regex as regex
 import utils.repository as repository
 from api.managed.utils import (
     create_or_update_resource_with_payload_handler,
-    get_mime_type,
     get_resource_content_type_from_payload_content_type,
-    iter_bytesio,
+    media_payload_response,
+    query_response_attributes,
 )
 from data_adapters.adapter import data_adapter as db
 from models.enums import AttachmentType, ContentType, PublicSubmitResourceType, QueryType, ResourceType, TaskType
@@ -62,7 +62,7 @@ async def query_entries(query: api.Query) -> api.Response:
     return api.Response(
         status=api.Status.success,
         records=[] if query.type == QueryType.counters else records,
-        attributes={"total": total, "returned": len(records)},
+        attributes=query_response_attributes(query, total, records),
     )
 
 
@@ -183,12 +183,13 @@ async def retrieve_entry_meta(
 # Public payload retrieval; can be used in "src=" in html pages
 @router.get("/payload/{resource_type}/{space_name}/{subpath:path}/{shortname}.{ext}", response_model=None)
 async def retrieve_entry_or_attachment_payload(
+    request: Request,
     resource_type: ResourceType,
     space_name: str = Path(..., pattern=regex.SPACENAME),
     subpath: str = Path(..., pattern=regex.SUBPATH),
     shortname: str = Path(..., pattern=regex.SHORTNAME),
     ext: str = Path(..., pattern=regex.EXT),
-) -> FileResponse | api.Response | StreamingResponse:
+) -> Response | api.Response:
     await plugin_manager.before_action(
         core.Event(
             space_name=space_name,
@@ -250,11 +251,7 @@ async def retrieve_entry_or_attachment_payload(
     if meta.payload.content_type == ContentType.json and isinstance(meta.payload.body, dict):
         return api.Response(status=api.Status.success, attributes=meta.payload.body)
 
-    data = await db.get_media_attachment(space_name, subpath, shortname)
-    if data:
-        return StreamingResponse(iter_bytesio(data), media_type=get_mime_type(meta.payload.content_type, meta.payload.body))
-
-    return api.Response(status=api.Status.failed)
+    return await media_payload_response(request, space_name, subpath, shortname, meta)
 
 
 """
@@ -297,7 +294,7 @@ async def query_via_urlparams(
     return api.Response(
         status=api.Status.success,
         records=records,
-        attributes={"total": total, "returned": len(records)},
+        attributes=query_response_attributes(query, total, records),
     )
 
 
@@ -549,6 +546,7 @@ async def create_entry(
     )
     response_data = response_data.model_dump(exclude_none=True, by_alias=True)
     response_data.pop("query_policies", None)
+    response_data.pop("acl_principals", None)
     return api.Response(
         status=api.Status.success,
         records=[response_data],
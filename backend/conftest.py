@@ -4,6 +4,24 @@ from httpx import ASGITransport, AsyncClient
 from main import app
 
 
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark", "pytests/benchmarks")
+    group.addoption("--benchmark", action="store_true", help="run the benchmark suite against the configured database")
+    group.addoption(
+        "--benchmark-records", type=int, default=5000, help="contents seeded in the benchmark space on its first run"
+    )
+    group.addoption("--benchmark-user", default="dmart", help="the user running the benchmarks")
+    group.addoption(
+        "--benchmark-json", default="pytests/benchmarks/results.json", help="where the stats of the run are written"
+    )
+    group.addoption(
+        "--benchmark-baselines", default="pytests/benchmarks/baselines.json", help="baselines the run is compared with"
+    )
+    group.addoption(
+        "--benchmark-update", action="store_true", help="make this run's medians the new baselines instead of comparing"
+    )
+
+
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
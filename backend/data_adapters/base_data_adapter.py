@@ -1,8 +1,10 @@
 import io
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any, TypeVar
 
+from jsonschema.exceptions import ValidationError
 from starlette.datastructures import UploadFile
 
 import models.api as api
@@ -103,6 +105,10 @@ class BaseDataAdapter(ABC):
     async def query(self, query: api.Query, user_shortname: str | None = None) -> tuple[int, list[core.Record]]:
         pass
 
+    @abstractmethod
+    def stream_query(self, query: api.Query, user_shortname: str | None = None) -> AsyncIterator[list[core.Record]]:
+        pass
+
     @abstractmethod
     async def load(
         self,
@@ -115,6 +121,15 @@ class BaseDataAdapter(ABC):
     ) -> MetaChild:
         pass
 
+    @abstractmethod
+    async def load_many(
+        self,
+        space_name: str,
+        class_type: type[MetaChild],
+        locators: list[tuple[str, str]],
+    ) -> dict[tuple[str, str], MetaChild]:
+        pass
+
     @abstractmethod
     async def load_resource_payload(
         self,
@@ -131,6 +146,10 @@ class BaseDataAdapter(ABC):
         """Save Meta Json to respectiv file"""
         pass
 
+    @abstractmethod
+    async def save_many(self, space_name: str, entries: list[tuple[str, core.Meta]]) -> dict[int, api.Exception]:
+        pass
+
     @abstractmethod
     async def create(self, space_name: str, subpath: str, meta: core.Meta):
         pass
@@ -231,6 +250,15 @@ class BaseDataAdapter(ABC):
     ) -> bool:
         pass
 
+    @abstractmethod
+    async def existing_locators(
+        self,
+        space_name: str,
+        resource_type: core.ResourceType,
+        locators: list[tuple[str, str]],
+    ) -> set[tuple[str, str]]:
+        pass
+
     @abstractmethod
     async def delete(
         self,
@@ -243,6 +271,14 @@ class BaseDataAdapter(ABC):
     ):
         pass
 
+    @abstractmethod
+    async def delete_many(self, space_name: str, entries: list[tuple[str, core.Meta]]) -> None:
+        pass
+
+    @abstractmethod
+    def is_bulk_deletable(self, class_type: type[core.Meta]) -> bool:
+        pass
+
     @abstractmethod
     async def lock_handler(
         self, space_name: str, subpath: str, shortname: str, user_shortname: str, action: LockAction
@@ -333,12 +369,32 @@ class BaseDataAdapter(ABC):
     async def get_media_attachment(self, space_name: str, subpath: str, shortname: str) -> io.BytesIO | None:
         pass
 
+    @abstractmethod
+    async def payload_index_status(self, space_name: str) -> list[dict]:
+        pass
+
+    @abstractmethod
+    async def get_media_attachment_size(self, space_name: str, subpath: str, shortname: str) -> int | None:
+        pass
+
+    @abstractmethod
+    def stream_media_attachment(
+        self, space_name: str, subpath: str, shortname: str, start: int = 0, length: int | None = None
+    ) -> AsyncIterator[bytes]:
+        pass
+
     @abstractmethod
     async def validate_uniqueness(
         self, space_name: str, record: Record, action: str = RequestType.create, user_shortname=None
     ) -> bool:
         pass
 
+    @abstractmethod
+    async def validate_uniqueness_many(
+        self, space_name: str, records: list[Record], user_shortname: str | None = None
+    ) -> dict[int, api.Exception]:
+        pass
+
     @abstractmethod
     async def validate_payload_with_schema(
         self,
@@ -348,6 +404,15 @@ class BaseDataAdapter(ABC):
     ):
         pass
 
+    @abstractmethod
+    async def validate_payloads_with_schema(
+        self,
+        payloads: list[dict],
+        space_name: str,
+        schema_shortname: str,
+    ) -> list[tuple[int, ValidationError]]:
+        pass
+
     @abstractmethod
     async def get_schema(self, space_name: str, schema_shortname: str, owner_shortname: str) -> dict:
         pass
@@ -7,6 +7,7 @@ import os
 import shutil
 import sys
 import time
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from copy import copy
 from datetime import datetime
@@ -18,7 +19,8 @@ from uuid import uuid4
 from fastapi import status
 from fastapi.logger import logger
 from jsonschema import Draft7Validator
-from sqlalchemy import URL, String, Text, bindparam, cast, literal, literal_column, or_
+from jsonschema.exceptions import ValidationError, best_match
+from sqlalchemy import URL, String, Text, and_, bindparam, cast, literal, literal_column, or_, tuple_
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import defer, sessionmaker
@@ -30,18 +32,27 @@ import models.core as core
 from data_adapters.base_data_adapter import BaseDataAdapter, MetaChild
 from data_adapters.helpers import get_nested_value, trans_magic_words
 from data_adapters.sql.adapter_helpers import (
+    ExplainJSON,
+    apply_query_projection,
+    decode_query_cursor,
+    encode_query_cursor,
     events_query,
     get_next_date_value,
+    hydrate_projected_row,
     is_date_time_value,
+    keyset_sort_column,
     # build_query_filter_for_allowed_field_values
     mysql_aggregate_functions,
     parse_search_expression,
     postgres_aggregate_functions,
+    search_document_sql,
+    search_value_type,
     set_results_from_aggregation,
     set_table_for_query,
     sqlite_aggregate_functions,
     subpath_checker,
     transform_keys_to_sql,
+    unique_field_values,
 )
 from data_adapters.sql.create_tables import (
     OTP,
@@ -58,6 +69,10 @@ from data_adapters.sql.create_tables import (
     UserPermissionsCache,
     Users,
 )
+from data_adapters.sql.hydration import hydrate, row_values
+from data_adapters.sql.metadata_cache import metadata_cache
+from data_adapters.sql.payload_indexes import payload_indexes
+from data_adapters.sql.search_plans import SearchPlan, TemplatePlan, search_plans, search_template
 from models.api import Error as API_Error
 from models.api import Exception as API_Exception
 from models.enums import LockAction, QueryType, ResourceType, SortType
@@ -65,13 +80,19 @@ from utils.helpers import (
     arr_remove_common,
     camel_case,
     get_removed_items,
-    resolve_schema_references,
 )
 from utils.internal_error_code import InternalErrorCode
 from utils.middleware import get_request_data
-from utils.password_hashing import hash_password, verify_password
-from utils.query_policies_helper import generate_query_policies, get_user_query_policies
+from utils.password_hashing import hash_session_token
+from utils.query_policies_helper import (
+    generate_acl_principals,
+    generate_query_policies,
+    get_user_query_policies,
+    query_policy_tokens,
+)
+from utils.schema_validators import schema_validators
 from utils.settings import settings
+from utils.token_cache import token_cache
 
 
 def query_attachment_aggregation(subpath):
@@ -179,499 +200,636 @@ def string_to_list(input_str):
 
 def apply_acl_and_query_policies(statement, table, user_shortname, user_query_policies):
     if table not in [Attachments, Histories] and hasattr(table, "query_policies"):
+        # Every branch is served by an index: owner_shortname btree, GIN on query_policies and acl_principals
         access_conditions = [
             "owner_shortname = :user_shortname",
-            "EXISTS (SELECT 1 FROM jsonb_array_elements(CASE WHEN jsonb_typeof(acl::jsonb) = 'array' THEN acl::jsonb ELSE '[]'::jsonb END) AS elem WHERE elem->>'user_shortname' = :user_shortname AND (elem->'allowed_actions') ? 'query')",
+            "acl_principals @> ARRAY[CAST(:user_shortname AS TEXT)]",
         ]
+        params: dict[str, Any] = {"user_shortname": user_shortname}
+
+        tokens, like_patterns = query_policy_tokens(user_query_policies or [])
+        if tokens:
+            access_conditions.insert(1, "query_policies && CAST(:qp_tokens AS TEXT[])")
+            params["qp_tokens"] = tokens
+        if like_patterns:
+            like_clauses = []
+            for idx, pat in enumerate(like_patterns):
+                param_name = f"qp_like_{idx}"
+                like_clauses.append(f"qp LIKE :{param_name}")
+                params[param_name] = pat
+            access_conditions.insert(
+                1, "EXISTS (SELECT 1 FROM unnest(query_policies) AS qp WHERE " + " OR ".join(like_clauses) + ")"
+            )
 
-        if user_query_policies:
-            raw_items = [str(p) for p in user_query_policies]
-            patterns = []
-            for item in raw_items:
-                for part in str(item).split("|"):
-                    part = part.strip()
-                    if part:
-                        patterns.append(part.replace("*", "%"))
-
-            seen = set()
-            dedup_patterns = []
-            for pat in patterns:
-                if pat not in seen:
-                    seen.add(pat)
-                    dedup_patterns.append(pat)
-
-            if dedup_patterns:
-                like_clauses = []
-                like_params = {}
-                for idx, pat in enumerate(dedup_patterns):
-                    param_name = f"qp_like_{idx}"
-                    like_clauses.append(f"qp LIKE :{param_name}")
-                    like_params[param_name] = pat
-
-                qp_exists = "EXISTS (SELECT 1 FROM unnest(query_policies) AS qp WHERE " + " OR ".join(like_clauses) + ")"
-                access_conditions.insert(1, qp_exists)
-
-                clause_str = "(" + " OR ".join(access_conditions) + ")"
-                access_filter = text(clause_str)
-                statement = statement.where(access_filter).params(user_shortname=user_shortname, **like_params)
-            else:
-                clause_str = "(" + " OR ".join(access_conditions) + ")"
-                access_filter = text(clause_str)
-                statement = statement.where(access_filter).params(user_shortname=user_shortname)
-        else:
-            clause_str = "(" + " OR ".join(access_conditions) + ")"
-            access_filter = text(clause_str)
-            statement = statement.where(access_filter).params(user_shortname=user_shortname)
+        clause_str = "(" + " OR ".join(access_conditions) + ")"
+        statement = statement.where(text(clause_str)).params(**params)
     return statement
 
 
-async def set_sql_statement_from_query(table, statement, query, is_for_count):
-    try:
-        if query.type == QueryType.attachments_aggregation and not is_for_count:
-            return query_attachment_aggregation(query.subpath)
-
-        if query.type == QueryType.aggregation and not is_for_count:
-            statement = query_aggregation(table, query)
-
-        if query.type == QueryType.tags and not is_for_count:
-            if query.retrieve_json_payload:
-                statement = select(
-                    func.jsonb_array_elements_text(table.tags).label("tag"), func.count("*").label("count")
-                ).group_by("tag")
-            else:
-                statement = select(func.jsonb_array_elements_text(table.tags).label("tag")).distinct()
+_NON_KEYSET_QUERY_TYPES = (QueryType.aggregation, QueryType.attachments_aggregation, QueryType.tags, QueryType.counters)
+_STREAMABLE_QUERY_TYPES = (QueryType.search, QueryType.subpath)
 
-    except Exception as e:
-        print("[!query]", e)
-        raise api.Exception(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            error=api.Error(
-                type="query",
-                code=InternalErrorCode.SOMETHING_WRONG,
-                message=str(e),
-            ),
-        ) from e
 
-    if query.space_name:
-        statement = statement.where(table.space_name == query.space_name)
-    if query.subpath and table in [Entries, Attachments]:
-        if query.exact_subpath:
-            statement = statement.where(table.subpath == query.subpath)
-        else:
-            # Use bind parameter for the ILIKE pattern to avoid string interpolation
-            subpath_like = f"{query.subpath}/%".replace("//", "/")
-            statement = statement.where(
-                or_(table.subpath == query.subpath, text("subpath ILIKE :subpath_like").bindparams(bindparam("subpath_like")))
-            ).params(subpath_like=subpath_like)
+def compile_search_expression(
+    table, search: str, space_name: str, subpath: str, search_groups: list[dict] | None = None
+) -> SearchPlan:
+    """Compile a `@field:value` search expression into one parameterized WHERE clause.
 
-    if query.search:
-        _search_has_operators = "(" in query.search or ")" in query.search
-        if not query.search.startswith("@") and not query.search.startswith("-") and not _search_has_operators:
-            try:
-                table_columns = {c.name: c for c in table.__table__.columns}  # type: ignore[attr-defined]
-                p_parts = [f"COALESCE({col_name}::text, '')" for col_name in table_columns]
-                p = " || ' ' || ".join(p_parts) if p_parts else "''"
-            except Exception:
-                p = "shortname || ' ' || tags || ' ' || displayname || ' ' || description || ' ' || payload"
-                if table is Users:
-                    p += " || ' ' || COALESCE(email, '') || ' ' || COALESCE(msisdn, '') || ' ' || roles"
-                if table is Roles:
-                    p += " || ' ' || permissions"
-            # Parameterize search string
-            statement = statement.where(text("(" + p + ") ILIKE :search")).params(search=f"%{query.search}%")
-        else:
-            search_groups = parse_search_expression(query.search)
-            bind_params = {}
-            param_counter = 0
+    Bind parameters are numbered in order of appearance (`s_p_0`, `s_p_1`, ...) so the same
+    expression shape always yields the same SQL text. `search_groups` is the already parsed
+    expression, when the caller has it.
+    """
+    if search_groups is None:
+        search_groups = parse_search_expression(search)
+    bind_params = {}
+    param_counter = 0
 
-            try:
-                table_columns = {c.name: c for c in table.__table__.columns}  # type: ignore[attr-defined]
-            except Exception:
-                table_columns = {}
+    try:
+        table_columns = {c.name: c for c in table.__table__.columns}  # type: ignore[attr-defined]
+    except Exception:
+        table_columns = {}
 
-            def _field_exists_in_table(_field: str) -> bool:
-                if _field in table_columns:
-                    return True
-                if _field.startswith("payload.") and "payload" in table_columns:
+    def _field_exists_in_table(_field: str) -> bool:
+        if _field in table_columns:
+            return True
+        if _field.startswith("payload.") and "payload" in table_columns:
+            return True
+        if "." in _field:
+            base_col = _field.split(".", 1)[0]
+            if base_col in table_columns:
+                col_type = table_columns[base_col].type
+                if str(col_type).lower() == "jsonb":
                     return True
-                if "." in _field:
-                    base_col = _field.split(".", 1)[0]
-                    if base_col in table_columns:
-                        col_type = table_columns[base_col].type
-                        if str(col_type).lower() == "jsonb":
-                            return True
-                return False
-
-            # Build full-text concat expression for text search terms
-            try:
-                _tc = {c.name: c for c in table.__table__.columns}  # type: ignore[attr-defined]
-                _p_parts = [f"COALESCE({col_name}::text, '')" for col_name in _tc]
-                _text_concat = " || ' ' || ".join(_p_parts) if _p_parts else "''"
-            except Exception:
-                _text_concat = "shortname || ' ' || tags || ' ' || displayname || ' ' || description || ' ' || payload"
-                if table is Users:
-                    _text_concat += " || ' ' || COALESCE(email, '') || ' ' || COALESCE(msisdn, '') || ' ' || roles"
-                if table is Roles:
-                    _text_concat += " || ' ' || permissions"
+        return False
 
-            all_group_sql = []
+    # Full-text expression for text search terms, served by the trigram index
+    _text_concat = search_document_sql(table)
+    search_terms = " ".join(term for _group in search_groups for term in _group.get("text_terms", []))
 
-            for _group in search_groups:
-                field_conditions = []
+    all_group_sql = []
 
-                for field, field_data in _group["fields"].items():
-                    if not _field_exists_in_table(field):
-                        continue
-                    values = field_data["values"]
-                    operation = field_data["operation"]
-                    negative = field_data.get("negative", False)
-                    value_type = field_data.get("value_type", "string")
-                    format_strings = field_data.get("format_strings", {})
-                    comparison_operator = field_data.get("comparison_operator", None)
-
-                    if field in table_columns:
-                        col_type = table_columns[field].type
-                        if isinstance(col_type, (String, Text)) or (
-                            hasattr(col_type, "impl") and isinstance(col_type.impl, (String, Text))
-                        ):
-                            value_type = "string"
+    for _group in search_groups:
+        field_conditions = []
 
-                    if not values:
-                        continue
+        for field, field_data in _group["fields"].items():
+            if not _field_exists_in_table(field):
+                continue
+            values = field_data["values"]
+            operation = field_data["operation"]
+            negative = field_data.get("negative", False)
+            value_type = field_data.get("value_type", "string")
+            format_strings = field_data.get("format_strings", {})
+            comparison_operator = field_data.get("comparison_operator", None)
+
+            if field in table_columns:
+                col_type = table_columns[field].type
+                if isinstance(col_type, (String, Text)) or (
+                    hasattr(col_type, "impl") and isinstance(col_type.impl, (String, Text))
+                ):
+                    value_type = "string"
 
-                    if "." in field and field not in table_columns and not field.startswith("payload."):
-                        base_col, sub_key = field.split(".", 1)
-                        if base_col in table_columns and str(table_columns[base_col].type).lower() == "jsonb":
-                            conditions = []
-                            for value in values:
-                                p_val = f"s_p_{param_counter}"
-                                param_counter += 1
-                                bind_params[p_val] = value
-                                if sub_key == "*":
-                                    if negative:
-                                        conditions.append(f"({base_col}::text NOT ILIKE '%' || :{p_val} || '%')")
-                                    else:
-                                        conditions.append(f"({base_col}::text ILIKE '%' || :{p_val} || '%')")
-                                else:
-                                    col_extract = f"{base_col}::jsonb->>'{sub_key}'"
-                                    if negative:
-                                        conditions.append(f"({col_extract} IS NULL OR {col_extract} NOT ILIKE '%' || :{p_val} || '%')")
-                                    else:
-                                        conditions.append(f"({col_extract} ILIKE '%' || :{p_val} || '%')")
-                            if conditions:
-                                join_operator = " OR " if operation == "AND" else " AND "
-                                if negative:
-                                    join_operator = " AND " if operation == "AND" else " OR "
-                                combined_cond = "(" + join_operator.join(conditions) + ")"
-                                field_conditions.append(combined_cond)
-                        continue
+            if not values:
+                continue
 
-                    if field.startswith("payload."):
-                        payload_field = field.replace("payload.", "", 1)
-                        parts = payload_field.split(".")
-
-                        is_array_query = False
-                        array_prefix_path = ""
-                        remaining_path_parts = []
-                        for idx, part in enumerate(parts):
-                            if part.endswith("[]"):
-                                is_array_query = True
-                                array_prefix_path = "->".join([f"'{p}'" for p in parts[:idx]] + [f"'{part[:-2]}'"])
-                                remaining_path_parts = parts[idx + 1 :]
-                                break
-
-                        payload_path = "->".join([f"'{part}'" for part in parts])
-
-                        if "*" in payload_path:
-                            parts_before_wildcard = []
-                            for p in payload_field.split("."):
-                                if p == "*":
-                                    break
-                                parts_before_wildcard.append(f"'{p}'")
-
-                            if parts_before_wildcard:
-                                parent_path = "->".join(parts_before_wildcard)
-                                base_expr = f"payload::jsonb->{parent_path}"
+            if "." in field and field not in table_columns and not field.startswith("payload."):
+                base_col, sub_key = field.split(".", 1)
+                if base_col in table_columns and str(table_columns[base_col].type).lower() == "jsonb":
+                    conditions = []
+                    for value in values:
+                        p_val = f"s_p_{param_counter}"
+                        param_counter += 1
+                        bind_params[p_val] = value
+                        if sub_key == "*":
+                            if negative:
+                                conditions.append(f"({base_col}::text NOT ILIKE '%' || :{p_val} || '%')")
+                            else:
+                                conditions.append(f"({base_col}::text ILIKE '%' || :{p_val} || '%')")
+                        else:
+                            col_extract = f"{base_col}::jsonb->>'{sub_key}'"
+                            if negative:
+                                conditions.append(f"({col_extract} IS NULL OR {col_extract} NOT ILIKE '%' || :{p_val} || '%')")
                             else:
-                                base_expr = "payload::jsonb"
+                                conditions.append(f"({col_extract} ILIKE '%' || :{p_val} || '%')")
+                    if conditions:
+                        join_operator = " OR " if operation == "AND" else " AND "
+                        if negative:
+                            join_operator = " AND " if operation == "AND" else " OR "
+                        combined_cond = "(" + join_operator.join(conditions) + ")"
+                        field_conditions.append(combined_cond)
+                continue
 
-                            conditions = []
-                            for value in values:
-                                p_val = f"s_p_{param_counter}"
-                                param_counter += 1
-                                bind_params[p_val] = value
-                                conditions.append(f"({base_expr})::text ILIKE '%' || :{p_val} || '%'")
+            if field.startswith("payload."):
+                payload_field = field.replace("payload.", "", 1)
+                parts = payload_field.split(".")
+
+                is_array_query = False
+                array_prefix_path = ""
+                remaining_path_parts = []
+                for idx, part in enumerate(parts):
+                    if part.endswith("[]"):
+                        is_array_query = True
+                        array_prefix_path = "->".join([f"'{p}'" for p in parts[:idx]] + [f"'{part[:-2]}'"])
+                        remaining_path_parts = parts[idx + 1 :]
+                        break
+
+                payload_path = "->".join([f"'{part}'" for part in parts])
+
+                if "*" in payload_path:
+                    parts_before_wildcard = []
+                    for p in payload_field.split("."):
+                        if p == "*":
+                            break
+                        parts_before_wildcard.append(f"'{p}'")
 
-                            if conditions:
-                                join_operator = " AND " if operation == "AND" else " OR "
-                                if negative:
-                                    combined_cond = "NOT (" + join_operator.join(conditions) + ")"
-                                else:
-                                    combined_cond = "(" + join_operator.join(conditions) + ")"
-                                field_conditions.append(combined_cond)
-                            continue
+                    if parts_before_wildcard:
+                        parent_path = "->".join(parts_before_wildcard)
+                        base_expr = f"payload::jsonb->{parent_path}"
+                    else:
+                        base_expr = "payload::jsonb"
+
+                    conditions = []
+                    for value in values:
+                        p_val = f"s_p_{param_counter}"
+                        param_counter += 1
+                        bind_params[p_val] = value
+                        conditions.append(f"({base_expr})::text ILIKE '%' || :{p_val} || '%'")
+
+                    if conditions:
+                        join_operator = " AND " if operation == "AND" else " OR "
+                        if negative:
+                            combined_cond = "NOT (" + join_operator.join(conditions) + ")"
+                        else:
+                            combined_cond = "(" + join_operator.join(conditions) + ")"
+                        field_conditions.append(combined_cond)
+                    continue
+
+                payload_path_splited = payload_path.split("->")
+                if len(payload_path_splited) > 1:
+                    _nested_no_last = "->".join(payload_path_splited[:-1])
+                    _last = payload_path_splited[-1]
+                    _payload_text_extract = f"payload::jsonb->{_nested_no_last}->>{_last}"
+                else:
+                    _payload_text_extract = f"payload::jsonb->>{payload_path}"
+                conditions = []
+
+                if is_array_query and field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
+                    # Range query against array elements — "ALL" semantic:
+                    # every element must fall within the range. Expressed
+                    # as NOT EXISTS of the inverse (no element lies
+                    # outside [v1, v2]). Plain EXISTS BETWEEN would match
+                    # products with any one in-range variant, contradicting
+                    # the natural reading of "price between A and B" as
+                    # a filter.
+                    val1, val2 = field_data["range_values"]
+                    all_numeric_range = value_type == "numeric"
+                    if all_numeric_range:
+                        try:
+                            val1 = float(val1)
+                            val2 = float(val2)
+                            if val1 > val2:
+                                val1, val2 = val2, val1
+                        except (TypeError, ValueError):
+                            all_numeric_range = False
+
+                    p1 = f"s_p_{param_counter}"
+                    param_counter += 1
+                    bind_params[p1] = val1
+                    p2 = f"s_p_{param_counter}"
+                    param_counter += 1
+                    bind_params[p2] = val2
 
-                        payload_path_splited = payload_path.split("->")
-                        if len(payload_path_splited) > 1:
-                            _nested_no_last = "->".join(payload_path_splited[:-1])
-                            _last = payload_path_splited[-1]
-                            _payload_text_extract = f"payload::jsonb->{_nested_no_last}->>{_last}"
+                    if not remaining_path_parts:
+                        if all_numeric_range:
+                            outside_expr = f"e::float NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float)"
                         else:
-                            _payload_text_extract = f"payload::jsonb->>{payload_path}"
-                        conditions = []
-
-                        if is_array_query and field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
-                            # Range query against array elements — "ALL" semantic:
-                            # every element must fall within the range. Expressed
-                            # as NOT EXISTS of the inverse (no element lies
-                            # outside [v1, v2]). Plain EXISTS BETWEEN would match
-                            # products with any one in-range variant, contradicting
-                            # the natural reading of "price between A and B" as
-                            # a filter.
-                            val1, val2 = field_data["range_values"]
-                            all_numeric_range = value_type == "numeric"
-                            if all_numeric_range:
-                                try:
-                                    val1 = float(val1)
-                                    val2 = float(val2)
-                                    if val1 > val2:
-                                        val1, val2 = val2, val1
-                                except (TypeError, ValueError):
-                                    all_numeric_range = False
+                            outside_expr = f"e NOT BETWEEN :{p1} AND :{p2}"
+                        membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE {outside_expr})"
+                    else:
+                        if len(remaining_path_parts) > 1:
+                            _rem_nested = "->".join([f"'{p}'" for p in remaining_path_parts[:-1]])
+                            _rem_last = remaining_path_parts[-1]
+                            sub_extract = f"x->{_rem_nested}->>'{_rem_last}'"
+                            nested_path_for_comparison = f"x->{_rem_nested}->'{_rem_last}'"
+                        else:
+                            sub_extract = f"x->>'{remaining_path_parts[0]}'"
+                            nested_path_for_comparison = f"x->'{remaining_path_parts[0]}'"
+                        if all_numeric_range:
+                            outside_expr = f"({nested_path_for_comparison})::float NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float)"
+                        else:
+                            outside_expr = f"{sub_extract} NOT BETWEEN :{p1} AND :{p2}"
+                        membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE {outside_expr})"
 
-                            p1 = f"s_p_{param_counter}"
-                            param_counter += 1
-                            bind_params[p1] = val1
-                            p2 = f"s_p_{param_counter}"
+                    base = f"jsonb_typeof(payload::jsonb->{array_prefix_path}) = 'array' AND {membership}"
+                    cond = f"({base})" if not negative else f"(NOT ({base}))"
+                    field_conditions.append(cond)
+                    continue
+
+                if is_array_query:
+                    for value in values:
+                        p_val = f"s_p_{param_counter}"
+                        param_counter += 1
+                        bind_params[p_val] = value
+
+                        is_numeric = False
+                        num_val = None
+                        try:
+                            num_val = float(value)
+                            is_numeric = True
+                        except ValueError:
+                            pass
+
+                        op_map = {"!": "!=", ">": ">", "<": "<", ">=": ">=", "<=": "<=", "=": "="}
+                        sql_op = op_map.get(comparison_operator, "=") if comparison_operator else "="
+                        # "ALL" semantic invert map for <, <=, >, >= on
+                        # array elements — every element must satisfy the
+                        # user's comparison, so emit NOT EXISTS of the
+                        # inverse operator.
+                        invert_map = {"<": ">=", "<=": ">", ">": "<=", ">=": "<"}
+                        inverted_op = invert_map.get(comparison_operator, "=")
+
+                        if not remaining_path_parts:
+                            p_text_val = f"s_p_{param_counter}"
                             param_counter += 1
-                            bind_params[p2] = val2
+                            bind_params[p_text_val] = str(value)
 
-                            if not remaining_path_parts:
-                                if all_numeric_range:
-                                    outside_expr = f"e::float NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float)"
-                                else:
-                                    outside_expr = f"e NOT BETWEEN :{p1} AND :{p2}"
-                                membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE {outside_expr})"
+                            if comparison_operator and is_numeric:
+                                p_num_val = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_num_val] = num_val
+                                membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e::float {inverted_op} CAST(:{p_num_val} AS float))"
+                            elif comparison_operator == "!":
+                                membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e != :{p_text_val})"
+                            elif is_numeric:
+                                p_num_val = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_num_val] = num_val
+                                membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e::float = CAST(:{p_num_val} AS float))"
                             else:
-                                if len(remaining_path_parts) > 1:
-                                    _rem_nested = "->".join([f"'{p}'" for p in remaining_path_parts[:-1]])
-                                    _rem_last = remaining_path_parts[-1]
-                                    sub_extract = f"x->{_rem_nested}->>'{_rem_last}'"
-                                    nested_path_for_comparison = f"x->{_rem_nested}->'{_rem_last}'"
-                                else:
-                                    sub_extract = f"x->>'{remaining_path_parts[0]}'"
-                                    nested_path_for_comparison = f"x->'{remaining_path_parts[0]}'"
-                                if all_numeric_range:
-                                    outside_expr = f"({nested_path_for_comparison})::float NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float)"
-                                else:
-                                    outside_expr = f"{sub_extract} NOT BETWEEN :{p1} AND :{p2}"
-                                membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE {outside_expr})"
+                                membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e = :{p_text_val})"
 
                             base = f"jsonb_typeof(payload::jsonb->{array_prefix_path}) = 'array' AND {membership}"
                             cond = f"({base})" if not negative else f"(NOT ({base}))"
-                            field_conditions.append(cond)
-                            continue
+                        else:
+                            if len(remaining_path_parts) > 1:
+                                _rem_nested = "->".join([f"'{p}'" for p in remaining_path_parts[:-1]])
+                                _rem_last = remaining_path_parts[-1]
+                                sub_extract = f"x->{_rem_nested}->>'{_rem_last}'"
+                                nested_path_for_comparison = f"x->{_rem_nested}->'{_rem_last}'"
+                            else:
+                                sub_extract = f"x->>'{remaining_path_parts[0]}'"
+                                nested_path_for_comparison = f"x->'{remaining_path_parts[0]}'"
 
-                        if is_array_query:
-                            for value in values:
-                                p_val = f"s_p_{param_counter}"
+                            p_text_val = f"s_p_{param_counter}"
+                            param_counter += 1
+                            bind_params[p_text_val] = str(value)
+
+                            if comparison_operator and is_numeric:
+                                p_num_val = f"s_p_{param_counter}"
                                 param_counter += 1
-                                bind_params[p_val] = value
+                                bind_params[p_num_val] = num_val
+                                membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE ({nested_path_for_comparison})::float {inverted_op} CAST(:{p_num_val} AS float))"
+                            elif comparison_operator == "!":
+                                membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE {sub_extract} != :{p_text_val})"
+                            elif is_numeric:
+                                p_num_val = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_num_val] = num_val
+                                membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE ({nested_path_for_comparison})::float = CAST(:{p_num_val} AS float))"
+                            else:
+                                membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE {sub_extract} = :{p_text_val})"
 
-                                is_numeric = False
-                                num_val = None
-                                try:
-                                    num_val = float(value)
-                                    is_numeric = True
-                                except ValueError:
-                                    pass
+                            base = f"jsonb_typeof(payload::jsonb->{array_prefix_path}) = 'array' AND {membership}"
+                            cond = f"({base})" if not negative else f"(NOT ({base}))"
+                        conditions.append(cond)
+                if is_array_query:
+                    if conditions:
+                        if negative:
+                            join_operator = " OR " if operation == "AND" else " AND "
+                        else:
+                            join_operator = " AND " if operation == "AND" else " OR "
+                        combined_cond = "(" + join_operator.join(conditions) + ")"
+                        field_conditions.append(combined_cond)
+                    continue
+                elif (
+                    value_type == "numeric"
+                    and field_data.get("is_range", False)
+                    and len(field_data.get("range_values", [])) == 2
+                ):
+                    val1, val2 = field_data["range_values"]
+                    try:
+                        val1 = float(val1)
+                        val2 = float(val2)
+                        if val1 > val2:
+                            val1, val2 = val2, val1
+                    except ValueError:
+                        pass
+
+                    p1 = f"s_p_{param_counter}"
+                    param_counter += 1
+                    p2 = f"s_p_{param_counter}"
+                    param_counter += 1
+                    bind_params[p1] = val1
+                    bind_params[p2] = val2
 
-                                op_map = {"!": "!=", ">": ">", "<": "<", ">=": ">=", "<=": "<=", "=": "="}
-                                sql_op = op_map.get(comparison_operator, "=") if comparison_operator else "="
-                                # "ALL" semantic invert map for <, <=, >, >= on
-                                # array elements — every element must satisfy the
-                                # user's comparison, so emit NOT EXISTS of the
-                                # inverse operator.
-                                invert_map = {"<": ">=", "<=": ">", ">": "<=", ">=": "<"}
-                                inverted_op = invert_map.get(comparison_operator, "=")
-
-                                if not remaining_path_parts:
-                                    p_text_val = f"s_p_{param_counter}"
-                                    param_counter += 1
-                                    bind_params[p_text_val] = str(value)
+                    if negative:
+                        conditions.append(
+                            f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND (payload::jsonb->{payload_path})::float NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
+                        )
+                    else:
+                        conditions.append(
+                            f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND (payload::jsonb->{payload_path})::float BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
+                        )
 
-                                    if comparison_operator and is_numeric:
-                                        p_num_val = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_num_val] = num_val
-                                        membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e::float {inverted_op} CAST(:{p_num_val} AS float))"
-                                    elif comparison_operator == "!":
-                                        membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e != :{p_text_val})"
-                                    elif is_numeric:
-                                        p_num_val = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_num_val] = num_val
-                                        membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e::float = CAST(:{p_num_val} AS float))"
-                                    else:
-                                        membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements_text(payload::jsonb->{array_prefix_path}) AS e WHERE e = :{p_text_val})"
+                # Skip per-value iteration for numeric ranges — the BETWEEN
+                # condition above already covers the whole range. Otherwise
+                # the for loop would add per-endpoint `= v1` / `= v2`
+                # equality conditions on top of BETWEEN, which are redundant
+                # (positive case) and actively wrong (negative case with
+                # AND join flips to matching endpoints-only).
+                _skip_value_loop = (
+                    value_type == "numeric"
+                    and field_data.get("is_range", False)
+                    and len(field_data.get("range_values", [])) == 2
+                )
 
-                                    base = f"jsonb_typeof(payload::jsonb->{array_prefix_path}) = 'array' AND {membership}"
-                                    cond = f"({base})" if not negative else f"(NOT ({base}))"
-                                else:
-                                    if len(remaining_path_parts) > 1:
-                                        _rem_nested = "->".join([f"'{p}'" for p in remaining_path_parts[:-1]])
-                                        _rem_last = remaining_path_parts[-1]
-                                        sub_extract = f"x->{_rem_nested}->>'{_rem_last}'"
-                                        nested_path_for_comparison = f"x->{_rem_nested}->'{_rem_last}'"
+                for value in values:
+                    if _skip_value_loop:
+                        break
+                    if value_type == "datetime":
+                        if field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
+                            range_values = field_data["range_values"]
+                            val1, val2 = range_values
+                            if is_date_time_value(val1)[0] and is_date_time_value(val2)[0]:
+                                fmt1 = format_strings.get(val1)
+                                fmt2 = format_strings.get(val2)
+                                if fmt1 and fmt2:
+                                    if fmt1 == fmt2:
+                                        if val1 > val2:
+                                            val1, val2 = val2, val1
                                     else:
-                                        sub_extract = f"x->>'{remaining_path_parts[0]}'"
-                                        nested_path_for_comparison = f"x->'{remaining_path_parts[0]}'"
+                                        try:
+                                            from datetime import datetime
+
+                                            dt1 = datetime.strptime(
+                                                val1,
+                                                fmt1.replace("YYYY", "%Y")
+                                                .replace("MM", "%m")
+                                                .replace("DD", "%d")
+                                                .replace('"T"HH24', "T%H")
+                                                .replace("MI", "%M")
+                                                .replace("SS", "%S")
+                                                .replace("US", "%f"),
+                                            )
+                                            dt2 = datetime.strptime(
+                                                val2,
+                                                fmt2.replace("YYYY", "%Y")
+                                                .replace("MM", "%m")
+                                                .replace("DD", "%d")
+                                                .replace('"T"HH24', "T%H")
+                                                .replace("MI", "%M")
+                                                .replace("SS", "%S")
+                                                .replace("US", "%f"),
+                                            )
+                                            if dt1 > dt2:
+                                                val1, val2 = val2, val1
+                                        except Exception:
+                                            if val1 > val2:
+                                                val1, val2 = val2, val1
+                            else:
+                                if val1 > val2:
+                                    val1, val2 = val2, val1
 
-                                    p_text_val = f"s_p_{param_counter}"
-                                    param_counter += 1
-                                    bind_params[p_text_val] = str(value)
+                            start_value, end_value = val1, val2
+                            start_format = format_strings.get(start_value)
+                            end_format = format_strings.get(end_value)
 
-                                    if comparison_operator and is_numeric:
-                                        p_num_val = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_num_val] = num_val
-                                        membership = f"NOT EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE ({nested_path_for_comparison})::float {inverted_op} CAST(:{p_num_val} AS float))"
-                                    elif comparison_operator == "!":
-                                        membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE {sub_extract} != :{p_text_val})"
-                                    elif is_numeric:
-                                        p_num_val = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_num_val] = num_val
-                                        membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE ({nested_path_for_comparison})::float = CAST(:{p_num_val} AS float))"
-                                    else:
-                                        membership = f"EXISTS (SELECT 1 FROM jsonb_array_elements(payload::jsonb->{array_prefix_path}) AS x WHERE {sub_extract} = :{p_text_val})"
+                            if start_format and end_format:
+                                p_start = f"s_p_{param_counter}"
+                                param_counter += 1
+                                p_end = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_start] = start_value
+                                bind_params[p_end] = end_value
 
-                                    base = f"jsonb_typeof(payload::jsonb->{array_prefix_path}) = 'array' AND {membership}"
-                                    cond = f"({base})" if not negative else f"(NOT ({base}))"
-                                conditions.append(cond)
-                        if is_array_query:
-                            if conditions:
                                 if negative:
-                                    join_operator = " OR " if operation == "AND" else " AND "
+                                    string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND TO_TIMESTAMP({_payload_text_extract}, '{start_format}') NOT BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}') AND TO_TIMESTAMP(:{p_end}, '{end_format}'))"
+                                    fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::text NOT BETWEEN :{p_start} AND :{p_end})"
+                                    conditions.append(f"({string_condition} OR {fallback_condition})")
                                 else:
-                                    join_operator = " AND " if operation == "AND" else " OR "
-                                combined_cond = "(" + join_operator.join(conditions) + ")"
-                                field_conditions.append(combined_cond)
-                            continue
-                        elif (
-                            value_type == "numeric"
-                            and field_data.get("is_range", False)
-                            and len(field_data.get("range_values", [])) == 2
-                        ):
-                            val1, val2 = field_data["range_values"]
-                            try:
-                                val1 = float(val1)
-                                val2 = float(val2)
-                                if val1 > val2:
-                                    val1, val2 = val2, val1
-                            except ValueError:
-                                pass
+                                    string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND TO_TIMESTAMP({_payload_text_extract}, '{start_format}') BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}') AND TO_TIMESTAMP(:{p_end}, '{end_format}'))"
+                                    fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::text BETWEEN :{p_start} AND :{p_end})"
+                                    conditions.append(f"({string_condition} OR {fallback_condition})")
+                        else:
+                            format_string = format_strings.get(value)
+                            if format_string:
+                                next_value = get_next_date_value(value, format_string)
+
+                                p_val = f"s_p_{param_counter}"
+                                param_counter += 1
+                                p_next = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_val] = value
+                                bind_params[p_next] = next_value
 
-                            p1 = f"s_p_{param_counter}"
+                                if negative:
+                                    string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND (TO_TIMESTAMP({_payload_text_extract}, '{format_string}') < TO_TIMESTAMP(:{p_val}, '{format_string}') OR TO_TIMESTAMP({_payload_text_extract}, '{format_string}') >= TO_TIMESTAMP(:{p_next}, '{format_string}')))"
+                                    fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND (({_payload_text_extract})::text < :{p_val} OR ({_payload_text_extract})::text >= :{p_next}))"
+                                    conditions.append(f"({string_condition} OR {fallback_condition})")
+                                else:
+                                    string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND TO_TIMESTAMP({_payload_text_extract}, '{format_string}') >= TO_TIMESTAMP(:{p_val}, '{format_string}') AND TO_TIMESTAMP({_payload_text_extract}, '{format_string}') < TO_TIMESTAMP(:{p_next}, '{format_string}'))"
+                                    fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::text >= :{p_val} AND ({_payload_text_extract})::text < :{p_next})"
+                                    conditions.append(f"({string_condition} OR {fallback_condition})")
+                    elif value_type == "boolean":
+                        for value in values:
+                            bool_value = value.lower()
+                            p_bool = f"s_p_{param_counter}"
                             param_counter += 1
-                            p2 = f"s_p_{param_counter}"
+                            bind_params[p_bool] = bool_value == "true"
+
+                            use_not_equal = negative or comparison_operator == "!"
+
+                            if use_not_equal:
+                                bool_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'boolean' AND ({_payload_text_extract})::boolean != CAST(:{p_bool} AS boolean))"
+                                string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::boolean != CAST(:{p_bool} AS boolean))"
+                                conditions.append(f"({bool_condition} OR {string_condition})")
+                            else:
+                                bool_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'boolean' AND ({_payload_text_extract})::boolean = CAST(:{p_bool} AS boolean))"
+                                string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::boolean = CAST(:{p_bool} AS boolean))"
+                                conditions.append(f"({bool_condition} OR {string_condition})")
+                    else:
+                        is_numeric = False
+                        try:
+                            num_val = float(value)
+                            is_numeric = True
+                        except ValueError:
+                            pass
+
+                        p_val = f"s_p_{param_counter}"
+                        param_counter += 1
+                        bind_params[p_val] = value
+
+                        p_json_val = f"s_p_{param_counter}"
+                        param_counter += 1
+                        bind_params[p_json_val] = json.dumps([value])
+
+                        if is_numeric and comparison_operator:
+                            p_val_num = f"s_p_{param_counter}"
                             param_counter += 1
-                            bind_params[p1] = val1
-                            bind_params[p2] = val2
+                            bind_params[p_val_num] = num_val  # type: ignore
 
-                            if negative:
-                                conditions.append(
-                                    f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND (payload::jsonb->{payload_path})::float NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
-                                )
+                            op_map = {"!": "!=", ">": ">", "<": "<", ">=": ">=", "<=": "<="}
+                            sql_op = op_map.get(comparison_operator, "=")
+
+                            number_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND ({_payload_text_extract})::float {sql_op} CAST(:{p_val_num} AS float))"
+                            conditions.append(number_condition)
+                        elif negative or comparison_operator == "!":
+                            array_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'array' AND NOT (payload::jsonb->{payload_path} @> CAST(:{p_json_val} AS jsonb)))"
+                            string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND {_payload_text_extract} != :{p_val})"
+
+                            if is_numeric:
+                                p_val_num = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_val_num] = num_val  # type: ignore
+                                number_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND ({_payload_text_extract})::float != CAST(:{p_val_num} AS float))"
+                                conditions.append(f"({array_condition} OR {string_condition} OR {number_condition})")
                             else:
+                                conditions.append(f"({array_condition} OR {string_condition})")
+                        elif not is_array_query and payload_indexes.is_indexed(space_name, subpath, field):
+                            # Declared string index attribute: a bare equality on the indexed expression
+                            # lets the planner use the folder's expression index
+                            conditions.append(f"({_payload_text_extract} = :{p_val})")
+                        else:
+                            array_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'array' AND payload::jsonb->{payload_path} @> CAST(:{p_json_val} AS jsonb))"
+                            string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND {_payload_text_extract} = :{p_val})"
+
+                            p_json_direct = f"s_p_{param_counter}"
+                            param_counter += 1
+                            bind_params[p_json_direct] = json.dumps(value)
+                            direct_condition = f"(payload::jsonb->{payload_path} = CAST(:{p_json_direct} AS jsonb))"
+
+                            if is_numeric:
+                                p_val_num = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_val_num] = num_val  # type: ignore
+                                number_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND ({_payload_text_extract})::float = CAST(:{p_val_num} AS float))"
                                 conditions.append(
-                                    f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND (payload::jsonb->{payload_path})::float BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
+                                    f"({array_condition} OR {string_condition} OR {direct_condition} OR {number_condition})"
                                 )
+                            else:
+                                conditions.append(f"({array_condition} OR {string_condition} OR {direct_condition})")
 
-                        # Skip per-value iteration for numeric ranges — the BETWEEN
-                        # condition above already covers the whole range. Otherwise
-                        # the for loop would add per-endpoint `= v1` / `= v2`
-                        # equality conditions on top of BETWEEN, which are redundant
-                        # (positive case) and actively wrong (negative case with
-                        # AND join flips to matching endpoints-only).
-                        _skip_value_loop = (
-                            value_type == "numeric"
-                            and field_data.get("is_range", False)
-                            and len(field_data.get("range_values", [])) == 2
-                        )
+                if conditions:
+                    if negative:
+                        join_operator = " OR " if operation == "AND" else " AND "
+                    else:
+                        join_operator = " AND " if operation == "AND" else " OR "
+                    combined_cond = "(" + join_operator.join(conditions) + ")"
+                    field_conditions.append(combined_cond)
+            else:
+                try:
+                    if hasattr(table, field):
+                        field_obj = getattr(table, field)
+                        if hasattr(field_obj, "type") and str(field_obj.type).lower() == "jsonb":
+                            conditions = []
+                            for value in values:
+                                p_val = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_val] = value
 
-                        for value in values:
-                            if _skip_value_loop:
-                                break
-                            if value_type == "datetime":
-                                if field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
-                                    range_values = field_data["range_values"]
-                                    val1, val2 = range_values
-                                    if is_date_time_value(val1)[0] and is_date_time_value(val2)[0]:
-                                        fmt1 = format_strings.get(val1)
-                                        fmt2 = format_strings.get(val2)
-                                        if fmt1 and fmt2:
-                                            if fmt1 == fmt2:
-                                                if val1 > val2:
-                                                    val1, val2 = val2, val1
-                                            else:
-                                                try:
-                                                    from datetime import datetime
-
-                                                    dt1 = datetime.strptime(
-                                                        val1,
-                                                        fmt1.replace("YYYY", "%Y")
-                                                        .replace("MM", "%m")
-                                                        .replace("DD", "%d")
-                                                        .replace('"T"HH24', "T%H")
-                                                        .replace("MI", "%M")
-                                                        .replace("SS", "%S")
-                                                        .replace("US", "%f"),
-                                                    )
-                                                    dt2 = datetime.strptime(
-                                                        val2,
-                                                        fmt2.replace("YYYY", "%Y")
-                                                        .replace("MM", "%m")
-                                                        .replace("DD", "%d")
-                                                        .replace('"T"HH24', "T%H")
-                                                        .replace("MI", "%M")
-                                                        .replace("SS", "%S")
-                                                        .replace("US", "%f"),
-                                                    )
-                                                    if dt1 > dt2:
-                                                        val1, val2 = val2, val1
-                                                except Exception:
-                                                    if val1 > val2:
-                                                        val1, val2 = val2, val1
-                                    else:
-                                        if val1 > val2:
-                                            val1, val2 = val2, val1
+                                p_json_val = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_json_val] = json.dumps([value])
 
-                                    start_value, end_value = val1, val2
-                                    start_format = format_strings.get(start_value)
-                                    end_format = format_strings.get(end_value)
+                                if negative:
+                                    array_condition = f"(jsonb_typeof({field}) = 'array' AND NOT ({field} @> CAST(:{p_json_val} AS jsonb)))"
+                                    object_condition = f"(jsonb_typeof({field}) = 'object' AND NOT ({field}::text ILIKE '%' || :{p_val} || '%'))"
+                                    conditions.append(f"({array_condition} OR {object_condition})")
+                                else:
+                                    array_condition = (
+                                        f"(jsonb_typeof({field}) = 'array' AND {field} @> CAST(:{p_json_val} AS jsonb))"
+                                    )
+                                    object_condition = (
+                                        f"(jsonb_typeof({field}) = 'object' AND {field}::text ILIKE '%' || :{p_val} || '%')"
+                                    )
+                                    conditions.append(f"({array_condition} OR {object_condition})")
 
-                                    if start_format and end_format:
-                                        p_start = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        p_end = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_start] = start_value
-                                        bind_params[p_end] = end_value
+                            if conditions:
+                                if negative:
+                                    join_operator = " OR " if operation == "AND" else " AND "
+                                else:
+                                    join_operator = " AND " if operation == "AND" else " OR "
+                                field_conditions.append("(" + join_operator.join(conditions) + ")")
+                        elif value_type == "datetime":
+                            conditions = []
 
-                                        if negative:
-                                            string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND TO_TIMESTAMP({_payload_text_extract}, '{start_format}') NOT BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}') AND TO_TIMESTAMP(:{p_end}, '{end_format}'))"
-                                            fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::text NOT BETWEEN :{p_start} AND :{p_end})"
-                                            conditions.append(f"({string_condition} OR {fallback_condition})")
+                            if field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
+                                range_values = field_data["range_values"]
+                                val1, val2 = range_values
+                                if is_date_time_value(val1)[0] and is_date_time_value(val2)[0]:
+                                    fmt1 = format_strings.get(val1)
+                                    fmt2 = format_strings.get(val2)
+                                    if fmt1 and fmt2:
+                                        if fmt1 == fmt2:
+                                            if val1 > val2:
+                                                val1, val2 = val2, val1
                                         else:
-                                            string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND TO_TIMESTAMP({_payload_text_extract}, '{start_format}') BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}') AND TO_TIMESTAMP(:{p_end}, '{end_format}'))"
-                                            fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::text BETWEEN :{p_start} AND :{p_end})"
-                                            conditions.append(f"({string_condition} OR {fallback_condition})")
+                                            try:
+                                                from datetime import datetime
+
+                                                dt1 = datetime.strptime(
+                                                    val1,
+                                                    fmt1.replace("YYYY", "%Y")
+                                                    .replace("MM", "%m")
+                                                    .replace("DD", "%d")
+                                                    .replace('"T"HH24', "T%H")
+                                                    .replace("MI", "%M")
+                                                    .replace("SS", "%S")
+                                                    .replace("US", "%f"),
+                                                )
+                                                dt2 = datetime.strptime(
+                                                    val2,
+                                                    fmt2.replace("YYYY", "%Y")
+                                                    .replace("MM", "%m")
+                                                    .replace("DD", "%d")
+                                                    .replace('"T"HH24', "T%H")
+                                                    .replace("MI", "%M")
+                                                    .replace("SS", "%S")
+                                                    .replace("US", "%f"),
+                                                )
+                                                if dt1 > dt2:
+                                                    val1, val2 = val2, val1
+                                            except Exception:
+                                                if val1 > val2:
+                                                    val1, val2 = val2, val1
                                 else:
+                                    if val1 > val2:
+                                        val1, val2 = val2, val1
+
+                                start_value, end_value = val1, val2
+                                start_format = format_strings.get(start_value)
+                                end_format = format_strings.get(end_value)
+
+                                if start_format and end_format:
+                                    p_start = f"s_p_{param_counter}"
+                                    param_counter += 1
+                                    p_end = f"s_p_{param_counter}"
+                                    param_counter += 1
+                                    bind_params[p_start] = start_value
+                                    bind_params[p_end] = end_value
+
+                                    if negative:
+                                        conditions.append(
+                                            f"({field}::timestamp NOT BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}')::timestamp AND TO_TIMESTAMP(:{p_end}, '{end_format}')::timestamp)"
+                                        )
+                                    else:
+                                        conditions.append(
+                                            f"({field}::timestamp BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}')::timestamp AND TO_TIMESTAMP(:{p_end}, '{end_format}')::timestamp)"
+                                        )
+                            else:
+                                for value in values:
                                     format_string = format_strings.get(value)
                                     if format_string:
                                         next_value = get_next_date_value(value, format_string)
-
                                         p_val = f"s_p_{param_counter}"
                                         param_counter += 1
                                         p_next = f"s_p_{param_counter}"
@@ -680,364 +838,236 @@ async def set_sql_statement_from_query(table, statement, query, is_for_count):
                                         bind_params[p_next] = next_value
 
                                         if negative:
-                                            string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND (TO_TIMESTAMP({_payload_text_extract}, '{format_string}') < TO_TIMESTAMP(:{p_val}, '{format_string}') OR TO_TIMESTAMP({_payload_text_extract}, '{format_string}') >= TO_TIMESTAMP(:{p_next}, '{format_string}')))"
-                                            fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND (({_payload_text_extract})::text < :{p_val} OR ({_payload_text_extract})::text >= :{p_next}))"
-                                            conditions.append(f"({string_condition} OR {fallback_condition})")
+                                            conditions.append(
+                                                f"({field}::timestamp < TO_TIMESTAMP(:{p_val}, '{format_string}')::timestamp OR {field}::timestamp >= TO_TIMESTAMP(:{p_next}, '{format_string}')::timestamp)"
+                                            )
                                         else:
-                                            string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND TO_TIMESTAMP({_payload_text_extract}, '{format_string}') >= TO_TIMESTAMP(:{p_val}, '{format_string}') AND TO_TIMESTAMP({_payload_text_extract}, '{format_string}') < TO_TIMESTAMP(:{p_next}, '{format_string}'))"
-                                            fallback_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::text >= :{p_val} AND ({_payload_text_extract})::text < :{p_next})"
-                                            conditions.append(f"({string_condition} OR {fallback_condition})")
-                            elif value_type == "boolean":
-                                for value in values:
-                                    bool_value = value.lower()
-                                    p_bool = f"s_p_{param_counter}"
-                                    param_counter += 1
-                                    bind_params[p_bool] = bool_value == "true"
+                                            conditions.append(
+                                                f"({field}::timestamp >= TO_TIMESTAMP(:{p_val}, '{format_string}')::timestamp AND {field}::timestamp < TO_TIMESTAMP(:{p_next}, '{format_string}')::timestamp)"
+                                            )
 
-                                    use_not_equal = negative or comparison_operator == "!"
+                            if conditions:
+                                if negative:
+                                    join_operator = " OR " if operation == "AND" else " AND "
+                                else:
+                                    join_operator = " AND " if operation == "AND" else " OR "
+                                field_conditions.append("(" + join_operator.join(conditions) + ")")
+                        elif value_type == "numeric":
+                            conditions = []
 
-                                    if use_not_equal:
-                                        bool_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'boolean' AND ({_payload_text_extract})::boolean != CAST(:{p_bool} AS boolean))"
-                                        string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::boolean != CAST(:{p_bool} AS boolean))"
-                                        conditions.append(f"({bool_condition} OR {string_condition})")
-                                    else:
-                                        bool_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'boolean' AND ({_payload_text_extract})::boolean = CAST(:{p_bool} AS boolean))"
-                                        string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND ({_payload_text_extract})::boolean = CAST(:{p_bool} AS boolean))"
-                                        conditions.append(f"({bool_condition} OR {string_condition})")
-                            else:
-                                is_numeric = False
+                            if field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
+                                range_values = field_data["range_values"]
+                                val1, val2 = range_values
                                 try:
-                                    num_val = float(value)
-                                    is_numeric = True
+                                    val1 = float(val1)
+                                    val2 = float(val2)
+                                    if val1 > val2:
+                                        val1, val2 = val2, val1
                                 except ValueError:
                                     pass
 
-                                p_val = f"s_p_{param_counter}"
+                                p1 = f"s_p_{param_counter}"
                                 param_counter += 1
-                                bind_params[p_val] = value
-
-                                p_json_val = f"s_p_{param_counter}"
+                                p2 = f"s_p_{param_counter}"
                                 param_counter += 1
-                                bind_params[p_json_val] = json.dumps([value])
-
-                                if is_numeric and comparison_operator:
-                                    p_val_num = f"s_p_{param_counter}"
-                                    param_counter += 1
-                                    bind_params[p_val_num] = num_val  # type: ignore
+                                bind_params[p1] = val1
+                                bind_params[p2] = val2
 
-                                    op_map = {"!": "!=", ">": ">", "<": "<", ">=": ">=", "<=": "<="}
-                                    sql_op = op_map.get(comparison_operator, "=")
-
-                                    number_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND ({_payload_text_extract})::float {sql_op} CAST(:{p_val_num} AS float))"
-                                    conditions.append(number_condition)
-                                elif negative or comparison_operator == "!":
-                                    array_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'array' AND NOT (payload::jsonb->{payload_path} @> CAST(:{p_json_val} AS jsonb)))"
-                                    string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND {_payload_text_extract} != :{p_val})"
-
-                                    if is_numeric:
-                                        p_val_num = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_val_num] = num_val  # type: ignore
-                                        number_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND ({_payload_text_extract})::float != CAST(:{p_val_num} AS float))"
-                                        conditions.append(f"({array_condition} OR {string_condition} OR {number_condition})")
-                                    else:
-                                        conditions.append(f"({array_condition} OR {string_condition})")
+                                if negative:
+                                    conditions.append(
+                                        f"(CAST({field} AS FLOAT) NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
+                                    )
                                 else:
-                                    array_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'array' AND payload::jsonb->{payload_path} @> CAST(:{p_json_val} AS jsonb))"
-                                    string_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'string' AND {_payload_text_extract} = :{p_val})"
+                                    conditions.append(
+                                        f"(CAST({field} AS FLOAT) BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
+                                    )
+                            else:
+                                for value in values:
+                                    try:
+                                        num_val = float(value)
+                                    except ValueError:
+                                        num_val = value
 
-                                    p_json_direct = f"s_p_{param_counter}"
+                                    p_val = f"s_p_{param_counter}"
                                     param_counter += 1
-                                    bind_params[p_json_direct] = json.dumps(value)
-                                    direct_condition = f"(payload::jsonb->{payload_path} = CAST(:{p_json_direct} AS jsonb))"
-
-                                    if is_numeric:
-                                        p_val_num = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_val_num] = num_val  # type: ignore
-                                        number_condition = f"(jsonb_typeof(payload::jsonb->{payload_path}) = 'number' AND ({_payload_text_extract})::float = CAST(:{p_val_num} AS float))"
-                                        conditions.append(
-                                            f"({array_condition} OR {string_condition} OR {direct_condition} OR {number_condition})"
-                                        )
+                                    bind_params[p_val] = num_val
+
+                                    if comparison_operator:
+                                        op_map = {"!": "!=", ">": ">", "<": "<", ">=": ">=", "<=": "<="}
+                                        sql_op = op_map.get(comparison_operator, "=")
+                                        conditions.append(f"(CAST({field} AS FLOAT) {sql_op} CAST(:{p_val} AS float))")
+                                    elif negative:
+                                        conditions.append(f"(CAST({field} AS FLOAT) != CAST(:{p_val} AS float))")
                                     else:
-                                        conditions.append(f"({array_condition} OR {string_condition} OR {direct_condition})")
-
-                        if conditions:
-                            if negative:
-                                join_operator = " OR " if operation == "AND" else " AND "
-                            else:
-                                join_operator = " AND " if operation == "AND" else " OR "
-                            combined_cond = "(" + join_operator.join(conditions) + ")"
-                            field_conditions.append(combined_cond)
-                    else:
-                        try:
-                            if hasattr(table, field):
-                                field_obj = getattr(table, field)
-                                if hasattr(field_obj, "type") and str(field_obj.type).lower() == "jsonb":
-                                    conditions = []
-                                    for value in values:
-                                        p_val = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_val] = value
+                                        conditions.append(f"(CAST({field} AS FLOAT) = CAST(:{p_val} AS float))")
 
-                                        p_json_val = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        bind_params[p_json_val] = json.dumps([value])
+                            if conditions:
+                                if negative:
+                                    join_operator = " OR " if operation == "AND" else " AND "
+                                else:
+                                    join_operator = " AND " if operation == "AND" else " OR "
 
-                                        if negative:
-                                            array_condition = f"(jsonb_typeof({field}) = 'array' AND NOT ({field} @> CAST(:{p_json_val} AS jsonb)))"
-                                            object_condition = f"(jsonb_typeof({field}) = 'object' AND NOT ({field}::text ILIKE '%' || :{p_val} || '%'))"
-                                            conditions.append(f"({array_condition} OR {object_condition})")
-                                        else:
-                                            array_condition = (
-                                                f"(jsonb_typeof({field}) = 'array' AND {field} @> CAST(:{p_json_val} AS jsonb))"
-                                            )
-                                            object_condition = (
-                                                f"(jsonb_typeof({field}) = 'object' AND {field}::text ILIKE '%' || :{p_val} || '%')"
-                                            )
-                                            conditions.append(f"({array_condition} OR {object_condition})")
+                                field_conditions.append("(" + join_operator.join(conditions) + ")")
+                        elif value_type == "boolean":
+                            conditions = []
+                            for value in values:
+                                bool_value = value.lower()
+                                p_bool = f"s_p_{param_counter}"
+                                param_counter += 1
+                                bind_params[p_bool] = bool_value == "true"
+                                use_not_equal = negative or comparison_operator == "!"
+                                if use_not_equal:
+                                    conditions.append(f"(CAST({field} AS BOOLEAN) != CAST(:{p_bool} AS boolean))")
+                                else:
+                                    conditions.append(f"(CAST({field} AS BOOLEAN) = CAST(:{p_bool} AS boolean))")
 
-                                    if conditions:
-                                        if negative:
-                                            join_operator = " OR " if operation == "AND" else " AND "
-                                        else:
-                                            join_operator = " AND " if operation == "AND" else " OR "
-                                        field_conditions.append("(" + join_operator.join(conditions) + ")")
-                                elif value_type == "datetime":
-                                    conditions = []
-
-                                    if field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
-                                        range_values = field_data["range_values"]
-                                        val1, val2 = range_values
-                                        if is_date_time_value(val1)[0] and is_date_time_value(val2)[0]:
-                                            fmt1 = format_strings.get(val1)
-                                            fmt2 = format_strings.get(val2)
-                                            if fmt1 and fmt2:
-                                                if fmt1 == fmt2:
-                                                    if val1 > val2:
-                                                        val1, val2 = val2, val1
-                                                else:
-                                                    try:
-                                                        from datetime import datetime
-
-                                                        dt1 = datetime.strptime(
-                                                            val1,
-                                                            fmt1.replace("YYYY", "%Y")
-                                                            .replace("MM", "%m")
-                                                            .replace("DD", "%d")
-                                                            .replace('"T"HH24', "T%H")
-                                                            .replace("MI", "%M")
-                                                            .replace("SS", "%S")
-                                                            .replace("US", "%f"),
-                                                        )
-                                                        dt2 = datetime.strptime(
-                                                            val2,
-                                                            fmt2.replace("YYYY", "%Y")
-                                                            .replace("MM", "%m")
-                                                            .replace("DD", "%d")
-                                                            .replace('"T"HH24', "T%H")
-                                                            .replace("MI", "%M")
-                                                            .replace("SS", "%S")
-                                                            .replace("US", "%f"),
-                                                        )
-                                                        if dt1 > dt2:
-                                                            val1, val2 = val2, val1
-                                                    except Exception:
-                                                        if val1 > val2:
-                                                            val1, val2 = val2, val1
-                                        else:
-                                            if val1 > val2:
-                                                val1, val2 = val2, val1
+                            if conditions:
+                                if negative:
+                                    join_operator = " OR " if operation == "AND" else " AND "
+                                else:
+                                    join_operator = " AND " if operation == "AND" else " OR "
+                                field_conditions.append("(" + join_operator.join(conditions) + ")")
+                        else:
+                            field_obj = getattr(table, field)
+                            is_timestamp = hasattr(field_obj, "type") and str(field_obj.type).lower().startswith(
+                                "timestamp"
+                            )
 
-                                        start_value, end_value = val1, val2
-                                        start_format = format_strings.get(start_value)
-                                        end_format = format_strings.get(end_value)
-
-                                        if start_format and end_format:
-                                            p_start = f"s_p_{param_counter}"
-                                            param_counter += 1
-                                            p_end = f"s_p_{param_counter}"
-                                            param_counter += 1
-                                            bind_params[p_start] = start_value
-                                            bind_params[p_end] = end_value
-
-                                            if negative:
-                                                conditions.append(
-                                                    f"({field}::timestamp NOT BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}')::timestamp AND TO_TIMESTAMP(:{p_end}, '{end_format}')::timestamp)"
-                                                )
-                                            else:
-                                                conditions.append(
-                                                    f"({field}::timestamp BETWEEN TO_TIMESTAMP(:{p_start}, '{start_format}')::timestamp AND TO_TIMESTAMP(:{p_end}, '{end_format}')::timestamp)"
-                                                )
+                            if is_timestamp:
+                                conditions = []
+                                for value in values:
+                                    p_val = f"s_p_{param_counter}"
+                                    param_counter += 1
+                                    bind_params[p_val] = value
+                                    use_not_equal = negative or comparison_operator == "!"
+                                    if use_not_equal:
+                                        conditions.append(f"{field}::text != :{p_val}")
                                     else:
-                                        for value in values:
-                                            format_string = format_strings.get(value)
-                                            if format_string:
-                                                next_value = get_next_date_value(value, format_string)
-                                                p_val = f"s_p_{param_counter}"
-                                                param_counter += 1
-                                                p_next = f"s_p_{param_counter}"
-                                                param_counter += 1
-                                                bind_params[p_val] = value
-                                                bind_params[p_next] = next_value
-
-                                                if negative:
-                                                    conditions.append(
-                                                        f"({field}::timestamp < TO_TIMESTAMP(:{p_val}, '{format_string}')::timestamp OR {field}::timestamp >= TO_TIMESTAMP(:{p_next}, '{format_string}')::timestamp)"
-                                                    )
-                                                else:
-                                                    conditions.append(
-                                                        f"({field}::timestamp >= TO_TIMESTAMP(:{p_val}, '{format_string}')::timestamp AND {field}::timestamp < TO_TIMESTAMP(:{p_next}, '{format_string}')::timestamp)"
-                                                    )
-
-                                    if conditions:
-                                        if negative:
-                                            join_operator = " OR " if operation == "AND" else " AND "
-                                        else:
-                                            join_operator = " AND " if operation == "AND" else " OR "
-                                        field_conditions.append("(" + join_operator.join(conditions) + ")")
-                                elif value_type == "numeric":
-                                    conditions = []
-
-                                    if field_data.get("is_range", False) and len(field_data.get("range_values", [])) == 2:
-                                        range_values = field_data["range_values"]
-                                        val1, val2 = range_values
-                                        try:
-                                            val1 = float(val1)
-                                            val2 = float(val2)
-                                            if val1 > val2:
-                                                val1, val2 = val2, val1
-                                        except ValueError:
-                                            pass
+                                        conditions.append(f"{field}::text = :{p_val}")
 
-                                        p1 = f"s_p_{param_counter}"
-                                        param_counter += 1
-                                        p2 = f"s_p_{param_counter}"
+                                join_operator = " AND " if operation == "AND" else " OR "
+                                field_conditions.append("(" + join_operator.join(conditions) + ")")
+                            else:
+                                conditions = []
+                                for value in values:
+                                    if "*" in value:
+                                        pattern = value.replace("*", "%")
+                                        p_pat = f"s_p_{param_counter}"
                                         param_counter += 1
-                                        bind_params[p1] = val1
-                                        bind_params[p2] = val2
-
-                                        if negative:
-                                            conditions.append(
-                                                f"(CAST({field} AS FLOAT) NOT BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
-                                            )
+                                        bind_params[p_pat] = pattern
+                                        use_not_equal = negative or comparison_operator == "!"
+                                        if use_not_equal:
+                                            conditions.append(f"{field} NOT ILIKE :{p_pat}")
                                         else:
-                                            conditions.append(
-                                                f"(CAST({field} AS FLOAT) BETWEEN CAST(:{p1} AS float) AND CAST(:{p2} AS float))"
-                                            )
+                                            conditions.append(f"{field} ILIKE :{p_pat}")
                                     else:
-                                        for value in values:
-                                            try:
-                                                num_val = float(value)
-                                            except ValueError:
-                                                num_val = value
-
-                                            p_val = f"s_p_{param_counter}"
-                                            param_counter += 1
-                                            bind_params[p_val] = num_val
-
-                                            if comparison_operator:
-                                                op_map = {"!": "!=", ">": ">", "<": "<", ">=": ">=", "<=": "<="}
-                                                sql_op = op_map.get(comparison_operator, "=")
-                                                conditions.append(f"(CAST({field} AS FLOAT) {sql_op} CAST(:{p_val} AS float))")
-                                            elif negative:
-                                                conditions.append(f"(CAST({field} AS FLOAT) != CAST(:{p_val} AS float))")
-                                            else:
-                                                conditions.append(f"(CAST({field} AS FLOAT) = CAST(:{p_val} AS float))")
-
-                                    if conditions:
-                                        if negative:
-                                            join_operator = " OR " if operation == "AND" else " AND "
-                                        else:
-                                            join_operator = " AND " if operation == "AND" else " OR "
-
-                                        field_conditions.append("(" + join_operator.join(conditions) + ")")
-                                elif value_type == "boolean":
-                                    conditions = []
-                                    for value in values:
-                                        bool_value = value.lower()
-                                        p_bool = f"s_p_{param_counter}"
+                                        p_val = f"s_p_{param_counter}"
                                         param_counter += 1
-                                        bind_params[p_bool] = bool_value == "true"
+                                        bind_params[p_val] = value
                                         use_not_equal = negative or comparison_operator == "!"
                                         if use_not_equal:
-                                            conditions.append(f"(CAST({field} AS BOOLEAN) != CAST(:{p_bool} AS boolean))")
+                                            conditions.append(f"{field} != :{p_val}")
                                         else:
-                                            conditions.append(f"(CAST({field} AS BOOLEAN) = CAST(:{p_bool} AS boolean))")
+                                            conditions.append(f"{field} = :{p_val}")
+                                join_operator = " AND " if negative else (" AND " if operation == "AND" else " OR ")
+                                field_conditions.append("(" + join_operator.join(conditions) + ")")
 
-                                    if conditions:
-                                        if negative:
-                                            join_operator = " OR " if operation == "AND" else " AND "
-                                        else:
-                                            join_operator = " AND " if operation == "AND" else " OR "
-                                        field_conditions.append("(" + join_operator.join(conditions) + ")")
-                                else:
-                                    field_obj = getattr(table, field)
-                                    is_timestamp = hasattr(field_obj, "type") and str(field_obj.type).lower().startswith(
-                                        "timestamp"
-                                    )
+                except Exception as e:
+                    print(f"Error handling field {field}: {e}")
+
+        # Process plain-text search terms in this group
+        for _text_term in _group.get("text_terms", []):
+            _p_val = f"s_p_{param_counter}"
+            param_counter += 1
+            bind_params[_p_val] = f"%{_text_term}%"
+            field_conditions.append(f"({_text_concat}) ILIKE :{_p_val}")
+
+        if field_conditions:
+            all_group_sql.append("(" + " AND ".join(field_conditions) + ")")
+
+    # AND within each group, OR between groups
+    where = None
+    if all_group_sql:
+        where = text(all_group_sql[0] if len(all_group_sql) == 1 else "(" + " OR ".join(all_group_sql) + ")")
+    return SearchPlan(where=where, params=bind_params, search_terms=search_terms)
+
+
+def cached_search_plan(table, search: str, space_name: str, subpath: str) -> SearchPlan:
+    search_groups = parse_search_expression(search)
+    template = search_template(search_groups)
+    key = (table.__name__, template.key, space_name, subpath, payload_indexes.version)
+    cached = search_plans.get(key)
+    if cached is None:
+        compiled = compile_search_expression(table, search, space_name, subpath, template.groups)
+        cached = TemplatePlan.from_plan(compiled, template)
+        search_plans.put(key, cached)
+    if isinstance(cached, TemplatePlan) and cached.bindings is not None:
+        return cached.bind(template)
+
+    # The values don't bind cleanly into this template, fall back to caching the search as is
+    key = (table.__name__, search, space_name, subpath, payload_indexes.version)
+    plan = search_plans.get(key)
+    if not isinstance(plan, SearchPlan):
+        plan = compile_search_expression(table, search, space_name, subpath, search_groups)
+        search_plans.put(key, plan)
+    return plan
 
-                                    if is_timestamp:
-                                        conditions = []
-                                        for value in values:
-                                            p_val = f"s_p_{param_counter}"
-                                            param_counter += 1
-                                            bind_params[p_val] = value
-                                            use_not_equal = negative or comparison_operator == "!"
-                                            if use_not_equal:
-                                                conditions.append(f"{field}::text != :{p_val}")
-                                            else:
-                                                conditions.append(f"{field}::text = :{p_val}")
-
-                                        join_operator = " AND " if operation == "AND" else " OR "
-                                        field_conditions.append("(" + join_operator.join(conditions) + ")")
-                                    else:
-                                        conditions = []
-                                        for value in values:
-                                            if "*" in value:
-                                                pattern = value.replace("*", "%")
-                                                p_pat = f"s_p_{param_counter}"
-                                                param_counter += 1
-                                                bind_params[p_pat] = pattern
-                                                use_not_equal = negative or comparison_operator == "!"
-                                                if use_not_equal:
-                                                    conditions.append(f"{field} NOT ILIKE :{p_pat}")
-                                                else:
-                                                    conditions.append(f"{field} ILIKE :{p_pat}")
-                                            else:
-                                                p_val = f"s_p_{param_counter}"
-                                                param_counter += 1
-                                                bind_params[p_val] = value
-                                                use_not_equal = negative or comparison_operator == "!"
-                                                if use_not_equal:
-                                                    conditions.append(f"{field} != :{p_val}")
-                                                else:
-                                                    conditions.append(f"{field} = :{p_val}")
-                                        join_operator = " AND " if negative else (" AND " if operation == "AND" else " OR ")
-                                        field_conditions.append("(" + join_operator.join(conditions) + ")")
 
-                        except Exception as e:
-                            print(f"Error handling field {field}: {e}")
+async def set_sql_statement_from_query(table, statement, query, is_for_count):
+    try:
+        if query.type == QueryType.attachments_aggregation and not is_for_count:
+            return query_attachment_aggregation(query.subpath)
 
-                # Process plain-text search terms in this group
-                for _text_term in _group.get("text_terms", []):
-                    _p_val = f"s_p_{param_counter}"
-                    param_counter += 1
-                    bind_params[_p_val] = f"%{_text_term}%"
-                    field_conditions.append(f"({_text_concat}) ILIKE :{_p_val}")
+        if query.type == QueryType.aggregation and not is_for_count:
+            statement = query_aggregation(table, query)
 
-                if field_conditions:
-                    all_group_sql.append("(" + " AND ".join(field_conditions) + ")")
+        if query.type == QueryType.tags and not is_for_count:
+            if query.retrieve_json_payload:
+                statement = select(
+                    func.jsonb_array_elements_text(table.tags).label("tag"), func.count("*").label("count")
+                ).group_by("tag")
+            else:
+                statement = select(func.jsonb_array_elements_text(table.tags).label("tag")).distinct()
 
-            # Apply collected group conditions: AND within each group, OR between groups
-            if all_group_sql:
-                if len(all_group_sql) == 1:
-                    statement = statement.where(text(all_group_sql[0]))
-                else:
-                    statement = statement.where(text("(" + " OR ".join(all_group_sql) + ")"))
+    except Exception as e:
+        print("[!query]", e)
+        raise api.Exception(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            error=api.Error(
+                type="query",
+                code=InternalErrorCode.SOMETHING_WRONG,
+                message=str(e),
+            ),
+        ) from e
+
+    if query.space_name:
+        statement = statement.where(table.space_name == query.space_name)
+    if query.subpath and table in [Entries, Attachments]:
+        if query.exact_subpath:
+            statement = statement.where(table.subpath == query.subpath)
+        else:
+            # Use bind parameter for the ILIKE pattern to avoid string interpolation
+            subpath_like = f"{query.subpath}/%".replace("//", "/")
+            statement = statement.where(
+                or_(table.subpath == query.subpath, text("subpath ILIKE :subpath_like").bindparams(bindparam("subpath_like")))
+            ).params(subpath_like=subpath_like)
 
-            if bind_params:
-                statement = statement.params(**bind_params)
+    search_terms = ""
+    if query.search:
+        _search_has_operators = "(" in query.search or ")" in query.search
+        if not query.search.startswith("@") and not query.search.startswith("-") and not _search_has_operators:
+            search_terms = query.search
+            # Parameterize search string
+            statement = statement.where(text("(" + search_document_sql(table) + ") ILIKE :search")).params(
+                search=f"%{query.search}%"
+            )
+        else:
+            plan = cached_search_plan(table, query.search, query.space_name, query.subpath)
+            search_terms = plan.search_terms
+            if plan.where is not None:
+                statement = statement.where(plan.where)
+            if plan.params:
+                statement = statement.params(**plan.params)
 
     if query.filter_schema_names:
         if "meta" in query.filter_schema_names:
@@ -1058,8 +1088,34 @@ async def set_sql_statement_from_query(table, statement, query, is_for_count):
     if query.to_date:
         statement = statement.where(table.created_at <= query.to_date)
 
+    keyset_column = None
+    if not is_for_count and query.type not in _NON_KEYSET_QUERY_TYPES:
+        if query.cursor:
+            query.sort_by, query.sort_type, cursor_value, cursor_uuid = decode_query_cursor(query.cursor)
+        keyset_column = keyset_sort_column(table, str(query.sort_by).replace("attributes.", ""))
+        if query.cursor:
+            if keyset_column is None:
+                raise api.Exception(
+                    status.HTTP_400_BAD_REQUEST,
+                    api.Error(
+                        type="query",
+                        code=InternalErrorCode.INVALID_DATA,
+                        message="Cursor pagination requires sort_by to be a non-null column",
+                    ),
+                )
+            row_key = tuple_(keyset_column, col(table.uuid))
+            if query.sort_type == SortType.descending:
+                statement = statement.where(row_key < tuple_(literal(cursor_value), literal(cursor_uuid)))
+            else:
+                statement = statement.where(row_key > tuple_(literal(cursor_value), literal(cursor_uuid)))
+
     try:
-        if not is_for_count and query.sort_by:
+        if not is_for_count and query.sort_by == "relevance":
+            if search_terms:
+                relevance = f"word_similarity(:relevance_terms, {search_document_sql(table)})"
+                relevance += "" if query.sort_type == SortType.ascending else " DESC"
+                statement = statement.order_by(text(relevance)).params(relevance_terms=search_terms)
+        elif not is_for_count and query.sort_by:
             query.sort_by = str(query.sort_by).replace("attributes.", "")
             if "." in query.sort_by:
                 # Normalize JSON path for sorting as well (handle leading '@' and body.* shortcut)
@@ -1071,6 +1127,12 @@ async def set_sql_statement_from_query(table, statement, query, is_for_count):
                 sort_type = " DESC" if query.sort_type == SortType.descending else ""
                 sort_expression = f"CASE WHEN ({sort_expression}) ~ '^[0-9]+$' THEN ({sort_expression})::float END {sort_type}, ({sort_expression}) {sort_type}"
                 statement = statement.order_by(text(sort_expression))
+            elif keyset_column is not None:
+                # uuid breaks ties so the order is total and a cursor can resume from it
+                if query.sort_type == SortType.descending:
+                    statement = statement.order_by(keyset_column.desc(), col(table.uuid).desc())
+                else:
+                    statement = statement.order_by(keyset_column, col(table.uuid))
             else:
                 if query.sort_type == SortType.ascending:
                     statement = statement.order_by(getattr(table, query.sort_by))
@@ -1081,7 +1143,7 @@ async def set_sql_statement_from_query(table, statement, query, is_for_count):
         print("[!set_sql_statement_from_query]", e)
 
     if not is_for_count:
-        if query.offset:
+        if query.offset and not query.cursor:
             statement = statement.offset(query.offset)
 
         statement = statement.limit(query.limit)
@@ -1114,6 +1176,9 @@ async def set_sql_statement_from_query(table, statement, query, is_for_count):
 class SQLAdapter(BaseDataAdapter):
     _engine = None
     _async_session_factory = None
+    # Per-worker single-flight for permission map rebuilds, and a counter bumped on every invalidation
+    _user_permissions_inflight: dict[str, asyncio.Future] = {}
+    _user_permissions_generation: int = 0
     session: Session
     async_session: sessionmaker
     engine: Any
@@ -1302,51 +1367,62 @@ class SQLAdapter(BaseDataAdapter):
         filter_shortnames: list | None = None,
         retrieve_json_payload: bool = False,
     ) -> dict:
-        attachments_dict: dict[ResourceType, list] = {}
-        async with self.get_session() as session:
-            if not subpath.startswith("/"):
-                subpath = f"/{subpath}"
+        if not subpath.startswith("/"):
+            subpath = f"/{subpath}"
 
-            if str(settings.spaces_folder) in str(attachments_path):
-                attachments_path = attachments_path.relative_to(settings.spaces_folder)
-            space_name = attachments_path.parts[0]
-            shortname = attachments_path.parts[-1]
-            statement = (
-                select(Attachments)
-                .where(Attachments.space_name == space_name)
-                .where(Attachments.subpath == f"{subpath}/{shortname}".replace("//", "/"))
-            )
-            results = list((await session.execute(statement)).all())
+        if str(settings.spaces_folder) in str(attachments_path):
+            attachments_path = attachments_path.relative_to(settings.spaces_folder)
+        space_name = attachments_path.parts[0]
+        shortname = attachments_path.parts[-1]
+        parent_path = f"{subpath}/{shortname}".replace("//", "/")
 
-            if len(results) == 0:
-                return attachments_dict
+        entries_attachments = await self.get_entries_attachments(space_name, [parent_path])
+        return entries_attachments.get(parent_path, {})
 
-            for _idx, item in enumerate(results):
-                item = item[0]
-                attachment_record = Attachments.model_validate(item)
-                attachment_json = attachment_record.model_dump()
-                attachment = {
-                    "resource_type": attachment_json["resource_type"],
-                    "uuid": attachment_json["uuid"],
-                    "shortname": attachment_json["shortname"],
-                    "subpath": "/".join(attachment_json["subpath"].split("/")[:-1]),  # join(),
-                }
-                del attachment_json["resource_type"]
-                del attachment_json["uuid"]
-                del attachment_json["media"]
-                del attachment_json["shortname"]
-                del attachment_json["subpath"]
-                del attachment_json["relationships"]
-                del attachment_json["acl"]
-                del attachment_json["space_name"]
-                attachment["attributes"] = {**attachment_json}
-                key = ResourceType(attachment_record.resource_type)
-                if key in attachments_dict:
-                    attachments_dict[key].append(attachment)
-                else:
-                    attachments_dict[key] = [attachment]
+    async def get_entries_attachments(self, space_name: str, parent_paths: list[str]) -> dict[str, dict]:
+        """Load the attachments of many entries in one query.
+
+        `parent_paths` are the full entry paths (`{subpath}/{shortname}`); the result maps each
+        one that has attachments to the same ResourceType-grouped dict `get_entry_attachments` returns.
+        """
+        entries_attachments: dict[str, dict[ResourceType, list]] = {}
+        if not parent_paths:
+            return entries_attachments
+
+        statement = (
+            select(Attachments)
+            .options(defer(Attachments.media))  # type: ignore
+            .where(Attachments.space_name == space_name)
+            .where(col(Attachments.subpath).in_(set(parent_paths)))
+        )
+        async with self.get_session() as session:
+            results = (await session.execute(statement)).scalars().all()
 
-        return attachments_dict
+        for item in results:
+            # media is deferred, take the loaded columns as they are rather than dumping the model
+            attachment_json = row_values(item, exclude={"media"})
+            attachment = {
+                "resource_type": attachment_json["resource_type"],
+                "uuid": attachment_json["uuid"],
+                "shortname": attachment_json["shortname"],
+                "subpath": "/".join(attachment_json["subpath"].split("/")[:-1]),  # join(),
+            }
+            del attachment_json["resource_type"]
+            del attachment_json["uuid"]
+            del attachment_json["shortname"]
+            del attachment_json["subpath"]
+            del attachment_json["relationships"]
+            del attachment_json["acl"]
+            del attachment_json["space_name"]
+            attachment["attributes"] = {**attachment_json}
+            key = ResourceType(item.resource_type)
+            attachments_dict = entries_attachments.setdefault(item.subpath, {})
+            if key in attachments_dict:
+                attachments_dict[key].append(attachment)
+            else:
+                attachments_dict[key] = [attachment]
+
+        return entries_attachments
 
     def payload_path(
         self,
@@ -1429,10 +1505,8 @@ class SQLAdapter(BaseDataAdapter):
                     if _result is None:
                         continue
 
-                    core_model_class_1: core.Meta = getattr(sys.modules["models.core"], camel_case(_result.resource_type))
-                    result = core_model_class_1.model_validate(_result.model_dump()).to_record(
-                        _result.subpath, _result.shortname
-                    )
+                    core_model_class_1: type[core.Meta] = getattr(sys.modules["models.core"], camel_case(_result.resource_type))
+                    result = hydrate(core_model_class_1, _result).to_record(_result.subpath, _result.shortname)
 
                     result.attributes = {**result.attributes, "space_name": _result.space_name}
 
@@ -1458,9 +1532,9 @@ class SQLAdapter(BaseDataAdapter):
                 if _result is None:
                     return None
 
-                core_model_class_2: core.Meta = getattr(sys.modules["models.core"], camel_case(_result.resource_type))
+                core_model_class_2: type[core.Meta] = getattr(sys.modules["models.core"], camel_case(_result.resource_type))
 
-                result = core_model_class_2.model_validate(_result.model_dump()).to_record(_result.subpath, _result.shortname)
+                result = hydrate(core_model_class_2, _result).to_record(_result.subpath, _result.shortname)
                 result.attributes = {**result.attributes, "space_name": _result.space_name}
 
                 return result
@@ -1488,25 +1562,29 @@ class SQLAdapter(BaseDataAdapter):
             except Exception as _:  # type: ignore
                 return None
 
-    async def query(self, query: api.Query, user_shortname: str | None = None) -> tuple[int, list[core.Record]]:
-        total: int
-        results: list
+    async def _estimate_query_total(self, session: AsyncSession, table, statement_total) -> int:
+        """Planner row estimate for the filtered rows instead of an exact COUNT"""
+        whereclause = statement_total.whereclause
+        if whereclause is None:
+            reltuples = (
+                await session.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table_name AS regclass)"),
+                    {"table_name": table.__tablename__},
+                )
+            ).scalar_one_or_none()
+            # reltuples is -1 until the table has been analyzed
+            return max(int(reltuples or 0), 0)
 
-        if not query.subpath.startswith("/"):
-            query.subpath = f"/{query.subpath}"
-        if query.subpath == "//":
-            query.subpath = "/"
+        plan = (await session.execute(ExplainJSON(select(col(table.uuid)).where(whereclause)))).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
-        user_shortname = user_shortname if user_shortname else "anonymous"
-        if user_shortname == "anonymous" and query.type in [QueryType.history, QueryType.events]:
-            raise api.Exception(
-                status.HTTP_401_UNAUTHORIZED,
-                api.Error(
-                    type="request",
-                    code=InternalErrorCode.NOT_ALLOWED,
-                    message="You don't have permission to this action",
-                ),
-            )
+    async def _query_scope(self, query: api.Query, user_shortname: str) -> list[str]:
+        """The query policies the user can read through, empty when nothing is readable.
+
+        Also narrows `query.search` to the `filter_fields_values` of the user's permissions.
+        """
         user_query_policies = await get_user_query_policies(
             self, user_shortname, query.space_name, query.subpath, query.type == QueryType.spaces
         )
@@ -1517,14 +1595,13 @@ class SQLAdapter(BaseDataAdapter):
             user_query_policies.extend(r)
 
         if len(user_query_policies) == 0:
-            return 0, []
+            return []
 
-        if query.type in [QueryType.attachments, QueryType.attachments_aggregation]:
-            table = Attachments
-            statement = select(table).options(defer(table.media))  # type: ignore
-        else:
-            table = set_table_for_query(query)
-            statement = select(table)
+        if settings.payload_indexes_enabled:
+            try:
+                await payload_indexes.refresh(SQLAdapter._engine)  # type: ignore[arg-type]
+            except Exception as e:
+                logger.warning(f"failed to refresh payload indexes {e}")
 
         user_permissions = await self.get_user_permissions(user_shortname)
         filtered_policies = []
@@ -1549,21 +1626,53 @@ class SQLAdapter(BaseDataAdapter):
                     ffv_subpath.append(perm_key_splited[1])
                     ffv_resource_type.append(perm_key_splited[2])
 
-        if len(ffv_spaces):
-            perm_key_splited_query = f"@space_name:{'|'.join(ffv_spaces)} @subpath:/{'|/'.join(ffv_subpath)} @resource_type:{'|'.join(ffv_resource_type)} {' '.join(ffv_query)}"
-            if query.search:
-                query.search += f" {perm_key_splited_query}"
-            else:
-                query.search = perm_key_splited_query
-        if query.search:
-            parts = [p for p in query.search.split(" ") if p]
-            seen = set()
-            deduped_parts = []
-            for p in parts:
-                if p not in seen:
-                    seen.add(p)
-                    deduped_parts.append(p)
-            query.search = " ".join(deduped_parts)
+        if len(ffv_spaces):
+            perm_key_splited_query = f"@space_name:{'|'.join(ffv_spaces)} @subpath:/{'|/'.join(ffv_subpath)} @resource_type:{'|'.join(ffv_resource_type)} {' '.join(ffv_query)}"
+            if query.search:
+                query.search += f" {perm_key_splited_query}"
+            else:
+                query.search = perm_key_splited_query
+        if query.search:
+            parts = [p for p in query.search.split(" ") if p]
+            seen = set()
+            deduped_parts = []
+            for p in parts:
+                if p not in seen:
+                    seen.add(p)
+                    deduped_parts.append(p)
+            query.search = " ".join(deduped_parts)
+        return user_query_policies
+
+    async def query(self, query: api.Query, user_shortname: str | None = None) -> tuple[int, list[core.Record]]:
+        total: int
+        results: list
+
+        if not query.subpath.startswith("/"):
+            query.subpath = f"/{query.subpath}"
+        if query.subpath == "//":
+            query.subpath = "/"
+
+        user_shortname = user_shortname if user_shortname else "anonymous"
+        if user_shortname == "anonymous" and query.type in [QueryType.history, QueryType.events]:
+            raise api.Exception(
+                status.HTTP_401_UNAUTHORIZED,
+                api.Error(
+                    type="request",
+                    code=InternalErrorCode.NOT_ALLOWED,
+                    message="You don't have permission to this action",
+                ),
+            )
+        user_query_policies = await self._query_scope(query, user_shortname)
+        if len(user_query_policies) == 0:
+            return 0, []
+
+        if query.type in [QueryType.attachments, QueryType.attachments_aggregation]:
+            table = Attachments
+            statement = select(table).options(defer(table.media))  # type: ignore
+        else:
+            table = set_table_for_query(query)
+            statement = select(table)
+
         statement_total = select(func.count(col(table.uuid)))
 
         if query and query.type == QueryType.events:
@@ -1636,8 +1745,11 @@ class SQLAdapter(BaseDataAdapter):
             async with self.get_session() as session:
                 if query.retrieve_total:
                     try:
-                        _total = (await session.execute(statement_total)).one()
-                        total = int(_total[0])
+                        if query.estimate_total and query.type != QueryType.aggregation:
+                            total = await self._estimate_query_total(session, table, statement_total)
+                        else:
+                            _total = (await session.execute(statement_total)).one()
+                            total = int(_total[0])
                     except Exception as e:
                         logger.warning(f"failed to retrieve total count {e}")
                         total = -1
@@ -1667,10 +1779,18 @@ class SQLAdapter(BaseDataAdapter):
                     results = list((await session.execute(statement)).all())
                     await session.close()
                 else:
-                    # Non-aggregation: fetch ORM instances directly
+                    # Non-aggregation: fetch ORM instances directly, only the columns the records need
                     results = []
-                    cursor = (await session.execute(statement)).scalars()
+                    last_row = None
+                    body_paths = None
+                    if not is_fetching_spaces:
+                        statement, body_paths = apply_query_projection(statement, table, query)
+                    if body_paths is None:
+                        cursor = (await session.execute(statement)).scalars()
+                    else:
+                        cursor = (hydrate_projected_row(row, body_paths) for row in (await session.execute(statement)).all())
                     for row in cursor:
+                        last_row = row
                         try:
                             _ = row.shortname
                             results.append(row)
@@ -1678,6 +1798,21 @@ class SQLAdapter(BaseDataAdapter):
                             logger.warning(f"skipping row due an error: {e}")
                     await session.close()
 
+                    if (
+                        last_row is not None
+                        and not is_fetching_spaces
+                        and query.limit
+                        and len(results) >= query.limit
+                        and query.type not in _NON_KEYSET_QUERY_TYPES
+                        and keyset_sort_column(table, query.sort_by) is not None
+                    ):
+                        query._next_cursor = encode_query_cursor(
+                            str(query.sort_by),
+                            query.sort_type or SortType.ascending,
+                            getattr(last_row, str(query.sort_by)),
+                            last_row.uuid,
+                        )
+
             if is_fetching_spaces:
                 from utils.access_control import access_control
 
@@ -1717,6 +1852,69 @@ class SQLAdapter(BaseDataAdapter):
             ) from e
         return total, results
 
+    async def stream_query(self, query: api.Query, user_shortname: str | None = None) -> AsyncIterator[list[core.Record]]:
+        """Yield the records `query` returns in batches of `settings.query_stream_batch_size`.
+
+        Rows are read from a server-side cursor, so an export holds one batch in memory
+        instead of the whole result. Only plain `search`/`subpath` queries are streamed,
+        `join`s are not applied.
+        """
+        if query.type not in _STREAMABLE_QUERY_TYPES:
+            raise api.Exception(
+                status.HTTP_400_BAD_REQUEST,
+                api.Error(
+                    type="query",
+                    code=InternalErrorCode.INVALID_DATA,
+                    message=f"Query type {query.type} can't be streamed",
+                ),
+            )
+        if not query.subpath.startswith("/"):
+            query.subpath = f"/{query.subpath}"
+        if query.subpath == "//":
+            query.subpath = "/"
+
+        user_shortname = user_shortname if user_shortname else "anonymous"
+        user_query_policies = await self._query_scope(query, user_shortname)
+        if len(user_query_policies) == 0:
+            return
+
+        table = set_table_for_query(query)
+        statement = await set_sql_statement_from_query(table, select(table), query, False)
+        statement = apply_acl_and_query_policies(statement, table, user_shortname, user_query_policies)
+        statement, body_paths = apply_query_projection(statement, table, query)
+
+        batch_size = max(1, settings.query_stream_batch_size)
+        try:
+            async with self.get_session() as session:
+                stream = await session.stream(statement, execution_options={"yield_per": batch_size})
+                rows_stream = stream.scalars() if body_paths is None else stream
+                async for partition in rows_stream.partitions(batch_size):
+                    rows = []
+                    for item in partition:
+                        row = item if body_paths is None else hydrate_projected_row(item, body_paths)
+                        try:
+                            _ = row.shortname
+                            rows.append(row)
+                        except Exception as e:
+                            logger.warning(f"skipping row due an error: {e}")
+                    if rows:
+                        records = await self._set_query_final_results(query, rows)
+                        # Same as repository.serve_query, exports must never carry password hashes
+                        for record in records:
+                            if isinstance(record.attributes, dict):
+                                record.attributes.pop("password", None)
+                        yield records
+        except Exception as e:
+            print("[!!stream_query]", e)
+            raise api.Exception(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                error=api.Error(
+                    type="query",
+                    code=InternalErrorCode.SOMETHING_WRONG,
+                    message=str(e),
+                ),
+            ) from e
+
     async def _apply_client_joins(
         self, base_records: list[core.Record], joins: list[api.JoinQuery], user_shortname: str
     ) -> list[core.Record]:
@@ -1959,19 +2157,48 @@ class SQLAdapter(BaseDataAdapter):
         user_shortname: str | None = None,
         schema_shortname: str | None = None,
     ) -> MetaChild | None:
+        is_cached_class = metadata_cache.is_cached_class(class_type)
+        if is_cached_class and (cached := metadata_cache.get(class_type, space_name, subpath, shortname)) is not None:
+            return cached  # type: ignore[return-value]
+
         result = await self.db_load_or_none(space_name, subpath, shortname, class_type, user_shortname, schema_shortname)
         if not result:
             return None
 
+        meta = self._meta_from_row(class_type, result)
+        if is_cached_class:
+            metadata_cache.put(space_name, subpath, shortname, meta)
+        return meta
+
+    @staticmethod
+    def _meta_from_row(class_type: type[MetaChild], result: Any) -> MetaChild:
+        if hasattr(result, "payload") and result.payload and isinstance(result.payload, dict) and result.payload.get("body") is None:
+            result.payload["body"] = {}
         try:
-            if hasattr(result, "payload") and result.payload and isinstance(result.payload, dict):
-                if result.payload.get("body", None) is None:
-                    result.payload["body"] = {}
-                result.payload = core.Payload.model_validate(result.payload, strict=False)
+            return hydrate(class_type, result)
         except Exception as e:
             print("[!load]", e)
             logger.error(f"Failed parsing an entry. Error: {e}")
-        return class_type.model_validate(result.model_dump())
+            return class_type.model_validate(result.model_dump())
+
+    async def load_many(
+        self,
+        space_name: str,
+        class_type: type[MetaChild],
+        locators: list[tuple[str, str]],
+    ) -> dict[tuple[str, str], MetaChild]:
+        """Load the entries or attachments at several (subpath, shortname) locations in one query"""
+        table = self.get_table(class_type)
+        if not locators or table not in (Entries, Attachments):
+            raise ValueError(f"load_many does not support {class_type.__name__}")
+        locators = [(subpath if subpath.startswith("/") else f"/{subpath}", shortname) for subpath, shortname in locators]
+        statement = select(table).options(defer(Attachments.media)) if table is Attachments else select(table)  # type: ignore
+        statement = statement.where(
+            col(table.space_name) == space_name, tuple_(table.subpath, table.shortname).in_(set(locators))
+        )
+        async with self.get_session() as session:
+            rows = (await session.execute(statement)).scalars().all()
+        return {(row.subpath, row.shortname): self._meta_from_row(class_type, row) for row in rows}
 
     async def load(
         self,
@@ -2125,46 +2352,89 @@ class SQLAdapter(BaseDataAdapter):
                         ),
                     )
 
+    async def _invalidate_cached_metadata(self, space_name: str, subpath: str, meta: core.Meta) -> None:
+        """Drop the cached space/folder/schema a write touched, here and in the other workers"""
+        scopes = metadata_cache.invalidate_meta(space_name, subpath, meta)
+        if isinstance(meta, core.Schema):
+            schema_validators.invalidate(space_name, meta.shortname)
+        await metadata_cache.publish(SQLAdapter._engine, scopes)  # type: ignore[arg-type]
+
+    async def _invalidate_cached_tokens(self, user_shortname: str) -> None:
+        """Drop the user's cached tokens, here and in the other workers"""
+        token_cache.invalidate_user(user_shortname)
+        await metadata_cache.publish_token_invalidation(SQLAdapter._engine, user_shortname)  # type: ignore[arg-type]
+
+    def _sync_folder_payload_indexes(
+        self, space_name: str, subpath: str, meta: core.Meta, shortname: str | None = None
+    ) -> None:
+        """Reconcile a folder's declared index_attributes with its payload expression indexes in the background"""
+        if not settings.payload_indexes_enabled or not isinstance(meta, core.Folder):
+            return
+        body = meta.payload.body if meta.payload else None
+        index_attributes = body.get("index_attributes", []) if isinstance(body, dict) else []
+        payload_indexes.schedule_sync(
+            SQLAdapter._engine,  # type: ignore[arg-type]
+            space_name,
+            f"{subpath}/{shortname or meta.shortname}".replace("//", "/"),
+            index_attributes if isinstance(index_attributes, list) else [],
+        )
+
+    async def payload_index_status(self, space_name: str) -> list[dict]:
+        if not settings.payload_indexes_enabled:
+            return []
+        return await payload_indexes.status(SQLAdapter._engine, space_name)  # type: ignore[arg-type]
+
+    def _new_row(self, space_name: str, subpath: str, meta: core.Meta) -> Any:
+        """The table row a new meta is inserted as"""
+        entity = {
+            **meta.model_dump(),
+            "space_name": space_name,
+            "subpath": subpath,
+        }
+
+        if meta.__class__ is core.Folder and entity["subpath"] != "/":
+            if not entity["subpath"].startswith("/"):
+                entity["subpath"] = f"/{entity['subpath']}"
+            if entity["subpath"].endswith("/"):
+                entity["subpath"] = entity["subpath"][:-1]
+
+        if "subpath" in entity:
+            if entity["subpath"] != "/" and entity["subpath"].endswith("/"):
+                entity["subpath"] = entity["subpath"][:-1]
+            entity["subpath"] = subpath_checker(entity["subpath"])
+
+        entity["resource_type"] = meta.__class__.__name__.lower()
+        data = self.get_base_model(meta.__class__, entity)
+
+        if not isinstance(data, Attachments) and not isinstance(data, Histories):
+            data.query_policies = generate_query_policies(
+                space_name=space_name,
+                subpath=subpath,
+                resource_type=entity["resource_type"],
+                is_active=entity["is_active"],
+                owner_shortname=entity.get("owner_shortname", "dmart"),
+                owner_group_shortname=entity.get("owner_group_shortname"),
+            )
+            data.acl_principals = generate_acl_principals(entity.get("acl"))
+        return data
+
+    async def _after_write(self, space_name: str, subpath: str, meta: core.Meta) -> None:
+        if isinstance(meta, (core.User, core.Role, core.Permission)):
+            await self.invalidate_cached_user_permission(meta)
+        await self._invalidate_cached_metadata(space_name, subpath, meta)
+        self._sync_folder_payload_indexes(space_name, subpath, meta)
+
     async def save(self, space_name: str, subpath: str, meta: core.Meta) -> Any:
         """Save"""
         await self._validate_referential_integrity(meta)
         try:
             async with self.get_session() as session:
-                entity = {
-                    **meta.model_dump(),
-                    "space_name": space_name,
-                    "subpath": subpath,
-                }
-
-                if meta.__class__ is core.Folder and entity["subpath"] != "/":
-                    if not entity["subpath"].startswith("/"):
-                        entity["subpath"] = f"/{entity['subpath']}"
-                    if entity["subpath"].endswith("/"):
-                        entity["subpath"] = entity["subpath"][:-1]
-
-                if "subpath" in entity:
-                    if entity["subpath"] != "/" and entity["subpath"].endswith("/"):
-                        entity["subpath"] = entity["subpath"][:-1]
-                    entity["subpath"] = subpath_checker(entity["subpath"])
-
-                entity["resource_type"] = meta.__class__.__name__.lower()
-                data = self.get_base_model(meta.__class__, entity)
-
-                if not isinstance(data, Attachments) and not isinstance(data, Histories):
-                    data.query_policies = generate_query_policies(
-                        space_name=space_name,
-                        subpath=subpath,
-                        resource_type=entity["resource_type"],
-                        is_active=entity["is_active"],
-                        owner_shortname=entity.get("owner_shortname", "dmart"),
-                        owner_group_shortname=entity.get("owner_group_shortname"),
-                    )
+                data = self._new_row(space_name, subpath, meta)
                 session.add(data)
                 try:
                     await session.commit()
                     await session.refresh(data)
-                    if isinstance(meta, (core.User, core.Role, core.Permission)):
-                        await self.clear_cached_user_permission()
+                    await self._after_write(space_name, data.subpath, meta)
                 except Exception as e:
                     await session.rollback()
                     raise e
@@ -2188,6 +2458,44 @@ class SQLAdapter(BaseDataAdapter):
                 ),
             ) from e
 
+    async def save_many(self, space_name: str, entries: list[tuple[str, core.Meta]]) -> dict[int, api.Exception]:
+        """Insert several new metas in one transaction, one multi-row INSERT per table.
+
+        Entries failing the referential integrity checks are skipped and returned
+        by index; a failing INSERT rolls the whole batch back and raises.
+        """
+        failures: dict[int, api.Exception] = {}
+        rows: list[tuple[int, Any]] = []
+        for index, (subpath, meta) in enumerate(entries):
+            try:
+                await self._validate_referential_integrity(meta)
+            except api.Exception as e:
+                failures[index] = e
+                continue
+            rows.append((index, self._new_row(space_name, subpath, meta)))
+        if not rows:
+            return failures
+
+        try:
+            async with self.get_session() as session:
+                session.add_all([row for _, row in rows])
+                await session.commit()
+        except Exception as e:
+            print("[!save_many]", e)
+            logger.error(f"Failed saving a batch of entries. Error: {e}")
+            raise api.Exception(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                error=api.Error(
+                    type="db",
+                    code=InternalErrorCode.SOMETHING_WRONG,
+                    message=f"Failed saving a batch of entries. Error: {e}",
+                ),
+            ) from e
+
+        for index, row in rows:
+            await self._after_write(space_name, row.subpath, entries[index][1])
+        return failures
+
     async def create(self, space_name: str, subpath: str, meta: core.Meta):
         result = await self.load_or_none(space_name, subpath, meta.shortname, meta.__class__)
 
@@ -2244,6 +2552,8 @@ class SQLAdapter(BaseDataAdapter):
             result.sqlmodel_update(meta.model_dump())
             async with self.get_session() as session:
                 session.add(result)
+            await self._invalidate_cached_metadata(space_name, subpath, meta)
+            self._sync_folder_payload_indexes(space_name, subpath, meta)
         except Exception as e:
             print("[!save_payload_from_json]", e)
             logger.error(f"Failed parsing an entry. Error: {e}")
@@ -2303,6 +2613,7 @@ class SQLAdapter(BaseDataAdapter):
                     owner_shortname=result.owner_shortname,
                     owner_group_shortname=getattr(result, "owner_group_shortname", None),
                 )
+                result.acl_principals = generate_acl_principals(getattr(result, "acl", None))
 
             if meta.__class__ is not core.Lock or not isinstance(result, Locks):
                 result.updated_at = datetime.now()
@@ -2316,7 +2627,9 @@ class SQLAdapter(BaseDataAdapter):
                 session.add(result)
                 await session.commit()
                 if isinstance(meta, (core.User, core.Role, core.Permission)):
-                    await self.clear_cached_user_permission()
+                    await self.invalidate_cached_user_permission(meta)
+            await self._invalidate_cached_metadata(space_name, result.subpath, meta)
+            self._sync_folder_payload_indexes(space_name, result.subpath, meta)
 
             # try:
             #     if isinstance(result, (Users, Roles, Permissions)):
@@ -2628,6 +2941,21 @@ class SQLAdapter(BaseDataAdapter):
                     ),
                 ) from e
 
+        await self._invalidate_cached_metadata(src_space_name, src_subpath, meta)
+        if isinstance(meta, core.Space):
+            await self._invalidate_cached_metadata(dest_space_name, "/", meta.model_copy(update={"shortname": dest_shortname}))
+        else:
+            await self._invalidate_cached_metadata(
+                dest_space_name, dest_subpath or src_subpath, meta.model_copy(update={"shortname": dest_shortname or meta.shortname})
+            )
+        if isinstance(meta, core.Folder) and settings.payload_indexes_enabled:
+            payload_indexes.schedule_drop(
+                SQLAdapter._engine,  # type: ignore[arg-type]
+                src_space_name,
+                f"{src_subpath}/{src_shortname}".replace("//", "/"),
+            )
+            self._sync_folder_payload_indexes(dest_space_name, dest_subpath or "/", meta, dest_shortname)
+
     def delete_empty(self, path: Path):
         pass
 
@@ -2670,6 +2998,32 @@ class SQLAdapter(BaseDataAdapter):
             result = (await session.execute(statement)).first()
             return result is not None
 
+    async def existing_locators(
+        self,
+        space_name: str,
+        resource_type: ResourceType,
+        locators: list[tuple[str, str]],
+    ) -> set[tuple[str, str]]:
+        """The (subpath, shortname) pairs of `locators` that already exist, in a single IN probe"""
+        if not locators:
+            return set()
+        resource_cls = getattr(sys.modules["models.core"], camel_case(resource_type))
+        table = self.get_table(resource_cls)
+        locators = [(subpath if subpath.startswith("/") else f"/{subpath}", shortname) for subpath, shortname in locators]
+
+        async with self.get_session() as session:
+            if table in [Roles, Permissions, Users]:
+                statement = select(table.shortname).where(
+                    col(table.space_name) == space_name, col(table.shortname).in_({shortname for _, shortname in locators})
+                )
+                existing_shortnames = set((await session.execute(statement)).scalars().all())
+                return {locator for locator in locators if locator[1] in existing_shortnames}
+
+            pairs_statement = select(table.subpath, table.shortname).where(
+                col(table.space_name) == space_name, tuple_(table.subpath, table.shortname).in_(set(locators))
+            )
+            return {(row.subpath, row.shortname) for row in (await session.execute(pairs_statement)).all()}
+
     async def delete(
         self,
         space_name: str,
@@ -2776,8 +3130,17 @@ class SQLAdapter(BaseDataAdapter):
                     await session.execute(statement)
 
                 await session.commit()
+                if isinstance(meta, core.User):
+                    await self._invalidate_cached_tokens(meta.shortname)
                 if isinstance(meta, (core.User, core.Role, core.Permission)):
-                    await self.clear_cached_user_permission()
+                    await self.invalidate_cached_user_permission(meta)
+                await self._invalidate_cached_metadata(space_name, subpath, meta)
+                if meta.__class__ == core.Folder and settings.payload_indexes_enabled:
+                    payload_indexes.schedule_drop(
+                        SQLAdapter._engine,  # type: ignore[arg-type]
+                        space_name,
+                        f"{subpath}/{meta.shortname}".replace("//", "/"),
+                    )
 
                 # Refresh authz MVs only when Users/Roles/Permissions changed
                 # try:
@@ -2797,6 +3160,61 @@ class SQLAdapter(BaseDataAdapter):
                     ),
                 ) from e
 
+    async def delete_many(self, space_name: str, entries: list[tuple[str, core.Meta]]) -> None:
+        """Delete several entries or attachments, with their attachments, in one transaction.
+
+        Only metas without side effects beyond their own attachments are accepted,
+        see `is_bulk_deletable`; the others go through `delete`.
+        """
+        if not entries:
+            return
+        by_table: dict[Any, set[tuple[str, str]]] = {}
+        for subpath, meta in entries:
+            if not self.is_bulk_deletable(meta.__class__):
+                raise ValueError(f"delete_many does not support {meta.__class__.__name__}")
+            subpath = subpath if subpath.startswith("/") else f"/{subpath}"
+            by_table.setdefault(self.get_table(meta.__class__), set()).add((subpath, meta.shortname))
+
+        try:
+            async with self.get_session() as session:
+                for table, locators in by_table.items():
+                    await session.execute(
+                        delete(table).where(
+                            col(table.space_name) == space_name, tuple_(table.subpath, table.shortname).in_(locators)
+                        )
+                    )
+                if entries_locators := by_table.get(Entries):
+                    await session.execute(
+                        delete(Attachments).where(
+                            col(Attachments.space_name) == space_name,
+                            or_(
+                                *(
+                                    col(Attachments.subpath).startswith(f"{subpath}/{shortname}".replace("//", "/"))
+                                    for subpath, shortname in entries_locators
+                                )
+                            ),
+                        )
+                    )
+                await session.commit()
+        except Exception as e:
+            print("[!delete_many]", e)
+            logger.error(f"Failed deleting a batch of entries. Error: {e}")
+            raise api.Exception(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                error=api.Error(
+                    type="delete",
+                    code=InternalErrorCode.SOMETHING_WRONG,
+                    message="failed to delete entries",
+                ),
+            ) from e
+
+        for subpath, meta in entries:
+            await self._invalidate_cached_metadata(space_name, subpath, meta)
+
+    def is_bulk_deletable(self, class_type: type[core.Meta]) -> bool:
+        """Folders, groups, users, roles, permissions, spaces and locks cascade or are checked on delete"""
+        return self.get_table(class_type) in (Entries, Attachments) and class_type not in (core.Folder, core.Group)
+
     async def lock_handler(
         self, space_name: str, subpath: str, shortname: str, user_shortname: str, action: LockAction
     ) -> dict | None:
@@ -2865,11 +3283,19 @@ class SQLAdapter(BaseDataAdapter):
 
     async def set_user_session(self, user_shortname: str, token: str, firebase_token: str | None = None) -> bool:
         try:
-            total, last_session = await self.get_user_session(user_shortname, token)
+            async with self.get_session() as session:
+                await session.execute(
+                    delete(Sessions)
+                    .where(col(Sessions.shortname) == user_shortname)
+                    .where(col(Sessions.timestamp) < self._session_expiry_cutoff())
+                )
+                total = (
+                    await session.execute(
+                        select(func.count(col(Sessions.uuid))).where(col(Sessions.shortname) == user_shortname)
+                    )
+                ).scalar_one()
 
-            if (settings.max_sessions_per_user == 1 and last_session is not None) or (
-                settings.max_sessions_per_user != 0 and total >= settings.max_sessions_per_user
-            ):
+            if settings.max_sessions_per_user != 0 and total >= settings.max_sessions_per_user:
                 await self.remove_user_session(user_shortname)
 
             timestamp = datetime.now()
@@ -2878,7 +3304,7 @@ class SQLAdapter(BaseDataAdapter):
                     Sessions(
                         uuid=uuid4(),
                         shortname=user_shortname,
-                        token=hash_password(token),
+                        token=hash_session_token(token),
                         timestamp=timestamp,
                         firebase_token=firebase_token,
                     )
@@ -2889,28 +3315,24 @@ class SQLAdapter(BaseDataAdapter):
             print("[!set_sql_user_session]", e)
             return False
 
+    @staticmethod
+    def _session_expiry_cutoff() -> datetime:
+        return datetime.fromtimestamp(time.time() - settings.session_inactivity_ttl)
+
     async def get_user_session(self, user_shortname: str, token: str) -> tuple[int, str | None]:
         async with self.get_session() as session:
-            statement = select(Sessions).where(col(Sessions.shortname) == user_shortname)
-
-            results = (await session.execute(statement)).all()
-            results = [result[0] for result in results]
-
-            if len(results) == 0:
-                return 0, None
-
-            for r in results:
-                if settings.session_inactivity_ttl + r.timestamp.timestamp() < time.time():
-                    await session.execute(delete(Sessions).where(col(Sessions.uuid) == r.uuid))
-                    continue
-                if verify_password(token, r.token):
-                    r.timestamp = datetime.now()
-                    session.add(r)
-                    await session.commit()
-                    return len(results), token
-                # else:
-                #     await session.execute(delete(Sessions).where(col(Sessions.uuid) == r.uuid))
-        return len(results), None
+            # Single indexed lookup that also slides the inactivity window
+            statement = (
+                update(Sessions)
+                .where(col(Sessions.token) == hash_session_token(token))
+                .where(col(Sessions.shortname) == user_shortname)
+                .where(col(Sessions.timestamp) >= self._session_expiry_cutoff())
+                .values(timestamp=datetime.now())
+                .returning(col(Sessions.uuid))
+            )
+            if (await session.execute(statement)).first() is not None:
+                return 1, token
+            return 0, None
 
     async def remove_user_session(self, user_shortname: str) -> bool:
         async with self.get_session() as session:
@@ -2926,6 +3348,7 @@ class SQLAdapter(BaseDataAdapter):
                 for oldest_session in oldest_sessions:
                     await session.delete(oldest_session)
                 await session.commit()
+                await self._invalidate_cached_tokens(user_shortname)
                 return True
             except Exception as e:
                 print("[!remove_sql_user_session]", e)
@@ -2947,16 +3370,14 @@ class SQLAdapter(BaseDataAdapter):
 
     async def update_session_firebase_token(self, user_shortname: str, token: str, firebase_token: str) -> bool:
         async with self.get_session() as session:
-            statement = select(Sessions).where(col(Sessions.shortname) == user_shortname)
-            results = (await session.execute(statement)).all()
-            for result in results:
-                r = result[0]
-                if verify_password(token, r.token):
-                    r.firebase_token = firebase_token
-                    session.add(r)
-                    await session.commit()
-                    return True
-        return False
+            statement = (
+                update(Sessions)
+                .where(col(Sessions.token) == hash_session_token(token))
+                .where(col(Sessions.shortname) == user_shortname)
+                .values(firebase_token=firebase_token)
+            )
+            result = await session.execute(statement)
+            return result.rowcount > 0  # type: ignore
 
     async def set_invitation(self, invitation_token: str, invitation_value):
         async with self.get_session() as session:
@@ -3081,8 +3502,7 @@ class SQLAdapter(BaseDataAdapter):
             return results
 
         # Case 3: Standard query → convert and optionally fetch attachments
-        attachment_tasks = []
-        attachment_indices = []
+        attachment_parents: list[tuple[int, str]] = []
         valid_results: list[core.Record] = []
 
         for item in results:
@@ -3097,6 +3517,8 @@ class SQLAdapter(BaseDataAdapter):
 
             if "query_policies" in rec.attributes:
                 del rec.attributes["query_policies"]
+            if "acl_principals" in rec.attributes:
+                del rec.attributes["acl_principals"]
 
             if query.type == QueryType.history:
                 del rec.attributes["request_headers"]
@@ -3119,24 +3541,20 @@ class SQLAdapter(BaseDataAdapter):
 
                 # Queue attachments if requested
                 if query.retrieve_attachments:
-                    attachment_tasks.append(
-                        self.get_entry_attachments(
-                            rec.subpath,
-                            Path(f"{query.space_name}/{rec.shortname}"),
-                            retrieve_json_payload=True,
-                        )
-                    )
-                    attachment_indices.append(len(valid_results))
+                    subpath = rec.subpath if rec.subpath.startswith("/") else f"/{rec.subpath}"
+                    attachment_parents.append((len(valid_results), f"{subpath}/{rec.shortname}".replace("//", "/")))
 
             if rec.attributes:
                 rec.attributes = self._sanitize_large_integers(rec.attributes)
             valid_results.append(rec)
 
-        # Run all attachment retrievals concurrently
-        if attachment_tasks:
-            attachments_list = await asyncio.gather(*attachment_tasks)
-            for idx, attachments in zip(attachment_indices, attachments_list, strict=False):
-                valid_results[idx].attachments = attachments
+        # Fetch the attachments of the whole page in a single query
+        if attachment_parents:
+            entries_attachments = await self.get_entries_attachments(
+                query.space_name, [parent_path for _, parent_path in attachment_parents]
+            )
+            for idx, parent_path in attachment_parents:
+                valid_results[idx].attachments = entries_attachments.get(parent_path, {})
 
         return valid_results
 
@@ -3195,6 +3613,48 @@ class SQLAdapter(BaseDataAdapter):
                 return io.BytesIO(result)
         return None
 
+    async def get_media_attachment_size(self, space_name: str, subpath: str, shortname: str) -> int | None:
+        if not subpath.startswith("/"):
+            subpath = f"/{subpath}"
+
+        async with self.get_session() as session:
+            statement = (
+                select(func.octet_length(Attachments.media))
+                .where(Attachments.space_name == space_name)
+                .where(Attachments.subpath == subpath)
+                .where(Attachments.shortname == shortname)
+            )
+            size: int | None = (await session.execute(statement)).scalar_one_or_none()
+            return size
+
+    async def stream_media_attachment(
+        self, space_name: str, subpath: str, shortname: str, start: int = 0, length: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """Yield the media bytes in [start, start + length) one chunk per query so the whole blob is never held"""
+        if not subpath.startswith("/"):
+            subpath = f"/{subpath}"
+        if length is None:
+            length = await self.get_media_attachment_size(space_name, subpath, shortname) or 0
+            length -= start
+
+        end = start + length
+        offset = start
+        while offset < end:
+            chunk_size = min(settings.media_stream_chunk_size, end - offset)
+            # substring() on bytea is 1-based
+            statement = (
+                select(func.substring(Attachments.media, offset + 1, chunk_size))
+                .where(Attachments.space_name == space_name)
+                .where(Attachments.subpath == subpath)
+                .where(Attachments.shortname == shortname)
+            )
+            async with self.get_session() as session:
+                chunk = (await session.execute(statement)).scalar_one_or_none()
+            if not chunk:
+                return
+            offset += len(chunk)
+            yield bytes(chunk)
+
     async def validate_uniqueness(
         self, space_name: str, record: core.Record, action: str = api.RequestType.create, user_shortname=None
     ) -> bool:
@@ -3284,6 +3744,77 @@ class SQLAdapter(BaseDataAdapter):
                 )
         return True
 
+    async def validate_uniqueness_many(
+        self, space_name: str, records: list[core.Record], user_shortname: str | None = None
+    ) -> dict[int, api.Exception]:
+        """`validate_uniqueness` for a batch of records being created, returns the failures by index.
+
+        The records of a folder that share the same unique keys are probed with one
+        search OR-ing all their values; only when it matches something are they
+        checked one by one, so the outcome is the per-record one. Records of the
+        batch repeating each other's unique values are rejected too.
+        """
+        failures: dict[int, api.Exception] = {}
+        per_record: set[int] = set()
+        by_folder: dict[str, list[int]] = {}
+        for index, record in enumerate(records):
+            by_folder.setdefault(record.subpath, []).append(index)
+
+        for subpath, indexes in by_folder.items():
+            parent_subpath, folder_shortname = os.path.split(subpath)
+            try:
+                folder_meta = await self.load(space_name, parent_subpath, folder_shortname, core.Folder)
+            except Exception:
+                continue
+            folder_body = folder_meta.payload.body if folder_meta.payload else None
+            unique_fields = folder_body.get("unique_fields") if isinstance(folder_body, dict) else None
+            if not isinstance(unique_fields, list):
+                continue
+
+            for compound in unique_fields:
+                seen: set[tuple] = set()
+                groups: dict[tuple, list[tuple[int, dict[str, str]]]] = {}
+                for index in indexes:
+                    if index in failures or index in per_record:
+                        continue
+                    values = unique_field_values(records[index], compound)
+                    if values is None:
+                        per_record.add(index)
+                        continue
+                    if not values:
+                        continue
+                    signature = tuple(sorted(values.items()))
+                    if signature in seen:
+                        failures[index] = API_Exception(
+                            status.HTTP_400_BAD_REQUEST,
+                            API_Error(
+                                type="request",
+                                code=InternalErrorCode.DATA_SHOULD_BE_UNIQUE,
+                                message="Entry properties should be unique: "
+                                + "".join(f"@{key}:{value} " for key, value in values.items()),
+                            ),
+                        )
+                        continue
+                    seen.add(signature)
+                    group_key = tuple(sorted((key, search_value_type(value)) for key, value in values.items()))
+                    groups.setdefault(group_key, []).append((index, values))
+
+                for group_key, members in groups.items():
+                    search = " ".join(
+                        f"@{key}:{'|'.join(dict.fromkeys(values[key] for _, values in members))}" for key, _ in group_key
+                    )
+                    q = api.Query(space_name=space_name, subpath=subpath, type=QueryType.subpath, search=search, limit=1)
+                    total, _ = await self.query(q, user_shortname)
+                    if total != 0:
+                        per_record.update(index for index, _ in members)
+
+        for index in sorted(per_record - failures.keys()):
+            try:
+                await self.validate_uniqueness(space_name, records[index], api.RequestType.create, user_shortname)
+            except api.Exception as e:
+                failures[index] = e
+        return failures
+
     async def validate_payload_with_schema(
         self,
         payload_data: UploadFile | dict,
@@ -3302,9 +3833,8 @@ class SQLAdapter(BaseDataAdapter):
 
         if schema_shortname in ["folder_rendering", "meta_schema"]:
             space_name = settings.management_space
-        schema = await self.load(space_name, "/schema", schema_shortname, core.Schema)
-        if schema.payload:
-            schema = schema.payload.model_dump()["body"]
+        schema_meta = await self.load(space_name, "/schema", schema_shortname, core.Schema)
+        schema_body = schema_meta.payload.body if schema_meta.payload else None
 
         if not isinstance(payload_data, dict):
             data = json.load(payload_data.file)
@@ -3312,7 +3842,35 @@ class SQLAdapter(BaseDataAdapter):
         else:
             data = payload_data
 
-        Draft7Validator(schema).validate(data)  # type: ignore
+        if not isinstance(schema_body, dict):
+            Draft7Validator(schema_body).validate(data)  # type: ignore
+            return
+
+        schema_validators.validator(space_name, schema_shortname, schema_body).validate(data)
+
+    async def validate_payloads_with_schema(
+        self,
+        payloads: list[dict],
+        space_name: str,
+        schema_shortname: str,
+    ) -> list[tuple[int, ValidationError]]:
+        """Validate a batch of payload bodies against one schema, returns (index, error) of the invalid ones"""
+        if schema_shortname in ["folder_rendering", "meta_schema"]:
+            space_name = settings.management_space
+        schema_meta = await self.load(space_name, "/schema", schema_shortname, core.Schema)
+        schema_body = schema_meta.payload.body if schema_meta.payload else None
+
+        if not isinstance(schema_body, dict):
+            # Same as the per-record path: validated as is, without going through the compiled validators
+            validator = Draft7Validator(schema_body)  # type: ignore
+            failures: list[tuple[int, ValidationError]] = []
+            for index, payload in enumerate(payloads):
+                error = best_match(validator.iter_errors(payload))
+                if error is not None:
+                    failures.append((index, error))
+            return failures
+
+        return schema_validators.validate_many(space_name, schema_shortname, schema_body, payloads)
 
     async def get_schema(self, space_name: str, schema_shortname: str, owner_shortname: str) -> dict:
         schema_content = await self.load(
@@ -3324,7 +3882,7 @@ class SQLAdapter(BaseDataAdapter):
         )
 
         if schema_content and schema_content.payload and isinstance(schema_content.payload.body, dict):
-            return resolve_schema_references(schema_content.payload.body)
+            return schema_validators.resolved_schema(space_name, schema_shortname, schema_content.payload.body)
 
         return {}
 
@@ -3402,7 +3960,7 @@ class SQLAdapter(BaseDataAdapter):
                 .where(Permissions.space_name == settings.management_space)
             )
             results = (await session.execute(statement)).scalars().all()
-            return [core.Permission.model_validate(r.model_dump()) for r in results]
+            return [hydrate(core.Permission, r) for r in results]
 
     async def get_user_roles(self, user_shortname: str) -> dict[str, core.Role]:
         try:
@@ -3425,7 +3983,7 @@ class SQLAdapter(BaseDataAdapter):
                 results = (await session.execute(statement)).scalars().all()
                 euser_roles: dict[str, core.Role] = {}
                 for row in results:
-                    role_obj = core.Role.model_validate(row.model_dump())
+                    role_obj = hydrate(core.Role, row)
                     euser_roles[row.shortname] = role_obj
                 return euser_roles
         except Exception as e2:
@@ -3446,61 +4004,106 @@ class SQLAdapter(BaseDataAdapter):
     async def generate_user_permissions(self, user_shortname: str) -> dict:
         user_permissions: dict = {}
 
-        user_meta = await self.load_or_none(
-            settings.management_space,
-            settings.users_subpath,
-            user_shortname,
-            core.User,
+        # Resolve user -> roles -> permissions in a single round trip. Every
+        # signed-in user implicitly holds `logged_in`, and anonymous gets `world`
+        # granted through each of its roles.
+        statement = (
+            select(col(Users.owner_shortname), Permissions)
+            .select_from(Users)
+            .join(
+                Roles,
+                and_(
+                    col(Roles.space_name) == settings.management_space,
+                    or_(
+                        col(Users.roles).has_key(col(Roles.shortname)),
+                        and_(col(Roles.shortname) == "logged_in", col(Users.shortname) != "anonymous"),
+                    ),
+                ),
+            )
+            .join(
+                Permissions,
+                and_(
+                    col(Permissions.space_name) == settings.management_space,
+                    or_(
+                        col(Roles.permissions).has_key(col(Permissions.shortname)),
+                        and_(col(Users.shortname) == "anonymous", col(Permissions.shortname) == "world"),
+                    ),
+                ),
+            )
+            .where(
+                col(Users.shortname) == user_shortname,
+                col(Users.space_name) == settings.management_space,
+                col(Users.subpath) == f"/{settings.users_subpath}",
+            )
+            .order_by(col(Roles.shortname), col(Permissions.shortname))
         )
-        owner_shortname = user_meta.owner_shortname if user_meta else None
-
-        user_roles = await self.get_user_roles(user_shortname)
+        async with self.get_session() as session:
+            rows = (await session.execute(statement)).all()
 
-        for _, role in user_roles.items():
-            role_permissions = await self.get_role_permissions(role)
-            if user_shortname == "anonymous":
-                permission_world_record = await self.load_or_none(
-                    settings.management_space, "permissions", "world", core.Permission
-                )
-                if permission_world_record:
-                    role_permissions.append(permission_world_record)
-
-            for permission in role_permissions:
-                for space_name, permission_subpaths in permission.subpaths.items():
-                    subpaths_to_use = permission_subpaths if permission_subpaths else ["/"]
-                    for permission_subpath in subpaths_to_use:
-                        permission_subpath = trans_magic_words(permission_subpath, user_shortname, owner_shortname)
-                        for permission_resource_types in permission.resource_types:
-                            actions = set(permission.actions)
-                            conditions = set(permission.conditions)
-                            if f"{space_name}:{permission_subpath}:{permission_resource_types}" in user_permissions:
-                                old_perm = user_permissions[f"{space_name}:{permission_subpath}:{permission_resource_types}"]
-
-                                if isinstance(actions, list):
-                                    actions = set(actions)
-                                actions |= set(old_perm["allowed_actions"])
-
-                                if isinstance(conditions, list):
-                                    conditions = set(conditions)
-                                conditions |= set(old_perm["conditions"])
-
-                            user_permissions[f"{space_name}:{permission_subpath}:{permission_resource_types}"] = {
-                                "allowed_actions": list(actions),
-                                "conditions": list(conditions),
-                                "restricted_fields": permission.restricted_fields,
-                                "allowed_fields_values": permission.allowed_fields_values,
-                                "filter_fields_values": permission.filter_fields_values,
-                            }
+        owner_shortname = rows[0][0] if rows else None
+        # A permission granted through several roles only needs to be applied once
+        unique_permissions = {row[1].shortname: row[1] for row in rows}
+        role_permissions = [hydrate(core.Permission, p) for p in unique_permissions.values()]
+
+        for permission in role_permissions:
+            for space_name, permission_subpaths in permission.subpaths.items():
+                subpaths_to_use = permission_subpaths if permission_subpaths else ["/"]
+                for permission_subpath in subpaths_to_use:
+                    permission_subpath = trans_magic_words(permission_subpath, user_shortname, owner_shortname)
+                    for permission_resource_types in permission.resource_types:
+                        actions = set(permission.actions)
+                        conditions = set(permission.conditions)
+                        if f"{space_name}:{permission_subpath}:{permission_resource_types}" in user_permissions:
+                            old_perm = user_permissions[f"{space_name}:{permission_subpath}:{permission_resource_types}"]
+
+                            if isinstance(actions, list):
+                                actions = set(actions)
+                            actions |= set(old_perm["allowed_actions"])
+
+                            if isinstance(conditions, list):
+                                conditions = set(conditions)
+                            conditions |= set(old_perm["conditions"])
+
+                        user_permissions[f"{space_name}:{permission_subpath}:{permission_resource_types}"] = {
+                            "allowed_actions": list(actions),
+                            "conditions": list(conditions),
+                            "restricted_fields": permission.restricted_fields,
+                            "allowed_fields_values": permission.allowed_fields_values,
+                            "filter_fields_values": permission.filter_fields_values,
+                        }
         return user_permissions
 
     async def get_user_permissions(self, user_shortname: str) -> dict:
+        inflight = SQLAdapter._user_permissions_inflight.get(user_shortname)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
         async with self.get_session() as session:
             statement = select(UserPermissionsCache).where(col(UserPermissionsCache.user_shortname) == user_shortname)
             cached = (await session.execute(statement)).scalars().first()
             if cached:
                 return cached.permissions  # type: ignore
 
+        # Concurrent misses for the same user within this worker share a single rebuild
+        inflight = SQLAdapter._user_permissions_inflight.get(user_shortname)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._rebuild_user_permissions(user_shortname))
+            SQLAdapter._user_permissions_inflight[user_shortname] = inflight
+            inflight.add_done_callback(lambda task: self._forget_inflight_user_permissions(user_shortname, task))
+        return await asyncio.shield(inflight)
+
+    @staticmethod
+    def _forget_inflight_user_permissions(user_shortname: str, task: asyncio.Future) -> None:
+        if SQLAdapter._user_permissions_inflight.get(user_shortname) is task:
+            del SQLAdapter._user_permissions_inflight[user_shortname]
+
+    async def _rebuild_user_permissions(self, user_shortname: str) -> dict:
+        generation = SQLAdapter._user_permissions_generation
         user_permissions = await self.generate_user_permissions(user_shortname)
+        if generation != SQLAdapter._user_permissions_generation:
+            # An invalidation landed while building, the map may already be stale so don't persist it
+            return user_permissions
+
         async with self.get_session() as session:
             stmt = insert(UserPermissionsCache).values(
                 user_shortname=user_shortname,
@@ -3558,10 +4161,51 @@ class SQLAdapter(BaseDataAdapter):
         return None
 
     async def clear_cached_user_permission(self) -> None:
+        SQLAdapter._user_permissions_generation += 1
         async with self.get_session() as session:
             await session.execute(delete(UserPermissionsCache))
             await session.commit()
 
+    async def invalidate_cached_user_permission(self, meta: core.Meta) -> None:
+        """Drop the cached permission maps of the users affected by a change to the given user, role or permission"""
+        if isinstance(meta, core.User):
+            await self._delete_cached_user_permission(col(UserPermissionsCache.user_shortname) == meta.shortname)
+            return
+
+        if isinstance(meta, core.Permission):
+            async with self.get_session() as session:
+                role_shortnames = list(
+                    (
+                        await session.execute(
+                            select(Roles.shortname).where(col(Roles.permissions).contains([meta.shortname]))
+                        )
+                    ).scalars().all()
+                )
+            if meta.shortname == "world":
+                await self._delete_cached_user_permission(col(UserPermissionsCache.user_shortname) == "anonymous")
+        elif isinstance(meta, core.Role):
+            role_shortnames = [meta.shortname]
+        else:
+            return
+
+        if not role_shortnames:
+            return
+        if "logged_in" in role_shortnames:
+            # Implicitly held by every signed-in user
+            await self.clear_cached_user_permission()
+            return
+
+        # The GIN index on users.roles serves as the role -> users reverse index
+        role_holders = select(Users.shortname).where(
+            or_(*[col(Users.roles).contains([role_shortname]) for role_shortname in role_shortnames])
+        )
+        await self._delete_cached_user_permission(col(UserPermissionsCache.user_shortname).in_(role_holders))
+
+    async def _delete_cached_user_permission(self, condition) -> None:
+        SQLAdapter._user_permissions_generation += 1
+        async with self.get_session() as session:
+            await session.execute(delete(UserPermissionsCache).where(condition))
+
     async def store_modules_to_redis(self, roles, groups, permissions) -> None:
         pass
 
@@ -1,15 +1,36 @@
+import asyncio
+import base64
+import binascii
 import json
 import re
+from datetime import datetime
 from pathlib import Path
+from uuid import UUID
+
+from fastapi import status
+from sqlalchemy import false, func, literal_column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
 import models.api as api
 import models.core as core
-from data_adapters.sql.create_tables import Aggregated, Entries, Histories, Permissions, Roles, Spaces, Users
-from models.enums import QueryType
-from utils.helpers import (
-    process_jsonl_file,
-    str_to_datetime,
+from data_adapters.helpers import get_nested_value
+from data_adapters.sql.create_tables import (
+    SEARCH_DOCUMENTS,
+    Aggregated,
+    Entries,
+    Histories,
+    Permissions,
+    Roles,
+    Spaces,
+    Users,
 )
+from models.enums import QueryType, SortType
+from utils.internal_error_code import InternalErrorCode
+from utils.jsonl_index import JsonlIndex
 from utils.settings import settings
 
 postgres_aggregate_functions = [
@@ -437,23 +458,33 @@ async def events_query(query: api.Query, user_shortname: str | None = None) -> t
     if not path.is_file():  # noqa: ASYNC240
         return total, records
 
-    total, result = await process_jsonl_file(path, limit=query.limit, offset=query.offset, search=query.search, reverse=True)
-
-    for line in result:
-        action_obj = json.loads(line)
-        if query.from_date and str_to_datetime(action_obj["timestamp"]) < query.from_date:
-            continue
-
-        if query.to_date and str_to_datetime(action_obj["timestamp"]) > query.to_date:
-            continue
+    index = JsonlIndex(path)
+    await asyncio.to_thread(index.refresh)
+    total, result = await asyncio.to_thread(
+        index.page,
+        limit=query.limit,
+        offset=query.offset,
+        search=query.search,
+        from_date=query.from_date,
+        to_date=query.to_date,
+    )
 
-        if not await access_control.check_access(
-            user_shortname=str(user_shortname),
-            space_name=query.space_name,
-            subpath=action_obj.get("resource", {}).get("subpath", "/"),
-            resource_type=action_obj["resource"]["type"],
-            action_type=core.ActionType(action_obj["request"]),
-        ):
+    actions = [json.loads(line) for line in result]
+
+    # Events on a page mostly share a handful of (subpath, type, action) combinations,
+    # so each distinct combination is checked once
+    access: dict[tuple[str, str, str], bool] = {}
+    for action_obj in actions:
+        key = (action_obj.get("resource", {}).get("subpath", "/"), action_obj["resource"]["type"], action_obj["request"])
+        if key not in access:
+            access[key] = await access_control.check_access(
+                user_shortname=str(user_shortname),
+                space_name=query.space_name,
+                subpath=key[0],
+                resource_type=key[1],
+                action_type=core.ActionType(key[2]),
+            )
+        if not access[key]:
             continue
 
         records.append(
@@ -468,6 +499,42 @@ async def events_query(query: api.Query, user_shortname: str | None = None) -> t
     return total, records
 
 
+# Values that can't be OR-ed into a single `@field:a|b` search term verbatim
+_UNBATCHABLE_SEARCH_VALUE = re.compile(r'[\s|"\[\]]|^[!<>]')
+
+
+def unique_field_values(record: core.Record, compound: list[str]) -> dict[str, str] | None:
+    """The search values `validate_uniqueness` uses for one `unique_fields` compound of a record.
+
+    Keys without a value are left out, None when a value can't be batched in a search.
+    """
+    values: dict[str, str] = {}
+    for key in compound:
+        if key.startswith("payload.body."):
+            payload_body = (record.attributes.get("payload") or {}).get("body", {})
+            value = get_nested_value(payload_body, key.replace("payload.body.", "", 1)) if isinstance(payload_body, dict) else None
+        else:
+            value = get_nested_value(record.attributes, key)
+        if value is None or value == "":
+            continue
+        value = f"{value}"
+        if _UNBATCHABLE_SEARCH_VALUE.search(value):
+            return None
+        values[key] = value
+    return values
+
+
+def search_value_type(value: str) -> str:
+    """The value type `parse_search_string` infers for a single search value"""
+    if is_date_time_value(value)[0]:
+        return "datetime"
+    if value.lower() in ["true", "false"]:
+        return "boolean"
+    if re.match(r"^-?\d+(?:\.\d+)?$", value):
+        return "numeric"
+    return "string"
+
+
 def set_results_from_aggregation(query, item, results, idx):
     extra = {}
     for key, value in item._mapping.items():
@@ -502,6 +569,172 @@ def set_table_for_query(query):
         return Entries
 
 
+def search_document_sql(table) -> str:
+    """SQL text expression free-text search matches against for `table`"""
+    table_name = getattr(table, "__tablename__", None)
+    if table_name in SEARCH_DOCUMENTS:
+        return SEARCH_DOCUMENTS[table_name]
+    try:
+        parts = [f"COALESCE({column.name}::text, '')" for column in table.__table__.columns]
+        return " || ' ' || ".join(parts) if parts else "''"
+    except Exception:
+        document = "shortname || ' ' || tags || ' ' || displayname || ' ' || description || ' ' || payload"
+        if table is Users:
+            document += " || ' ' || COALESCE(email, '') || ' ' || COALESCE(msisdn, '') || ' ' || roles"
+        if table is Roles:
+            document += " || ' ' || permissions"
+        return document
+
+
+def keyset_sort_column(table, sort_by: str | None):
+    """The column a keyset cursor can be built on: a plain, non-null column of a table keyed by uuid"""
+    if not sort_by or "." in sort_by or not hasattr(table, "__table__") or "uuid" not in table.__table__.c:
+        return None
+    column = table.__table__.c.get(sort_by)
+    if column is None or column.nullable:
+        return None
+    return getattr(table, sort_by)
+
+
+# Columns every record needs, and the ones `_set_query_final_results` strips from records anyway
+_PROJECTION_REQUIRED_COLUMNS = ("uuid", "shortname", "subpath", "space_name", "resource_type")
+_PROJECTION_HIDDEN_COLUMNS = ("query_policies", "acl_principals", "media")
+_NON_PROJECTED_QUERY_TYPES = (
+    QueryType.history,
+    QueryType.events,
+    QueryType.tags,
+    QueryType.counters,
+    QueryType.aggregation,
+    QueryType.attachments_aggregation,
+)
+
+
+def apply_query_projection(statement, table, query: api.Query):
+    """Push `include_fields`, `exclude_fields` and `retrieve_json_payload` into the SELECT.
+
+    Columns the records won't carry are not loaded. When the payload body isn't wanted, or
+    only some `payload.body.*` fields are, the `payload` column is replaced by the payload
+    with a null body plus one `jsonb_extract_path` column per requested field.
+
+    Returns the statement and the requested body paths; the paths are None when the ORM
+    loads `payload` itself, otherwise each row carries the projected payload and then the
+    value of each path after the entity (see `hydrate_projected_row`).
+    """
+    if not hasattr(table, "__table__") or query.type in _NON_PROJECTED_QUERY_TYPES:
+        return statement, None
+
+    columns = [column.name for column in table.__table__.columns]
+    keep = set(columns) - set(_PROJECTION_HIDDEN_COLUMNS)
+    if table is Users:
+        keep.discard("password")
+
+    body_paths: list[list[str]] = []
+    # Client joins may read any attribute of the records, so only the payload body is projected then
+    if not query.join:
+        if query.include_fields:
+            included: set[str] = set()
+            for field in query.include_fields:
+                field = field.removeprefix("attributes.")
+                if field.startswith("payload.body."):
+                    parts = [part for part in field.removeprefix("payload.body.").split(".") if part]
+                    if parts and parts not in body_paths:
+                        body_paths.append(parts)
+                else:
+                    included.add(field.split(".")[0])
+            keep &= included | set(_PROJECTION_REQUIRED_COLUMNS)
+        for field in query.exclude_fields or []:
+            field = field.removeprefix("attributes.")
+            if field not in _PROJECTION_REQUIRED_COLUMNS:
+                keep.discard(field)
+
+    sort_column = str(query.sort_by).removeprefix("attributes.") if query.sort_by else ""
+    if sort_column in columns:
+        keep.add(sort_column)
+
+    project_payload = (
+        "payload" in columns
+        and query.type != QueryType.attachments
+        and ((bool(body_paths) and "payload" not in keep) or ("payload" in keep and not query.retrieve_json_payload))
+    )
+    if project_payload:
+        keep.discard("payload")
+    elif "payload" in keep:
+        body_paths = []
+
+    if keep != set(columns):
+        statement = statement.options(load_only(*[getattr(table, column) for column in columns if column in keep]))
+    if not project_payload:
+        return statement, None
+
+    if not query.retrieve_json_payload:
+        body_paths = []
+    payload = table.payload
+    statement = statement.add_columns(
+        func.jsonb_set(payload, literal_column("'{body}'"), literal_column("'null'::jsonb"), false(), type_=JSONB).label(
+            "projected_payload"
+        ),
+        *[
+            func.jsonb_extract_path(payload, "body", *parts, type_=JSONB).label(f"projected_body_{idx}")
+            for idx, parts in enumerate(body_paths)
+        ],
+    )
+    return statement, body_paths
+
+
+def hydrate_projected_row(row, body_paths: list[list[str]]):
+    """The ORM instance of a row fetched with `apply_query_projection`, its payload set back"""
+    entity, payload = row[0], row[1]
+    if isinstance(payload, dict) and body_paths:
+        body: dict = {}
+        for parts, value in zip(body_paths, row[2:], strict=False):
+            if value is None:
+                continue
+            node = body
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            node[parts[-1]] = value
+        payload["body"] = body
+    set_committed_value(entity, "payload", payload)
+    return entity
+
+
+def encode_query_cursor(sort_by: str, sort_type: SortType, value, uuid: UUID) -> str:
+    if isinstance(value, datetime):
+        value = {"$dt": value.isoformat()}
+    elif isinstance(value, UUID):
+        value = str(value)
+    payload = json.dumps({"s": sort_by, "t": sort_type, "v": value, "u": str(uuid)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_query_cursor(cursor: str) -> tuple[str, SortType, object, UUID]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = payload["v"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$dt"])
+        return str(payload["s"]), SortType(payload["t"]), value, UUID(payload["u"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise api.Exception(
+            status.HTTP_400_BAD_REQUEST,
+            api.Error(type="query", code=InternalErrorCode.INVALID_DATA, message="Invalid query cursor"),
+        ) from e
+
+
+class ExplainJSON(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a statement, its parameters bound the way the driver in use expects"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(ExplainJSON)
+def _compile_explain_json(element, compiler, **kw):
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
 def build_query_filter_for_allowed_field_values(perm_value) -> str:
     filters = []
 
@@ -182,12 +182,14 @@ class Users(Metas, table=True):
     notes: str | None = None
     last_checksum_history: str | None = Field(default=None)
     query_policies: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
+    acl_principals: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
 
 
 class Roles(Metas, table=True):
     permissions: list[str] = Field(default_factory=dict, sa_type=JSONB)
     owner_shortname: str = Field(foreign_key="users.shortname")
     query_policies: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
+    acl_principals: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
     last_checksum_history: str | None = Field(default=None)
 
 
@@ -201,6 +203,7 @@ class Permissions(Metas, table=True):
     filter_fields_values: str | None = None
     last_checksum_history: str | None = Field(default=None)
     query_policies: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
+    acl_principals: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
 
 
 class UserPermissionsCache(SQLModel, table=True):
@@ -218,6 +221,7 @@ class Entries(Metas, table=True):
     resolution_reason: str | None = None
     last_checksum_history: str | None = Field(default=None)
     query_policies: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
+    acl_principals: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
 
 
 class Attachments(Metas, table=True):
@@ -285,6 +289,7 @@ class Spaces(Metas, table=True):
     ordinal: int | None = None
     last_checksum_history: str | None = Field(default=None)
     query_policies: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
+    acl_principals: list[str] = Field(default=[], sa_type=ARRAY(TEXT))  # type: ignore
 
 
 class AggregatedRecord(SQLModel, table=False):
@@ -364,7 +369,8 @@ class Locks(Unique, table=True):
 class Sessions(SQLModel, table=True):
     shortname: str = Field(regex=regex.SHORTNAME)
     uuid: UUID = Field(default_factory=UUID, primary_key=True)
-    token: str = Field(...)
+    # HMAC-SHA256 digest of the JWT (see utils.password_hashing.hash_session_token)
+    token: str = Field(..., index=True)
     timestamp: datetime = Field(default_factory=datetime.now)
     firebase_token: str | None = None
 
@@ -389,6 +395,24 @@ class OTP(SQLModel, table=True):
     timestamp: datetime = Field(default_factory=datetime.now)
 
 
+def _search_document(*columns: str) -> str:
+    return " || ' ' || ".join(f"COALESCE({column}::text, '')" for column in columns)
+
+
+_META_SEARCH_COLUMNS = ("uuid", "shortname", "slug", "displayname", "description", "tags", "payload", "owner_shortname")
+
+# Curated free-text document per table for `search`. The trigram indexes are
+# built on exactly these expressions, queries must use them verbatim to hit them.
+SEARCH_DOCUMENTS: dict[str, str] = {
+    "entries": _search_document(*_META_SEARCH_COLUMNS, "state", "workflow_shortname"),
+    "attachments": _search_document(*_META_SEARCH_COLUMNS, "body", "state"),
+    "users": _search_document(*_META_SEARCH_COLUMNS, "email", "msisdn", "roles", "groups"),
+    "roles": _search_document(*_META_SEARCH_COLUMNS, "permissions"),
+    "permissions": _search_document(*_META_SEARCH_COLUMNS),
+    "spaces": _search_document(*_META_SEARCH_COLUMNS),
+}
+
+
 def generate_tables():
     postgresql_url = URL.create(
         drivername=settings.database_driver.replace("+asyncpg", "+psycopg"),
@@ -493,6 +517,18 @@ def generate_tables():
             "CREATE INDEX IF NOT EXISTS idx_roles_query_policies_gin ON roles USING GIN (query_policies)",
             "CREATE INDEX IF NOT EXISTS idx_permissions_query_policies_gin ON permissions USING GIN (query_policies)",
             "CREATE INDEX IF NOT EXISTS idx_spaces_query_policies_gin ON spaces USING GIN (query_policies)",
+            # GIN index for acl_principals ARRAY columns
+            "CREATE INDEX IF NOT EXISTS idx_entries_acl_principals_gin ON entries USING GIN (acl_principals)",
+            "CREATE INDEX IF NOT EXISTS idx_users_acl_principals_gin ON users USING GIN (acl_principals)",
+            "CREATE INDEX IF NOT EXISTS idx_roles_acl_principals_gin ON roles USING GIN (acl_principals)",
+            "CREATE INDEX IF NOT EXISTS idx_permissions_acl_principals_gin ON permissions USING GIN (acl_principals)",
+            "CREATE INDEX IF NOT EXISTS idx_spaces_acl_principals_gin ON spaces USING GIN (acl_principals)",
+            # Trigram indexes serving free-text search (ILIKE '%term%')
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            *(
+                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_search_trgm ON {table_name} USING GIN (({document}) gin_trgm_ops)"
+                for table_name, document in SEARCH_DOCUMENTS.items()
+            ),
         ]
         import contextlib
 
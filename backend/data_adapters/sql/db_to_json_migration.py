@@ -1,10 +1,15 @@
 #!/usr/bin/env -S BACKEND_ENV=config.env python3
 
 import base64
+import copy
 import json
 import os
+import posixpath
+from collections.abc import AsyncGenerator
 from datetime import datetime
 
+from sqlalchemy import tuple_
+from sqlalchemy.orm import defer
 from sqlmodel import Session, col, create_engine, select
 
 from data_adapters.sql.create_tables import (
@@ -17,7 +22,7 @@ from data_adapters.sql.create_tables import (
     Users,
 )
 from models import core
-from models.core import Payload
+from utils.archive_stream import ArchiveMember
 from utils.settings import settings
 
 
@@ -57,12 +62,17 @@ def clean_json(data: dict):
     return data
 
 
+def json_file_content(data: dict) -> bytes:
+    data = copy.deepcopy(data)
+    if data.get("query_policies", False):
+        del data["query_policies"]
+    data.pop("acl_principals", None)
+    return json.dumps(clean_json(data), indent=2, default=str).encode()
+
+
 def write_json_file(path, data):
-    with open(path, "w") as f:
-        if data.get("query_policies", False):
-            del data["query_policies"]
-        clean = clean_json(data)
-        json.dump(clean, f, indent=2, default=str)
+    with open(path, "wb") as f:
+        f.write(json_file_content(data))
 
 
 def write_file(path, data):
@@ -291,201 +301,276 @@ def process_spaces(session, space_folder):
         write_json_file(f"{dir_path}/meta.space.json", _space)
 
 
-async def export_data_with_query(query, user_shortname):
-    from utils.repository import serve_query
+def member_path(*parts: str) -> str:
+    return posixpath.normpath("/".join(parts)).lstrip("/")
+
+
+def user_members(user: Users) -> list[ArchiveMember]:
+    dir_path = "management/users"
+    members = []
+    _user = user.model_dump()
+    del _user["space_name"]
+    del _user["resource_type"]
+    if _user.get("payload", None) and _user["payload"].get("body", None):
+        members.append((member_path(dir_path, f"{user.shortname}.json"), json_file_content(_user["payload"]["body"])))
+        _user["payload"]["body"] = f"{user.shortname}.json"
+
+    members.append((member_path(dir_path, ".dm", user.shortname, "meta.user.json"), json_file_content(_user)))
+    return members
+
+
+def role_members(role: Roles) -> list[ArchiveMember]:
+    _role = role.model_dump()
+    del _role["space_name"]
+    del _role["subpath"]
+    del _role["resource_type"]
+    return [(member_path("management/roles/.dm", role.shortname, "meta.role.json"), json_file_content(_role))]
+
+
+def permission_members(permission: Permissions) -> list[ArchiveMember]:
+    _permission = permission.model_dump()
+    del _permission["space_name"]
+    del _permission["subpath"]
+    del _permission["resource_type"]
+    return [
+        (
+            member_path("management/permissions/.dm", permission.shortname, "meta.permission.json"),
+            json_file_content(_permission),
+        )
+    ]
+
+
+def space_members(space: Spaces) -> list[ArchiveMember]:
+    _space = space.model_dump()
+    del _space["space_name"]
+    del _space["resource_type"]
+    return [(member_path(space.space_name, ".dm", "meta.space.json"), json_file_content(_space))]
+
+
+def folder_members(folder: Entries) -> list[ArchiveMember]:
+    folder_dir_path = f"{folder.space_name}{subpath_checker(folder.subpath)}"
+    _folder = folder.model_dump()
+    _folder = {**_folder, **_folder.get("attributes", {})}
+    if "attributes" in _folder:
+        del _folder["attributes"]
+    body = None
+    if _folder and _folder.get("payload") is not None:
+        if _folder and _folder.get("payload", {}).get("body", None) is not None:
+            body = _folder.get("payload", {}).get("body", None)
+        _folder["payload"]["body"] = f"{folder.shortname}.json"
+
+    del _folder["space_name"]
+    del _folder["subpath"]
+    del _folder["resource_type"]
+
+    members = [(member_path(folder_dir_path, folder.shortname, ".dm", "meta.folder.json"), json_file_content(_folder))]
+    if body is not None:
+        members.append((member_path(folder_dir_path, f"{folder.shortname}.json"), json_file_content(body)))
+    return members
+
+
+def record_members(
+    space_name: str, entry: core.Record, histories: list[Histories], attachments: list[tuple[Attachments, bytes | None]]
+) -> list[ArchiveMember]:
+    """The files of one exported record: its meta and body, history and attachments"""
+    dir_path = f"{space_name}{subpath_checker(entry.subpath)}"
+
+    if entry.resource_type == "folder":
+        _entry = entry.model_dump()
+        body = None
+        if _entry.get("payload", None) is not None:
+            if _entry.get("payload", {}).get("body", None) is not None:
+                body = _entry.get("payload", {}).get("body", None)
+            _entry["payload"]["body"] = f"{entry.shortname}.json"
 
-    space_folder = os.path.relpath(str(settings.spaces_folder))  # noqa: ASYNC240
+        del _entry["subpath"]
+        del _entry["resource_type"]
 
-    _total, records = await serve_query(query, user_shortname)
+        _entry = {**_entry, **_entry.get("attributes", {})}
+        if "attributes" in _entry:
+            del _entry["attributes"]
+
+        members = [(member_path(dir_path, entry.shortname, ".dm", "meta.folder.json"), json_file_content(_entry))]
+        if body is not None:
+            members.append((member_path(dir_path, f"{entry.shortname}.json"), json_file_content(body)))
+        return members
+
+    members = []
+    _entry = entry.model_dump()
+    del _entry["subpath"]
+    del _entry["resource_type"]
+
+    if (
+        entry.attributes.get("payload")
+        and entry.attributes.get("payload", {}).get("content_type") == core.ContentType.json
+        and _entry.get("attributes", {}).get("payload", {}).get("body", None) is not None
+    ):
+        if isinstance(_entry.get("attributes", {}).get("payload").get("body", None), dict):
+            members.append(
+                (
+                    member_path(dir_path, f"{entry.shortname}.json"),
+                    json_file_content(_entry.get("attributes", {}).get("payload").get("body", None)),
+                )
+            )
+        _entry.get("attributes", {}).get("payload")["body"] = f"{entry.shortname}.json"
+
+    _entry = {**_entry, **_entry.get("attributes", {})}
+    if "attributes" in _entry:
+        del _entry["attributes"]
+    if "attachments" in _entry:
+        del _entry["attachments"]
+
+    members.append(
+        (member_path(dir_path, ".dm", entry.shortname, f"meta.{entry.resource_type}.json"), json_file_content(_entry))
+    )
+
+    if histories:
+        lines = []
+        for history in histories:
+            _history: dict = json.loads(history.model_dump_json())
+            _history["shortname"] = "history"
+
+            del _history["space_name"]
+            del _history["subpath"]
+            if _history.get("resource_type"):
+                del _history["resource_type"]
+            lines.append(json.dumps(_history) + "\n")
+        members.append((member_path(dir_path, ".dm", entry.shortname, "history.jsonl"), "".join(lines).encode()))
+
+    for attachment, media in attachments:
+        parts = subpath_checker(attachment.subpath).split("/")
+        parts.insert(-1, ".dm")
+        media_path = member_path(space_name, "/".join(parts), f"attachments.{attachment.resource_type}")
 
-    with Session(get_engine()) as session:
-        if query.space_name == settings.management_space:
-            subpath = (query.subpath or "/").strip("/")
-            if subpath in ("", "users"):
-                process_users(session, space_folder)
-            if subpath in ("", "roles"):
-                process_roles(session, space_folder)
-            if subpath in ("", "permissions"):
-                process_permissions(session, space_folder)
-
-        space = session.exec(select(Spaces).where(col(Spaces.space_name) == query.space_name)).first()
-        if space:
-            dir_path = f"{space_folder}/{space.space_name}/.dm/"
-            ensure_directory_exists(dir_path)
+        _attachment = attachment.model_dump(exclude={"media"})
+        payload = _attachment.get("payload")
+        if not isinstance(payload, dict) or payload.get("body") is None:
+            continue
+        attachment_body = payload["body"]
 
-            _space = space.model_dump()
-            del _space["space_name"]
-            del _space["resource_type"]
+        if payload.get("content_type") in ("json", "comment"):
+            members.append((member_path(media_path, f"{attachment.shortname}.json"), json_file_content(attachment_body)))
+            payload["body"] = f"{attachment.shortname}.json"
+        elif media:
+            members.append((member_path(media_path, str(attachment_body)), media))
 
-            write_json_file(f"{dir_path}/meta.space.json", _space)
+        del _attachment["resource_type"]
+        members.append((member_path(media_path, f"meta.{attachment.shortname}.json"), json_file_content(_attachment)))
+    return members
+
+
+async def export_query_members(query, user_shortname) -> AsyncGenerator[list[ArchiveMember], None]:
+    """The files an export of `query` is made of, in batches read straight from the database.
+
+    The management users/roles/permissions, the space and the folders down to `query.subpath`
+    come first, then every record the query returns with its history and attachments.
+    """
+    from data_adapters.sql.adapter import SQLAdapter
+    from utils.repository import serve_query_batches
+
+    adapter = SQLAdapter()
+    batch_size = max(1, settings.query_stream_batch_size)
+
+    if query.space_name == settings.management_space:
+        subpath = (query.subpath or "/").strip("/")
+        management_tables = (
+            ("users", Users, user_members),
+            ("roles", Roles, role_members),
+            ("permissions", Permissions, permission_members),
+        )
+        for folder_name, table, members_of in management_tables:
+            if subpath not in ("", folder_name):
+                continue
+            async with adapter.get_session() as session:
+                stream = await session.stream(select(table), execution_options={"yield_per": batch_size})
+                async for rows in stream.scalars().partitions(batch_size):
+                    yield [member for row in rows for member in members_of(row)]  # type: ignore[operator]
+
+    members: list[ArchiveMember] = []
+    async with adapter.get_session() as session:
+        space = (await session.execute(select(Spaces).where(col(Spaces.space_name) == query.space_name))).scalars().first()
+        if space:
+            members.extend(space_members(space))
         if query.subpath and query.subpath != "/":
-            path_parts = query.subpath.strip("/").split("/")
             current_path = ""
-
-            for part in path_parts:
+            for part in query.subpath.strip("/").split("/"):
                 current_path += f"/{part}"
-
-                folder = session.exec(
-                    select(Entries).where(
-                        (Entries.space_name == query.space_name)
-                        & (Entries.subpath == str(current_path.rsplit("/", 1)[0] or "/"))
-                        & (Entries.shortname == part)
-                        & (Entries.resource_type == "folder")
+                folder = (
+                    (
+                        await session.execute(
+                            select(Entries).where(
+                                (Entries.space_name == query.space_name)
+                                & (Entries.subpath == str(current_path.rsplit("/", 1)[0] or "/"))
+                                & (Entries.shortname == part)
+                                & (Entries.resource_type == "folder")
+                            )
+                        )
                     )
-                ).first()
-
+                    .scalars()
+                    .first()
+                )
                 if folder:
-                    folder_subpath = subpath_checker(folder.subpath)
-                    folder_dir_path = f"{space_folder}/{folder.space_name}{folder_subpath}".replace("//", "/")
-                    ensure_directory_exists(folder_dir_path)
-
-                    dir_meta_path = f"{folder_dir_path}/{folder.shortname}/.dm/".replace("//", "/")
-                    ensure_directory_exists(dir_meta_path)
-
-                    _folder = folder.model_dump()
-                    _folder = {**_folder, **_folder.get("attributes", {})}
-                    if "attributes" in _folder:
-                        del _folder["attributes"]
-                    body = None
-                    if _folder and _folder.get("payload") is not None:
-                        if _folder and _folder.get("payload", {}).get("body", None) is not None:
-                            body = _folder.get("payload", {}).get("body", None)
-                        _folder["payload"]["body"] = f"{folder.shortname}.json"
-
-                    del _folder["space_name"]
-                    del _folder["subpath"]
-                    del _folder["resource_type"]
-
-                    write_json_file(f"{dir_meta_path}/meta.folder.json", _folder)
-                    if body is not None:
-                        write_json_file(f"{folder_dir_path}/{folder.shortname}.json", body)
-
-        for entry in records:
-            subpath = subpath_checker(entry.subpath)
-            dir_path = f"{space_folder}/{query.space_name}{subpath}".replace("//", "/")  # Ensure absolute path
-            ensure_directory_exists(dir_path)
-
-            if entry.resource_type == "folder":
-                dir_meta_path = f"{dir_path}/{entry.shortname}/.dm/".replace("//", "/")
-                ensure_directory_exists(dir_meta_path)
-                _entry = entry.model_dump()
-                body = None
-                if _entry.get("payload", None) is not None:
-                    if _entry.get("payload", {}).get("body", None) is not None:
-                        body = _entry.get("payload", {}).get("body", None)
-                    _entry["payload"]["body"] = f"{entry.shortname}.json"
-
-                del _entry["subpath"]
-                del _entry["resource_type"]
-
-                _entry = {**_entry, **_entry.get("attributes", {})}
-                if "attributes" in _entry:
-                    del _entry["attributes"]
-
-                write_json_file(f"{dir_meta_path}/meta.folder.json", _entry)
-                if body is not None:
-                    write_json_file(f"{dir_path}/{entry.shortname}.json", body)
-                continue
-
-            dir_meta_path = f"{dir_path}/.dm/{entry.shortname}".replace("//", "/")
-            ensure_directory_exists(dir_meta_path)
-
-            _entry = entry.model_dump()
-            del _entry["subpath"]
-            del _entry["resource_type"]
-
-            if (
-                entry.attributes.get("payload")
-                and entry.attributes.get("payload", {}).get("content_type") == core.ContentType.json
-                and _entry.get("attributes", {}).get("payload", {}).get("body", None) is not None
-            ):
-                if isinstance(_entry.get("attributes", {}).get("payload").get("body", None), dict):
-                    write_json_file(
-                        f"{dir_path}/{entry.shortname}.json",
-                        _entry.get("attributes", {}).get("payload").get("body", None),
+                    members.extend(folder_members(folder))
+    if members:
+        yield members
+
+    async for records in serve_query_batches(query, user_shortname):
+        entries = [record for record in records if record.resource_type != "folder"]
+        histories: dict[tuple[str, str], list[Histories]] = {}
+        attachments: dict[str, list[Attachments]] = {}
+        if entries:
+            async with adapter.get_session() as session:
+                history_rows = await session.execute(
+                    select(Histories)
+                    .where(
+                        (Histories.space_name == query.space_name)
+                        & tuple_(Histories.subpath, Histories.shortname).in_([(e.subpath, e.shortname) for e in entries])
                     )
-                _entry.get("attributes", {}).get("payload")["body"] = f"{entry.shortname}.json"
-
-            _entry = {**_entry, **_entry.get("attributes", {})}
-            if "attributes" in _entry:
-                del _entry["attributes"]
-            if "attachments" in _entry:
-                del _entry["attachments"]
-
-            write_json_file(f"{dir_meta_path}/meta.{entry.resource_type}.json", _entry)
-
-            histories = session.exec(
-                select(Histories).where(
-                    (Histories.space_name == query.space_name)
-                    & (Histories.subpath == entry.subpath)
-                    & (Histories.shortname == entry.shortname)
+                    .order_by(col(Histories.timestamp))
                 )
-            ).all()
-
-            for history in histories:
-                file_path = f"{dir_path}/.dm/{entry.shortname}"
-                ensure_directory_exists(file_path)
-
-                _history_one: str = history.model_dump_json()
-                _history: dict = json.loads(_history_one)
-                _history["shortname"] = "history"
-
-                del _history["space_name"]
-                del _history["subpath"]
-                if _history.get("resource_type"):
-                    del _history["resource_type"]
-                with open(f"{file_path}/history.jsonl", "a+") as f:
-                    f.write(json.dumps(_history) + "\n")
-
-            attachments = session.exec(
-                select(Attachments).where(
-                    (Attachments.space_name == query.space_name)
-                    & (Attachments.subpath == f"/{entry.subpath}/{entry.shortname}")
+                for history in history_rows.scalars():
+                    histories.setdefault((history.subpath, history.shortname), []).append(history)
+
+                # Media is read one attachment at a time, below
+                attachment_rows = await session.execute(
+                    select(Attachments)
+                    .options(defer(Attachments.media))  # type: ignore[arg-type]
+                    .where(
+                        (Attachments.space_name == query.space_name)
+                        & col(Attachments.subpath).in_([f"/{e.subpath}/{e.shortname}".replace("//", "/") for e in entries])
+                    )
                 )
-            ).all()
-
-            __attachment = None
-            for attachment in attachments:
-                __attachment = attachment
-                subpath = subpath_checker(attachment.subpath)
-
-                parts = subpath.split("/")
-                parts.insert(-1, ".dm")
-                new_path = "/".join(parts)
-
-                dir_path = f"{space_folder}/{query.space_name}{new_path}"
-                ensure_directory_exists(dir_path)
+                for attachment in attachment_rows.scalars():
+                    attachments.setdefault(attachment.subpath, []).append(attachment)
+
+        for record in records:
+            record_attachments: list[tuple[Attachments, bytes | None]] = []
+            for attachment in attachments.get(f"/{record.subpath}/{record.shortname}".replace("//", "/"), []):
+                media = None
+                payload = attachment.payload if isinstance(attachment.payload, dict) else {}
+                if payload.get("body") is not None and payload.get("content_type") not in ("json", "comment"):
+                    async with adapter.get_session() as session:
+                        media = (
+                            await session.execute(select(Attachments.media).where(col(Attachments.uuid) == attachment.uuid))
+                        ).scalar()
+                record_attachments.append((attachment, media))
+            yield record_members(
+                query.space_name, record, histories.get((record.subpath, record.shortname), []), record_attachments
+            )
 
-                media_path = f"{dir_path}/attachments.{attachment.resource_type}"
-                ensure_directory_exists(media_path)
 
-                attachment_body = None
-                if attachment.payload is not None:
-                    if isinstance(attachment.payload, Payload):
-                        attachment_body = attachment.payload.body
-                    else:
-                        attachment_body = attachment.payload["body"]
-
-                if attachment_body is not None:
-                    if (isinstance(attachment.payload, dict) and attachment.payload.get("content_type") == "json") or (
-                        isinstance(attachment.payload, dict) and attachment.payload.get("content_type") == "comment"
-                    ):
-                        write_json_file(f"{media_path}/{attachment.shortname}.json", attachment_body)
-                        attachment.payload["body"] = f"{attachment.shortname}.json"
-                    else:
-                        if attachment.media:
-                            write_binary_file(f"{media_path}/{attachment_body}", attachment.media)
-
-                    _attachment = attachment.model_dump()
+async def export_data_with_query(query, user_shortname):
+    space_folder = os.path.relpath(str(settings.spaces_folder))  # noqa: ASYNC240
 
-                    del _attachment["media"]
-                    del _attachment["resource_type"]
-                    write_json_file(f"{media_path}/meta.{attachment.shortname}.json", _attachment)
+    async for members in export_query_members(query, user_shortname):
+        for path, content in members:
+            file_path = os.path.join(space_folder, path)
+            ensure_directory_exists(os.path.dirname(file_path))
+            if path.endswith("/history.jsonl"):
+                with open(file_path, "ab") as f:
+                    f.write(content)
             else:
-                with open(f"{dir_meta_path}/meta.{entry.resource_type}.json") as f:
-                    entry_data = json.load(f)
-                    if __attachment is not None and "payload" in entry_data:
-                        entry_data["payload"] = __attachment.payload
+                write_binary_file(file_path, content)
 
     return space_folder
 
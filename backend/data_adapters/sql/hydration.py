@@ -0,0 +1,30 @@
+"""Row to `core` model hydration for the SQL adapter.
+
+Turning an ORM row into its `core` class used to go through
+`model_validate(row.model_dump())`: a full serialization pass followed by a
+full validation pass. `hydrate` validates the row's loaded column values
+directly, which halves the cost of every load. Columns the model doesn't
+declare (space_name, query_policies...) are ignored by the validator.
+
+`model_construct` was measured as well; it fills defaults and sets fields in
+Python and, once the nested models (payload, translations, ACL...) are
+validated, ends up slower than the single pydantic-core pass.
+"""
+
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def row_values(row: Any, exclude: set[str] | frozenset[str] = frozenset()) -> dict[str, Any]:
+    """The loaded columns of an ORM instance (deferred ones are left out) or of a `Row`"""
+    values = row._mapping if isinstance(row, Row) else row.__dict__
+    return {key: value for key, value in values.items() if key != "_sa_instance_state" and key not in exclude}
+
+
+def hydrate(model: type[ModelT], row: Any) -> ModelT:
+    """Build `model` from a database row in a single validation pass"""
+    return model.model_validate(row._mapping if isinstance(row, Row) else row.__dict__)
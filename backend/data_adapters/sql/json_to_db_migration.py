@@ -3,15 +3,26 @@ import hashlib
 import json
 import os
 import sys
+import threading
+import time
+from collections.abc import Callable
 from datetime import datetime
+from enum import Enum
 from pathlib import Path
 from typing import Any
-from uuid import uuid4
+from uuid import UUID, uuid4
+
+import psycopg
+from psycopg.types.json import Jsonb
+from pydantic_core import to_jsonable_python
+from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from data_adapters.sql.adapter import SQLAdapter
 from data_adapters.sql.create_tables import Attachments, Entries, Histories, Permissions, Roles, Spaces, Users, generate_tables
 from models.enums import ContentType, ResourceType
-from utils.query_policies_helper import generate_query_policies
+from utils.query_policies_helper import generate_acl_principals, generate_query_policies
 from utils.settings import settings
 
 
@@ -47,14 +58,17 @@ def subpath_checker(subpath: str):
 
 folders_report: Any = {}
 invalid_entries: Any = []
+_report_lock = threading.Lock()
+
+Emit = Callable[[Any, dict], None]  # table model, row
 
 
 def save_issue(resource_type, entry, e):
     entry_uuid = None
     entry_shortname = None
     if isinstance(entry, dict):
-        entry_uuid = str(entry["uuid"])
-        entry_shortname = entry["shortname"]
+        entry_uuid = str(entry.get("uuid"))
+        entry_shortname = entry.get("shortname")
     else:
         entry_uuid = str(entry.uuid)
         entry_shortname = entry.shortname
@@ -69,13 +83,15 @@ def save_issue(resource_type, entry, e):
 
 
 def save_report(isubpath: str, issue):
-    if folders_report.get(isubpath, False):
-        if folders_report[isubpath].get("invalid_entries", False):
-            folders_report[isubpath]["invalid_entries"] = [*folders_report[isubpath]["invalid_entries"], issue]
+    # Directories are read in parallel threads
+    with _report_lock:
+        if folders_report.get(isubpath, False):
+            if folders_report[isubpath].get("invalid_entries", False):
+                folders_report[isubpath]["invalid_entries"] = [*folders_report[isubpath]["invalid_entries"], issue]
+            else:
+                folders_report[isubpath]["invalid_entries"] = [issue]
         else:
-            folders_report[isubpath]["invalid_entries"] = [issue]
-    else:
-        folders_report[isubpath] = {"invalid_entries": [issue]}
+            folders_report[isubpath] = {"invalid_entries": [issue]}
 
 
 async def bulk_insert_in_batches(model, records, batch_size=2000):
@@ -107,41 +123,30 @@ async def bulk_insert_in_batches(model, records, batch_size=2000):
             print("[!fatal_bulk_insert_in_batches]", e)
 
 
-async def _process_directory(root, dirs, space_name, subpath):
-    # asyncio.run()
-    await process_directory(root, dirs, space_name, subpath)
-
-
-async def process_directory(root, dirs, space_name, subpath):
-    histories = []
-    attachments = []
-    entries = []
-    users = []
-    roles = []
-    permissions = []
-
+def read_directory(root, dirs, space_name, subpath, emit: Emit):
+    """Parse the metas, payloads and histories under `dirs` and `emit` a row for each"""
     for dir in dirs:
         for file in os.listdir(os.path.join(root, dir)):
             if not file.startswith("meta") and file == "history.jsonl":
                 with open(os.path.join(root, dir, file)) as _f:
-                    lines = _f.readlines()
-                for line in lines:
-                    history = None
-                    try:
-                        history = json.loads(line.replace("\n", ""))
-                        history["shortname"] = dir
-                        history["space_name"] = space_name
-                        history["subpath"] = subpath_checker(subpath)
-                        history["timestamp"] = datetime.strptime(history["timestamp"], "%Y-%m-%dT%H:%M:%S.%f")
+                    # Line by line, history files can be large
+                    for line in _f:
+                        history = None
+                        try:
+                            history = json.loads(line.replace("\n", ""))
+                            history["shortname"] = dir
+                            history["space_name"] = space_name
+                            history["subpath"] = subpath_checker(subpath)
+                            history["timestamp"] = datetime.strptime(history["timestamp"], "%Y-%m-%dT%H:%M:%S.%f")
 
-                        histories.append(history)
+                            emit(Histories, history)
 
-                    except Exception as e:
-                        print(f"Error processing Histories {space_name}/{subpath}/{dir}/{history} ... ")
-                        print(e)
+                        except Exception as e:
+                            print(f"Error processing Histories {space_name}/{subpath}/{dir}/{history} ... ")
+                            print(e)
 
             p = os.path.join(root, dir, file)
-            if Path(p).is_file():  # noqa: ASYNC240
+            if Path(p).is_file():
                 if "attachments" in p:
                     if file.startswith("meta") and file.endswith(".json"):
                         with open(os.path.join(root, dir, file)) as _f:
@@ -188,7 +193,7 @@ async def process_directory(root, dirs, space_name, subpath):
                                 _attachment["payload"] = {}
                         try:
                             _attachment["resource_type"] = dir.replace("attachments.", "")
-                            attachments.append(_attachment)
+                            emit(Attachments, _attachment)
                         except Exception as e:
                             print(f"Error processing Attachments {space_name}/{subpath}/{dir}/{file} ... ")
                             print("!!", e)
@@ -219,6 +224,7 @@ async def process_directory(root, dirs, space_name, subpath):
                         entry["payload"] = None
                     entry["subpath"] = subpath_checker(subpath)
                     entry["acl"] = entry.get("acl", [])
+                    entry["acl_principals"] = generate_acl_principals(entry["acl"])
                     entry["relationships"] = entry.get("relationships", [])
                     try:
                         if file.startswith("meta.user"):
@@ -239,7 +245,7 @@ async def process_directory(root, dirs, space_name, subpath):
                             entry["social_avatar_url"] = entry.get("social_avatar_url", "")
                             entry["displayname"] = entry.get("displayname", {})
                             entry["description"] = entry.get("description", {})
-                            users.append(entry)
+                            emit(Users, entry)
                         elif file.startswith("meta.role"):
                             entry["query_policies"] = generate_query_policies(
                                 space_name=space_name,
@@ -251,7 +257,7 @@ async def process_directory(root, dirs, space_name, subpath):
                             )
                             entry["resource_type"] = "role"
                             entry["permissions"] = entry.get("permissions", [])
-                            roles.append(entry)
+                            emit(Roles, entry)
                         elif file.startswith("meta.permission"):
                             entry["query_policies"] = generate_query_policies(
                                 space_name=space_name,
@@ -268,7 +274,7 @@ async def process_directory(root, dirs, space_name, subpath):
                             entry["conditions"] = entry.get("conditions", [])
                             entry["restricted_fields"] = entry.get("restricted_fields", [])
                             entry["allowed_fields_values"] = entry.get("allowed_fields_values", {})
-                            permissions.append(entry)
+                            emit(Permissions, entry)
                         else:
                             entry["resource_type"] = file.replace(".json", "").replace("meta.", "")
 
@@ -294,23 +300,338 @@ async def process_directory(root, dirs, space_name, subpath):
                                 entry["displayname"] = entry.get("displayname", {})
                                 entry["description"] = entry.get("description", {})
                                 entry["subpath"] = subpath_checker(entry["subpath"])
-                                entries.append(entry)
+                                emit(Entries, entry)
                                 continue
                             entry["subpath"] = subpath_checker(entry["subpath"])
 
-                            entries.append(entry)
+                            emit(Entries, entry)
                     except Exception as e:
                         save_report("/", save_issue(entry["resource_type"], entry, e))
 
-    await bulk_insert_in_batches(Users, users)
-    await bulk_insert_in_batches(Roles, roles)
-    await bulk_insert_in_batches(Permissions, permissions)
-    await bulk_insert_in_batches(Entries, entries)
-    await bulk_insert_in_batches(Attachments, attachments)
-    await bulk_insert_in_batches(Histories, histories)
 
+def read_space(root, space_name, emit: Emit):
+    subpath = "/"
+    p = os.path.join(root, ".dm", "meta.space.json")
+    entry = {}
+    if Path(p).is_file():
+        try:
+            with open(p) as _f:
+                entry = json.load(_f)
+            entry["space_name"] = space_name
+            entry["shortname"] = space_name
+            entry["query_policies"] = generate_query_policies(
+                space_name=space_name,
+                subpath=subpath,
+                resource_type=ResourceType.space,
+                is_active=True,
+                owner_shortname=entry.get("owner_shortname", "dmart"),
+                owner_group_shortname=entry.get("owner_group_shortname", None),
+            )
+
+            _payload = entry.get("payload", {})
+            if _payload:
+                if payload := _payload.get("body", None):
+                    if entry.get("payload", {}).get("content_type", None) == "json":
+                        with open(os.path.join(root, ".dm", "../..", str(payload))) as _f:
+                            body = json.load(_f)
+                    else:
+                        body = payload
+                    sha1 = hashlib.sha1()
+                    sha1.update(json.dumps(body).encode())
+                    checksum = sha1.hexdigest()
+                    entry["payload"]["checksum"] = checksum
+                    entry["payload"]["body"] = body
+            else:
+                entry["payload"] = None
+            entry["subpath"] = "/"
+            entry["resource_type"] = "space"
+            entry["tags"] = entry.get("tags", [])
+            entry["acl"] = entry.get("acl", [])
+            entry["acl_principals"] = generate_acl_principals(entry["acl"])
+            entry["hide_folders"] = entry.get("hide_folders", [])
+            entry["relationships"] = entry.get("relationships", [])
+            entry["hide_space"] = entry.get("hide_space", False)
+
+            emit(Spaces, entry)
+        except Exception as e:
+            save_report("/", save_issue(ResourceType.space, entry, e))
+
+
+def _column_default(column) -> Any:
+    """The Python side default SQLAlchemy would have filled in for a missing key"""
+    default = column.default
+    if default is None or default.is_clause_element:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+
+class CopyTable:
+    """How rows of one table are written with `COPY ... FROM STDIN (FORMAT BINARY)`.
+
+    Rows are copied into a temporary staging table, then moved with
+    `INSERT ... SELECT ... ON CONFLICT DO NOTHING` so a duplicate only costs its own row.
+    """
+
+    def __init__(self, model):
+        dialect = postgresql.dialect()
+        self.model = model
+        self.columns: list[str] = []
+        self.staging_types: list[str] = []
+        self.uuid_index = 0
+        self._sa_columns = list(model.__table__.columns)
+        selects = []
+        for column in self._sa_columns:
+            column_type = column.type.compile(dialect=dialect).lower()
+            is_enum = isinstance(column.type, SQLEnum)
+            if column.name == "uuid":
+                self.uuid_index = len(self.columns)
+            self.columns.append(column.name)
+            # Enums are copied as text and cast while moving out of the staging table
+            self.staging_types.append("text" if is_enum else column_type)
+            selects.append(f'"{column.name}"::{column_type}' if is_enum else f'"{column.name}"')
+
+        table = model.__table__.name
+        staging = f"import_{table}"
+        column_list = ", ".join(f'"{name}"' for name in self.columns)
+        self.create_staging = (
+            f'CREATE TEMP TABLE "{staging}" ('
+            + ", ".join(f'"{name}" {staging_type}' for name, staging_type in zip(self.columns, self.staging_types, strict=True))
+            + ") ON COMMIT DROP"
+        )
+        self.copy = f'COPY "{staging}" ({column_list}) FROM STDIN (FORMAT BINARY)'
+        self.insert = (
+            f'INSERT INTO "{table}" ({column_list}) SELECT {", ".join(selects)} FROM "{staging}" '
+            'ON CONFLICT DO NOTHING RETURNING "uuid"'
+        )
+
+    def row(self, entry: dict) -> tuple:
+        """`entry`'s values in `COPY` column order, missing keys get the column defaults as with `bulk_insert_mappings`"""
+        values: list[Any] = []
+        value: Any
+        for column, staging_type in zip(self._sa_columns, self.staging_types, strict=True):
+            if column.name == "uuid":
+                # The model's `default_factory=UUID` can't build one, mint it like the readers do
+                value = entry.get("uuid") or uuid4()
+            else:
+                value = entry[column.name] if column.name in entry else _column_default(column)
+            if value is None:
+                pass
+            elif staging_type == "jsonb":
+                value = Jsonb(to_jsonable_python(value))
+            elif staging_type == "uuid" and not isinstance(value, UUID):
+                value = UUID(str(value))
+            elif staging_type.startswith("timestamp"):
+                if isinstance(value, str):
+                    value = datetime.fromisoformat(value)
+                if value.tzinfo is None:
+                    value = value.astimezone()
+            elif isinstance(column.type, SQLEnum):
+                # SQLAlchemy stores enum members by name
+                if isinstance(value, Enum):
+                    value = value.name
+                elif column.type.enum_class and value in column.type.enum_class._value2member_map_:
+                    value = column.type.enum_class(value).name
+            elif staging_type in ("varchar", "text") and not isinstance(value, str):
+                value = str(value)
+            values.append(value)
+        return tuple(values)
+
+
+ImportRow = tuple[dict, tuple | None]  # entry (or just what reports need), COPY values
+
+
+def report_identity(entry: dict) -> dict:
+    return {key: entry.get(key) for key in ("uuid", "shortname", "subpath", "resource_type")}
+
+
+class ImportProgress:
+    def __init__(self, directories: int, enabled: bool):
+        self.directories = directories
+        self.enabled = enabled
+        self.read_directories = 0
+        self.read_rows = 0
+        self.written_rows = 0
+        self.failed_rows = 0
+        self.started = time.monotonic()
+
+    def failed(self, count: int = 1):
+        self.failed_rows += count
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 0.001)
+        return (
+            f"[json_to_db] directories {self.read_directories}/{self.directories}"
+            f" | rows read {self.read_rows} written {self.written_rows} failed {self.failed_rows}"
+            f" | {self.written_rows / elapsed:.0f} rows/s | {elapsed:.1f}s"
+        )
+
+    async def report(self, interval: float = 1.0):
+        while self.enabled:
+            print(f"\r{self.line()}", end="", flush=True)
+            await asyncio.sleep(interval)
+
+
+async def copy_rows(engine: AsyncEngine, table: CopyTable, rows: list[ImportRow], progress: ImportProgress):
+    """COPY one batch, a batch the database rejects is split in halves until the offending rows are isolated"""
+    try:
+        async with engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            pg: Any = raw_connection.driver_connection
+            try:
+                async with pg.cursor() as cursor:
+                    await cursor.execute(table.create_staging)
+                    async with cursor.copy(table.copy) as copy:
+                        copy.set_types(table.staging_types)
+                        for _, values in rows:
+                            await copy.write_row(values)
+                    await cursor.execute(table.insert)
+                    inserted = {str(row[0]) for row in await cursor.fetchall()}
+                # Committed on the driver connection, the pool's pre-ping may already have opened the transaction
+                await pg.commit()
+            except BaseException:
+                await pg.rollback()
+                raise
+    except (psycopg.DataError, psycopg.IntegrityError, TypeError, ValueError) as e:
+        if len(rows) == 1:
+            entry = rows[0][0]
+            print("[!copy_rows]", e, f"* {entry.get('subpath')}/{entry.get('shortname')}")
+            save_report("/", save_issue(entry.get("resource_type"), entry, e))
+            progress.failed()
+            return
+        middle = len(rows) // 2
+        await copy_rows(engine, table, rows[:middle], progress)
+        await copy_rows(engine, table, rows[middle:], progress)
+        return
+
+    progress.written_rows += len(inserted)
+    for entry, values in rows:
+        if values is not None and str(values[table.uuid_index]) not in inserted:
+            save_report("/", save_issue(entry.get("resource_type"), entry, "Entry already exists"))
+            progress.failed()
+
+
+async def write_table(engine: AsyncEngine, model, queue: asyncio.Queue, batch_size: int, progress: ImportProgress):
+    """Drain `queue` into `model`'s table, one COPY per `batch_size` rows"""
+    table = CopyTable(model) if engine.dialect.driver == "psycopg" else None
+    pending: list[ImportRow] = []
+    done = False
+    while not done or pending:
+        if not done and not pending:
+            chunk = await queue.get()
+            if chunk is None:
+                done = True
+                continue
+            pending.extend(chunk)
+        while not done and len(pending) < batch_size and not queue.empty():
+            chunk = queue.get_nowait()
+            if chunk is None:
+                done = True
+            else:
+                pending.extend(chunk)
+        rows, pending = pending[:batch_size], pending[batch_size:]
 
-async def main(target_path: Path | None = None):
+        try:
+            if table is None:
+                await bulk_insert_in_batches(model, [entry for entry, _ in rows], batch_size)
+                progress.written_rows += len(rows)
+            else:
+                await copy_rows(engine, table, rows, progress)
+        except Exception as e:
+            print("[!write_table]", model.__name__, e)
+            for entry, _ in rows:
+                save_report("/", save_issue(entry.get("resource_type"), entry, e))
+            progress.failed(len(rows))
+
+
+async def import_directories(jobs: list[tuple], workers: int, batch_size: int, show_progress: bool):
+    """Read `jobs` with `workers` parallel readers and stream their rows to one writer per table.
+
+    Readers block once their table's queue is full, so memory stays bounded however large the tree.
+    """
+    engine = SQLAdapter().engine
+    use_copy = engine.dialect.driver == "psycopg"
+    loop = asyncio.get_running_loop()
+    models = (Spaces, Users, Roles, Permissions, Entries, Attachments, Histories)
+    queues: dict[Any, asyncio.Queue] = {model: asyncio.Queue(maxsize=max(2, workers * 2)) for model in models}
+    tables = {model: CopyTable(model) for model in models} if use_copy else {}
+    progress = ImportProgress(len(jobs), show_progress)
+
+    def read_job(job: tuple):
+        pending: dict[Any, list[ImportRow]] = {}
+
+        def flush(model):
+            if pending.get(model):
+                asyncio.run_coroutine_threadsafe(queues[model].put(pending.pop(model)), loop).result()
+
+        def emit(model, entry: dict):
+            progress.read_rows += 1
+            if use_copy:
+                try:
+                    row: ImportRow = (report_identity(entry), tables[model].row(entry))
+                except Exception as e:
+                    save_report("/", save_issue(entry.get("resource_type"), entry, e))
+                    progress.failed()
+                    return
+            else:
+                row = (entry, None)
+            pending.setdefault(model, []).append(row)
+            if len(pending[model]) >= batch_size:
+                flush(model)
+
+        if job[0] == "space":
+            _, root, space_name = job
+            read_space(root, space_name, emit)
+        else:
+            _, root, dirs, space_name, subpath = job
+            read_directory(root, dirs, space_name, subpath, emit)
+        for model in list(pending):
+            flush(model)
+
+    jobs_queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        jobs_queue.put_nowait(job)
+
+    async def reader():
+        while not jobs_queue.empty():
+            job = jobs_queue.get_nowait()
+            try:
+                await asyncio.to_thread(read_job, job)
+            except Exception as e:
+                print("[!import_directories]", job[1], e)
+            progress.read_directories += 1
+
+    writers = [asyncio.create_task(write_table(engine, model, queues[model], batch_size, progress)) for model in models]
+    ticker = asyncio.create_task(progress.report())
+    try:
+        await asyncio.gather(*[reader() for _ in range(max(1, workers))])
+        for model in models:
+            await queues[model].put(None)
+        await asyncio.gather(*writers)
+    finally:
+        ticker.cancel()
+        for writer in writers:
+            writer.cancel()
+    if show_progress:
+        print(f"\r{progress.line()}")
+    return progress
+
+
+def space_and_subpath(root: str) -> tuple[str, str] | None:
+    tmp = root.replace(str(settings.spaces_folder), "")
+    if tmp == "":
+        return None
+    if tmp[0] == "/":
+        tmp = tmp[1:]
+    space_name = tmp.split("/")[0]
+    subpath = "/".join(tmp.split("/")[1:])
+    if space_name == ".." or space_name.startswith(".git"):
+        return None
+    return space_name, subpath
+
+
+async def main(target_path: Path | None = None, workers: int | None = None, show_progress: bool | None = None):
     generate_tables()
 
     if target_path is None:
@@ -332,93 +653,15 @@ async def main(target_path: Path | None = None):
 
     user_dirs.sort(key=lambda x: (not x[0].startswith(os.path.join(str(target_path), "management/users/.dm")), x[0]))
 
-    for root, dirs in user_dirs:
-        tmp = root.replace(str(settings.spaces_folder), "")
-        if tmp == "":
-            continue
-        if tmp[0] == "/":
-            tmp = tmp[1:]
-        space_name = tmp.split("/")[0]
-        subpath = "/".join(tmp.split("/")[1:])
-        if space_name == "..":
-            continue
-
-        if space_name.startswith(".git"):
-            continue
-
-        subpath = subpath.replace(".dm", "")
-        if subpath != "/" and subpath.endswith("/"):
-            subpath = subpath[:-1]
-
-        if subpath == "":
-            subpath = "/"
-
-        await process_directory(root, dirs, space_name, subpath)
-
-    # with ThreadPoolExecutor() as executor:
-    # futures = []
-    for root, dirs in all_dirs:
-        tmp = root.replace(str(settings.spaces_folder), "")
-        if tmp == "":
-            continue
-        if tmp[0] == "/":
-            tmp = tmp[1:]
-        space_name = tmp.split("/")[0]
-        subpath = "/".join(tmp.split("/")[1:])
-        if space_name == "..":
-            continue
-
-        if space_name.startswith(".git"):
+    jobs: list[tuple] = []
+    for root, dirs in [*user_dirs, *all_dirs]:
+        location = space_and_subpath(root)
+        if location is None:
             continue
+        space_name, subpath = location
 
-        print(".", end="")
         if subpath == "" or subpath == "/":
-            subpath = "/"
-            p = os.path.join(root, ".dm", "meta.space.json")
-            entry = {}
-            if Path(p).is_file():  # noqa: ASYNC240
-                try:
-                    with open(p) as _f:
-                        entry = json.load(_f)
-                    entry["space_name"] = space_name
-                    entry["shortname"] = space_name
-                    entry["query_policies"] = generate_query_policies(
-                        space_name=space_name,
-                        subpath=subpath,
-                        resource_type=ResourceType.space,
-                        is_active=True,
-                        owner_shortname=entry.get("owner_shortname", "dmart"),
-                        owner_group_shortname=entry.get("owner_group_shortname", None),
-                    )
-
-                    _payload = entry.get("payload", {})
-                    if _payload:
-                        if payload := _payload.get("body", None):
-                            if entry.get("payload", {}).get("content_type", None) == "json":
-                                with open(os.path.join(root, ".dm", "../..", str(payload))) as _f:
-                                    body = json.load(_f)
-                            else:
-                                body = payload
-                            sha1 = hashlib.sha1()
-                            sha1.update(json.dumps(body).encode())
-                            checksum = sha1.hexdigest()
-                            entry["payload"]["checksum"] = checksum
-                            entry["payload"]["body"] = body
-                    else:
-                        entry["payload"] = None
-                    entry["subpath"] = "/"
-                    entry["resource_type"] = "space"
-                    entry["tags"] = entry.get("tags", [])
-                    entry["acl"] = entry.get("acl", [])
-                    entry["hide_folders"] = entry.get("hide_folders", [])
-                    entry["relationships"] = entry.get("relationships", [])
-                    entry["hide_space"] = entry.get("hide_space", False)
-
-                    async with SQLAdapter().get_session() as session:
-                        session.add(Spaces.model_validate(entry))
-                        await session.commit()
-                except Exception as e:
-                    save_report("/", save_issue(ResourceType.space, entry, e))
+            jobs.append(("space", root, space_name))
             continue
 
         subpath = subpath.replace(".dm", "")
@@ -428,12 +671,14 @@ async def main(target_path: Path | None = None):
         if subpath == "":
             subpath = "/"
 
-        await _process_directory(root, dirs, space_name, subpath)
-        # futures.append(executor.submit(_process_directory, root, dirs, space_name, subpath))
-        # as_completed(futures)
+        jobs.append(("directory", root, dirs, space_name, subpath))
 
-    # for future in as_completed(futures):
-    #     future.result()
+    await import_directories(
+        jobs,
+        workers or settings.import_workers,
+        settings.import_batch_size,
+        sys.stdout.isatty() if show_progress is None else show_progress,
+    )
 
     await save_health_check_entry()
 
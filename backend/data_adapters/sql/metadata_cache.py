@@ -0,0 +1,217 @@
+"""Per-worker read-through cache of space, folder and schema metas.
+
+These are loaded on nearly every request (plugin dispatch, `is_space_exist`,
+folder uniqueness rules, schema validation, CSV column definitions) and
+change rarely. `SQLAdapter.load_or_none` serves them from here; the writes
+that touch them (save, update, move, delete) drop the affected keys and
+publish the invalidation on a Postgres NOTIFY channel so every other worker
+drops them too. Entries also expire after `settings.metadata_cache_ttl` as a
+safety net for changes made outside the API (migrations, scripts).
+
+The same channel carries logouts and user deletions, so every worker drops
+the user's entries from its token cache instead of trusting their verified
+session stamp.
+"""
+
+import asyncio
+import contextlib
+import json
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from fastapi.logger import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import models.core as core
+from utils.schema_validators import schema_validators
+from utils.settings import settings
+from utils.token_cache import token_cache
+
+CHANNEL = "dmart_metadata"
+CACHED_CLASSES = (core.Space, core.Folder, core.Schema)
+
+CacheKey = tuple[str, str, str]  # space_name, subpath, shortname
+
+
+def normalize_subpath(subpath: str) -> str:
+    return f"/{subpath.strip('/')}"
+
+
+class MetadataCache:
+    """Bounded LRU of the cached metas, keyed on their location"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[CacheKey, tuple[float, core.Meta]] = OrderedDict()
+        self.worker_id = uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listener: asyncio.Task | None = None
+
+    @staticmethod
+    def is_cached_class(class_type: type) -> bool:
+        return class_type in CACHED_CLASSES
+
+    @staticmethod
+    def key(space_name: str, subpath: str, shortname: str) -> CacheKey:
+        return space_name, normalize_subpath(subpath), shortname.replace("/", "")
+
+    def get(self, class_type: type, space_name: str, subpath: str, shortname: str) -> core.Meta | None:
+        """A copy of the cached meta, callers are free to modify it"""
+        if self.max_size <= 0:
+            return None
+        key = self.key(space_name, subpath, shortname)
+        cached = self._entries.get(key)
+        if cached is None or cached[0] <= time.monotonic() or type(cached[1]) is not class_type:
+            if cached is not None and cached[0] <= time.monotonic():
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return cached[1].model_copy(deep=True)
+
+    def put(self, space_name: str, subpath: str, shortname: str, meta: core.Meta) -> None:
+        if self.max_size <= 0:
+            return
+        key = self.key(space_name, subpath, shortname)
+        self._entries[key] = (time.monotonic() + self.ttl, meta.model_copy(deep=True))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, space_name: str, subpath: str | None = None, shortname: str | None = None) -> None:
+        """Drop one meta, or everything at and below `subpath` without a shortname, or the whole space without either"""
+        self.invalidations += 1
+        if subpath is not None and shortname is not None:
+            self._entries.pop(self.key(space_name, subpath, shortname), None)
+            return
+        prefix = normalize_subpath(subpath) if subpath is not None else None
+        for key in list(self._entries):
+            if key[0] != space_name:
+                continue
+            if prefix is None or prefix == "/" or key[1] == prefix or key[1].startswith(f"{prefix}/"):
+                del self._entries[key]
+
+    def invalidate_meta(self, space_name: str, subpath: str, meta: core.Meta) -> list[dict]:
+        """Invalidate what a write to `meta` can make stale, returns the scopes to publish to the other workers"""
+        if not isinstance(meta, CACHED_CLASSES):
+            return []
+        if isinstance(meta, core.Space):
+            scopes = [{"space_name": meta.shortname}]
+        elif isinstance(meta, core.Folder):
+            folder_path = f"{normalize_subpath(subpath)}/{meta.shortname}".replace("//", "/")
+            scopes = [
+                {"space_name": space_name, "subpath": subpath, "shortname": meta.shortname},
+                {"space_name": space_name, "subpath": folder_path},
+            ]
+        else:
+            scopes = [{"space_name": space_name, "subpath": subpath, "shortname": meta.shortname}]
+        for scope in scopes:
+            self.invalidate(**scope)
+        return scopes
+
+    async def publish(self, engine: AsyncEngine, scopes: list[dict]) -> None:
+        if self.max_size > 0:
+            await self._notify(engine, scopes)
+
+    async def publish_token_invalidation(self, engine: AsyncEngine, shortname: str) -> None:
+        """Have the other workers drop `shortname`'s cached tokens, after a logout or the user's deletion"""
+        if token_cache.max_size > 0:
+            await self._notify(engine, [{"token_user": shortname}])
+
+    async def _notify(self, engine: AsyncEngine, messages: list[dict]) -> None:
+        if not messages or not settings.database_driver.startswith("postgresql"):
+            return
+        try:
+            async with engine.connect() as conn:
+                for message in messages:
+                    await conn.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": CHANNEL, "payload": json.dumps({"worker": self.worker_id, **message})},
+                    )
+                await conn.commit()
+        except Exception as e:
+            print("[!metadata_cache_publish]", e)
+            logger.error(f"Failed publishing metadata cache invalidation. Error: {e}")
+
+    def _on_notification(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if not isinstance(message, dict) or message.pop("worker", None) == self.worker_id:
+            return
+        if "token_user" in message:
+            token_cache.invalidate_user(message["token_user"])
+            return
+        self.invalidate(message["space_name"], message.get("subpath"), message.get("shortname"))
+        if message.get("shortname") and normalize_subpath(message.get("subpath") or "") == "/schema":
+            # Validators are keyed on the schema body, this only frees the ones compiled from the old body
+            schema_validators.invalidate(message["space_name"], message["shortname"])
+
+    async def _listen(self) -> None:
+        import psycopg
+
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    host=settings.database_host,
+                    port=settings.database_port,
+                    user=settings.database_username,
+                    password=settings.database_password,
+                    dbname=settings.database_name,
+                    autocommit=True,
+                ) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    # Anything published while this worker wasn't listening is lost
+                    self._entries.clear()
+                    token_cache.clear()
+                    delay = 1.0
+                    async for notification in conn.notifies():
+                        self._on_notification(notification.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Metadata cache listener disconnected, retrying in {delay}s. Error: {e}")
+                self._entries.clear()
+                token_cache.clear()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def start_listener(self) -> None:
+        if (
+            self._listener is None
+            and (self.max_size > 0 or token_cache.max_size > 0)
+            and settings.database_driver.startswith("postgresql")
+        ):
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+metadata_cache = MetadataCache(settings.metadata_cache_size, settings.metadata_cache_ttl)
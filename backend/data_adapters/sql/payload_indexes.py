@@ -0,0 +1,236 @@
+"""Expression indexes on `entries` for the payload fields folders declare in `index_attributes`.
+
+Each `payload.body.*` key a folder declares with `"type": "string"` gets a
+partial btree index on the same text extraction the search compiler emits,
+limited to the folder's space and subpath. Exact-match searches on such a key
+compile to a bare equality the index serves. Attributes without a declared
+type, or declared as arrays, numbers, etc., are not indexed: their searches
+need the typed containment/number matches, which a btree on the text
+extraction can't serve. Indexes are built CONCURRENTLY in the background so
+saving a folder never waits for (or blocks writes during) the build.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from dataclasses import dataclass
+
+from fastapi.logger import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from utils.settings import settings
+
+INDEX_PREFIX = "idx_payload_"
+# Declared value types whose exact match is the text equality the index serves
+INDEXED_VALUE_TYPES = ("string",)
+_PATH_PART = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+@dataclass(frozen=True)
+class PayloadIndex:
+    name: str
+    space_name: str
+    subpath: str
+    field: str  # search field form, e.g. "payload.body.status"
+    value_type: str | None = None  # as declared in the folder's index_attributes
+
+    @property
+    def expression(self) -> str:
+        """Exactly the text extraction `set_sql_statement_from_query` builds for `@payload.*` searches"""
+        parts = [f"'{part}'" for part in self.field.removeprefix("payload.").split(".")]
+        if len(parts) > 1:
+            return f"payload::jsonb->{'->'.join(parts[:-1])}->>{parts[-1]}"
+        return f"payload::jsonb->>{parts[0]}"
+
+    @property
+    def predicate(self) -> str:
+        # Same shape as the subpath filter of a non-exact query so the planner can prove it
+        return (
+            f"space_name = {_quote(self.space_name)} AND "
+            f"(subpath = {_quote(self.subpath)} OR subpath ILIKE {_quote(self.subpath + '/%')})"
+        )
+
+    def spec(self) -> str:
+        return json.dumps(
+            {"space_name": self.space_name, "subpath": self.subpath, "field": self.field, "value_type": self.value_type}
+        )
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def index_field_from_key(key: str) -> str | None:
+    """Map an `index_attributes` key to its `payload.body.*` search field, None if it isn't one"""
+    key = key.removeprefix("attributes.")
+    if key.startswith("body."):
+        key = f"payload.{key}"
+    if not key.startswith("payload.body."):
+        return None
+    if not all(_PATH_PART.match(part) for part in key.split(".")):
+        return None
+    return key
+
+
+def index_name(space_name: str, subpath: str, field: str) -> str:
+    digest = hashlib.sha1(f"{space_name}:{subpath}:{field}".encode()).hexdigest()[:24]
+    return f"{INDEX_PREFIX}{digest}"
+
+
+class PayloadIndexRegistry:
+    """Per-worker view of the payload indexes, refreshed from the catalog every
+    `settings.payload_indexes_refresh_interval` seconds"""
+
+    def __init__(self):
+        self._indexes: dict[str, PayloadIndex] = {}
+        self._valid: set[str] = set()
+        self._building: dict[str, PayloadIndex] = {}
+        self._loaded_at = 0.0
+        self._tasks: set[asyncio.Task] = set()
+        # Bumped whenever the set of usable indexes changes, compiled search plans depend on it
+        self.version = 0
+
+    def is_indexed(self, space_name: str, subpath: str, field: str) -> bool:
+        """Whether an exact match on `field` can be the bare equality its ready index serves"""
+        name = index_name(space_name, subpath, field)
+        index = self._indexes.get(name)
+        return name in self._valid and index is not None and index.value_type in INDEXED_VALUE_TYPES
+
+    async def refresh(self, engine: AsyncEngine, force: bool = False) -> None:
+        if not force and time.monotonic() - self._loaded_at < settings.payload_indexes_refresh_interval:
+            return
+        self._loaded_at = time.monotonic()
+        async with engine.connect() as conn:
+            rows = (
+                await conn.execute(
+                    text(
+                        "SELECT c.relname, obj_description(c.oid, 'pg_class'), i.indisvalid "
+                        "FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                        "WHERE c.relname LIKE :prefix"
+                    ),
+                    {"prefix": f"{INDEX_PREFIX}%"},
+                )
+            ).all()
+        indexes: dict[str, PayloadIndex] = {}
+        valid: set[str] = set()
+        for name, spec, is_valid in rows:
+            try:
+                indexes[name] = PayloadIndex(name=name, **json.loads(spec))
+            except (TypeError, ValueError):
+                continue
+            if is_valid:
+                valid.add(name)
+        if valid != self._valid or indexes != self._indexes:
+            self.version += 1
+        self._indexes, self._valid = indexes, valid
+
+    def schedule_sync(self, engine: AsyncEngine, space_name: str, subpath: str, index_attributes: list) -> None:
+        task = asyncio.create_task(self.sync_scope(engine, space_name, subpath, index_attributes))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def schedule_drop(self, engine: AsyncEngine, space_name: str, subpath: str) -> None:
+        task = asyncio.create_task(self.drop_scope(engine, space_name, subpath))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def sync_scope(self, engine: AsyncEngine, space_name: str, subpath: str, index_attributes: list) -> None:
+        """Create the indexes declared for a folder and drop the ones it no longer declares"""
+        try:
+            await self.refresh(engine, force=True)
+            wanted: dict[str, PayloadIndex] = {}
+            for attribute in index_attributes or []:
+                if not isinstance(attribute, dict) or attribute.get("type") not in INDEXED_VALUE_TYPES:
+                    continue
+                key = attribute.get("key")
+                field = index_field_from_key(key) if isinstance(key, str) else None
+                if field:
+                    name = index_name(space_name, subpath, field)
+                    wanted[name] = PayloadIndex(
+                        name=name, space_name=space_name, subpath=subpath, field=field, value_type=attribute["type"]
+                    )
+
+            for name, index in list(self._indexes.items()):
+                if index.space_name == space_name and index.subpath == subpath and name not in wanted:
+                    await self._drop(engine, name)
+
+            for name, index in wanted.items():
+                if name in self._building:
+                    continue
+                if name in self._valid:
+                    if self._indexes.get(name) != index:
+                        # Same field, the declaration changed (e.g. an index from before value types)
+                        await self._describe(engine, index)
+                    continue
+                if name in self._indexes:
+                    # Left invalid by an interrupted concurrent build
+                    await self._drop(engine, name)
+                await self._create(engine, index)
+        except Exception as e:
+            print("[!sync_payload_indexes]", e)
+            logger.error(f"Failed syncing payload indexes of {space_name}:{subpath}. Error: {e}")
+
+    async def drop_scope(self, engine: AsyncEngine, space_name: str, subpath: str) -> None:
+        """Drop the indexes of a folder and of every folder below it"""
+        try:
+            await self.refresh(engine, force=True)
+            for name, index in list(self._indexes.items()):
+                if index.space_name == space_name and (index.subpath == subpath or index.subpath.startswith(f"{subpath}/")):
+                    await self._drop(engine, name)
+        except Exception as e:
+            print("[!drop_payload_indexes]", e)
+            logger.error(f"Failed dropping payload indexes of {space_name}:{subpath}. Error: {e}")
+
+    async def _create(self, engine: AsyncEngine, index: PayloadIndex) -> None:
+        self._building[index.name] = index
+        try:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(
+                    text(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} "
+                        f"ON entries (({index.expression})) WHERE {index.predicate}"
+                    )
+                )
+            await self._describe(engine, index)
+            self._valid.add(index.name)
+            self.version += 1
+        finally:
+            self._building.pop(index.name, None)
+
+    async def _describe(self, engine: AsyncEngine, index: PayloadIndex) -> None:
+        """Record the index's spec as its COMMENT, where every worker's refresh reads it"""
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"COMMENT ON INDEX {index.name} IS {_quote(index.spec())}"))
+        self._indexes[index.name] = index
+        self.version += 1
+
+    async def _drop(self, engine: AsyncEngine, name: str) -> None:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        self._indexes.pop(name, None)
+        if name in self._valid:
+            self._valid.discard(name)
+            self.version += 1
+
+    async def status(self, engine: AsyncEngine, space_name: str) -> list[dict]:
+        await self.refresh(engine, force=True)
+        indexes = {**self._indexes, **self._building}
+        return [
+            {
+                "name": index.name,
+                "subpath": index.subpath,
+                "field": index.field,
+                "status": "building" if name in self._building else ("ready" if name in self._valid else "invalid"),
+            }
+            for name, index in sorted(indexes.items(), key=lambda item: (item[1].subpath, item[1].field))
+            if index.space_name == space_name
+        ]
+
+
+payload_indexes = PayloadIndexRegistry()
@@ -0,0 +1,169 @@
+"""Per-worker cache of compiled search expressions.
+
+Dashboards repeat the same `@field:value` searches over and over, mostly
+the same few shapes with changing values; compiling one walks every field of
+every group and builds a large text clause. A parsed search is split into a
+template, where each plain string/number value and text term is replaced by a
+placeholder of the same kind, and the list of those values. The template is
+compiled once per table, scope and payload index state, recording which bind
+parameter derives from which value; later searches of the same shape only
+rebind their values. Because bind names are positional the SQL text is
+stable, so SQLAlchemy's compiled cache and the driver's prepared statements
+are reused as well.
+
+Values that change the shape of the compiled clause (dates, booleans, `*`
+patterns, ranges) stay part of the template.
+"""
+
+import copy
+import json
+import re
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import TextClause
+
+from data_adapters.sql.adapter_helpers import is_date_time_value
+from utils.settings import settings
+
+_NUMERIC = re.compile(r"^-?\d+(?:\.\d+)?$")
+_NUMERIC_PLACEHOLDER_BASE = 7_340_000_000_000
+
+# How the compiler derives a bind parameter from a search value
+_BINDINGS: dict[str, Callable[[str], Any]] = {
+    "value": lambda value: value,
+    "json_list": lambda value: json.dumps([value]),
+    "json": json.dumps,
+    "like": lambda value: f"%{value}%",
+    "float": float,
+}
+
+
+@dataclass(frozen=True)
+class SearchPlan:
+    where: TextClause | None
+    params: dict[str, Any] = field(default_factory=dict)
+    search_terms: str = ""
+
+
+@dataclass(frozen=True)
+class SearchTemplate:
+    key: str
+    groups: list[dict]  # the parsed search with placeholders in place of its values
+    values: list[str]
+    placeholders: list[str]
+    search_terms: str
+
+
+def _placeholder(value: str, index: int) -> str | None:
+    """A stand-in for `value` the compiler treats the same way, None when the value must stay literal"""
+    if _NUMERIC.match(value):
+        return str(_NUMERIC_PLACEHOLDER_BASE + index)
+    if not value or "*" in value or value.lower() in ("true", "false") or is_date_time_value(value)[0]:
+        return None
+    try:
+        float(value)  # nan, inf, 1e5: numeric to the compiler, not to the parser
+        return None
+    except ValueError:
+        return f"\x00s{index}\x00"
+
+
+def search_template(search_groups: list[dict]) -> SearchTemplate:
+    """Split parsed search groups (see `parse_search_expression`) into a template and its values"""
+    groups = copy.deepcopy(search_groups)
+    values: list[str] = []
+    placeholders: list[str] = []
+
+    def templated(value: str, text_term: bool = False) -> str:
+        placeholder = f"\x00t{len(values)}\x00" if text_term else _placeholder(value, len(values))
+        if placeholder is None:
+            return value
+        values.append(value)
+        placeholders.append(placeholder)
+        return placeholder
+
+    for group in groups:
+        for field_data in group["fields"].values():
+            if not field_data.get("is_range"):
+                field_data["values"] = [templated(value) for value in field_data["values"]]
+        group["text_terms"] = [templated(term, text_term=True) for term in group.get("text_terms", [])]
+    search_terms = " ".join(term for group in search_groups for term in group.get("text_terms", []))
+    return SearchTemplate(json.dumps(groups), groups, values, placeholders, search_terms)
+
+
+@dataclass(frozen=True)
+class TemplatePlan:
+    """A compiled template and, per bind parameter, how it derives from the search values.
+
+    `bindings` is None when a value doesn't end up in a bind parameter the way
+    the template can express, such templates are compiled per search.
+    """
+
+    plan: SearchPlan
+    bindings: dict[str, tuple[str, int]] | None
+
+    @classmethod
+    def from_plan(cls, plan: SearchPlan, template: SearchTemplate) -> "TemplatePlan":
+        forms: dict[Any, tuple[str, int]] = {}
+        for index, placeholder in enumerate(template.placeholders):
+            for form in ("value", "json_list", "json", "like"):
+                forms[_BINDINGS[form](placeholder)] = (form, index)
+            if _NUMERIC.match(placeholder):
+                forms[float(placeholder)] = ("float", index)
+
+        bindings: dict[str, tuple[str, int]] = {}
+        for name, value in plan.params.items():
+            if isinstance(value, (str, float)) and value in forms:
+                bindings[name] = forms[value]
+            elif isinstance(value, str) and any(placeholder in value for placeholder in template.placeholders):
+                return cls(plan, None)
+        sql = plan.where.text if plan.where is not None else ""
+        if any(placeholder in sql for placeholder in template.placeholders):
+            return cls(plan, None)
+        return cls(plan, bindings)
+
+    def bind(self, template: SearchTemplate) -> SearchPlan:
+        params = dict(self.plan.params)
+        for name, (form, index) in (self.bindings or {}).items():
+            params[name] = _BINDINGS[form](template.values[index])
+        return SearchPlan(where=self.plan.where, params=params, search_terms=template.search_terms)
+
+
+class SearchPlanCache:
+    """Bounded LRU of `TemplatePlan`s, and of `SearchPlan`s for searches that can't be templated"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple, SearchPlan | TemplatePlan] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> SearchPlan | TemplatePlan | None:
+        if self.max_size <= 0:
+            return None
+        plan = self._entries.get(key)
+        if plan is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return plan
+
+    def put(self, key: tuple, plan: SearchPlan | TemplatePlan) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = plan
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+search_plans = SearchPlanCache(settings.search_plan_cache_size)
@@ -14,7 +14,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlmodel import col
 
 from data_adapters.sql.create_tables import Entries
-from utils.query_policies_helper import generate_query_policies
+from utils.query_policies_helper import generate_acl_principals, generate_query_policies
 from utils.settings import settings
 
 
@@ -68,14 +68,15 @@ async def update_all_entries(batch_size: int = 1000) -> int:
                     print(f"Error while computing query_policies for {row.space_name}/{row.subpath}/{row.shortname}")
                     print(f"| {e}\n")
                     continue
+                new_principals = generate_acl_principals(row.acl)
 
-                if row.query_policies != new_policies:
+                if row.query_policies != new_policies or row.acl_principals != new_principals:
                     await session.execute(
                         sa_update(Entries)
                         .where(col(Entries.space_name) == row.space_name)
                         .where(col(Entries.subpath) == row.subpath)
                         .where(col(Entries.shortname) == row.shortname)
-                        .values(query_policies=new_policies)
+                        .values(query_policies=new_policies, acl_principals=new_principals)
                     )
                     updated += 1
             try:
@@ -96,7 +97,7 @@ async def amain(batch_size: int) -> None:
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Recompute query_policies for all Entries")
+    parser = argparse.ArgumentParser(description="Recompute query_policies and acl_principals for all Entries")
     parser.add_argument("--batch-size", type=int, default=1000, help="Batch size for processing entries")
     args = parser.parse_args()
     asyncio.run(amain(args.batch_size))
@@ -1,7 +1,9 @@
 import argparse
 import asyncio
+import random
+from collections.abc import Iterator
 from pathlib import Path
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 from jsf import JSF  # type: ignore
 
@@ -10,29 +12,54 @@ from models.core import Content, Payload
 from models.enums import ContentType
 
 
-async def main(space: str, subpath: str, schema_path: str, num: int):
+def fake_payloads(schema_path: str, num: int, seed: int | None = None) -> Iterator[dict]:
+    """`num` payload bodies following the schema, the same ones on every run when `seed` is given"""
+    faker = JSF.from_json(Path(schema_path))  # type: ignore
+    if seed is not None:
+        from faker import Faker
 
-    if not Path(schema_path).is_file():  # noqa: ASYNC240
-        print("Invalid schema file path")
+        random.seed(seed)
+        Faker.seed(seed)
+    for _ in range(num):
+        yield faker.generate()
 
-    faker = JSF.from_json(Path(schema_path))  # type: ignore
-    for _ in range(0, num):
-        payload = faker.generate()
-        uuid = uuid4()
+
+def fake_contents(
+    schema_path: str,
+    num: int,
+    seed: int | None = None,
+    owner_shortname: str = "generator_script",
+    schema_shortname: str | None = None,
+) -> Iterator[tuple[Content, dict]]:
+    """Content metas with their generated payload bodies"""
+    if schema_shortname is None:
+        schema_shortname = schema_path.split("/")[-1].split(".")[0]
+    rng = random.Random(seed)
+    for payload in fake_payloads(schema_path, num, seed):
+        uuid = uuid4() if seed is None else UUID(int=rng.getrandbits(128), version=4)
         shortname = str(uuid)[:8]
         meta = Content(
             uuid=uuid,
             shortname=shortname,
             is_active=True,
-            owner_shortname="generator_script",
+            owner_shortname=owner_shortname,
             payload=Payload(
                 content_type=ContentType.json,
-                schema_shortname=schema_path.split("/")[-1].split(".")[0],
+                schema_shortname=schema_shortname,
                 body=f"{shortname}.json",
             ),
         )
+        yield meta, payload
+
+
+async def main(space: str, subpath: str, schema_path: str, num: int):
+
+    if not Path(schema_path).is_file():  # noqa: ASYNC240
+        print("Invalid schema file path")
+
+    for meta, payload in fake_contents(schema_path, num):
         await db.internal_save_model(space_name=space, subpath=subpath, meta=meta, payload=payload)
-        print(f"Generated new doc with shortname: {shortname}")
+        print(f"Generated new doc with shortname: {meta.shortname}")
 
     print("====================================================")
     print(f"The generator script is finished, {num} of records generated")
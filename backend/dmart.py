@@ -792,24 +792,30 @@ def main():
                 output_file += ".zip"
 
             async def run_export():
+                output_zip = os.path.abspath(output_file)  # noqa: ASYNC240
+                if args.space_name:
+                    from data_adapters.sql.db_to_json_migration import export_query_members
+                    from models.api import Query, QueryType
+                    from models.enums import ArchiveFormat
+                    from utils.archive_stream import stream_archive
+
+                    query = Query(type=QueryType.search, space_name=args.space_name, subpath="/", limit=-1)
+                    with open(output_zip, "wb") as zip_file:
+                        async for chunk in stream_archive(export_query_members(query, "dmart"), ArchiveFormat.zip):
+                            zip_file.write(chunk)
+                    print(f"Data exported successfully to {output_zip}")
+                    return
+
                 with tempfile.TemporaryDirectory() as temp_dir:
                     original_spaces_folder = settings.spaces_folder
                     settings.spaces_folder = Path(temp_dir)
 
                     try:
-                        if args.space_name:
-                            from data_adapters.sql.db_to_json_migration import export_data_with_query
-                            from models.api import Query, QueryType
-
-                            query = Query(type=QueryType.search, space_name=args.space_name, subpath="/", limit=-1)
-                            await export_data_with_query(query, "dmart")
-                        else:
-                            from data_adapters.sql.db_to_json_migration import main as db_to_json_main
+                        from data_adapters.sql.db_to_json_migration import main as db_to_json_main
 
-                            db_to_json_main()
+                        db_to_json_main()
 
                         # Zip the contents
-                        output_zip = os.path.abspath(output_file)  # noqa: ASYNC240
                         with zipfile.ZipFile(output_zip, "w", zipfile.ZIP_DEFLATED) as zip_file:
                             for root, _, files in os.walk(temp_dir):
                                 for file in files:
@@ -4,6 +4,7 @@
 import asyncio
 import json
 import os
+import random
 import socket
 import sys
 import time
@@ -25,7 +26,6 @@ from hypercorn.asyncio import serve
 from hypercorn.config import Config
 from jsonschema.exceptions import ValidationError as SchemaValidationError
 from pydantic import ValidationError
-from starlette.concurrency import iterate_in_threadpool
 from starlette.datastructures import UploadFile
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.gzip import GZipMiddleware
@@ -39,12 +39,14 @@ from api.public.router import router as public
 from api.qr.router import router as qr
 from api.user.router import router as user
 from data_adapters.adapter import data_adapter as db
+from data_adapters.sql.metadata_cache import metadata_cache
 from languages.loader import load_langs
 from utils.internal_error_code import InternalErrorCode
 from utils.jwt import decode_jwt
-from utils.logger import logging_schema
+from utils.logger import logging_schema, mask_sensitive_data_string
 from utils.middleware import ChannelMiddleware, CustomRequestMiddleware
 from utils.plugin_manager import plugin_manager
+from utils.realtime_events import close_publishers
 from utils.settings import settings
 
 
@@ -76,11 +78,14 @@ async def lifespan(app: FastAPI):
     app.openapi_schema = openapi_schema
 
     await db.initialize_spaces()
+    metadata_cache.start_listener()
     # await plugin_manager.load_plugins(app, capture_body)
     yield
 
     logger.info("Application shutting down")
     print('{"stage":"shutting down"}')
+    await metadata_cache.stop_listener()
+    await close_publishers()
     if hasattr(db, "engine"):
         await db.engine.dispose()  # type: ignore[attr-defined]
 
@@ -277,6 +282,44 @@ def set_logging(response, extra, request, exception_data):
             logger.info("Served request", extra=_extra)
 
 
+def logged_response_body(head: bytes, size: int) -> dict:
+    """The response body as logged: parsed when `head` is all of it, else a masked excerpt"""
+    if not head:
+        return {}
+    if len(head) == size:
+        try:
+            body = json.loads(head)
+        except Exception:
+            return {}
+        return body if isinstance(body, dict) else {}
+    return {"truncated": True, "size": size, "head": mask_sensitive_data_string(head.decode("utf-8", "replace"))}
+
+
+async def tee_logged_body(body_iterator, request, response, start_time, user_shortname, exception_data):
+    """Stream the response unchanged while keeping its first `log_response_body_max_kb` KBs for the log.
+
+    A `log_response_body_sample_rate` share of the requests keeps the whole body.
+    """
+    limit = settings.log_response_body_max_kb * 1024
+    if settings.log_response_body_sample_rate and random.random() < settings.log_response_body_sample_rate:
+        limit = sys.maxsize
+    head = bytearray()
+    size = 0
+    try:
+        async for chunk in body_iterator:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(response.charset)
+            size += len(chunk)
+            if len(head) < limit:
+                head += chunk[: limit - len(head)]
+            yield chunk
+    finally:
+        extra = set_middleware_extra(
+            request, response, start_time, user_shortname, exception_data, logged_response_body(bytes(head), size)
+        )
+        set_logging(response, extra, request, exception_data)
+
+
 def set_stack(e):
     return [
         {
@@ -305,16 +348,6 @@ async def middle(request: Request, call_next):
 
     try:
         response = await asyncio.wait_for(call_next(request), timeout=settings.request_timeout)
-        content_type = response.headers.get("content-type", "")
-        if "application/json" in content_type:
-            raw_response = [section async for section in response.body_iterator]
-            response.body_iterator = iterate_in_threadpool(iter(raw_response))
-            raw_data = b"".join(raw_response)
-            if raw_data:
-                try:
-                    response_body = json.loads(raw_data)
-                except Exception:
-                    response_body = {}
     except TimeoutError:
         response_body = {"status": "failed", "error": {"code": 504, "message": "Request processing time excedeed limit"}}
         response = JSONResponse(content=response_body, status_code=status.HTTP_504_GATEWAY_TIMEOUT)
@@ -392,9 +425,13 @@ async def middle(request: Request, call_next):
         except Exception:
             user_shortname = "guest"
 
-    extra = set_middleware_extra(request, response, start_time, user_shortname, exception_data, response_body)
-
-    set_logging(response, extra, request, exception_data)
+    body_iterator = getattr(response, "body_iterator", None)
+    if body_iterator is not None and "application/json" in response.headers.get("content-type", ""):
+        # Logged once the body has been streamed to the client
+        response.body_iterator = tee_logged_body(body_iterator, request, response, start_time, user_shortname, exception_data)
+    else:
+        extra = set_middleware_extra(request, response, start_time, user_shortname, exception_data, response_body)
+        set_logging(response, extra, request, exception_data)
 
     if settings.hide_stack_trace and (
         response_body
@@ -3,7 +3,7 @@ from builtins import Exception as PyException
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, ValidationInfo, field_validator
 
 import models.core as core
 import utils.regex as regex
@@ -136,14 +136,23 @@ class Query(BaseModel):
     retrieve_json_payload: bool = False
     retrieve_attachments: bool = False
     retrieve_total: bool = True
+    estimate_total: bool = False
     validate_schema: bool = True
     retrieve_lock_status: bool = False
     jq_filter: str | None = Field(default=None, max_length=1024)
     limit: int = 10
     offset: int = 0
+    cursor: str | None = Field(default=None, max_length=2048)
     aggregation_data: RedisAggregate | None = None
     join: list[JoinQuery] | None = None
 
+    # Set by the data adapter when the page can be continued from a keyset cursor
+    _next_cursor: str | None = PrivateAttr(default=None)
+
+    @property
+    def next_cursor(self) -> str | None:
+        return self._next_cursor
+
     @field_validator("sort_by")
     @classmethod
     def validate_sort_by(cls, v: str | None) -> str | None:
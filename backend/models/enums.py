@@ -268,3 +268,10 @@ class ReactionType(StrEnum):
     care = "care"
     laughing = "laughing"
     sad = "sad"
+
+
+class ArchiveFormat(StrEnum):
+    zip = "zip"
+    tar = "tar"
+    tar_gz = "tar.gz"
+    tar_zst = "tar.zst"
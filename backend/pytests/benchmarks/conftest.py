@@ -0,0 +1,74 @@
+"""Fixtures of the benchmark suite, only active with `pytest --benchmark`."""
+
+import platform
+from pathlib import Path
+
+import pytest
+
+import models.api as api
+from data_adapters.adapter import data_adapter as db
+from models.enums import QueryType
+from pytests.benchmarks.dataset import (
+    BENCHMARK_SPACE,
+    PRODUCTS_SUBPATH,
+    BenchmarkDataset,
+    database_reachable,
+    products_total,
+    seed,
+)
+from pytests.benchmarks.harness import BenchmarkRecorder, load_baselines
+from utils.jwt import sign_jwt
+from utils.settings import settings
+
+
+@pytest.fixture(scope="session")
+async def dataset(request) -> BenchmarkDataset:
+    if not request.config.getoption("--benchmark"):
+        pytest.skip("benchmarks only run with --benchmark")
+    if not await database_reachable():
+        pytest.skip("the configured database is not reachable")
+
+    user_shortname = request.config.getoption("--benchmark-user")
+    records = request.config.getoption("--benchmark-records")
+    if await db.fetch_space(BENCHMARK_SPACE) is None or await products_total(user_shortname) == 0:
+        await seed(user_shortname, records)
+
+    token = await sign_jwt({"shortname": user_shortname, "type": "web"}, settings.jwt_access_expires)
+    seeded = BenchmarkDataset(user_shortname, await products_total(user_shortname), token)
+    _, sample = await db.query(
+        api.Query(type=QueryType.subpath, space_name=BENCHMARK_SPACE, subpath=PRODUCTS_SUBPATH, exact_subpath=True, limit=50),
+        user_shortname,
+    )
+    seeded.shortnames = [record.shortname for record in sample]
+    return seeded
+
+
+@pytest.fixture(scope="session")
+def recorder(request, dataset: BenchmarkDataset):
+    baselines_path = Path(request.config.getoption("--benchmark-baselines"))
+    recorder = BenchmarkRecorder(
+        load_baselines(baselines_path),
+        {
+            "records": dataset.records,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "database_driver": settings.database_driver,
+        },
+    )
+    yield recorder
+    recorder.write_report(Path(request.config.getoption("--benchmark-json")))
+    if request.config.getoption("--benchmark-update"):
+        recorder.write_baselines(baselines_path)
+
+
+@pytest.fixture
+def check_regression(request, recorder: BenchmarkRecorder):
+    """Fail the benchmark if it got slower than its baseline"""
+
+    def check(name: str) -> None:
+        if request.config.getoption("--benchmark-update"):
+            return
+        regression = recorder.regression(name)
+        assert regression is None, regression
+
+    return check
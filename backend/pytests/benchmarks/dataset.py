@@ -0,0 +1,92 @@
+"""The dataset the benchmarks run on.
+
+A `benchmark` space seeded in the configured database with contents generated
+from `product_schema.json`; the space is kept so later runs time the same data.
+"""
+
+from pathlib import Path
+
+from sqlalchemy import text
+
+import models.api as api
+import models.core as core
+from data_adapters.adapter import data_adapter as db
+from models.enums import QueryType
+
+BENCHMARK_SPACE = "benchmark"
+PRODUCTS_SUBPATH = "/products"
+CATEGORIES_SUBPATH = "/categories"
+CREATED_SUBPATH = "/created"
+CATEGORIES = 10
+TAGS = 7
+SEED = 1234
+SEED_BATCH = 500
+SCHEMA_PATH = Path(__file__).parent / "product_schema.json"
+
+
+class BenchmarkDataset:
+    def __init__(self, user_shortname: str, records: int, token: str):
+        self.user_shortname = user_shortname
+        self.records = records
+        self.token = token
+        self.space_name = BENCHMARK_SPACE
+        self.shortnames: list[str] = []
+
+
+async def database_reachable() -> bool:
+    try:
+        async with db.get_session() as session:
+            await session.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+async def products_total(user_shortname: str) -> int:
+    total, _ = await db.query(
+        api.Query(type=QueryType.subpath, space_name=BENCHMARK_SPACE, subpath=PRODUCTS_SUBPATH, exact_subpath=True, limit=1),
+        user_shortname,
+    )
+    return total
+
+
+async def seed(user_shortname: str, records: int) -> None:
+    from data_generator import fake_contents
+
+    if await db.fetch_space(BENCHMARK_SPACE) is None:
+        await db.save(
+            BENCHMARK_SPACE, "/", core.Space(shortname=BENCHMARK_SPACE, owner_shortname=user_shortname, is_active=True)
+        )
+        await db.initialize_spaces()
+    for subpath in (PRODUCTS_SUBPATH, CATEGORIES_SUBPATH, CREATED_SUBPATH):
+        shortname = subpath.strip("/")
+        if await db.load_or_none(BENCHMARK_SPACE, "/", shortname, core.Folder) is None:
+            await db.save(
+                BENCHMARK_SPACE, "/", core.Folder(shortname=shortname, owner_shortname=user_shortname, is_active=True)
+            )
+
+    categories: list[tuple[str, core.Meta]] = [
+        (
+            CATEGORIES_SUBPATH,
+            core.Content(
+                shortname=f"category_{index}",
+                owner_shortname=user_shortname,
+                is_active=True,
+                payload=core.Payload(content_type="json", body={"name": f"Category {index}"}),
+            ),
+        )
+        for index in range(CATEGORIES)
+    ]
+    await db.save_many(BENCHMARK_SPACE, categories)
+
+    batch: list[tuple[str, core.Meta]] = []
+    for index, (meta, body) in enumerate(fake_contents(str(SCHEMA_PATH), records, SEED, user_shortname)):
+        meta.tags = [f"tag_{index % TAGS}"]
+        body["category"] = f"category_{index % CATEGORIES}"
+        meta.payload = core.Payload(content_type="json", body=body)
+        batch.append((PRODUCTS_SUBPATH, meta))
+        if len(batch) == SEED_BATCH:
+            await db.save_many(BENCHMARK_SPACE, batch)
+            batch = []
+    if batch:
+        await db.save_many(BENCHMARK_SPACE, batch)
@@ -0,0 +1,97 @@
+"""Timing and baseline bookkeeping of the benchmark suite.
+
+Every benchmark is timed over a number of rounds after a warm up call. The
+stats of the run are written as JSON, and a benchmark whose median is slower
+than its baseline by more than the tolerance fails.
+"""
+
+import json
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+DEFAULT_TOLERANCE = 0.25
+
+
+def timing_stats(durations: list[float]) -> dict[str, float]:
+    """Stats in milliseconds of the durations (seconds) of one benchmark"""
+    ms = sorted(duration * 1000 for duration in durations)
+    return {
+        "rounds": len(ms),
+        "min_ms": round(ms[0], 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "max_ms": round(ms[-1], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+    }
+
+
+def load_baselines(path: Path) -> dict[str, Any]:
+    if not path.is_file():
+        return {"tolerance": DEFAULT_TOLERANCE, "benchmarks": {}}
+    with open(path) as file:
+        baselines = json.load(file)
+    baselines.setdefault("tolerance", DEFAULT_TOLERANCE)
+    baselines.setdefault("benchmarks", {})
+    return baselines
+
+
+class BenchmarkRecorder:
+    def __init__(self, baselines: dict[str, Any], context: dict[str, Any] | None = None):
+        self.baselines = baselines
+        self.context = context or {}
+        self.results: dict[str, dict[str, float]] = {}
+
+    async def measure(self, name: str, call: Callable[[], Awaitable[Any]], rounds: int = 20, warmup: int = 1) -> dict:
+        """Time `rounds` awaits of `call()`, returns and records their stats"""
+        for _ in range(warmup):
+            await call()
+        durations = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await call()
+            durations.append(time.perf_counter() - started)
+        self.results[name] = timing_stats(durations)
+        return self.results[name]
+
+    def regression(self, name: str) -> str | None:
+        """Why `name` regressed against its baseline, None when it didn't or has no baseline"""
+        baseline = self.baselines["benchmarks"].get(name)
+        if not baseline:
+            return None
+        limit = baseline["median_ms"] * (1 + self.baselines["tolerance"])
+        median = self.results[name]["median_ms"]
+        if median <= limit:
+            return None
+        return f"{name}: median {median}ms is over {limit:.3f}ms (baseline {baseline['median_ms']}ms)"
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "context": self.context,
+            "tolerance": self.baselines["tolerance"],
+            "benchmarks": {
+                name: {**stats, "baseline_median_ms": self.baselines["benchmarks"].get(name, {}).get("median_ms")}
+                for name, stats in self.results.items()
+            },
+        }
+
+    def write_report(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def write_baselines(self, path: Path) -> None:
+        """Make this run's medians the new baselines, benchmarks that didn't run keep theirs"""
+        benchmarks = dict(self.baselines["benchmarks"])
+        for name, stats in self.results.items():
+            benchmarks[name] = {"median_ms": stats["median_ms"], "p95_ms": stats["p95_ms"]}
+        with open(path, "w") as file:
+            json.dump(
+                {"context": self.context, "tolerance": self.baselines["tolerance"], "benchmarks": benchmarks},
+                file,
+                indent=2,
+                sort_keys=True,
+            )
+            file.write("\n")
@@ -0,0 +1,53 @@
+"""Tests for pytests/benchmarks/harness.py — stats, baselines and regressions."""
+
+import json
+
+import pytest
+
+from pytests.benchmarks.harness import BenchmarkRecorder, load_baselines, timing_stats
+
+
+def test_timing_stats():
+    stats = timing_stats([0.004, 0.001, 0.002, 0.003])
+    assert stats["rounds"] == 4
+    assert stats["min_ms"] == 1.0
+    assert stats["median_ms"] == 2.5
+    assert stats["max_ms"] == 4.0
+
+
+def test_load_baselines_defaults(tmp_path):
+    assert load_baselines(tmp_path / "missing.json") == {"tolerance": 0.25, "benchmarks": {}}
+
+
+@pytest.mark.anyio
+async def test_regression_against_baseline(tmp_path):
+    async def noop():
+        return None
+
+    recorder = BenchmarkRecorder({"tolerance": 0.5, "benchmarks": {"fast": {"median_ms": 10.0}}})
+    await recorder.measure("fast", noop, rounds=3)
+    await recorder.measure("new", noop, rounds=3)
+    assert recorder.regression("fast") is None
+    assert recorder.regression("new") is None
+
+    recorder.results["fast"]["median_ms"] = 15.1
+    assert recorder.regression("fast") == "fast: median 15.1ms is over 15.000ms (baseline 10.0ms)"
+
+    recorder.write_report(tmp_path / "results.json")
+    report = json.loads((tmp_path / "results.json").read_text())
+    assert report["benchmarks"]["fast"]["baseline_median_ms"] == 10.0
+    assert report["benchmarks"]["new"]["baseline_median_ms"] is None
+
+
+@pytest.mark.anyio
+async def test_write_baselines_keeps_the_others(tmp_path):
+    async def noop():
+        return None
+
+    path = tmp_path / "baselines.json"
+    recorder = BenchmarkRecorder({"tolerance": 0.25, "benchmarks": {"old": {"median_ms": 1.0, "p95_ms": 2.0}}}, {"records": 10})
+    await recorder.measure("new", noop, rounds=2)
+    recorder.write_baselines(path)
+    baselines = load_baselines(path)
+    assert set(baselines["benchmarks"]) == {"old", "new"}
+    assert baselines["context"] == {"records": 10}
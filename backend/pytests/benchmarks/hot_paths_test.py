@@ -0,0 +1,143 @@
+"""Benchmarks of the data adapter, access control and API hot paths, see conftest.py."""
+
+from itertools import count
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+import models.api as api
+import models.core as core
+from api.managed.utils import serve_request_create
+from data_adapters.adapter import data_adapter as db
+from models.enums import QueryType, RequestType, ResourceType
+from pytests.benchmarks.dataset import CATEGORIES_SUBPATH, CREATED_SUBPATH, PRODUCTS_SUBPATH, BenchmarkDataset
+from utils.access_control import access_control
+
+ROUNDS = 20
+CREATE_BATCH = 50
+
+
+def _query(dataset: BenchmarkDataset, **kwargs) -> api.Query:
+    return api.Query(space_name=dataset.space_name, subpath=PRODUCTS_SUBPATH, limit=100, **kwargs)
+
+
+QUERIES = {
+    "query_subpath": {"type": QueryType.subpath, "exact_subpath": True},
+    "query_search": {"type": QueryType.search, "search": "@payload.body.color:red"},
+    "query_sorted_page": {"type": QueryType.search, "search": "", "sort_by": "payload.body.price", "offset": 200},
+    "query_tags": {"type": QueryType.search, "search": "", "filter_tags": ["tag_3"]},
+    "query_aggregation": {
+        "type": QueryType.aggregation,
+        "search": "",
+        "aggregation_data": api.RedisAggregate(
+            load=["@is_active"],
+            group_by=["@is_active"],
+            reducers=[api.RedisReducer(reducer_name="r_count", alias="total")],
+        ),
+    },
+}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", list(QUERIES))
+async def test_query(name, dataset, recorder, check_regression):
+    query = _query(dataset, **QUERIES[name])
+    await recorder.measure(name, lambda: db.query(query.model_copy(deep=True), dataset.user_shortname), ROUNDS)
+    check_regression(name)
+
+
+@pytest.mark.anyio
+async def test_query_join(dataset, recorder, check_regression):
+    query = _query(
+        dataset,
+        type=QueryType.subpath,
+        exact_subpath=True,
+        join=[
+            api.JoinQuery(
+                join_on="payload.body.category:shortname",
+                alias="category",
+                query={"type": "subpath", "space_name": dataset.space_name, "subpath": CATEGORIES_SUBPATH},
+            )
+        ],
+    )
+    await recorder.measure("query_join", lambda: db.query(query.model_copy(deep=True), dataset.user_shortname), ROUNDS)
+    check_regression("query_join")
+
+
+@pytest.mark.anyio
+async def test_load_or_none(dataset, recorder, check_regression):
+    shortnames = iter(dataset.shortnames * ROUNDS)
+
+    async def load():
+        assert await db.load_or_none(dataset.space_name, PRODUCTS_SUBPATH, next(shortnames), core.Content) is not None
+
+    await recorder.measure("load_or_none", load, ROUNDS * 5)
+    check_regression("load_or_none")
+
+
+@pytest.mark.anyio
+async def test_check_access(dataset, recorder, check_regression):
+    async def check():
+        await access_control.check_access(
+            user_shortname=dataset.user_shortname,
+            space_name=dataset.space_name,
+            subpath=PRODUCTS_SUBPATH,
+            resource_type=ResourceType.content,
+            action_type=core.ActionType.view,
+            resource_is_active=True,
+            resource_owner_shortname=dataset.user_shortname,
+            entry_shortname=dataset.shortnames[0],
+        )
+
+    await recorder.measure("check_access", check, ROUNDS * 5)
+    check_regression("check_access")
+
+
+@pytest.mark.anyio
+async def test_generate_user_permissions(dataset, recorder, check_regression):
+    await recorder.measure("generate_user_permissions", lambda: db.generate_user_permissions(dataset.user_shortname), ROUNDS)
+    check_regression("generate_user_permissions")
+
+
+@pytest.mark.anyio
+async def test_serve_request_create_bulk(dataset, recorder, check_regression):
+    created: list[tuple[str, core.Meta]] = []
+    batches = count()
+
+    async def create():
+        records = [
+            core.Record(
+                resource_type=ResourceType.content,
+                subpath=CREATED_SUBPATH,
+                shortname=f"b{next(batches)}_{uuid4().hex[:8]}",
+                attributes={
+                    "is_active": True,
+                    "payload": {"content_type": "json", "body": {"name": "created", "price": 1}},
+                },
+            )
+            for _ in range(CREATE_BATCH)
+        ]
+        request = api.Request(space_name=dataset.space_name, request_type=RequestType.create, records=records)
+        await serve_request_create(request, dataset.user_shortname, dataset.token)
+        created.extend((CREATED_SUBPATH, core.Content.from_record(record, dataset.user_shortname)) for record in records)
+
+    try:
+        await recorder.measure("serve_request_create_bulk", create, ROUNDS // 2)
+    finally:
+        for start in range(0, len(created), 500):
+            await db.delete_many(dataset.space_name, created[start : start + 500])
+    check_regression("serve_request_create_bulk")
+
+
+@pytest.mark.anyio
+async def test_managed_csv(client: AsyncClient, dataset, recorder, check_regression):
+    query = {"type": "subpath", "space_name": dataset.space_name, "subpath": PRODUCTS_SUBPATH, "limit": 1000}
+    headers = {"Authorization": f"Bearer {dataset.token}"}
+
+    async def export():
+        response = await client.post("/managed/csv", json=query, headers=headers)
+        assert response.status_code == 200
+
+    await recorder.measure("managed_csv", export, ROUNDS // 2)
+    check_regression("managed_csv")
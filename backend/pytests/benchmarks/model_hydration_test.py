@@ -0,0 +1,54 @@
+"""Benchmark of row to core model hydration against the dump/validate round trip, see conftest.py."""
+
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+import models.core as core
+from data_adapters.sql.create_tables import Entries
+from data_adapters.sql.hydration import hydrate
+
+ROUNDS = 2000
+
+
+def _entry() -> Entries:
+    return Entries(
+        uuid=uuid4(),
+        shortname="e1",
+        space_name="data",
+        subpath="/products",
+        resource_type="content",
+        owner_shortname="dmart",
+        is_active=True,
+        tags=["a", "b"],
+        displayname={"en": "Entry", "ar": "مدخل"},
+        created_at=datetime(2026, 1, 1),
+        updated_at=datetime(2026, 1, 2),
+        payload={
+            "content_type": "json",
+            "schema_shortname": "product",
+            "checksum": "abc",
+            "body": {"name": "x", "price": 10, "variants": [{"sku": i} for i in range(20)]},
+        },
+        acl=[{"user_shortname": "alice", "allowed_actions": ["view", "query"]}],
+        relationships=[],
+        query_policies=["data:products:content:true:dmart"],
+    )
+
+
+@pytest.mark.anyio
+async def test_hydrate(recorder, check_regression):
+    row = _entry()
+
+    async def round_trip():
+        core.Content.model_validate(row.model_dump())
+
+    async def hydrated():
+        hydrate(core.Content, row)
+
+    await recorder.measure("hydrate_round_trip", round_trip, ROUNDS)
+    await recorder.measure("hydrate", hydrated, ROUNDS)
+    check_regression("hydrate_round_trip")
+    check_regression("hydrate")
+    assert recorder.results["hydrate"]["median_ms"] < recorder.results["hydrate_round_trip"]["median_ms"]
@@ -0,0 +1,153 @@
+"""Tests for the batched write helpers of the SQL adapter — uniqueness probes, bulk deletability and streamed reads."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import models.api as api
+import models.core as core
+from data_adapters.adapter import data_adapter as db
+from data_adapters.sql.adapter import SQLAdapter
+from data_adapters.sql.adapter_helpers import search_value_type, unique_field_values
+from models.enums import ResourceType
+from utils.internal_error_code import InternalErrorCode
+
+
+def _record(shortname: str, email: str | None, sku: str | None = None) -> core.Record:
+    attributes: dict = {"email": email, "payload": {"content_type": "json", "body": {"sku": sku}}}
+    return core.Record(resource_type=ResourceType.content, subpath="/products", shortname=shortname, attributes=attributes)
+
+
+def _folder() -> core.Folder:
+    return core.Folder(
+        shortname="products",
+        owner_shortname="dmart",
+        payload=core.Payload(content_type="json", body={"unique_fields": [["email"], ["payload.body.sku"]]}),
+    )
+
+
+def test_unique_field_values():
+    assert unique_field_values(_record("a", "a@x.com", "S1"), ["email", "payload.body.sku"]) == {
+        "email": "a@x.com",
+        "payload.body.sku": "S1",
+    }
+    assert unique_field_values(_record("a", None, ""), ["email", "payload.body.sku"]) == {}
+    assert unique_field_values(_record("a", "a b"), ["email"]) is None
+    assert unique_field_values(_record("a", "a|b"), ["email"]) is None
+    assert unique_field_values(_record("a", ">5"), ["email"]) is None
+
+
+def test_search_value_type():
+    assert search_value_type("12") == "numeric"
+    assert search_value_type("-1.5") == "numeric"
+    assert search_value_type("True") == "boolean"
+    assert search_value_type("2025-04-28") == "datetime"
+    assert search_value_type("abc") == "string"
+
+
+@pytest.mark.anyio
+async def test_validate_uniqueness_many_probes_once_per_compound():
+    records = [_record("a", "a@x.com", "S1"), _record("b", "b@x.com", "S2"), _record("c", "a@x.com", "S3")]
+    query = AsyncMock(return_value=(0, []))
+    with (
+        patch.object(SQLAdapter, "load", new_callable=AsyncMock, return_value=_folder()),
+        patch.object(SQLAdapter, "query", query),
+    ):
+        failures = await db.validate_uniqueness_many("data", records, "dmart")
+
+    assert list(failures) == [2]
+    assert failures[2].error.code == InternalErrorCode.DATA_SHOULD_BE_UNIQUE
+    searches = [call.args[0].search for call in query.await_args_list]
+    assert searches == ["@email:a@x.com|b@x.com", "@payload.body.sku:S1|S2"]
+
+
+@pytest.mark.anyio
+async def test_validate_uniqueness_many_rechecks_per_record_on_a_hit():
+    records = [_record("a", "a@x.com"), _record("b", "b@x.com")]
+    error = api.Exception(
+        400, api.Error(type="request", code=InternalErrorCode.DATA_SHOULD_BE_UNIQUE, message="Entry properties should be unique")
+    )
+
+    async def validate_uniqueness(space_name, record, action, user_shortname):
+        if record.shortname == "b":
+            raise error
+        return True
+
+    with (
+        patch.object(SQLAdapter, "load", new_callable=AsyncMock, return_value=_folder()),
+        patch.object(SQLAdapter, "query", new_callable=AsyncMock, return_value=(1, [])),
+        patch.object(SQLAdapter, "validate_uniqueness", side_effect=validate_uniqueness) as per_record,
+    ):
+        failures = await db.validate_uniqueness_many("data", records, "dmart")
+
+    assert failures == {1: error}
+    assert per_record.await_count == 2
+
+
+@pytest.mark.anyio
+async def test_validate_uniqueness_many_without_unique_fields():
+    folder = core.Folder(shortname="products", owner_shortname="dmart")
+    query = AsyncMock(return_value=(0, []))
+    with (
+        patch.object(SQLAdapter, "load", new_callable=AsyncMock, return_value=folder),
+        patch.object(SQLAdapter, "query", query),
+    ):
+        assert await db.validate_uniqueness_many("data", [_record("a", "a@x.com")], "dmart") == {}
+    query.assert_not_awaited()
+
+
+def test_is_bulk_deletable():
+    assert db.is_bulk_deletable(core.Content)
+    assert db.is_bulk_deletable(core.Comment)
+    assert not db.is_bulk_deletable(core.Folder)
+    assert not db.is_bulk_deletable(core.Group)
+    assert not db.is_bulk_deletable(core.User)
+    assert not db.is_bulk_deletable(core.Lock)
+
+
+class _Partitions:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    async def partitions(self, size: int):
+        for start in range(0, len(self.rows), size):
+            yield self.rows[start : start + size]
+
+
+@pytest.mark.anyio
+async def test_stream_query_strips_passwords():
+    user = core.Record(
+        resource_type=ResourceType.content, subpath="/users", shortname="alice", attributes={"password": "$argon2id$hash"}
+    )
+    session = AsyncMock()
+    session.stream.return_value = _Partitions([MagicMock(shortname="alice")])
+    session_context = MagicMock()
+    session_context.__aenter__ = AsyncMock(return_value=session)
+    session_context.__aexit__ = AsyncMock(return_value=False)
+    query = api.Query(type="subpath", space_name="management", subpath="/users")
+    with (
+        patch.object(SQLAdapter, "_query_scope", new_callable=AsyncMock, return_value=["management:users"]),
+        patch.object(SQLAdapter, "get_session", return_value=session_context),
+        patch.object(SQLAdapter, "_set_query_final_results", new_callable=AsyncMock, return_value=[user]),
+    ):
+        batches = [batch async for batch in db.stream_query(query, "dmart")]
+
+    assert [[record.shortname for record in batch] for batch in batches] == [["alice"]]
+    assert "password" not in batches[0][0].attributes
+
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "payload", [None, core.Payload(content_type="json", schema_shortname="meta_schema", body="anything.json")]
+)
+async def test_validate_payloads_with_a_non_dict_schema_fails_like_the_per_record_path(payload):
+    schema = core.Schema(shortname="anything", owner_shortname="dmart", payload=payload)
+    with patch.object(SQLAdapter, "load", new_callable=AsyncMock, return_value=schema):
+        with pytest.raises(Exception) as per_record:
+            await db.validate_payload_with_schema({"sku": "S1"}, "data", "anything")
+        with pytest.raises(type(per_record.value)):
+            await db.validate_payloads_with_schema([{"sku": "S1"}], "data", "anything")
@@ -0,0 +1,77 @@
+"""Tests for data_adapters/sql/hydration.py — row to core model hydration."""
+
+from datetime import datetime
+from uuid import uuid4
+
+import models.core as core
+from data_adapters.sql.create_tables import Entries, Users
+from data_adapters.sql.hydration import hydrate, row_values
+
+
+def _entry() -> Entries:
+    return Entries(
+        uuid=uuid4(),
+        shortname="e1",
+        space_name="data",
+        subpath="/products",
+        resource_type="content",
+        owner_shortname="dmart",
+        is_active=True,
+        tags=["a", "b"],
+        displayname={"en": "Entry", "ar": "مدخل"},
+        description={"en": "An entry"},
+        created_at=datetime(2026, 1, 1),
+        updated_at=datetime(2026, 1, 2),
+        payload={
+            "content_type": "json",
+            "schema_shortname": "product",
+            "checksum": "abc",
+            "body": {"name": "x", "price": 10, "variants": [{"sku": i} for i in range(20)]},
+        },
+        acl=[{"user_shortname": "alice", "allowed_actions": ["view", "query"]}],
+        relationships=[],
+        query_policies=["data:products:content:true:dmart"],
+    )
+
+
+def _user() -> Users:
+    return Users(
+        uuid=uuid4(),
+        shortname="alice",
+        space_name="management",
+        subpath="/users",
+        resource_type="user",
+        owner_shortname="alice",
+        is_active=True,
+        tags=[],
+        roles=["admin"],
+        groups=[],
+        type="web",
+        language="english",
+        displayname={"en": "Alice"},
+        query_policies=[],
+    )
+
+
+def test_hydrate_matches_round_trip():
+    for row, model in ((_entry(), core.Content), (_user(), core.User)):
+        expected = model.model_validate(row.model_dump())
+        hydrated = hydrate(model, row)
+        assert hydrated.model_dump() == expected.model_dump()
+        assert isinstance(hydrated.displayname, core.Translation)
+
+
+def test_hydrate_nested_models():
+    content = hydrate(core.Content, _entry())
+    assert isinstance(content.payload, core.Payload)
+    assert content.payload.body["price"] == 10
+    assert content.acl is not None and isinstance(content.acl[0], core.ACL)
+    assert content.to_record("/products", "e1").attributes["tags"] == ["a", "b"]
+
+
+def test_row_values_skips_orm_state():
+    values = row_values(_entry(), exclude={"payload"})
+    assert "_sa_instance_state" not in values
+    assert "payload" not in values
+    assert values["shortname"] == "e1"
+
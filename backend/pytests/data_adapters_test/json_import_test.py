@@ -0,0 +1,107 @@
+"""Tests for the streaming JSON tree import of data_adapters/sql/json_to_db_migration.py."""
+
+import json
+from datetime import datetime
+from unittest.mock import patch
+from uuid import UUID, uuid4
+
+import pytest
+from psycopg.types.json import Jsonb
+
+import data_adapters.sql.json_to_db_migration as migration
+from data_adapters.sql.create_tables import Entries, Histories, Users
+from data_adapters.sql.json_to_db_migration import CopyTable, import_directories, read_directory
+
+
+def test_copy_table_statements():
+    table = CopyTable(Users)
+    assert table.create_staging.startswith('CREATE TEMP TABLE "import_users" (')
+    assert table.create_staging.endswith("ON COMMIT DROP")
+    assert '"type" text' in table.create_staging
+    assert table.copy.endswith("FROM STDIN (FORMAT BINARY)")
+    assert '"type"::usertype' in table.insert
+    assert table.insert.endswith('ON CONFLICT DO NOTHING RETURNING "uuid"')
+
+
+def test_copy_table_row():
+    table = CopyTable(Users)
+    uuid = str(uuid4())
+    row = dict(
+        zip(
+            table.columns,
+            table.row(
+                {
+                    "uuid": uuid,
+                    "shortname": "alice",
+                    "space_name": "management",
+                    "subpath": "/users",
+                    "owner_shortname": "dmart",
+                    "resource_type": "user",
+                    "type": "web",
+                    "language": "english",
+                    "created_at": "2024-01-01T10:00:00.123",
+                    "displayname": {"en": "Alice"},
+                    "unknown": "ignored",
+                }
+            ),
+            strict=True,
+        )
+    )
+    assert row["uuid"] == UUID(uuid)
+    # Enum columns hold the member names
+    assert row["language"] == "en"
+    assert row["type"] == "web"
+    assert row["created_at"].tzinfo is not None
+    assert isinstance(row["displayname"], Jsonb) and row["displayname"].obj == {"en": "Alice"}
+    # Missing keys get the column defaults
+    assert row["is_active"] is False
+    assert row["force_password_change"] is True
+    assert isinstance(row["updated_at"], datetime)
+
+
+def test_read_directory(tmp_path):
+    dm = tmp_path / ".dm" / "phone"
+    dm.mkdir(parents=True)
+    (dm / "meta.content.json").write_text(
+        json.dumps({"uuid": str(uuid4()), "shortname": "phone", "owner_shortname": "dmart", "is_active": True})
+    )
+    (dm / "history.jsonl").write_text(
+        json.dumps({"owner_shortname": "dmart", "timestamp": "2024-01-01T10:00:00.000000", "diff": {}}) + "\n"
+    )
+
+    emitted: list = []
+    read_directory(str(tmp_path / ".dm"), ["phone"], "data", "products", lambda model, row: emitted.append((model, row)))
+    assert sorted(model.__name__ for model, _ in emitted) == ["Entries", "Histories"]
+    for _, row in emitted:
+        assert row["space_name"] == "data"
+        assert row["subpath"] == "/products"
+
+
+@pytest.mark.anyio
+async def test_import_directories_batches_rows():
+    rows = [{"uuid": str(uuid4()), "shortname": f"e{i}", "owner_shortname": "dmart"} for i in range(5)]
+
+    def read_space(root, space_name, emit):
+        for row in rows:
+            emit(Entries, row)
+        emit(Histories, {"shortname": "e0", "timestamp": "2024-01-01T10:00:00"})
+
+    batches: dict = {}
+
+    async def copy_rows(engine, table, batch, progress):
+        batches.setdefault(table.model.__name__, []).append(len(batch))
+        progress.written_rows += len(batch)
+
+    engine = migration.SQLAdapter().engine
+    with (
+        patch.object(migration, "read_space", side_effect=read_space),
+        patch.object(migration, "copy_rows", side_effect=copy_rows),
+        patch.object(type(engine.dialect), "driver", "psycopg"),
+    ):
+        progress = await import_directories([("space", "/tmp", "data"), ("space", "/tmp", "other")], 2, 2, False)
+
+    assert sum(batches["Entries"]) == 10
+    assert max(batches["Entries"]) <= 2
+    assert batches["Histories"] == [1, 1] or batches["Histories"] == [2]
+    assert progress.read_directories == 2
+    assert progress.written_rows == 12
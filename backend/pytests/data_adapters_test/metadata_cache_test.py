@@ -0,0 +1,159 @@
+"""Tests for data_adapters/sql/metadata_cache.py — the space/folder/schema meta cache."""
+
+import json
+import time
+
+import pytest
+
+import models.core as core
+from data_adapters.sql.metadata_cache import MetadataCache
+from utils.schema_validators import schema_validators
+from utils.settings import settings
+from utils.token_cache import token_cache
+
+
+def _folder(shortname: str) -> core.Folder:
+    return core.Folder(shortname=shortname, owner_shortname="dmart", is_active=True)
+
+
+def test_get_returns_a_copy():
+    cache = MetadataCache(8, 60)
+    cache.put("data", "/", "products", _folder("products"))
+    first = cache.get(core.Folder, "data", "/", "products")
+    assert first is not None
+    first.is_active = False
+    second = cache.get(core.Folder, "data", "", "products")
+    assert second is not None and second.is_active is True
+
+
+def test_get_checks_the_class():
+    cache = MetadataCache(8, 60)
+    cache.put("data", "/", "products", _folder("products"))
+    assert cache.get(core.Schema, "data", "/", "products") is None
+    assert cache.get(core.Folder, "data", "/", "products") is not None
+
+
+def test_expired_entries_are_dropped():
+    cache = MetadataCache(8, 0)
+    cache.put("data", "/", "products", _folder("products"))
+    assert cache.get(core.Folder, "data", "/", "products") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache():
+    cache = MetadataCache(0, 60)
+    cache.put("data", "/", "products", _folder("products"))
+    assert cache.get(core.Folder, "data", "/", "products") is None
+
+
+def test_invalidate_entry_subtree_and_space():
+    cache = MetadataCache(8, 60)
+    cache.put("data", "/", "products", _folder("products"))
+    cache.put("data", "/products", "phones", _folder("phones"))
+    cache.put("data", "/products/phones", "android", _folder("android"))
+    cache.put("data", "/productsx", "other", _folder("other"))
+    cache.put("other", "/", "products", _folder("products"))
+
+    cache.invalidate("data", "/", "products")
+    assert cache.get(core.Folder, "data", "/", "products") is None
+    assert cache.get(core.Folder, "data", "/products", "phones") is not None
+
+    cache.invalidate("data", "/products")
+    assert cache.get(core.Folder, "data", "/products", "phones") is None
+    assert cache.get(core.Folder, "data", "/products/phones", "android") is None
+    assert cache.get(core.Folder, "data", "/productsx", "other") is not None
+
+    cache.invalidate("data")
+    assert cache.get(core.Folder, "data", "/productsx", "other") is None
+    assert cache.get(core.Folder, "other", "/", "products") is not None
+
+
+def test_invalidate_meta_scopes():
+    cache = MetadataCache(8, 60)
+    assert cache.invalidate_meta("data", "/", core.Content(shortname="x", owner_shortname="dmart")) == []
+    assert cache.invalidate_meta("data", "/", core.Space(shortname="data", owner_shortname="dmart")) == [
+        {"space_name": "data"}
+    ]
+    assert cache.invalidate_meta("data", "/products", _folder("phones")) == [
+        {"space_name": "data", "subpath": "/products", "shortname": "phones"},
+        {"space_name": "data", "subpath": "/products/phones"},
+    ]
+    assert cache.invalidate_meta("data", "/schema", core.Schema(shortname="product", owner_shortname="dmart")) == [
+        {"space_name": "data", "subpath": "/schema", "shortname": "product"}
+    ]
+
+
+def test_notifications_from_other_workers_invalidate():
+    cache = MetadataCache(8, 60)
+    cache.put("data", "/", "products", _folder("products"))
+
+    cache._on_notification(json.dumps({"worker": cache.worker_id, "space_name": "data"}))
+    assert cache.get(core.Folder, "data", "/", "products") is not None
+
+    cache._on_notification("not json")
+    cache._on_notification(json.dumps({"worker": "other", "space_name": "data", "subpath": "/", "shortname": "products"}))
+    assert cache.get(core.Folder, "data", "/", "products") is None
+
+
+def test_schema_notifications_drop_compiled_validators():
+    cache = MetadataCache(8, 60)
+    first = schema_validators.validator("data", "product", {"type": "object"})
+    cache._on_notification(json.dumps({"worker": "other", "space_name": "data", "subpath": "/schema", "shortname": "product"}))
+    assert schema_validators.validator("data", "product", {"type": "object"}) is not first
+    schema_validators.invalidate("data", "product")
+
+
+def test_token_notifications_drop_the_users_cached_tokens():
+    cache = MetadataCache(0, 60)
+    token_cache.put("alice-token", {"shortname": "alice"}, time.time() + 60)
+    token_cache.put("bob-token", {"shortname": "bob"}, time.time() + 60)
+
+    cache._on_notification(json.dumps({"worker": "other", "token_user": "alice"}))
+    assert token_cache.peek("alice-token") is None
+    assert token_cache.peek("bob-token") is not None
+    token_cache.clear()
+
+
+class _RecordingEngine:
+    def __init__(self):
+        self.payloads: list[dict] = []
+
+    def connect(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def execute(self, statement, params):
+        self.payloads.append(json.loads(params["payload"]))
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.anyio
+async def test_token_invalidation_is_published_with_the_metadata_cache_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "database_driver", "postgresql+psycopg")
+    cache = MetadataCache(0, 60)
+    engine = _RecordingEngine()
+    await cache.publish(engine, [{"space_name": "data"}])  # type: ignore[arg-type]
+    await cache.publish_token_invalidation(engine, "alice")  # type: ignore[arg-type]
+    assert engine.payloads == [{"worker": cache.worker_id, "token_user": "alice"}]
+
+
+def test_stats():
+    cache = MetadataCache(8, 60)
+    cache.put("data", "/", "products", _folder("products"))
+    cache.get(core.Folder, "data", "/", "products")
+    cache.get(core.Folder, "data", "/", "missing")
+    assert cache.stats() == {
+        "size": 1,
+        "max_size": 8,
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "invalidations": 0,
+    }
@@ -0,0 +1,101 @@
+"""Tests for data_adapters/sql/payload_indexes.py — key mapping and the search rewrite."""
+
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+import models.api as api
+from data_adapters.sql.adapter import set_sql_statement_from_query
+from data_adapters.sql.create_tables import Entries
+from data_adapters.sql.payload_indexes import (
+    PayloadIndex,
+    PayloadIndexRegistry,
+    index_field_from_key,
+    index_name,
+    payload_indexes,
+)
+
+
+def test_index_field_from_key():
+    assert index_field_from_key("payload.body.status") == "payload.body.status"
+    assert index_field_from_key("attributes.payload.body.status") == "payload.body.status"
+    assert index_field_from_key("body.address.city") == "payload.body.address.city"
+    assert index_field_from_key("shortname") is None
+    assert index_field_from_key("payload.body.members[0]") is None
+    assert index_field_from_key("payload.body.x'); DROP TABLE entries; --") is None
+
+
+def test_index_name_is_stable_and_short():
+    name = index_name("data", "/products", "payload.body.status")
+    assert name == index_name("data", "/products", "payload.body.status")
+    assert name != index_name("data", "/orders", "payload.body.status")
+    assert len(name) <= 63
+
+
+def test_payload_index_expression_and_predicate():
+    index = PayloadIndex(name="idx", space_name="data", subpath="/products", field="payload.body.address.city")
+    assert index.expression == "payload::jsonb->'body'->'address'->>'city'"
+    assert index.predicate == "space_name = 'data' AND (subpath = '/products' OR subpath ILIKE '/products/%')"
+
+
+@contextmanager
+def _ready_index(field: str, value_type: str | None):
+    name = index_name("data", "/products", field)
+    payload_indexes._indexes[name] = PayloadIndex(name, "data", "/products", field, value_type)
+    payload_indexes._valid.add(name)
+    payload_indexes.version += 1
+    try:
+        yield
+    finally:
+        payload_indexes._indexes.pop(name, None)
+        payload_indexes._valid.discard(name)
+        payload_indexes.version += 1
+
+
+async def _search_sql(search: str) -> str:
+    query = api.Query(type="search", space_name="data", subpath="/products", search=search)
+    statement = await set_sql_statement_from_query(Entries, select(Entries), query, False)
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.anyio
+async def test_declared_string_attribute_search_is_only_the_indexed_equality():
+    assert "jsonb_typeof" in await _search_sql("@payload.body.status:active")
+    with _ready_index("payload.body.status", "string"):
+        sql = await _search_sql("@payload.body.status:active")
+    assert "payload::jsonb->'body'->>'status' = %(s_p_0)s" in sql
+    # Every arm of the predicate must be servable by the expression index
+    assert "jsonb_typeof" not in sql
+    assert "@>" not in sql
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("value_type", [None, "array"])
+async def test_attributes_not_declared_string_keep_the_typed_match(value_type):
+    # e.g. {"tags": ["active", "new"]} has to match by containment
+    with _ready_index("payload.body.tags", value_type):
+        sql = await _search_sql("@payload.body.tags:active")
+    assert "jsonb_typeof(payload::jsonb->'body'->'tags') = 'array' AND payload::jsonb->'body'->'tags' @> CAST(" in sql
+
+
+@pytest.mark.anyio
+async def test_sync_scope_indexes_only_declared_string_attributes():
+    attributes = [
+        {"key": "payload.body.status", "name": "Status", "type": "string"},
+        {"key": "payload.body.tags", "name": "Tags", "type": "array"},
+        {"key": "payload.body.price", "name": "Price"},
+        {"key": "shortname", "name": "Name", "type": "string"},
+    ]
+    with (
+        patch.object(PayloadIndexRegistry, "refresh", new_callable=AsyncMock),
+        patch.object(PayloadIndexRegistry, "_create", new_callable=AsyncMock) as create,
+    ):
+        await PayloadIndexRegistry().sync_scope(MagicMock(), "data", "/products", attributes)
+    assert [call.args[1] for call in create.await_args_list] == [
+        PayloadIndex(
+            index_name("data", "/products", "payload.body.status"), "data", "/products", "payload.body.status", "string"
+        )
+    ]
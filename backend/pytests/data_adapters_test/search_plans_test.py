@@ -0,0 +1,100 @@
+"""Tests for data_adapters/sql/search_plans.py — the compiled search expression cache."""
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+import models.api as api
+from data_adapters.sql.adapter import cached_search_plan, compile_search_expression, set_sql_statement_from_query
+from data_adapters.sql.create_tables import Entries
+from data_adapters.sql.search_plans import SearchPlan, SearchPlanCache, search_plans
+
+
+def test_search_plan_cache_evicts_least_recently_used():
+    cache = SearchPlanCache(2)
+    cache.put(("a",), SearchPlan(where=None))
+    cache.put(("b",), SearchPlan(where=None))
+    assert cache.get(("a",)) is not None
+    cache.put(("c",), SearchPlan(where=None))
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 2, "misses": 1}
+
+
+def test_search_plan_cache_disabled():
+    cache = SearchPlanCache(0)
+    cache.put(("a",), SearchPlan(where=None))
+    assert cache.get(("a",)) is None
+
+
+def test_cached_search_plan_is_reused():
+    search_plans.clear()
+    hits, misses = search_plans.hits, search_plans.misses
+    plan = cached_search_plan(Entries, "@shortname:abc @tags:x", "data", "/products")
+    assert cached_search_plan(Entries, "@shortname:abc @tags:x", "data", "/products").where is plan.where
+    assert search_plans.hits == hits + 1
+    cached_search_plan(Entries, "@shortname:abc @tags:x", "data", "/orders")
+    assert search_plans.misses == misses + 2
+    assert plan.params["s_p_0"] == "abc"
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("@shortname:abc", "@shortname:abd"),
+        ("@payload.body.price:>10 laptop", "@payload.body.price:>25.5 phone"),
+        ("@payload.body.status:active|@shortname:x1", "@payload.body.status:sold|@shortname:y2"),
+    ],
+)
+def test_searches_differing_only_in_value_share_a_plan(first, second):
+    search_plans.clear()
+    hits = search_plans.hits
+    first_plan = cached_search_plan(Entries, first, "data", "/products")
+    second_plan = cached_search_plan(Entries, second, "data", "/products")
+    assert search_plans.hits == hits + 1
+    assert second_plan.where is first_plan.where
+
+    # Rebinding gives exactly what compiling the search from scratch gives
+    fresh = compile_search_expression(Entries, second, "data", "/products")
+    assert str(second_plan.where) == str(fresh.where)
+    assert second_plan.params == fresh.params
+    assert second_plan.search_terms == fresh.search_terms
+
+
+def test_rebound_values_replace_every_derived_parameter():
+    search_plans.clear()
+    cached_search_plan(Entries, "@payload.body.price:10 desk", "data", "/products")
+    plan = cached_search_plan(Entries, "@payload.body.price:42 chair", "data", "/products")
+    values = set(plan.params.values())
+    assert {"42", '["42"]', 42.0, "%chair%"} <= values
+    assert not values & {"10", 10.0, "%desk%"}
+    assert plan.search_terms == "chair"
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("@shortname:abc", "@shortname:ab*"),
+        ("@payload.body.price:10", "@payload.body.price:abc"),
+        ("@payload.body.created:2025-01-01", "@payload.body.created:2025-02-01"),
+        ("@payload.body.active:true", "@payload.body.active:false"),
+    ],
+)
+def test_values_that_shape_the_clause_stay_in_the_template(first, second):
+    search_plans.clear()
+    hits = search_plans.hits
+    cached_search_plan(Entries, first, "data", "/products")
+    cached_search_plan(Entries, second, "data", "/products")
+    assert search_plans.hits == hits
+
+
+@pytest.mark.anyio
+async def test_cached_plan_compiles_to_same_statement():
+    search_plans.clear()
+    query = api.Query(type="search", space_name="data", subpath="/products", search="@payload.body.status:active")
+    first = await set_sql_statement_from_query(Entries, select(Entries), query, False)
+    second = await set_sql_statement_from_query(Entries, select(Entries), query, False)
+    dialect = postgresql.dialect()
+    assert str(first.compile(dialect=dialect)) == str(second.compile(dialect=dialect))
+    assert first.compile(dialect=dialect).params == second.compile(dialect=dialect).params
+    assert search_plans.hits >= 1
@@ -1,22 +1,36 @@
 """Tests for data_adapters/sql/adapter_helpers.py — covers pure functions."""
 
+from datetime import datetime
+from uuid import uuid4
+
 import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg
+from sqlmodel import select
 
+import models.api as api
 from data_adapters.sql.adapter_helpers import (
+    ExplainJSON,
     _sanitize_sql_part,
+    apply_query_projection,
     build_query_filter_for_allowed_field_values,
+    decode_query_cursor,
+    encode_query_cursor,
     get_next_date_value,
+    hydrate_projected_row,
     is_date_time_value,
+    keyset_sort_column,
     parse_search_array,
     parse_search_expression,
     parse_search_string,
+    search_document_sql,
     set_table_for_query,
     subpath_checker,
     transform_keys_to_sql,
     validate_search_range,
 )
-from data_adapters.sql.create_tables import Entries, Histories, Permissions, Roles, Spaces, Users
-from models.enums import QueryType
+from data_adapters.sql.create_tables import SEARCH_DOCUMENTS, Entries, Histories, Permissions, Roles, Spaces, Users
+from models.enums import QueryType, SortType
 
 # --- subpath_checker ---
 
@@ -548,3 +562,118 @@ def test_parse_search_expression_preserves_pipe_or():
     assert len(result) == 2
     assert result[0]["fields"]["status"]["values"] == ["active", "pending"]
     assert result[0]["fields"]["status"]["operation"] == "OR"
+
+
+# --- keyset cursors ---
+
+
+def test_query_cursor_round_trip_datetime():
+    uuid = uuid4()
+    cursor = encode_query_cursor("created_at", SortType.descending, datetime(2026, 1, 2, 3, 4, 5), uuid)
+    assert decode_query_cursor(cursor) == ("created_at", SortType.descending, datetime(2026, 1, 2, 3, 4, 5), uuid)
+
+
+def test_query_cursor_round_trip_text():
+    uuid = uuid4()
+    cursor = encode_query_cursor("shortname", SortType.ascending, "abc", uuid)
+    assert decode_query_cursor(cursor) == ("shortname", SortType.ascending, "abc", uuid)
+
+
+def test_query_cursor_invalid():
+    with pytest.raises(api.Exception):
+        decode_query_cursor("not-a-cursor")
+
+
+def test_keyset_sort_column():
+    assert keyset_sort_column(Entries, "created_at") is Entries.created_at
+    assert keyset_sort_column(Entries, "payload") is None
+    assert keyset_sort_column(Entries, "payload.body.x") is None
+    assert keyset_sort_column(Entries, None) is None
+
+
+# --- search_document_sql ---
+
+
+def test_search_document_sql_uses_indexed_document():
+    assert search_document_sql(Entries) == SEARCH_DOCUMENTS["entries"]
+    assert "payload::text" in search_document_sql(Entries)
+    assert "password" not in search_document_sql(Users)
+
+
+def test_search_document_sql_falls_back_to_all_columns():
+    document = search_document_sql(Histories)
+    assert "COALESCE(request_headers::text, '')" in document
+
+
+# --- apply_query_projection ---
+
+
+def _projected_sql(query, table=Entries):
+    statement, body_paths = apply_query_projection(select(table), table, query)
+    return str(statement.compile(dialect=postgresql.dialect())), body_paths
+
+
+def test_query_projection_strips_payload_body():
+    sql, body_paths = _projected_sql(api.Query(type="search", space_name="data", subpath="/"))
+    assert body_paths == []
+    assert "jsonb_set(entries.payload" in sql
+    assert "query_policies" not in sql
+    assert sql.count("entries.payload") == 1
+
+
+def test_query_projection_keeps_payload_when_retrieved():
+    sql, body_paths = _projected_sql(api.Query(type="search", space_name="data", subpath="/", retrieve_json_payload=True))
+    assert body_paths is None
+    assert "entries.payload" in sql
+    assert "jsonb_set" not in sql
+
+
+def test_query_projection_include_and_exclude_fields():
+    query = api.Query(
+        type="search",
+        space_name="data",
+        subpath="/",
+        retrieve_json_payload=True,
+        include_fields=["tags", "payload.body.address.city", "displayname"],
+        exclude_fields=["displayname", "shortname"],
+        sort_by="created_at",
+    )
+    sql, body_paths = _projected_sql(query)
+    assert body_paths == [["address", "city"]]
+    assert "entries.tags" in sql
+    assert "entries.shortname" in sql
+    assert "entries.created_at" in sql
+    assert "entries.displayname" not in sql
+    assert "entries.description" not in sql
+    assert "jsonb_extract_path(entries.payload" in sql
+
+
+def test_query_projection_skips_history():
+    query = api.Query(type="history", space_name="data", subpath="/", include_fields=["diff"])
+    statement, body_paths = apply_query_projection(select(Histories), Histories, query)
+    assert body_paths is None
+    assert "request_headers" in str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_hydrate_projected_row():
+    entry = Entries(
+        uuid=uuid4(), shortname="e1", space_name="data", subpath="/", resource_type="content", owner_shortname="dmart", tags=[]
+    )
+    payload = {"content_type": "json", "body": None}
+    hydrated = hydrate_projected_row((entry, payload, "Amman", None), [["address", "city"], ["status"]])
+    assert hydrated is entry
+    assert entry.payload == {"content_type": "json", "body": {"address": {"city": "Amman"}}}
+
+
+# --- estimated totals ---
+
+
+@pytest.mark.parametrize(("dialect", "placeholder"), [(psycopg.dialect(), "%(space_name_1)s"), (asyncpg.dialect(), "$1")])
+def test_explain_json_binds_parameters_for_the_driver(dialect, placeholder):
+    statement = select(Entries.uuid).where(Entries.space_name == "data", Entries.subpath.in_(["/a", "/b"]))  # type: ignore[attr-defined]
+    compiled = ExplainJSON(statement).compile(dialect=dialect)
+    sql = str(compiled)
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT entries.uuid")
+    assert f"entries.space_name = {placeholder}" in sql
+    assert compiled.params["space_name_1"] == "data"
+    assert compiled.params["subpath_1"] == ["/a", "/b"]
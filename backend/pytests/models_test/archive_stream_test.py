@@ -0,0 +1,66 @@
+"""Tests for utils/archive_stream.py and the export members of db_to_json_migration."""
+
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+import models.core as core
+from data_adapters.sql.db_to_json_migration import record_members
+from models.enums import ArchiveFormat, ResourceType
+from utils.archive_stream import ArchiveWriter, stream_archive
+
+MEMBERS = [("data/.dm/meta.space.json", b'{"shortname": "data"}'), ("data/products/phone.json", b"{}")]
+
+
+async def _batches(*batches):
+    for batch in batches:
+        yield batch
+
+
+@pytest.mark.anyio
+async def test_stream_zip():
+    chunks = [chunk async for chunk in stream_archive(_batches(MEMBERS[:1], MEMBERS[1:]), ArchiveFormat.zip)]
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == [path for path, _ in MEMBERS]
+        assert archive.read("data/products/phone.json") == b"{}"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("archive_format", [ArchiveFormat.tar, ArchiveFormat.tar_gz])
+async def test_stream_tar(archive_format):
+    chunks = [chunk async for chunk in stream_archive(_batches(MEMBERS), archive_format)]
+    with tarfile.open(fileobj=io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.getnames() == [path for path, _ in MEMBERS]
+        extracted = archive.extractfile("data/.dm/meta.space.json")
+        assert extracted is not None and extracted.read() == MEMBERS[0][1]
+
+
+def test_writer_hands_out_bytes_as_it_goes():
+    writer = ArchiveWriter(ArchiveFormat.tar)
+    # Stream mode tar buffers one record before writing
+    first = writer.add([("data/products/big.json", b"x" * tarfile.RECORDSIZE)])
+    assert first.startswith(b"data/products/big.json")
+    assert len(first + writer.add(MEMBERS) + writer.close()) % tarfile.RECORDSIZE == 0
+
+
+def test_record_members():
+    record = core.Record(
+        resource_type=ResourceType.content,
+        subpath="/products",
+        shortname="phone",
+        attributes={
+            "owner_shortname": "dmart",
+            "query_policies": ["data:products:content:true:dmart"],
+            "payload": {"content_type": "json", "body": {"price": 10}},
+        },
+    )
+    members = dict(record_members("data", record, [], []))
+    assert list(members) == ["data/products/phone.json", "data/products/.dm/phone/meta.content.json"]
+    assert json.loads(members["data/products/phone.json"]) == {"price": 10}
+    meta = json.loads(members["data/products/.dm/phone/meta.content.json"])
+    assert meta["payload"]["body"] == "phone.json"
+    assert "query_policies" not in meta
+    assert record.attributes["payload"]["body"] == {"price": 10}
@@ -0,0 +1,102 @@
+"""Tests for utils/jsonl_index.py — the sidecar index behind the events log."""
+
+import json
+from datetime import datetime, timedelta
+
+from utils.jsonl_index import JsonlIndex
+
+BASE = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _event(i: int) -> str:
+    return json.dumps({"i": i, "user": "alice" if i % 2 else "bob", "timestamp": (BASE + timedelta(minutes=i)).isoformat()})
+
+
+def _write_log(path, count: int, start: int = 0, mode: str = "w"):
+    with open(path, mode) as f:
+        for i in range(start, start + count):
+            f.write(_event(i) + "\n")
+
+
+def _ids(lines):
+    return [json.loads(line)["i"] for line in lines]
+
+
+def test_page_newest_first(tmp_path):
+    log = tmp_path / "events.jsonl"
+    _write_log(log, 10)
+    index = JsonlIndex(log)
+    index.refresh()
+
+    total, lines = index.page(limit=3)
+    assert total == 10
+    assert _ids(lines) == [9, 8, 7]
+
+    total, lines = index.page(limit=3, offset=8)
+    assert _ids(lines) == [1, 0]
+
+    assert index.page(limit=3, offset=20) == (10, [])
+
+
+def test_page_date_range(tmp_path):
+    log = tmp_path / "events.jsonl"
+    _write_log(log, 10)
+    index = JsonlIndex(log)
+    index.refresh()
+
+    total, lines = index.page(from_date=BASE + timedelta(minutes=3), to_date=BASE + timedelta(minutes=6))
+    assert total == 4
+    assert _ids(lines) == [6, 5, 4, 3]
+
+
+def test_page_search(tmp_path):
+    log = tmp_path / "events.jsonl"
+    _write_log(log, 10)
+    index = JsonlIndex(log)
+    index.refresh()
+
+    total, lines = index.page(limit=2, offset=1, search="alice")
+    assert total == 5
+    assert _ids(lines) == [7, 5]
+
+
+def test_refresh_indexes_appended_lines_only(tmp_path):
+    log = tmp_path / "events.jsonl"
+    _write_log(log, 5)
+    JsonlIndex(log).refresh()
+    index_size = (tmp_path / "events.jsonl.idx").stat().st_size
+
+    _write_log(log, 3, start=5, mode="a")
+    index = JsonlIndex(log)
+    index.refresh()
+    assert index.count == 8
+    assert (tmp_path / "events.jsonl.idx").stat().st_size > index_size
+    assert _ids(index.page(limit=4)[1]) == [7, 6, 5, 4]
+
+
+def test_refresh_rebuilds_after_truncation(tmp_path):
+    log = tmp_path / "events.jsonl"
+    _write_log(log, 10)
+    JsonlIndex(log).refresh()
+
+    _write_log(log, 2)
+    index = JsonlIndex(log)
+    index.refresh()
+    assert index.count == 2
+    assert _ids(index.page()[1]) == [1, 0]
+
+
+def test_refresh_skips_incomplete_trailing_line(tmp_path):
+    log = tmp_path / "events.jsonl"
+    _write_log(log, 3)
+    with open(log, "a") as f:
+        f.write('{"i": 3, "timest')
+    index = JsonlIndex(log)
+    index.refresh()
+    assert index.count == 3
+
+    with open(log, "a") as f:
+        f.write(f'amp": "{(BASE + timedelta(minutes=3)).isoformat()}"}}\n')
+    index.refresh()
+    assert index.count == 4
+    assert _ids(index.page(limit=1)[1]) == [3]
@@ -0,0 +1,40 @@
+"""Tests for utils/query_policies_helper.py — policy tokens and ACL principals."""
+
+from models.core import ACL
+from utils.query_policies_helper import generate_acl_principals, generate_query_policies, query_policy_tokens
+
+
+def test_generate_query_policies_includes_prefix_tokens():
+    policies = generate_query_policies(
+        space_name="data",
+        subpath="/products",
+        resource_type="content",
+        is_active=True,
+        owner_shortname="alice",
+        owner_group_shortname=None,
+    )
+    assert "data::content" in policies
+    assert "data::content:true" in policies
+    assert "data::content:true:alice" in policies
+    assert "data:products:content" in policies
+    assert "data:products:content:true" in policies
+    assert "data:products:content:true:alice" in policies
+
+
+def test_query_policy_tokens_exact_and_like():
+    tokens, like_patterns = query_policy_tokens(
+        ["data:products:content:*", "data:products:content:true:*", "data:orders:*:true:alice|data:orders:ticket:true:bob"]
+    )
+    assert tokens == ["data:products:content", "data:products:content:true", "data:orders:ticket:true:bob"]
+    assert like_patterns == ["data:orders:%:true:alice"]
+
+
+def test_generate_acl_principals():
+    acl = [
+        {"user_shortname": "alice", "allowed_actions": ["view", "query"]},
+        {"user_shortname": "bob", "allowed_actions": ["view"]},
+        ACL(user_shortname="carol", allowed_actions=["query"]),
+        {"user_shortname": "alice", "allowed_actions": ["query"]},
+    ]
+    assert generate_acl_principals(acl) == ["alice", "carol"]
+    assert generate_acl_principals(None) == []
@@ -0,0 +1,70 @@
+"""Tests for utils/realtime_broker.py — local delivery and the NOTIFY envelopes."""
+
+import pytest
+
+from utils.realtime_broker import NOTIFY_PART_SIZE, LocalBroker, PostgresBroker
+
+
+class FakeManager:
+    def __init__(self):
+        self.users: list[tuple[str, str]] = []
+        self.channels: list[tuple[str, str]] = []
+
+    async def send_message(self, message: str, user_shortname: str) -> bool:
+        self.users.append((user_shortname, message))
+        return user_shortname == "alice"
+
+    async def broadcast_message(self, message: str, channel_name: str) -> bool:
+        self.channels.append((channel_name, message))
+        return channel_name == "data:/products:__ALL__:__ALL__:__ALL__"
+
+
+@pytest.mark.anyio
+async def test_local_broker_delivers_to_the_manager():
+    manager = FakeManager()
+    broker = LocalBroker(manager)
+    assert await broker.send_message("hi", "alice")
+    assert not await broker.send_message("hi", "bob")
+    assert await broker.broadcast([("m1", ["other", "data:/products:__ALL__:__ALL__:__ALL__"]), ("m2", ["other"])])
+    assert manager.channels == [
+        ("other", "m1"),
+        ("data:/products:__ALL__:__ALL__:__ALL__", "m1"),
+        ("other", "m2"),
+    ]
+
+
+def test_envelopes_round_trip_across_instances():
+    publisher, subscriber = PostgresBroker(FakeManager()), PostgresBroker(FakeManager())
+    message = {"kind": "user", "user_shortname": "alice", "message": "x" * (NOTIFY_PART_SIZE * 2)}
+    envelopes = publisher.envelopes(message)
+    assert len(envelopes) == 3
+    assert all(len(envelope.encode()) < 8000 for envelope in envelopes)
+
+    # The publisher already delivered locally and skips its own notifications
+    assert [publisher.receive(envelope) for envelope in envelopes] == [None, None, None]
+    # Parts may interleave with other messages
+    small = publisher.envelopes({"kind": "user", "user_shortname": "bob", "message": "hi"})
+    assert subscriber.receive(envelopes[0]) is None
+    assert subscriber.receive(small[0])["user_shortname"] == "bob"
+    assert subscriber.receive(envelopes[2]) is None
+    assert subscriber.receive(envelopes[1]) == message
+    assert subscriber.receive("not json") is None
+
+
+@pytest.mark.parametrize("text", ["مرحبا بالعالم " * 1500, '{"quoted": "value", "path": "a\\\\b"} ' * 600])
+def test_envelopes_of_escaped_text_fit_a_notify(text):
+    publisher, subscriber = PostgresBroker(FakeManager()), PostgresBroker(FakeManager())
+    message = {"kind": "broadcast", "events": [{"message": text, "channels": ["data:/products:__ALL__:__ALL__:__ALL__"]}]}
+    envelopes = publisher.envelopes(message)
+    assert len(envelopes) > 1
+    assert all(len(envelope.encode()) < 8000 for envelope in envelopes)
+    assert [subscriber.receive(envelope) for envelope in envelopes][-1] == message
+
+
+def test_brokers_on_different_channels_dont_cross_deliver():
+    websocket_broker = PostgresBroker(FakeManager(), "dmart_realtime")
+    webtransport_broker = PostgresBroker(FakeManager(), "dmart_realtime_wt")
+    message = {"kind": "user", "user_shortname": "alice", "message": "hi"}
+    assert webtransport_broker.receive(websocket_broker.envelopes(message)[0]) is None
+    assert websocket_broker.receive(webtransport_broker.envelopes(message)[0]) is None
+    assert PostgresBroker(FakeManager(), "dmart_realtime").receive(websocket_broker.envelopes(message)[0]) == message
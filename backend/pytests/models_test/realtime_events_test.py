@@ -0,0 +1,79 @@
+"""Tests for utils/realtime_events.py — channel names, coalescing and batching."""
+
+import asyncio
+
+import pytest
+
+from models.core import ActionType, Event
+from utils.realtime_events import BroadcastPublisher, event_channels, update_event
+
+
+class FakeResponse:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    closed = False
+
+    def __init__(self):
+        self.posts: list[tuple[str, dict]] = []
+
+    def post(self, url, json):
+        self.posts.append((url, json))
+        return FakeResponse()
+
+    async def close(self):
+        self.closed = True
+
+
+def _event(shortname: str) -> dict:
+    return update_event(
+        Event(
+            space_name="data",
+            subpath="/products/phones",
+            shortname=shortname,
+            action_type=ActionType.update,
+            schema_shortname="phone",
+            user_shortname="dmart",
+        )
+    )
+
+
+def test_event_channels():
+    channels = event_channels("data", "/products/phones", "phone", "update", "__ALL__")
+    assert len(channels) == 8
+    assert channels[0] == "data:/products:__ALL__:update:__ALL__"
+    assert "data:/products/phones:phone:__ALL__:__ALL__" in channels
+    assert len(event_channels("data", "/products", None, "create", "open")) == 4
+
+
+@pytest.mark.anyio
+async def test_publisher_coalesces_and_batches():
+    publisher = BroadcastPublisher("http://ws", batch_size=2, flush_interval=0.01, buffer_size=3)
+    session = FakeSession()
+    for shortname in ("a", "a", "b", "c", "d"):
+        publisher.publish(_event(shortname))
+    # The session is opened by the first flush
+    publisher._session = session  # type: ignore[assignment]
+    assert publisher.stats()["coalesced"] == 1
+    assert publisher.stats()["dropped"] == 1
+
+    await asyncio.sleep(0.05)
+    assert [url for url, _ in session.posts] == ["http://ws/broadcast", "http://ws/broadcast"]
+    assert [[event["message"]["shortname"] for event in body["events"]] for _, body in session.posts] == [
+        ["a", "b"],
+        ["c"],
+    ]
+    assert publisher.stats()["sent"] == 3
+
+    publisher.publish(_event("e"))
+    await publisher.close()
+    assert session.posts[-1][1]["events"][0]["message"]["shortname"] == "e"
+    assert session.closed
@@ -0,0 +1,78 @@
+"""Tests for utils/schema_validators.py — the compiled JSON schema registry."""
+
+import pytest
+from jsonschema.exceptions import ValidationError
+
+import models.core as core
+from utils.schema_validators import SchemaValidatorRegistry, schema_checksum
+
+SCHEMA = {
+    "type": "object",
+    "definitions": {"price": {"type": "number", "minimum": 0}},
+    "properties": {"name": {"type": "string"}, "price": {"$ref": "#/definitions/price"}},
+    "required": ["name"],
+}
+
+
+def test_checksum_matches_the_payload_checksum():
+    payload = core.Payload(content_type="json", body=SCHEMA)
+    assert payload.checksum == schema_checksum(SCHEMA)
+
+
+def test_validator_is_compiled_once_per_schema_body():
+    registry = SchemaValidatorRegistry(8)
+    first = registry.validator("data", "product", SCHEMA)
+    assert registry.validator("data", "product", dict(SCHEMA)) is first
+
+    changed = {**SCHEMA, "required": ["name", "price"]}
+    assert registry.validator("data", "product", changed) is not first
+    assert registry.stats() == {"size": 2, "max_size": 8, "hits": 1, "misses": 2}
+
+
+def test_body_edited_without_a_new_checksum_is_recompiled():
+    # Some write paths change payload.body and keep the stored checksum
+    payload = core.Payload(content_type="json", body=dict(SCHEMA))
+    registry = SchemaValidatorRegistry(8)
+    registry.validator("data", "product", payload.body).validate({"name": "a"})  # type: ignore[arg-type]
+    payload.body["required"] = ["name", "price"]  # type: ignore[index]
+    assert payload.checksum == schema_checksum(SCHEMA)
+    with pytest.raises(ValidationError):
+        registry.validator("data", "product", payload.body).validate({"name": "a"})  # type: ignore[arg-type]
+
+
+def test_invalidate_drops_every_version():
+    registry = SchemaValidatorRegistry(8)
+    first = registry.validator("data", "product", SCHEMA)
+    registry.validator("data", "product", {**SCHEMA, "required": []})
+    registry.validator("other", "product", SCHEMA)
+    registry.invalidate("data", "product")
+    assert registry.stats()["size"] == 1
+    assert registry.validator("data", "product", SCHEMA) is not first
+
+
+def test_disabled_registry_still_validates():
+    registry = SchemaValidatorRegistry(0)
+    with pytest.raises(ValidationError):
+        registry.validator("data", "product", SCHEMA).validate({"price": 1})
+    assert registry.stats()["size"] == 0
+
+
+def test_resolved_schema_is_a_copy():
+    registry = SchemaValidatorRegistry(8)
+    resolved = registry.resolved_schema("data", "product", SCHEMA)
+    assert resolved["properties"]["price"] == {"type": "number", "minimum": 0}
+    assert "definitions" not in resolved
+    resolved["properties"].clear()
+    assert registry.resolved_schema("data", "product", SCHEMA)["properties"]["price"]["minimum"] == 0
+    assert "$ref" in SCHEMA["properties"]["price"]
+
+
+def test_validate_many_reports_the_failing_items():
+    registry = SchemaValidatorRegistry(8)
+    items = [{"name": "a", "price": 1}, {"price": 2}, {"name": "c", "price": -1}, {"name": "d"}]
+    failures = registry.validate_many("data", "product", SCHEMA, items)
+    assert [index for index, _ in failures] == [1, 2]
+    assert "'name' is a required property" in failures[0][1].message
+    with pytest.raises(ValidationError) as raised:
+        registry.validator("data", "product", SCHEMA).validate(items[2])
+    assert raised.value.message == failures[1][1].message
@@ -1,10 +1,12 @@
 """Combined tests for various utility modules — covers uncovered branches and pure functions.
 
 Targets: utils/jwt.py, utils/generate_email.py, utils/social_sso.py, utils/notification.py,
-         utils/plugin_manager.py, main.py (mask_sensitive_data, set_middleware_response_headers),
-         data_adapters/helpers.py
+         utils/plugin_manager.py, utils/logger.py, data_adapters/helpers.py,
+         main.py (mask_sensitive_data, set_middleware_response_headers, response body logging)
 """
 
+import io
+import logging
 from time import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -12,15 +14,108 @@ import jwt as pyjwt
 import pytest
 
 import models.api as api
+import api.managed.router as managed_router
+from api.managed.utils import csv_entry_row, parse_range_header, schema_columns
 from data_adapters.helpers import get_nested_value, trans_magic_words
-from main import mask_sensitive_data, set_middleware_response_headers
-from models.core import ActionType, Event, EventFilter, PluginWrapper
+from main import logged_response_body, mask_sensitive_data, set_middleware_response_headers, tee_logged_body
+from models.core import ActionType, Event, EventFilter, PluginBase, PluginWrapper
 from models.enums import EventListenTime, PluginType, ResourceType
 from utils.generate_email import generate_email_from_template, generate_subject
+from utils.internal_error_code import InternalErrorCode
 from utils.jwt import decode_jwt, generate_jwt
+from utils.logger import CustomFormatter, QueueLogHandler
 from utils.notification import NotificationManager
+from utils.password_hashing import hash_session_token
 from utils.plugin_manager import PluginManager
 from utils.settings import settings
+from utils.token_cache import TokenCache
+
+# ==================== api/managed/utils.py ====================
+
+
+def test_parse_range_header_whole_body():
+    assert parse_range_header(None, 100) is None
+    assert parse_range_header("items=0-10", 100) is None
+    assert parse_range_header("bytes=0-1,5-6", 100) is None
+    assert parse_range_header("bytes=abc", 100) is None
+
+
+def test_parse_range_header_bounds():
+    assert parse_range_header("bytes=0-9", 100) == (0, 9)
+    assert parse_range_header("bytes=90-", 100) == (90, 99)
+    assert parse_range_header("bytes=90-500", 100) == (90, 99)
+    assert parse_range_header("bytes=-10", 100) == (90, 99)
+    assert parse_range_header("bytes=-500", 100) == (0, 99)
+
+
+def test_parse_range_header_unsatisfiable():
+    with pytest.raises(ValueError):
+        parse_range_header("bytes=100-", 100)
+    with pytest.raises(ValueError):
+        parse_range_header("bytes=-0", 100)
+
+
+def test_csv_entry_row():
+    folder_views = [
+        {"key": "shortname", "name": "Name"},
+        {"key": "attributes.payload.body.tags", "name": "Tags"},
+        {"key": "attributes.payload.body.price", "name": "Price"},
+        {"key": "attachments.media.shortname", "name": "Media"},
+        {"key": "attributes.missing", "name": "Missing"},
+    ]
+    document = {
+        "shortname": "phone",
+        "attributes": {"payload": {"body": {"tags": ["a", "b"], "price": 10}}},
+        "attachments": {"media": [{"shortname": "front"}, {"shortname": "back"}, {"other": 1}]},
+    }
+    assert csv_entry_row(document, folder_views) == {
+        "Name": "phone",
+        "Tags": '["a", "b"]',
+        "Price": 10,
+        "Media": '["front", "back"]',
+    }
+
+
+def test_schema_columns_follow_flatten_dict():
+    schema = {
+        "type": "object",
+        "properties": {
+            "price": {"type": "number"},
+            "dimensions": {"type": "object", "properties": {"width": {"type": "number"}}},
+            "tags": {"type": "array", "items": {"type": "string"}},
+        },
+    }
+    assert schema_columns(schema) == ["payload.body.price", "payload.body.dimensions.width", "payload.body.tags"]
+    assert schema_columns({"type": "object"}) == []
+
+
+@pytest.mark.anyio
+async def test_report_csv_header_covers_attributes_only_later_batches_carry(caplog):
+    def record(shortname: str, body: dict):
+        return MagicMock(attributes={"payload": {"body": body}, "shortname": shortname})
+
+    async def batches(*args):
+        yield [record("a", {"price": 1})]
+        yield [record("b", {"price": 2, "color": "red", "size": "L"})]
+
+    query = api.Query(type="search", space_name="data", subpath="/products", filter_schema_names=["product"])
+    schema = {"type": "object", "properties": {"price": {"type": "number"}, "color": {"type": "string"}}}
+    with (
+        patch.object(managed_router, "saved_query", AsyncMock(return_value=query)),
+        patch.object(managed_router, "is_space_exist", AsyncMock()),
+        patch.object(managed_router, "plugin_manager", AsyncMock()),
+        patch.object(managed_router.repository, "serve_query_batches", batches),
+        patch.object(managed_router.db, "get_schema", AsyncMock(return_value=schema)),
+        caplog.at_level(logging.WARNING),
+    ):
+        response = await managed_router.generate_csv_from_report_saved_query(
+            "data", MagicMock(subpath="/reports", shortname="sales"), "dmart"
+        )
+        body = "".join([chunk async for chunk in response.body_iterator])
+
+    assert body.splitlines() == ["payload.body.price,shortname,payload.body.color", "1,a,", "2,b,red"]
+    assert "payload.body.size" in caplog.text
+
 
 # ==================== data_adapters/helpers.py ====================
 
@@ -119,6 +214,59 @@ def test_generate_jwt_roundtrip():
     assert decoded["expires"] > time()
 
 
+def test_hash_session_token_is_stable():
+    token = generate_jwt({"shortname": "testuser", "type": "web"})
+    assert hash_session_token(token) == hash_session_token(token)
+    assert len(hash_session_token(token)) == 64
+
+
+def test_hash_session_token_distinguishes_tokens():
+    token_a = generate_jwt({"shortname": "user_a", "type": "web"})
+    token_b = generate_jwt({"shortname": "user_b", "type": "web"})
+    assert hash_session_token(token_a) != hash_session_token(token_b)
+
+
+def test_token_cache_hit_and_miss():
+    cache = TokenCache(max_size=10)
+    token = generate_jwt({"shortname": "testuser", "type": "web"})
+    assert cache.get(token) is None
+    cache.put(token, {"shortname": "testuser", "type": "web"}, time() + 60)
+    entry = cache.get(token)
+    assert entry is not None and entry.claims["shortname"] == "testuser"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_token_cache_expired_entry_is_dropped():
+    cache = TokenCache(max_size=10)
+    cache.put("expired-token", {"shortname": "testuser"}, time() - 1)
+    assert cache.get("expired-token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    cache.put("token-a", {"shortname": "a"}, time() + 60)
+    cache.put("token-b", {"shortname": "b"}, time() + 60)
+    cache.get("token-a")
+    cache.put("token-c", {"shortname": "c"}, time() + 60)
+    assert cache.peek("token-b") is None
+    assert cache.peek("token-a") is not None
+
+
+def test_token_cache_invalidate_user():
+    cache = TokenCache(max_size=10)
+    cache.put("token-a", {"shortname": "testuser"}, time() + 60)
+    cache.put("token-b", {"shortname": "testuser"}, time() + 60)
+    cache.put("token-c", {"shortname": "other"}, time() + 60)
+    cache.mark_session_verified("token-a")
+    assert cache.peek("token-a").is_session_verified()
+    cache.invalidate_user("testuser")
+    assert cache.peek("token-a") is None
+    assert cache.peek("token-b") is None
+    assert cache.peek("token-c") is not None
+
+
 # ==================== utils/generate_email.py ====================
 
 
@@ -290,6 +438,79 @@ def test_set_middleware_response_headers_static_cache():
     assert "public" in mock_response.headers["Cache-Control"]
 
 
+# ==================== main.py: response body logging ====================
+
+
+def test_logged_response_body():
+    assert logged_response_body(b"", 0) == {}
+    assert logged_response_body(b'{"status": "success"}', 21) == {"status": "success"}
+    assert logged_response_body(b"[1, 2]", 6) == {}
+    truncated = logged_response_body(b'{"access_token": "secret", "rec', 500)
+    assert truncated["truncated"] is True and truncated["size"] == 500
+    assert "secret" not in truncated["head"]
+
+
+@pytest.mark.anyio
+async def test_tee_logged_body_streams_and_keeps_the_head():
+    async def body():
+        yield b'{"records": ['
+        yield b'"' + b"x" * 2048 + b'"'
+        yield b"]}"
+
+    request = MagicMock(method="GET")
+    request.url.path = "/managed/query"
+    response = MagicMock(status_code=200, charset="utf-8")
+    old_max_kb, old_rate = settings.log_response_body_max_kb, settings.log_response_body_sample_rate
+    settings.log_response_body_max_kb, settings.log_response_body_sample_rate = 1, 0.0
+    try:
+        with (
+            patch("main.set_middleware_extra", return_value={"props": {}}) as set_extra,
+            patch("main.set_logging") as set_logging,
+        ):
+            chunks = [chunk async for chunk in tee_logged_body(body(), request, response, time(), "dmart", None)]
+            assert b"".join(chunks) == b'{"records": ["' + b"x" * 2048 + b'"]}'
+            logged_body = set_extra.call_args.args[-1]
+            assert logged_body["size"] == 2065 and len(logged_body["head"]) == 1024
+            set_logging.assert_called_once()
+
+            settings.log_response_body_sample_rate = 1.0
+            _ = [chunk async for chunk in tee_logged_body(body(), request, response, time(), "dmart", None)]
+            assert set_extra.call_args.args[-1] == {"records": ["x" * 2048]}
+    finally:
+        settings.log_response_body_max_kb, settings.log_response_body_sample_rate = old_max_kb, old_rate
+
+
+# ==================== utils/logger.py ====================
+
+
+def test_queue_log_handler_formats_on_the_listener_thread():
+    stream = io.StringIO()
+    handler = QueueLogHandler("logging.StreamHandler", {"stream": stream}, queue_size=10)
+    handler.setFormatter(CustomFormatter())
+    test_logger = logging.getLogger("dmart.queue_log_handler_test")
+    test_logger.addHandler(handler)
+    try:
+        test_logger.warning("Served request", extra={"props": {"headers": {"authorization": "Bearer abc"}}})
+    finally:
+        test_logger.removeHandler(handler)
+        handler.close()
+
+    output = stream.getvalue()
+    assert '"message": "Served request"' in output
+    assert "Bearer abc" not in output
+
+
+def test_queue_log_handler_drops_when_full():
+    handler = QueueLogHandler("logging.NullHandler", queue_size=1)
+    handler.listener.stop()
+    record = logging.makeLogRecord({"msg": "m"})
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+    handler.queue.get_nowait()
+    handler.close()
+
+
 # ==================== utils/notification.py ====================
 
 
@@ -461,5 +682,42 @@ async def test_plugin_manager_after_action_space_none():
         resource_type=ResourceType.content,
         user_shortname="admin",
     )
-    with patch.object(PluginManager, "_get_space_cached", new_callable=AsyncMock, return_value=None):
+    with patch.object(PluginManager, "_get_space", new_callable=AsyncMock, return_value=None):
         await pm.after_action(event)
+
+
+@pytest.mark.anyio
+async def test_plugin_manager_before_action_many():
+    pm = PluginManager()
+    filters = EventFilter(
+        subpaths=["/blocked"],
+        resource_types=["__ALL__"],
+        schema_shortnames=["__ALL__"],
+        actions=[ActionType.create],
+    )
+
+    class Rejecting(PluginBase):
+        async def hook(self, data: Event):
+            raise api.Exception(400, api.Error(type="request", code=InternalErrorCode.NOT_ALLOWED, message="rejected"))
+
+    pw = PluginWrapper(shortname="p1", is_active=True, filters=filters, listen_time=EventListenTime.before, type=PluginType.hook)
+    pw.object = Rejecting()
+    pm._before_plugins = {ActionType.create: [pw]}
+
+    events = [
+        Event(
+            space_name="test",
+            subpath=subpath,
+            action_type=ActionType.create,
+            resource_type=ResourceType.content,
+            user_shortname="admin",
+        )
+        for subpath in ["/data", "/blocked", "/data"]
+    ]
+    space = MagicMock(active_plugins=["p1"])
+    with patch.object(PluginManager, "_get_space", new_callable=AsyncMock, return_value=space) as get_space:
+        failures = await pm.before_action_many(events)
+
+    assert list(failures) == [1]
+    assert failures[1].error.message == "rejected"
+    get_space.assert_awaited_once_with("test")
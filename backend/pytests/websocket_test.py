@@ -0,0 +1,118 @@
+"""Tests for the websocket ConnectionManager — registry, fan-out and slow-consumer eviction."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+import websocket
+from utils.realtime_broker import LocalBroker
+from websocket import ConnectionManager, app, websocket_manager
+
+SUBSCRIPTION = {"type": "notification_subscription", "space_name": "data", "subpath": "/products"}
+CHANNEL = "data:/products:__ALL__:__ALL__:__ALL__"
+
+
+class FakeWebSocket:
+    def __init__(self, blocked: bool = False):
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+        self.blocked = blocked
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.blocked:
+            await asyncio.Event().wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def _drain():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.anyio
+async def test_user_devices_and_subscriptions():
+    manager = ConnectionManager(queue_size=8, send_timeout=1)
+    phone, laptop = FakeWebSocket(), FakeWebSocket()
+    phone_connection = await manager.connect(phone, "alice")
+    laptop_connection = await manager.connect(laptop, "alice")
+
+    assert await manager.send_message("hello", "alice")
+    assert not await manager.send_message("hello", "bob")
+    await manager.channel_subscribe(phone_connection, SUBSCRIPTION)
+    assert await manager.broadcast_message("update", CHANNEL)
+    await _drain()
+    assert phone.sent[0] == "hello" and phone.sent[-1] == "update"
+    assert laptop.sent == ["hello"]
+
+    manager.disconnect(phone_connection)
+    assert CHANNEL not in manager.channels
+    assert manager.info()["connected_clients"] == {"alice": 1}
+
+    await manager.channel_subscribe(laptop_connection, SUBSCRIPTION)
+    await manager.channel_subscribe(laptop_connection, {**SUBSCRIPTION, "subpath": "/orders"})
+    assert list(manager.channels) == ["data:/orders:__ALL__:__ALL__:__ALL__"]
+    await manager.channel_unsubscribe(laptop_connection)
+    assert manager.channels == {}
+    manager.disconnect(laptop_connection)
+    assert manager.active_connections == {}
+
+
+@pytest.mark.anyio
+async def test_slow_consumer_is_evicted_without_holding_up_the_others():
+    manager = ConnectionManager(queue_size=2, send_timeout=60)
+    slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+    for websocket, user in ((slow, "slow"), (fast, "fast")):
+        await manager.channel_subscribe(await manager.connect(websocket, user), SUBSCRIPTION)
+    await _drain()
+
+    for index in range(5):
+        await manager.broadcast_message(f"m{index}", CHANNEL)
+        await _drain()
+
+    assert fast.sent[-5:] == [f"m{index}" for index in range(5)]
+    assert slow.closed_with == 1013
+    assert "slow" not in manager.active_connections
+    assert manager.info()["evicted"] == 1
+
+
+@pytest.mark.anyio
+async def test_send_timeout_evicts():
+    manager = ConnectionManager(queue_size=8, send_timeout=0.01)
+    stuck = FakeWebSocket(blocked=True)
+    await manager.connect(stuck, "stuck")
+    await manager.send_message("hello", "stuck")
+    await asyncio.sleep(0.05)
+    assert manager.connections == {}
+    assert stuck.closed_with == 1013
+
+
+@pytest.mark.anyio
+async def test_batched_broadcast_endpoint():
+    subscriber = FakeWebSocket()
+    connection = await websocket_manager.connect(subscriber, "carol")
+    await websocket_manager.channel_subscribe(connection, SUBSCRIPTION)
+    events = [
+        {"type": "notification_subscription", "channels": [CHANNEL, "other:/x:__ALL__:__ALL__:__ALL__"], "message": {"n": 1}},
+        {"type": "notification_subscription", "channels": ["other:/x:__ALL__:__ALL__:__ALL__"], "message": {"n": 2}},
+        {"type": "notification_subscription", "channels": [CHANNEL], "message": {"n": 3}},
+    ]
+    try:
+        with patch.object(websocket, "broker", LocalBroker(websocket_manager)):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://ws") as client:
+                response = await client.post("/broadcast", json={"events": events})
+        assert response.json()["message_sent"] is True
+        await _drain()
+        assert subscriber.sent[-2:] == [
+            '{"type": "notification_subscription", "message": {"n": 1}}',
+            '{"type": "notification_subscription", "message": {"n": 3}}',
+        ]
+    finally:
+        websocket_manager.disconnect(connection)
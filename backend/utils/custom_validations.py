@@ -3,9 +3,10 @@ from pathlib import Path as FSPath
 from typing import Any
 
 import aiofiles
-from jsonschema import Draft7Validator
+from jsonschema.exceptions import ValidationError
 
 from utils.helpers import csv_file_to_json
+from utils.schema_validators import schema_validators
 from utils.settings import settings
 
 
@@ -39,8 +40,11 @@ async def validate_jsonl_with_schema(
 
     async with aiofiles.open(file_path) as file:
         lines = await file.readlines()
-        for line in lines:
-            Draft7Validator(schema).validate(line)
+    _raise_first_failure(
+        schema_validators.validate_many(
+            space_name, schema_shortname, schema, (json.loads(line) for line in lines if line.strip())
+        )
+    )
 
 
 async def validate_csv_with_schema(
@@ -57,5 +61,9 @@ async def validate_csv_with_schema(
     schema = json.loads(FSPath(schema_path).read_text())  # noqa: ASYNC240
 
     jsonl: list[dict[str, Any]] = await csv_file_to_json(file_path)
-    for json_item in jsonl:
-        Draft7Validator(schema).validate(json_item)
+    _raise_first_failure(schema_validators.validate_many(space_name, schema_shortname, schema, jsonl))
+
+
+def _raise_first_failure(failures: list[tuple[int, ValidationError]]) -> None:
+    if failures:
+        raise failures[0][1]
@@ -0,0 +1,185 @@
+"""Sidecar offset/timestamp index for append-only JSONL logs (e.g. `.dm/events.jsonl`).
+
+The index lives next to the log as `<name>.idx` and holds one fixed-width
+entry (byte offset, line length, timestamp) per line, so a page of the log
+can be read by seeking instead of loading the whole file. It is brought up
+to date lazily: only the bytes appended since the last refresh are scanned,
+and it is rebuilt from scratch when the log is truncated or replaced.
+"""
+
+import fcntl
+import json
+import os
+import struct
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+_HEADER = struct.Struct("<8sQQ")  # magic, indexed log size, log inode
+_ENTRY = struct.Struct("<QId")  # line offset, line length, timestamp
+_MAGIC = b"DMJLIDX1"
+_READ_BLOCK = 1024 * 1024
+
+
+def _line_timestamp(line: bytes, timestamp_key: str, previous: float) -> float:
+    try:
+        return datetime.fromisoformat(json.loads(line)[timestamp_key]).timestamp()
+    except (ValueError, KeyError, TypeError):
+        # Keep the column monotonic so bisecting over it stays valid
+        return previous
+
+
+class JsonlIndex:
+    def __init__(self, log_path: Path, timestamp_key: str = "timestamp"):
+        self.log_path = log_path
+        self.index_path = log_path.with_name(f"{log_path.name}.idx")
+        self.timestamp_key = timestamp_key
+        self.count = 0
+        self.indexed_size = 0
+
+    def refresh(self) -> None:
+        """Index whatever was appended to the log since the last refresh"""
+        stat = self.log_path.stat()
+        # Not opened in append mode: pwrite() of the header must land at offset 0
+        with os.fdopen(os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as index_file:
+            fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                index_file.seek(0)
+                header = index_file.read(_HEADER.size)
+                indexed_size, last_ts = 0, 0.0
+                if len(header) == _HEADER.size:
+                    magic, indexed_size, inode = _HEADER.unpack(header)
+                    if magic != _MAGIC or inode != stat.st_ino or indexed_size > stat.st_size:
+                        indexed_size = 0
+                if indexed_size == 0:
+                    index_file.truncate(0)
+                    index_file.seek(0)
+                    index_file.write(_HEADER.pack(_MAGIC, 0, stat.st_ino))
+                else:
+                    index_file.seek(0, os.SEEK_END)
+                    if index_file.tell() > _HEADER.size:
+                        index_file.seek(-_ENTRY.size, os.SEEK_END)
+                        last_ts = _ENTRY.unpack(index_file.read(_ENTRY.size))[2]
+
+                if stat.st_size > indexed_size:
+                    indexed_size = self._append_entries(index_file, indexed_size, stat.st_size, last_ts)
+                    index_file.flush()
+                    # The header is only moved forward once the entries it covers are on disk
+                    os.pwrite(index_file.fileno(), _HEADER.pack(_MAGIC, indexed_size, stat.st_ino), 0)
+
+                index_file.seek(0, os.SEEK_END)
+                self.count = (index_file.tell() - _HEADER.size) // _ENTRY.size
+                self.indexed_size = indexed_size
+            finally:
+                fcntl.flock(index_file, fcntl.LOCK_UN)
+
+    def _append_entries(self, index_file, start: int, end: int, last_ts: float) -> int:
+        index_file.seek(0, os.SEEK_END)
+        position = start
+        with open(self.log_path, "rb") as log_file:
+            log_file.seek(start)
+            for line in log_file:
+                if position + len(line) > end:
+                    break
+                if not line.endswith(b"\n"):
+                    # A trailing line is indexed only once it is complete JSON,
+                    # otherwise it may still be in the middle of being written
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        break
+                if line.strip():
+                    last_ts = _line_timestamp(line, self.timestamp_key, last_ts)
+                    index_file.write(_ENTRY.pack(position, len(line.rstrip(b"\r\n")), last_ts))
+                position += len(line)
+        return position
+
+    def _entry(self, index_file, idx: int) -> tuple[int, int, float]:
+        index_file.seek(_HEADER.size + idx * _ENTRY.size)
+        offset, length, timestamp = _ENTRY.unpack(index_file.read(_ENTRY.size))
+        return offset, length, timestamp
+
+    def _bisect(self, index_file, timestamp: float, right: bool) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_ts = self._entry(index_file, mid)[2]
+            if mid_ts < timestamp or (right and mid_ts == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def date_range(self, from_date: datetime | None = None, to_date: datetime | None = None) -> tuple[int, int]:
+        """Line numbers [lo, hi) whose timestamp falls within [from_date, to_date]"""
+        if self.count == 0 or (from_date is None and to_date is None):
+            return 0, self.count
+        with open(self.index_path, "rb") as index_file:
+            lo = self._bisect(index_file, from_date.timestamp(), right=False) if from_date else 0
+            hi = self._bisect(index_file, to_date.timestamp(), right=True) if to_date else self.count
+        return lo, max(lo, hi)
+
+    def read_lines(self, start: int, end: int) -> list[str]:
+        """Lines [start, end) in file order, read with one seek per run of lines"""
+        if start >= end:
+            return []
+        with open(self.index_path, "rb") as index_file:
+            index_file.seek(_HEADER.size + start * _ENTRY.size)
+            entries = list(_ENTRY.iter_unpack(index_file.read((end - start) * _ENTRY.size)))
+        if not entries:
+            return []
+        first_offset = entries[0][0]
+        last_offset, last_length, _ = entries[-1]
+        with open(self.log_path, "rb") as log_file:
+            log_file.seek(first_offset)
+            block = log_file.read(last_offset + last_length - first_offset)
+        return [block[offset - first_offset : offset - first_offset + length].decode() for offset, length, _ in entries]
+
+    def iter_lines_reverse(self, start: int, end: int) -> Iterator[str]:
+        """Lines [start, end) from newest to oldest, read backwards in fixed-size blocks"""
+        if start >= end:
+            return
+        with open(self.index_path, "rb") as index_file:
+            span_start = self._entry(index_file, start)[0]
+            last_offset, last_length, _ = self._entry(index_file, end - 1)
+        position = last_offset + last_length
+        remainder = b""
+        with open(self.log_path, "rb") as log_file:
+            while position > span_start:
+                size = min(_READ_BLOCK, position - span_start)
+                position -= size
+                log_file.seek(position)
+                block = log_file.read(size) + remainder
+                lines = block.split(b"\n")
+                remainder = lines[0]
+                for line in reversed(lines[1:]):
+                    if line.strip():
+                        yield line.decode().rstrip("\r")
+            if remainder.strip():
+                yield remainder.decode().rstrip("\r")
+
+    def page(
+        self,
+        limit: int | None = None,
+        offset: int = 0,
+        search: str | None = None,
+        from_date: datetime | None = None,
+        to_date: datetime | None = None,
+    ) -> tuple[int, list[str]]:
+        """Newest-first page of the log, returns (total matching lines, page lines)"""
+        lo, hi = self.date_range(from_date, to_date)
+        if not search:
+            total = hi - lo
+            page_end = hi - offset
+            page_start = max(lo, page_end - limit) if limit is not None else lo
+            return total, list(reversed(self.read_lines(page_start, page_end)))
+
+        total = 0
+        result: list[str] = []
+        for line in self.iter_lines_reverse(lo, hi):
+            if search not in line:
+                continue
+            if total >= offset and (limit is None or len(result) < limit):
+                result.append(line)
+            total += 1
+        return total, result
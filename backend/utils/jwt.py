@@ -9,9 +9,14 @@ import models.api as api
 from data_adapters.adapter import data_adapter as db
 from utils.internal_error_code import InternalErrorCode
 from utils.settings import settings
+from utils.token_cache import token_cache
 
 
 def decode_jwt(token: str) -> dict[str, Any]:
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached.claims
+
     decoded_token: dict
     try:
         decoded_token = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
@@ -32,6 +37,7 @@ def decode_jwt(token: str) -> dict[str, Any]:
         )
 
     if isinstance(decoded_token["data"], dict) and decoded_token["data"].get("shortname") is not None:
+        token_cache.put(token, decoded_token["data"], decoded_token["expires"])
         return decoded_token["data"]
     else:
         raise api.Exception(
@@ -76,12 +82,15 @@ class JWTBearer:
             )
 
         if decoded["type"] != "bot" and settings.session_inactivity_ttl:
-            _, user_session_token = await db.get_user_session(user_shortname, auth_token)
-            if not isinstance(user_session_token, str):
-                raise api.Exception(
-                    status.HTTP_401_UNAUTHORIZED,
-                    api.Error(type="jwtauth", code=InternalErrorCode.NOT_AUTHENTICATED, message="Not authenticated [3]"),
-                )
+            cached = token_cache.peek(auth_token)
+            if cached is None or not cached.is_session_verified():
+                _, user_session_token = await db.get_user_session(user_shortname, auth_token)
+                if not isinstance(user_session_token, str):
+                    raise api.Exception(
+                        status.HTTP_401_UNAUTHORIZED,
+                        api.Error(type="jwtauth", code=InternalErrorCode.NOT_AUTHENTICATED, message="Not authenticated [3]"),
+                    )
+                token_cache.mark_session_verified(auth_token)
 
         return user_shortname
 
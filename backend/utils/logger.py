@@ -1,8 +1,11 @@
 import json
 import logging
+import logging.handlers
 import os
+import queue
 import re
 import socket
+from pydoc import locate
 
 from utils.settings import settings
 
@@ -101,6 +104,66 @@ class CustomFormatter(logging.Formatter):
             return json.dumps({"error": str(e), "message": record.getMessage()})
 
 
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room instead of failing on a full queue, so every queued record is written before stopping
+        self.queue.put(self._sentinel)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """Formats and writes records on a background thread.
+
+    The event loop only enqueues the record; `CustomFormatter` (JSON encoding,
+    `mask_sensitive_data_string`) and the actual write run on the listener's
+    thread through the wrapped handler. Filters (correlation id) still run on
+    the calling side. When the queue is full new records are dropped rather
+    than blocking the loop.
+    """
+
+    def __init__(self, handler_class: str, handler_args: dict | None = None, queue_size: int = 10000):
+        target_class = locate(handler_class)
+        if not isinstance(target_class, type) or not issubclass(target_class, logging.Handler):
+            raise ValueError(f"Unknown log handler class {handler_class}")
+        # Reading through the configurator's dict resolves its ext:// values
+        args = {key: handler_args[key] for key in handler_args} if handler_args else {}
+        self.target = target_class(**args)
+        self.dropped = 0
+        super().__init__(queue.Queue(maxsize=max(0, queue_size)))
+        self.listener = _QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Formatting is the target's job, on the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+
+def queued_handler(config: dict) -> dict:
+    """The dictConfig entry running the handler `config` describes behind a `QueueLogHandler`"""
+    queued: dict = {
+        "()": "utils.logger.QueueLogHandler",
+        "handler_class": config["class"],
+        "handler_args": {key: value for key, value in config.items() if key not in ("class", "filters", "formatter", "level")},
+        "queue_size": settings.log_queue_size,
+    }
+    queued.update({key: config[key] for key in ("filters", "formatter", "level") if key in config})
+    return queued
+
+
 logging_schema: dict = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -161,12 +224,14 @@ logging_schema: dict = {
 }
 
 
+if settings.log_queue:
+    logging_schema["handlers"] = {name: queued_handler(config) for name, config in logging_schema["handlers"].items()}
+
+
 def change_log_file(log_file: str | None = None) -> None:
     global logging_schema
-    if (
-        log_file
-        and "handlers" in logging_schema
-        and "file" in logging_schema["handlers"]
-        and "filename" in logging_schema["handlers"]["file"]
-    ):
-        logging_schema["handlers"]["file"]["filename"] = log_file
+    if log_file and "handlers" in logging_schema and "file" in logging_schema["handlers"]:
+        file_handler = logging_schema["handlers"]["file"]
+        file_handler = file_handler.get("handler_args", file_handler)
+        if "filename" in file_handler:
+            file_handler["filename"] = log_file
@@ -1,5 +1,10 @@
+import hashlib
+import hmac
+
 from argon2 import PasswordHasher
 
+from utils.settings import settings
+
 ph = PasswordHasher(memory_cost=102400, time_cost=3, parallelism=8)
 
 
@@ -12,3 +17,8 @@ def verify_password(plain_password: str, hashed_password: str):
 
 def hash_password(password: str):
     return ph.hash(password)
+
+
+def hash_session_token(token: str) -> str:
+    """Keyed digest of a session token, cheap enough to compute and look up on every request"""
+    return hmac.new(settings.jwt_secret.encode(), token.encode(), hashlib.sha256).hexdigest()
@@ -1,7 +1,6 @@
 import asyncio
 import os
 import sys
-import time
 from importlib.util import find_spec, module_from_spec
 from inspect import iscoroutine
 from pathlib import Path
@@ -41,26 +40,12 @@ class PluginManager:
 
     active_plugins: list[str] = []
 
-    # Short-lived cache for space lookups to avoid redundant Redis calls
-    # within the same request (before_action + after_action both fetch the same space)
-    _space_cache: dict[str, tuple[float, Any]] = {}
-    _SPACE_CACHE_TTL: float = 2.0  # seconds
-
-    @classmethod
-    async def _get_space_cached(cls, space_name: str) -> Any:
-        """Fetch space with a short TTL cache to avoid double-loading within a single request."""
-        now = time.monotonic()
-        cached = cls._space_cache.get(space_name)
-        if cached is not None:
-            ts, space = cached
-            if now - ts < cls._SPACE_CACHE_TTL:
-                return space
-
+    @staticmethod
+    async def _get_space(space_name: str) -> Any:
+        """Spaces come from the data adapter's metadata cache, so dispatching doesn't hit the DB"""
         from data_adapters.adapter import data_adapter as db
 
-        space = await db.fetch_space(space_name)
-        cls._space_cache[space_name] = (now, space)
-        return space
+        return await db.fetch_space(space_name)
 
     async def load_plugins(self, app: FastAPI, capture_body):
         # Load core plugins
@@ -186,16 +171,7 @@ class PluginManager:
         except Exception as e:
             logger.error(f"Plugin:{plugin_model}:{e!s}")
 
-    async def before_action(self, event: Event):
-        before_plugins = self._before_plugins.get(event.action_type)
-        if not before_plugins:
-            return
-
-        space = await self._get_space_cached(event.space_name)
-        if space is None:
-            return
-        space_plugins = space.active_plugins
-
+    async def _run_before_plugins(self, before_plugins: list[PluginWrapper], space_plugins: list, event: Event):
         for plugin_model in before_plugins:
             if (
                 plugin_model.shortname in space_plugins
@@ -213,16 +189,7 @@ class PluginManager:
                 except Exception as e:
                     logger.error(f"Plugin:{plugin_model}:{e!s}")
 
-    async def after_action(self, event: Event):
-        after_plugins = self._after_plugins.get(event.action_type)
-        if not after_plugins:
-            return
-
-        space = await self._get_space_cached(event.space_name)
-        if space is None:
-            return
-        space_plugins = space.active_plugins
-
+    async def _run_after_plugins(self, after_plugins: list[PluginWrapper], space_plugins: list, event: Event):
         loop = asyncio.get_running_loop()
         for plugin_model in after_plugins:
             if (
@@ -246,5 +213,54 @@ class PluginManager:
                 except Exception as e:
                     logger.error(f"Plugin:{plugin_model}:{e!s}")
 
+    async def before_action(self, event: Event):
+        before_plugins = self._before_plugins.get(event.action_type)
+        if not before_plugins:
+            return
+
+        space = await self._get_space(event.space_name)
+        if space is None:
+            return
+        await self._run_before_plugins(before_plugins, space.active_plugins, event)
+
+    async def after_action(self, event: Event):
+        after_plugins = self._after_plugins.get(event.action_type)
+        if not after_plugins:
+            return
+
+        space = await self._get_space(event.space_name)
+        if space is None:
+            return
+        await self._run_after_plugins(after_plugins, space.active_plugins, event)
+
+    async def _dispatch_many(self, events: list[Event], plugins_by_action: dict, run) -> dict[int, api.Exception]:
+        failures: dict[int, api.Exception] = {}
+        spaces: dict[str, Any] = {}
+        for index, event in enumerate(events):
+            plugins = plugins_by_action.get(event.action_type)
+            if not plugins:
+                continue
+            if event.space_name not in spaces:
+                spaces[event.space_name] = await self._get_space(event.space_name)
+            space = spaces[event.space_name]
+            if space is None:
+                continue
+            try:
+                await run(plugins, space.active_plugins, event)
+            except api.Exception as e:
+                failures[index] = e
+        return failures
+
+    async def before_action_many(self, events: list[Event]) -> dict[int, api.Exception]:
+        """`before_action` over a batch of events, resolving each space once.
+
+        Returns the api.Exception raised for each rejected event, keyed on its index.
+        """
+        return await self._dispatch_many(events, self._before_plugins, self._run_before_plugins)
+
+    async def after_action_many(self, events: list[Event]) -> dict[int, api.Exception]:
+        """`after_action` over a batch of events, see `before_action_many`"""
+        return await self._dispatch_many(events, self._after_plugins, self._run_after_plugins)
+
 
 plugin_manager = PluginManager()
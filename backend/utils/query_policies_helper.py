@@ -17,16 +17,19 @@ def generate_query_policies(
     if resource_type == ResourceType.folder and entry_shortname:
         subpath_parts.append(entry_shortname)
 
+    # Besides the full policies, the `<space>:<subpath>:<type>` and `<space>:<subpath>:<type>:<active>`
+    # prefixes are stored as tokens of their own, so the `<perm_key>:*` and `<perm_key>:true:*`
+    # policies of users compile to exact array overlaps (see `query_policy_tokens`)
     query_policies: list = []
     full_subpath = ""
     for subpath_part in subpath_parts:
         full_subpath += subpath_part
+        query_policies.append(f"{space_name}:{full_subpath.strip('/')}:{resource_type}")
+        query_policies.append(f"{space_name}:{full_subpath.strip('/')}:{resource_type}:{str(is_active).lower()}")
         query_policies.append(
             f"{space_name}:{full_subpath.strip('/')}:{resource_type}:{str(is_active).lower()}:{owner_shortname}"
         )
-        if owner_group_shortname is None:
-            query_policies.append(f"{space_name}:{full_subpath.strip('/')}:{resource_type}:{str(is_active).lower()}")
-        else:
+        if owner_group_shortname is not None:
             query_policies.append(
                 f"{space_name}:{full_subpath.strip('/')}:{resource_type}:{str(is_active).lower()}:{owner_group_shortname}"
             )
@@ -36,6 +39,7 @@ def generate_query_policies(
             subpath_with_magic_keyword = "/".join(full_subpath_parts[:1]) + "/" + settings.all_subpaths_mw
             if len(full_subpath_parts) > 2:
                 subpath_with_magic_keyword += "/" + "/".join(full_subpath_parts[2:])
+            query_policies.append(f"{space_name}:{subpath_with_magic_keyword.strip('/')}:{resource_type}")
             query_policies.append(
                 f"{space_name}:{subpath_with_magic_keyword.strip('/')}:{resource_type}:{str(is_active).lower()}"
             )
@@ -48,6 +52,37 @@ def generate_query_policies(
     return query_policies
 
 
+def generate_acl_principals(acl: list | None) -> list[str]:
+    """Users granted `query` by the entry's ACL, stored alongside it for an indexed lookup"""
+    principals: list[str] = []
+    for item in acl or []:
+        if not isinstance(item, dict):
+            item = item.model_dump() if hasattr(item, "model_dump") else {}
+        user_shortname = item.get("user_shortname")
+        if user_shortname and "query" in (item.get("allowed_actions") or []) and user_shortname not in principals:
+            principals.append(user_shortname)
+    return principals
+
+
+def query_policy_tokens(user_query_policies: list) -> tuple[list[str], list[str]]:
+    """Split user query policies into exact tokens for `query_policies && ARRAY[...]`
+    and the leftover LIKE patterns that have a wildcard anywhere but the end"""
+    tokens: list[str] = []
+    like_patterns: list[str] = []
+    for item in user_query_policies:
+        for part in str(item).split("|"):
+            part = part.strip()
+            if not part:
+                continue
+            token = part.removesuffix(":*")
+            if "*" in token:
+                if (pattern := part.replace("*", "%")) not in like_patterns:
+                    like_patterns.append(pattern)
+            elif token not in tokens:
+                tokens.append(token)
+    return tokens, like_patterns
+
+
 def matches_subpath(perm_key: str, space_name: str, query_subpath: str) -> bool:
     if not perm_key.startswith(f"{space_name}:"):
         return False
@@ -0,0 +1,224 @@
+"""Fan-out of realtime messages across websocket/webtransport server instances.
+
+Connections and channel subscriptions live in the memory of the instance the
+client is connected to. The broker is what `/send-message`,
+`/broadcast-to-channels` and `/broadcast` go through: it delivers to this
+instance's connections and, for a distributed broker, publishes the message
+for every other instance to deliver to theirs.
+
+`settings.realtime_broker` picks the implementation: `postgres` (the
+default, Postgres LISTEN/NOTIFY) or `local` (a single instance). The
+websocket and webtransport servers have separate clients, so each publishes
+on its own channel: `realtime_broker_channel` and
+`realtime_broker_channel` + "_wt".
+"""
+
+import asyncio
+import contextlib
+import json
+from collections import OrderedDict
+from typing import Any, Protocol
+from uuid import uuid4
+
+from fastapi.logger import logger
+
+from utils.settings import settings
+
+# NOTIFY payloads are limited to 8000 bytes, larger messages are sent in parts
+NOTIFY_PART_SIZE = 7500
+MAX_PARTIAL_MESSAGES = 1000
+
+
+class RealtimeManager(Protocol):
+    async def send_message(self, message: str, user_shortname: str) -> bool: ...
+
+    async def broadcast_message(self, message: str, channel_name: str) -> bool: ...
+
+
+class LocalBroker:
+    """Delivers to the connections of this instance only"""
+
+    name = "local"
+
+    def __init__(self, manager: RealtimeManager):
+        self.manager = manager
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, message: dict) -> bool:
+        return await self.deliver(message)
+
+    async def deliver(self, message: dict) -> bool:
+        """Hand a published message to the local connections, True if any of them was a target"""
+        if message["kind"] == "user":
+            return bool(await self.manager.send_message(message["message"], message["user_shortname"]))
+        is_sent = False
+        for event in message["events"]:
+            for channel_name in event["channels"]:
+                is_sent = bool(await self.manager.broadcast_message(event["message"], channel_name)) or is_sent
+        return is_sent
+
+    async def send_message(self, message: str, user_shortname: str) -> bool:
+        return await self.publish({"kind": "user", "user_shortname": user_shortname, "message": message})
+
+    async def broadcast(self, events: list[tuple[str, list[str]]]) -> bool:
+        """Publish (formatted message, channels) pairs"""
+        return await self.publish(
+            {"kind": "broadcast", "events": [{"message": message, "channels": channels} for message, channels in events]}
+        )
+
+
+def _notify_parts(data: str) -> list[str]:
+    """Split `data` into parts that stay within NOTIFY_PART_SIZE once JSON-encoded in their envelope"""
+    parts = []
+    start = 0
+    while start < len(data):
+        end = min(start + NOTIFY_PART_SIZE, len(data))
+        # Quotes and backslashes (every escape of the message itself) take two characters in the envelope
+        while (excess := len(json.dumps(data[start:end])) - 2 - NOTIFY_PART_SIZE) > 0:
+            end -= (excess + 1) // 2
+        parts.append(data[start:end])
+        start = end
+    return parts
+
+
+def _message(data: str) -> dict | None:
+    message = json.loads(data)
+    return message if isinstance(message, dict) else None
+
+
+class PostgresBroker(LocalBroker):
+    """Publishes with NOTIFY on `settings.realtime_broker_channel`, every instance LISTENs.
+
+    The publishing instance delivers to its own connections right away and
+    ignores its own notifications.
+    """
+
+    name = "postgres"
+
+    def __init__(self, manager: RealtimeManager, channel: str | None = None):
+        super().__init__(manager)
+        self.channel = channel or settings.realtime_broker_channel
+        self.instance_id = uuid4().hex
+        self._listener: asyncio.Task | None = None
+        self._publisher: Any = None
+        self._publisher_lock = asyncio.Lock()
+        self._partial: OrderedDict[str, list[str | None]] = OrderedDict()
+
+    async def _connect(self) -> Any:
+        import psycopg
+
+        return await psycopg.AsyncConnection.connect(
+            host=settings.database_host,
+            port=settings.database_port,
+            user=settings.database_username,
+            password=settings.database_password,
+            dbname=settings.database_name,
+            autocommit=True,
+        )
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        if self._publisher is not None:
+            with contextlib.suppress(Exception):
+                await self._publisher.close()
+            self._publisher = None
+
+    def envelopes(self, message: dict) -> list[str]:
+        """The NOTIFY payloads carrying `message`"""
+        data = json.dumps(message)
+        message_id = uuid4().hex
+        parts = _notify_parts(data) or [""]
+        return [
+            json.dumps(
+                {
+                    "channel": self.channel,
+                    "instance": self.instance_id,
+                    "id": message_id,
+                    "part": index,
+                    "parts": len(parts),
+                    "data": part,
+                }
+            )
+            for index, part in enumerate(parts)
+        ]
+
+    def receive(self, payload: str) -> dict | None:
+        """The message completed by this NOTIFY payload, None while parts are missing or when it's our own"""
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            return None
+        if not isinstance(envelope, dict) or envelope.get("instance") == self.instance_id:
+            return None
+        if envelope.get("channel") != self.channel:
+            # Another server's messages (websocket vs webtransport), its clients aren't ours
+            return None
+        if envelope["parts"] == 1:
+            return _message(envelope["data"])
+
+        parts = self._partial.setdefault(envelope["id"], [None] * envelope["parts"])
+        parts[envelope["part"]] = envelope["data"]
+        while len(self._partial) > MAX_PARTIAL_MESSAGES:
+            self._partial.popitem(last=False)
+        if any(part is None for part in parts):
+            return None
+        del self._partial[envelope["id"]]
+        return _message("".join(part or "" for part in parts))
+
+    async def publish(self, message: dict) -> bool:
+        is_sent = await self.deliver(message)
+        payloads = self.envelopes(message)
+        async with self._publisher_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None or self._publisher.closed:
+                        self._publisher = await self._connect()
+                    # One transaction keeps the parts of a message in order
+                    async with self._publisher.transaction():
+                        for payload in payloads:
+                            await self._publisher.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                    return True
+                except Exception as e:
+                    self._publisher = None
+                    if attempt:
+                        print("[!realtime_broker]", e)
+                        logger.error(f"Failed publishing a realtime message. Error: {e}")
+        return is_sent
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                async with await self._connect() as conn:
+                    await conn.execute(f'LISTEN "{self.channel}"')
+                    delay = 1.0
+                    async for notification in conn.notifies():
+                        message = self.receive(notification.payload)
+                        if message is not None:
+                            await self.deliver(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Realtime broker listener disconnected, retrying in {delay}s. Error: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+def create_broker(manager: RealtimeManager, channel: str | None = None) -> LocalBroker:
+    """The broker of one realtime server, each server (websocket, webtransport) needs its own `channel`"""
+    if settings.realtime_broker == "postgres" and settings.database_driver.startswith("postgresql"):
+        return PostgresBroker(manager, channel)
+    return LocalBroker(manager)
@@ -0,0 +1,186 @@
+"""Batched delivery of realtime update events to the websocket/webtransport servers.
+
+The realtime_updates_notifier plugins used to open a new HTTP client and POST
+one `/broadcast-to-channels` request per event. Events are now buffered per
+worker, identical ones coalesced, and sent in batches to the server's
+`/broadcast` endpoint over one long-lived keep-alive session.
+"""
+
+import asyncio
+import contextlib
+import json
+from collections import OrderedDict
+from functools import lru_cache
+
+import aiohttp
+
+from models.core import Event
+from utils.settings import settings
+
+ALL_MKW = "__ALL__"
+
+
+@lru_cache(maxsize=4096)
+def event_channels(
+    space_name: str, subpath: str, schema_shortname: str | None, action_type: str, state: str
+) -> tuple[str, ...]:
+    """The channels an event is published to.
+
+    For subpath `parent/child` that is the channels of `/parent` and
+    `/parent/child`, each with and without the `__ALL__` magic word.
+    """
+    channels: list[str] = []
+    current = ""
+    for subpath_part in subpath.split("/"):
+        if not subpath_part:
+            continue
+        current += f"/{subpath_part}"
+        schemas = [ALL_MKW, schema_shortname] if schema_shortname else [ALL_MKW]
+        for schema in schemas:
+            channels.extend(
+                [
+                    f"{space_name}:{current}:{schema}:{action_type}:{state}",
+                    f"{space_name}:{current}:{schema}:{ALL_MKW}:{state}",
+                    f"{space_name}:{current}:{schema}:{action_type}:{ALL_MKW}",
+                    f"{space_name}:{current}:{schema}:{ALL_MKW}:{ALL_MKW}",
+                ]
+            )
+    return tuple(dict.fromkeys(channels))
+
+
+def update_event(data: Event) -> dict:
+    """The `/broadcast` event announcing `data` to its channels' subscribers"""
+    return {
+        "type": "notification_subscription",
+        "channels": list(
+            event_channels(
+                data.space_name,
+                data.subpath,
+                data.schema_shortname,
+                str(data.action_type),
+                data.attributes.get("state", ALL_MKW),
+            )
+        ),
+        "message": {
+            "title": "updated",
+            "subpath": data.subpath,
+            "space": data.space_name,
+            "shortname": data.shortname,
+            "action_type": data.action_type,
+            "owner_shortname": data.user_shortname,
+        },
+    }
+
+
+class BroadcastPublisher:
+    """Per-worker buffer of events for one realtime server.
+
+    `publish` never waits on the network: events are queued, an event identical
+    to a queued one only adds its channels, and a background task posts them in
+    batches. When the server can't keep up the buffer fills and new events are
+    dropped.
+    """
+
+    def __init__(self, url: str, batch_size: int, flush_interval: float, buffer_size: int):
+        self.url = url
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.buffer_size = max(1, buffer_size)
+        self._pending: OrderedDict[str, dict] = OrderedDict()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def publish(self, event: dict) -> None:
+        key = json.dumps([event["type"], event["message"]], sort_keys=True, default=str)
+        queued = self._pending.get(key)
+        if queued is not None:
+            queued["channels"] = list(dict.fromkeys([*queued["channels"], *event["channels"]]))
+            self.coalesced += 1
+            return
+        if len(self._pending) >= self.buffer_size:
+            self.dropped += 1
+            return
+        self._pending[key] = {**event, "channels": list(event["channels"])}
+        self._ensure_flusher()
+        self._wakeup.set()
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop (tests, worker restart): what belonged to the old one is unusable
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._flusher = None
+            self._session = None
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if len(self._pending) < self.batch_size:
+                # Give the burst a moment to fill the batch and coalesce
+                await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Post one batch of the queued events"""
+        batch = [self._pending.popitem(last=False)[1] for _ in range(min(self.batch_size, len(self._pending)))]
+        if not batch:
+            return
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        try:
+            async with self._session.post(f"{self.url}/broadcast", json={"events": batch}) as response:
+                response.raise_for_status()
+            self.sent += len(batch)
+        except Exception as e:
+            print("[!realtime_events]", self.url, e)
+            self.failed += len(batch)
+
+    async def close(self) -> None:
+        """Send what is still queued and release the session"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        while self._pending:
+            await self.flush()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+_publishers: dict[str, BroadcastPublisher] = {}
+
+
+def publisher(url: str) -> BroadcastPublisher:
+    """The worker's publisher for the realtime server at `url`"""
+    if url not in _publishers:
+        _publishers[url] = BroadcastPublisher(
+            url, settings.realtime_batch_size, settings.realtime_flush_interval, settings.realtime_buffer_size
+        )
+    return _publishers[url]
+
+
+async def close_publishers() -> None:
+    for url_publisher in _publishers.values():
+        await url_publisher.close()
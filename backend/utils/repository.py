@@ -5,6 +5,7 @@ import re
 import shutil
 import subprocess
 import sys
+from collections.abc import AsyncGenerator
 from pathlib import Path
 from typing import Any
 from uuid import uuid4
@@ -15,7 +16,7 @@ import models.api as api
 import models.core as core
 import utils.regex as regex
 from data_adapters.adapter import data_adapter as db
-from models.enums import ContentType, Language
+from models.enums import ContentType, Language, QueryType
 from utils.helpers import (
     camel_case,
     jq_dict_parser,
@@ -108,6 +109,21 @@ async def serve_query(query: api.Query, logged_in_user: str) -> tuple[int, list[
     return total, records
 
 
+async def serve_query_batches(query: api.Query, logged_in_user: str) -> AsyncGenerator[list[core.Record], None]:
+    """The records of `query` in batches, read through a server-side cursor when the query allows it.
+
+    `jq_filter` and `join` need the whole result, those queries are served in one batch.
+    """
+    if query.type not in [QueryType.search, QueryType.subpath] or query.jq_filter or query.join:
+        _, records = await serve_query(query, logged_in_user)
+        if records:
+            yield records
+        return
+
+    async for records in db.stream_query(query, logged_in_user):
+        yield records
+
+
 async def get_last_updated_entry(
     space_name: str,
     schema_names: list,
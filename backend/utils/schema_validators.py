@@ -0,0 +1,111 @@
+"""Per-worker registry of compiled JSON schema validators.
+
+Validating a payload used to build a new `Draft7Validator` (and, through
+`get_schema`, re-resolve every `$ref`) on each create/update. Validators are
+now built once per (space, schema shortname, digest of the schema body) and
+reused. The digest is taken from the body being validated against, not the
+stored `payload.checksum` (not every write path recomputes that), so an
+edited schema never hits a validator compiled from its previous body, even
+when the edit was made on another worker or outside the API.
+"""
+
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import ValidationError, best_match
+
+from utils.helpers import resolve_schema_references
+from utils.settings import settings
+
+ValidatorKey = tuple[str, str, str]  # space_name, schema_shortname, schema_checksum(schema)
+
+
+def schema_checksum(schema: dict) -> str:
+    """Same digest `core.Payload` stores for a dict body"""
+    return hashlib.sha256(json.dumps(schema).encode("utf-8")).hexdigest()
+
+
+class CompiledSchema:
+    def __init__(self, schema: dict):
+        self.validator = Draft7Validator(schema)
+        self._schema = schema
+        self._resolved: dict | None = None
+
+    @property
+    def resolved(self) -> dict:
+        """The schema with its `$ref`s inlined, resolved on first use"""
+        if self._resolved is None:
+            self._resolved = resolve_schema_references(copy.deepcopy(self._schema))
+        return self._resolved
+
+
+class SchemaValidatorRegistry:
+    """Bounded LRU of compiled schemas"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[ValidatorKey, CompiledSchema] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compiled(self, space_name: str, schema_shortname: str, schema: dict) -> CompiledSchema:
+        key = (space_name, schema_shortname, schema_checksum(schema))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        # The validator keeps a reference to the schema, don't share the caller's dict
+        entry = CompiledSchema(copy.deepcopy(schema))
+        if self.max_size > 0:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def validator(self, space_name: str, schema_shortname: str, schema: dict) -> Draft7Validator:
+        return self.compiled(space_name, schema_shortname, schema).validator
+
+    def resolved_schema(self, space_name: str, schema_shortname: str, schema: dict) -> dict:
+        """A copy of the `$ref` resolved schema, see `utils.helpers.resolve_schema_references`"""
+        return copy.deepcopy(self.compiled(space_name, schema_shortname, schema).resolved)
+
+    def validate_many(
+        self,
+        space_name: str,
+        schema_shortname: str,
+        schema: dict,
+        items: Iterable[Any],
+    ) -> list[tuple[int, ValidationError]]:
+        """Validate every item against one compiled schema, returns (index, error) of the invalid ones.
+
+        The error is the one `Draft7Validator.validate` would have raised for the item.
+        """
+        validator = self.validator(space_name, schema_shortname, schema)
+        failures: list[tuple[int, ValidationError]] = []
+        for index, item in enumerate(items):
+            error = best_match(validator.iter_errors(item))
+            if error is not None:
+                failures.append((index, error))
+        return failures
+
+    def invalidate(self, space_name: str, schema_shortname: str) -> None:
+        """Drop every compiled version of a schema, frees memory after an edit"""
+        for key in list(self._entries):
+            if key[0] == space_name and key[1] == schema_shortname:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+schema_validators = SchemaValidatorRegistry(settings.schema_validator_cache_size)
@@ -44,6 +44,13 @@ class Settings(BaseSettings):
     app_name: str = "dmart"
     websocket_url: str = ""  # "http://127.0.0.1:8484"
     websocket_port: int = 8484
+    websocket_send_queue_size: int = 256  # messages waiting per websocket before the client is evicted as too slow
+    websocket_send_timeout: float = 10.0  # seconds one websocket send may take before the client is evicted
+    realtime_batch_size: int = 200  # update events posted per /broadcast request to the websocket/webtransport server
+    realtime_flush_interval: float = 0.05  # seconds update events are held to fill a batch
+    realtime_buffer_size: int = 10000  # update events queued per worker before new ones are dropped
+    realtime_broker: str = "postgres"  # "postgres" fans websocket/webtransport messages out to every instance, "local" for one instance
+    realtime_broker_channel: str = "dmart_realtime"  # Postgres NOTIFY channel of the websocket server, the webtransporter adds "_wt"
     webtransport_port: int = 8585
     base_path: str = ""
     debug_enabled: bool = False
@@ -51,6 +58,10 @@ class Settings(BaseSettings):
     log_handlers: list[str] = ["file"]
     log_file: str = "../logs/dmart.ljson.log"
     ws_log_file: str = "../logs/websocket.ljson.log"
+    log_queue: bool = True  # format (JSON, masking) and write log records on a background thread
+    log_queue_size: int = 10000  # log records waiting for the background thread before new ones are dropped
+    log_response_body_max_kb: int = 16  # first KBs of JSON response bodies kept for the access log, 0 logs none
+    log_response_body_sample_rate: float = 0.0  # fraction of requests whose whole JSON response body is logged
     jwt_secret: str = "".join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32))
     jwt_algorithm: str = "HS256"
     jwt_access_expires: int = 30 * 86400  # 30 days
@@ -105,6 +116,19 @@ class Settings(BaseSettings):
     session_inactivity_ttl: int = (
         0  # Set initially to 0 to disable session timeout. Possible value : 60 * 60 * 24 * 7  # 7 days
     )
+    token_cache_size: int = 10000  # Decoded JWTs kept per worker, 0 disables the cache
+    token_cache_session_ttl: int = 30  # secs a verified session is trusted before hitting the DB again
+    search_plan_cache_size: int = 512  # Compiled search expressions kept per worker, 0 disables the cache
+    metadata_cache_size: int = 4096  # Space/folder/schema metas kept per worker, 0 disables the cache
+    metadata_cache_ttl: int = 300  # secs a cached meta is trusted, covers changes made outside the API
+    schema_validator_cache_size: int = 256  # Compiled JSON schema validators kept per worker, 0 disables the cache
+    bulk_write_min_records: int = 10  # requests with this many records use the batched write path, 0 disables it
+    query_stream_batch_size: int = 1000  # rows fetched per round trip when streaming exports (CSV)
+    import_workers: int = 4  # parallel directory readers of json_to_db / import
+    import_batch_size: int = 2000  # rows per COPY of json_to_db / import
+    payload_indexes_enabled: bool = True  # build expression indexes for folders' payload index_attributes
+    payload_indexes_refresh_interval: int = 60  # seconds between re-reading the payload indexes catalog
+    media_stream_chunk_size: int = 1024 * 1024  # bytes read from the DB per query when streaming media
     request_timeout: int = 35  # In seconds the time of dmart requests.
     jq_timeout: int = 2  # secs
     is_sha_required: bool = False
@@ -0,0 +1,96 @@
+"""Per-worker cache of decoded JWT claims and session validity"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from utils.password_hashing import hash_session_token
+from utils.settings import settings
+
+
+@dataclass
+class TokenCacheEntry:
+    shortname: str
+    claims: dict[str, Any]
+    expires: float
+    session_verified_until: float = 0.0
+
+    def is_session_verified(self) -> bool:
+        return self.session_verified_until > time.monotonic()
+
+
+class TokenCache:
+    """Bounded LRU keyed on the token digest.
+
+    Holds the claims returned by `decode_jwt` until the token expires, and a
+    "session verified until" stamp so repeated requests within
+    `settings.token_cache_session_ttl` skip the sessions table round trip.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, TokenCacheEntry] = OrderedDict()
+        self._user_keys: dict[str, set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> TokenCacheEntry | None:
+        if self.max_size <= 0:
+            return None
+        key = hash_session_token(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires <= time.time():
+            self._discard(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, token: str) -> TokenCacheEntry | None:
+        """Look up an entry without touching the counters or the LRU order"""
+        return self._entries.get(hash_session_token(token)) if self.max_size > 0 else None
+
+    def put(self, token: str, claims: dict[str, Any], expires: float) -> None:
+        if self.max_size <= 0:
+            return
+        key = hash_session_token(token)
+        if key in self._entries:
+            self._discard(key)
+        self._entries[key] = TokenCacheEntry(shortname=claims["shortname"], claims=claims, expires=expires)
+        self._user_keys.setdefault(claims["shortname"], set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._discard(next(iter(self._entries)))
+
+    def mark_session_verified(self, token: str) -> None:
+        entry = self._entries.get(hash_session_token(token))
+        if entry is not None:
+            entry.session_verified_until = time.monotonic() + settings.token_cache_session_ttl
+
+    def invalidate_user(self, shortname: str) -> None:
+        for key in self._user_keys.pop(shortname, set()):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._user_keys.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._user_keys.get(entry.shortname)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[entry.shortname]
+
+
+token_cache = TokenCache(settings.token_cache_size)
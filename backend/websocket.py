@@ -1,7 +1,7 @@
 #!/usr/bin/env -S BACKEND_ENV=config.env python3
 import asyncio
 import json
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import Any, cast
 
 from fastapi import Body, FastAPI, WebSocket, WebSocketDisconnect, status
@@ -13,55 +13,138 @@ from hypercorn.config import Config
 from models.enums import Status as ResponseStatus
 from utils.jwt import decode_jwt
 from utils.logger import change_log_file, logging_schema
+from utils.realtime_broker import create_broker
 from utils.settings import settings
 
 all_MKW = "__ALL__"
 
 
-class ConnectionManager:
-    def __init__(self) -> None:
-        self.active_connections: dict[str, WebSocket] = {}
-        # item => channel_name: list_of_subscribed_clients
-        self.channels: dict[str, list[str]] = {}
+class Connection:
+    """One websocket of a user.
 
-    async def connect(self, websocket: WebSocket, user_shortname: str):
-        await websocket.accept()
-        self.active_connections[user_shortname] = websocket
+    Messages are queued and written by the connection's own sender task, so a
+    slow client only ever holds up itself.
+    """
 
-    def disconnect(self, user_shortname: str):
-        del self.active_connections[user_shortname]
+    def __init__(self, websocket: WebSocket, user_shortname: str, queue_size: int):
+        self.websocket = websocket
+        self.user_shortname = user_shortname
+        self.channels: set[str] = set()
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max(1, queue_size))
+        self.sender: asyncio.Task | None = None
 
-    async def send_message(self, message: str, user_shortname: str):
-        if user_shortname in self.active_connections:
-            await self.active_connections[user_shortname].send_text(message)
+    def enqueue(self, message: str) -> bool:
+        """Queue `message` without waiting, False when the client is too far behind"""
+        try:
+            self.queue.put_nowait(message)
             return True
+        except asyncio.QueueFull:
+            return False
+
+
+class ConnectionManager:
+    """Registry of the connected websockets and their channel subscriptions.
+
+    Connections are indexed by websocket, by user (one per device) and by
+    channel so every lookup is O(1). Sending only queues the message on each
+    target connection; a connection whose queue is full or whose send times out
+    is evicted.
+    """
+
+    def __init__(self, queue_size: int | None = None, send_timeout: float | None = None) -> None:
+        self.queue_size = settings.websocket_send_queue_size if queue_size is None else queue_size
+        self.send_timeout = settings.websocket_send_timeout if send_timeout is None else send_timeout
+        self.connections: dict[WebSocket, Connection] = {}
+        self.active_connections: dict[str, set[Connection]] = {}
+        # item => channel_name: subscribed connections
+        self.channels: dict[str, set[Connection]] = {}
+        self.evicted = 0
+        self._closing: set[asyncio.Task] = set()
+
+    async def connect(self, websocket: WebSocket, user_shortname: str) -> Connection:
+        await websocket.accept()
+        return self.register(websocket, user_shortname)
+
+    def register(self, websocket: WebSocket, user_shortname: str) -> Connection:
+        connection = Connection(websocket, user_shortname, self.queue_size)
+        self.connections[websocket] = connection
+        self.active_connections.setdefault(user_shortname, set()).add(connection)
+        connection.sender = asyncio.create_task(self._send_queued(connection))
+        return connection
+
+    def disconnect(self, connection: Connection) -> None:
+        if self.connections.pop(connection.websocket, None) is None:
+            return
+        self.remove_all_subscriptions(connection)
+        devices = self.active_connections.get(connection.user_shortname)
+        if devices is not None:
+            devices.discard(connection)
+            if not devices:
+                del self.active_connections[connection.user_shortname]
+        if connection.sender is not None and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+
+    def evict(self, connection: Connection, reason: str) -> None:
+        """Drop a client that can't keep up, its socket is closed in the background"""
+        if connection.websocket not in self.connections:
+            return
+        logger.warning(f"Evicting a slow websocket client: {reason}", extra={"user_shortname": connection.user_shortname})
+        self.evicted += 1
+        self.disconnect(connection)
+        closing = asyncio.create_task(self._close(connection.websocket))
+        self._closing.add(closing)
+        closing.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket) -> None:
+        with suppress(Exception):
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    async def _send_queued(self, connection: Connection) -> None:
+        while True:
+            message = await connection.queue.get()
+            try:
+                async with asyncio.timeout(self.send_timeout):
+                    await connection.websocket.send_text(message)
+            except TimeoutError:
+                self.evict(connection, "send timed out")
+                return
+            except Exception as e:
+                logger.info(f"Websocket send failed: {e}", extra={"user_shortname": connection.user_shortname})
+                self.disconnect(connection)
+                return
 
-        return False
+    def _deliver(self, message: str, connections: list[Connection]) -> bool:
+        for connection in connections:
+            if not connection.enqueue(message):
+                self.evict(connection, "send queue is full")
+        return bool(connections)
+
+    def send_to_connection(self, message: str, connection: Connection) -> bool:
+        return self._deliver(message, [connection])
+
+    async def send_message(self, message: str, user_shortname: str):
+        return self._deliver(message, list(self.active_connections.get(user_shortname, ())))
 
     async def broadcast_message(self, message: str, channel_name: str):
         if channel_name not in self.channels:
             return False
 
-        for user_shortname in self.channels[channel_name]:
-            await self.send_message(message, user_shortname)
+        return self._deliver(message, list(self.channels[channel_name]))
 
-        return True
+    def remove_all_subscriptions(self, connection: Connection):
+        for channel_name in connection.channels:
+            subscribers = self.channels.get(channel_name)
+            if subscribers is None:
+                continue
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.channels[channel_name]
+        connection.channels.clear()
 
-    def remove_all_subscriptions(self, username: str):
-        updated_channels: dict[str, list[str]] = {}
-        for channel_name, users in self.channels.items():
-            if username in users:
-                users.remove(username)
-            updated_channels[channel_name] = users
-        self.channels = updated_channels
-
-    async def channel_unsubscribe(self, websocket: WebSocket):
-        connections_usernames = list(self.active_connections.keys())
-        connections = list(self.active_connections.values())
-        username = connections_usernames[connections.index(websocket)]
-        self.remove_all_subscriptions(username)
+    async def channel_unsubscribe(self, connection: Connection):
+        self.remove_all_subscriptions(connection)
         subscribed_message = json.dumps({"type": "notification_unsubscribe", "message": {"status": "success"}})
-        await self.send_message(subscribed_message, username)
+        self.send_to_connection(subscribed_message, connection)
 
     def generate_channel_name(self, msg: dict):
         if not {"space_name", "subpath"}.issubset(msg):
@@ -73,35 +156,44 @@ class ConnectionManager:
         ticket_state = msg.get("ticket_state", all_MKW)
         return f"{space_name}:{subpath}:{schema_shortname}:{action_type}:{ticket_state}"
 
-    async def channel_subscribe(self, websocket: WebSocket, msg_json: dict):
+    async def channel_subscribe(self, connection: Connection, msg_json: dict):
         channel_name = self.generate_channel_name(msg_json)
         if not channel_name:
             return False
 
-        self.channels.setdefault(channel_name, [])
-
-        connections_usernames = list(self.active_connections.keys())
-        connections = list(self.active_connections.values())
-        username = connections_usernames[connections.index(websocket)]
-        self.remove_all_subscriptions(username)
-        self.channels[channel_name].append(username)
+        # A device follows one channel at a time, other devices of the user keep theirs
+        self.remove_all_subscriptions(connection)
+        self.channels.setdefault(channel_name, set()).add(connection)
+        connection.channels.add(channel_name)
 
         subscribed_message = json.dumps({"type": "notification_subscription", "message": {"status": "success"}})
-        await self.send_message(subscribed_message, username)
+        self.send_to_connection(subscribed_message, connection)
+        return True
+
+    def info(self) -> dict:
+        return {
+            "connected_clients": {user: len(devices) for user, devices in self.active_connections.items()},
+            "connections": len(self.connections),
+            "channels": {channel_name: len(subscribers) for channel_name, subscribers in self.channels.items()},
+            "evicted": self.evicted,
+        }
 
 
 websocket_manager = ConnectionManager()
+broker = create_broker(websocket_manager)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up")
     print('{"stage":"starting up"}')
+    await broker.start()
 
     yield
 
     logger.info("Application shutting down")
     print('{"stage":"shutting down"}')
+    await broker.stop()
 
 
 app = FastAPI(
@@ -118,16 +210,12 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
 
     user_shortname = decoded_token["shortname"]
     try:
-        await websocket_manager.connect(websocket, user_shortname)
+        connection = await websocket_manager.connect(websocket, user_shortname)
     except Exception as e:
         return status.HTTP_500_INTERNAL_SERVER_ERROR, [], str(e.__str__()).encode()
 
     success_connection_message = json.dumps({"type": "connection_response", "message": {"status": "success"}})
-
-    try:
-        await websocket_manager.send_message(success_connection_message, user_shortname)
-    except Exception as e:
-        return status.HTTP_500_INTERNAL_SERVER_ERROR, [], str(e.__str__()).encode()
+    websocket_manager.send_to_connection(success_connection_message, connection)
 
     try:
         while True:
@@ -135,46 +223,52 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
                 msg = await websocket.receive_text()
                 msg_json = json.loads(msg)
                 if "type" in msg_json and msg_json["type"] == "notification_subscription":
-                    await websocket_manager.channel_subscribe(websocket, msg_json)
+                    await websocket_manager.channel_subscribe(connection, msg_json)
                 if "type" in msg_json and msg_json["type"] == "notification_unsubscribe":
-                    await websocket_manager.channel_unsubscribe(websocket)
+                    await websocket_manager.channel_unsubscribe(connection)
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 logger.error(f"Error while processing message: {e.__str__()}", extra={"user_shortname": user_shortname})
                 break
     except WebSocketDisconnect:
         logger.info("WebSocket connection closed", extra={"user_shortname": user_shortname})
-        websocket_manager.disconnect(user_shortname)
+    finally:
+        websocket_manager.disconnect(connection)
 
 
 @app.api_route(path="/send-message/{user_shortname}", methods=["post"])
 async def send_message(user_shortname: str, data: dict = Body(...)):
     formatted_message = json.dumps({"type": data["type"], "message": data["message"]})
-    is_sent = await websocket_manager.send_message(formatted_message, user_shortname)
+    is_sent = await broker.send_message(formatted_message, user_shortname)
     return JSONResponse(status_code=status.HTTP_200_OK, content={"status": ResponseStatus.success, "message_sent": is_sent})
 
 
 @app.api_route(path="/broadcast-to-channels", methods=["post"])
 async def broadcast(data: dict = Body(...)):
     formatted_message = json.dumps({"type": data["type"], "message": data["message"]})
+    is_sent = await broker.broadcast([(formatted_message, data["channels"])])
+    return JSONResponse(status_code=status.HTTP_200_OK, content={"status": ResponseStatus.success, "message_sent": is_sent})
 
-    is_sent = False
-    for channel_name in data["channels"]:
-        is_sent = await websocket_manager.broadcast_message(formatted_message, channel_name) or is_sent
 
-    return JSONResponse(status_code=status.HTTP_200_OK, content={"status": ResponseStatus.success, "message_sent": is_sent})
+@app.api_route(path="/broadcast", methods=["post"])
+async def broadcast_events(data: dict = Body(...)):
+    """Many `/broadcast-to-channels` payloads at once: `{"events": [{"type", "message", "channels"}, ...]}`"""
+    events = data.get("events", [])
+    is_sent = await broker.broadcast(
+        [(json.dumps({"type": event["type"], "message": event["message"]}), event["channels"]) for event in events]
+    )
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"status": ResponseStatus.success, "events": len(events), "message_sent": is_sent},
+    )
 
 
 @app.api_route(path="/info", methods=["get"])
 async def service_info():
     return JSONResponse(
         status_code=status.HTTP_200_OK,
-        content={
-            "status": ResponseStatus.success,
-            "data": {
-                "connected_clients": str(websocket_manager.active_connections),
-                "channels": str(websocket_manager.channels),
-            },
-        },
+        content={"status": ResponseStatus.success, "data": {**websocket_manager.info(), "broker": broker.name}},
     )
 
 
@@ -32,6 +32,7 @@ from models.enums import Status as ResponseStatus
 from utils.access_control import access_control
 from utils.jwt import decode_jwt
 from utils.logger import logging_schema
+from utils.realtime_broker import create_broker
 from utils.settings import settings
 
 all_MKW = "__ALL__"
@@ -181,6 +182,7 @@ class WebTransportConnectionManager:
 
 
 manager = WebTransportConnectionManager()
+broker = create_broker(manager, f"{settings.realtime_broker_channel}_wt")
 
 
 # ---------------------------------------------------------------------------
@@ -409,8 +411,10 @@ fingerprint_cache: str | None = None
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("WebTransporter starting up")
+    await broker.start()
     yield
     print("WebTransporter shutting down")
+    await broker.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -438,7 +442,7 @@ async def get_fingerprint():
 @app.api_route("/send-message/{user_shortname}", methods=["POST"])
 async def send_message(user_shortname: str, data: dict = Body(...)):
     formatted = json.dumps({"type": data["type"], "message": data["message"]})
-    is_sent = await manager.send_message(formatted, user_shortname)
+    is_sent = await broker.send_message(formatted, user_shortname)
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={"status": ResponseStatus.success, "message_sent": is_sent},
@@ -448,15 +452,26 @@ async def send_message(user_shortname: str, data: dict = Body(...)):
 @app.api_route("/broadcast-to-channels", methods=["POST"])
 async def broadcast(data: dict = Body(...)):
     formatted = json.dumps({"type": data["type"], "message": data["message"]})
-    is_sent = False
-    for channel_name in data["channels"]:
-        is_sent = await manager.broadcast_message(formatted, channel_name) or is_sent
+    is_sent = await broker.broadcast([(formatted, data["channels"])])
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={"status": ResponseStatus.success, "message_sent": is_sent},
     )
 
 
+@app.api_route("/broadcast", methods=["POST"])
+async def broadcast_events(data: dict = Body(...)):
+    """Many `/broadcast-to-channels` payloads at once: `{"events": [{"type", "message", "channels"}, ...]}`"""
+    events = data.get("events", [])
+    is_sent = await broker.broadcast(
+        [(json.dumps({"type": event["type"], "message": event["message"]}), event["channels"]) for event in events]
+    )
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"status": ResponseStatus.success, "events": len(events), "message_sent": is_sent},
+    )
+
+
 @app.api_route("/info", methods=["GET"])
 async def service_info():
     return JSONResponse(
@@ -466,6 +481,7 @@ async def service_info():
             "data": {
                 "connected_clients": list(manager.active_connections.keys()),
                 "channels": manager.channels,
+                "broker": broker.name,
             },
         },
     )